@@ -163,7 +163,36 @@ class RunnerThread(QtCore.QThread):
         self.pm_dir = pm_dir
         self.generate_py = generate_py
 
+    def _run_via_daemon(self) -> bool:
+        """Submit generate.py's batch to a running ACM daemon (ACM_DAEMON_URL). False = not available."""
+        if Path(self.generate_py).name != "generate.py":
+            return False
+        try:
+            try:
+                from functions import daemon
+            except Exception:
+                from api_cost_multiplier.functions import daemon
+            client = daemon.client_from_env()
+            if client is None or not client.available():
+                return False
+            job = client.submit("batch", config=str(Path(self.pm_dir) / "config.yaml"))
+        except Exception as e:
+            print(f"[WARN] ACM daemon submission failed, launching generate.py instead: {e}", flush=True)
+            return False
+        print(f"[INFO] Submitted batch to ACM daemon {client.url} as job {job['id']}", flush=True)
+        try:
+            final = daemon.follow_job(client, job["id"], echo=lambda line: print(line, flush=True))
+        except Exception as e:
+            self.finished_ok.emit(False, -1, f"Lost connection to ACM daemon job {job['id']}: {e}")
+            return True
+        ok = final.get("state") == daemon.STATE_DONE
+        msg = "daemon job finished successfully" if ok else f"daemon job {final.get('state')}: {final.get('error')}"
+        self.finished_ok.emit(ok, 0 if ok else 1, msg)
+        return True
+
     def run(self) -> None:  # type: ignore[override]
+        if self._run_via_daemon():
+            return
         try:
             cmd = [sys.executable, "-u", str(self.generate_py)]
             env = os.environ.copy()
@@ -9,13 +9,15 @@ from typing import List, Dict, Optional
 
 # Import FPF runner
 try:
-    from functions import fpf_runner
+    from functions import fpf_runner, rate_limiter
+    from functions.dag import Dag
     from functions.pm_utils import uid3, sanitize_model_for_filename
 except ImportError:
     # Fallback for relative import if needed
     import sys
     sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-    from functions import fpf_runner
+    from functions import fpf_runner, rate_limiter
+    from functions.dag import Dag
     from functions.pm_utils import uid3, sanitize_model_for_filename
 
 class ReportCombiner:
@@ -196,17 +198,10 @@ class ReportCombiner:
                 tmp_instr.write("You are an expert editor. Please generate the combined report as requested in the input file.")
                 tmp_instr_path = tmp_instr.name
 
-            for idx, model_cfg in enumerate(self.models):
-                if not model_cfg or not model_cfg.get('model'):
-                    self.logger.warning(f"Skipping model entry {idx}: No model configuration found.")
-                    continue
-
-                provider = model_cfg.get('provider', 'openai')
-                model_name = model_cfg.get('model')
-                label = f"{provider}_{model_name}".replace(":", "_").replace("/", "_")
-                
+            # One node per combine model; they run side by side (bounded by combine.max_concurrent
+            # and the shared provider limits) instead of one after another.
+            async def _combine_with(provider: str, model_name: str, label: str) -> Optional[str]:
                 self.logger.info(f"Generating combined report with {label} ({provider}/{model_name})...")
-
                 try:
                     options = {
                         "provider": provider,
@@ -214,13 +209,15 @@ class ReportCombiner:
                         "json": False
                     }
                     
-                    # Call FPF
-                    results = await fpf_runner.run_filepromptforge_runs(
-                        file_a_path=tmp_instr_path,
-                        file_b_path=tmp_input_path,
-                        num_runs=1,
-                        options=options
-                    )
+                    # Call FPF (under the shared provider rate limits)
+                    limiter = rate_limiter.get_rate_limiter()
+                    async with limiter.limit(provider, model_name, requests=1, tokens=limiter.estimate_tokens(prompt_content, "combine"), kind="combine"):
+                        results = await fpf_runner.run_filepromptforge_runs(
+                            file_a_path=tmp_instr_path,
+                            file_b_path=tmp_input_path,
+                            num_runs=1,
+                            options=options
+                        )
 
                     if results:
                         src_path, _ = results[0]
@@ -234,13 +231,38 @@ class ReportCombiner:
                         
                         shutil.copy2(src_path, filepath)
                         
-                        generated_files.append(filepath)
                         self.logger.info(f"Saved combined report to: {filepath}")
+                        return filepath
                     else:
                         self.logger.error(f"Failed to get response from {label}")
 
                 except Exception as e:
                     self.logger.error(f"Error generating with {label}: {e}")
+                return None
+
+            max_concurrent = self.combine_config.get('max_concurrent') or len(self.models)
+            graph = Dag(name=f"combine:{base_name}", limits={"combine": max_concurrent}, log=self.logger.info)
+            node_names = []
+            for idx, model_cfg in enumerate(self.models):
+                if not model_cfg or not model_cfg.get('model'):
+                    self.logger.warning(f"Skipping model entry {idx}: No model configuration found.")
+                    continue
+
+                provider = model_cfg.get('provider', 'openai')
+                model_name = model_cfg.get('model')
+                label = f"{provider}_{model_name}".replace(":", "_").replace("/", "_")
+                node = f"{idx}:{label}"
+                async def _node(_inputs, p=provider, m=model_name, lb=label):
+                    return await _combine_with(p, m, lb)
+                graph.add(node, _node, resource="combine")
+                node_names.append(node)
+
+            results_by_node = await graph.run()
+            # Keep the configured model order
+            for node in node_names:
+                res = results_by_node.get(node)
+                if res is not None and res.ok and res.result:
+                    generated_files.append(res.result)
         
         finally:
             # Cleanup temp files
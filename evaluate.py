@@ -7,11 +7,9 @@ import sqlite3
 import datetime
 import logging
 import argparse # Import argparse
-import tempfile
 import uuid
-import time
 import json
-from functions import logging_levels, config_parser
+from functions import logging_levels, config_parser, workspaces
 
 # Add the local llm-doc-eval package directory to sys.path
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -221,36 +219,14 @@ async def main():
         
         print(f"\nValid candidates: {len(candidates)}")
         
-        # Create FRESH temp directory with timestamp to prevent reuse
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        temp_eval_dir = os.path.join(tempfile.gettempdir(), f"llm_eval_{timestamp}")
-        os.makedirs(temp_eval_dir, exist_ok=True)
-        
+        # Create a FRESH per-run workspace to prevent reuse. Stale ones (crashed runs) are
+        # removed by the runner's workspace reaper, not by scanning the temp dir here.
+        temp_workspace = workspaces.create("llm_eval")
+        temp_eval_dir = temp_workspace.path
+
         print(f"Created fresh temp directory: {temp_eval_dir}")
         logging.getLogger("eval").info("[EVAL_TEMP_DIR] Created fresh: %s", temp_eval_dir)
-        
-        # Clean up OLD temp directories (older than 1 hour)
-        try:
-            temp_root = tempfile.gettempdir()
-            cutoff = time.time() - 3600  # 1 hour ago
-            cleaned_count = 0
-            for item in os.listdir(temp_root):
-                if item.startswith("llm_eval_") or item.startswith("llm_doc_eval_single_batch_"):
-                    item_path = os.path.join(temp_root, item)
-                    if os.path.isdir(item_path):
-                        try:
-                            mtime = os.path.getmtime(item_path)
-                            if mtime < cutoff:
-                                shutil.rmtree(item_path)
-                                cleaned_count += 1
-                                print(f"  Cleaned up stale temp directory: {item}")
-                        except Exception:
-                            pass
-            if cleaned_count > 0:
-                print(f"  Cleaned up {cleaned_count} stale temp directories")
-        except Exception as e:
-            print(f"  Warning: Could not clean up old temp directories: {e}")
-        
+
         # Copy files to temp directory
         temp_candidates = []
         for f in candidates:
@@ -749,9 +725,10 @@ async def main():
         print(f"Evaluation failed: {e}")
     finally:
         # Clean up temporary directory if it was created
-        if args.target_files and 'temp_eval_dir' in locals() and os.path.exists(temp_eval_dir):
+        if args.target_files and 'temp_workspace' in locals():
             try:
-                shutil.rmtree(temp_eval_dir)
+                temp_workspace.release()
+                workspaces.get_manager().reap()
                 print(f"Cleaned up temporary evaluation directory: {temp_eval_dir}")
             except Exception as e:
                 print(f"Warning: Failed to clean up temporary evaluation directory {temp_eval_dir}: {e}")
@@ -5,7 +5,11 @@ Provides:
 - MA_CLI_PATH
 - TEMP_BASE
 - async run_multi_agent_once(query_text, output_folder, run_index) -> list[str]
-- async run_multi_agent_runs(query_text, num_runs=3) -> list[(path, model_name)]
+- async run_multi_agent_runs(query_text, num_runs=3, ..., guidelines=None) -> list[(path, model_name)]
+
+The CLI runs through functions.process_runner (asyncio subprocess, async line readers).
+Guidelines come from the batch's run context (functions.run_context), read once per
+batch; config.yaml is only consulted when there is no context.
 """
 
 from __future__ import annotations
@@ -13,33 +17,39 @@ from __future__ import annotations
 import os
 import sys
 import uuid
-import subprocess
 import shutil
 import json
 import re  # Import re for JSON extraction from text
 import time
 import asyncio
 from pathlib import Path
-import threading
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Optional, Sequence
 from datetime import datetime # Import datetime for _normalize_plan_output
 
-from .pm_utils import ensure_temp_dir, load_env_file
+from .pm_utils import load_env_file
+from . import deadlines
+from . import process_runner
+from . import run_context
+from . import workspaces
 
 # Path to the MA CLI script (assume MA_CLI is sibling to process_markdown directory)
 MA_CLI_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "MA_CLI", "Multi_Agent_CLI.py"))
 
 # Temp base dir for intermediate outputs (placed under process_markdown directory)
-TEMP_BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "temp_process_markdown_noeval"))
-# Hard timeout for MA_CLI subprocess (seconds)
+TEMP_BASE = workspaces.ROOT
+# Hard timeout for MA_CLI subprocess (seconds) when the caller passes no deadline
 TIMEOUT_SECONDS = 600
 
 
-async def run_multi_agent_once(query_text: str, output_folder: str, run_index: int, task_config: dict | None = None) -> List[str]:
+async def run_multi_agent_once(query_text: str, output_folder: str, run_index: int, task_config: dict | None = None, deadline: Optional[deadlines.Deadline] = None) -> List[str]:
     """
     Run the Multi_Agent_CLI.py as a subprocess once.
     Returns the path to the generated markdown file (absolute) on success.
+    deadline bounds the child (default: TIMEOUT_SECONDS under the current deadline); on expiry
+    its whole process group is terminated and a .failed.json artifact is returned instead.
     """
+    if deadline is None:
+        deadline = deadlines.current().child(TIMEOUT_SECONDS, "run:ma")
     if not os.path.exists(MA_CLI_PATH):
         raise FileNotFoundError(f"Multi-Agent CLI not found at {MA_CLI_PATH}")
 
@@ -130,94 +140,27 @@ async def run_multi_agent_once(query_text: str, output_folder: str, run_index: i
                 py_paths.append(p)
     
     env["PYTHONPATH"] = os.pathsep.join(py_paths)
+    deadline.apply_env(env)
 
     # Record run start time for artifact discovery
     start_ts = time.time()
 
-    # Use Popen to stream stdout/stderr; disable stdin so CLI won't block on input()
-    # Set cwd to local_multi_agents if it exists so the MA CLI resolves repo-local task.json and modules
+    # Stream stdout/stderr line by line with a "[MA run N]" prefix; stdin is disabled so the
+    # CLI won't block on input(). Set cwd to local_multi_agents if it exists so the MA CLI
+    # resolves repo-local task.json and modules
     popen_cwd = local_multi_agents if local_multi_agents and os.path.isdir(local_multi_agents) else None
 
-    process = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        stdin=subprocess.DEVNULL,
-        env=env,
-        text=True,
-        encoding='utf-8',
-        errors='replace',
-        bufsize=1,
-        cwd=popen_cwd
-    )
-
-    # Read stdout and stderr concurrently using threads to avoid blocking
-    stdout_lines = []
-    stderr_lines = []
-
-    def _reader(stream, prefix, collector):
-        """
-        Read from the subprocess stream character-by-character and forward output immediately,
-        while ensuring each logical line is prefixed with the run identifier.
-
-        This preserves live visibility (no newline buffering) and restores the per-line
-        prefix like "[MA run 1] ..." at the start of each logical line.
-        """
-        try:
-            buffer = ""
-            line_started = False
-            while True:
-                ch = stream.read(1)
-                if not ch:
-                    # EOF: flush remaining buffer as a final line
-                    if buffer:
-                        if not line_started:
-                            print(f"{prefix} ", end="", flush=True)
-                        print(buffer, flush=True)
-                        collector.append(buffer)
-                        buffer = ""
-                    break
-
-                # If this is the first character of a logical line, print the prefix
-                if not line_started:
-                    print(f"{prefix} ", end="", flush=True)
-                    line_started = True
-
-                # Print character immediately so console shows live output
-                print(ch, end="", flush=True)
-                buffer += ch
-
-                # If we've reached newline, treat as complete line
-                if ch == "\n":
-                    line = buffer.rstrip("\r\n")
-                    collector.append(line)
-                    buffer = ""
-                    line_started = False
-        finally:
-            try:
-                stream.close()
-            except Exception:
-                pass
-
-    t_out = threading.Thread(target=_reader, args=(process.stdout, f"[MA run {run_index}]", stdout_lines), daemon=True)
-    t_err = threading.Thread(target=_reader, args=(process.stderr, f"[MA run {run_index} ERR]", stderr_lines), daemon=True)
-
-    t_out.start()
-    t_err.start()
-
-    # Wait for process to exit with timeout and ensure readers finish
-    try:
-        process.wait(timeout=TIMEOUT_SECONDS)
-    except subprocess.TimeoutExpired:
-        # Kill on timeout and emit a failed artifact; do not crash the pipeline
-        try:
-            process.kill()
-        except Exception:
-            pass
-        # Join reader threads to drain buffers
-        t_out.join(timeout=5)
-        t_err.join(timeout=5)
-
+    def _on_line(stream, line):
+        prefix = f"[MA run {run_index} ERR]" if stream == process_runner.STDERR else f"[MA run {run_index}]"
+        print(f"{prefix} {line}", flush=True)
+
+    # Wait for the process to exit (on the event loop) until the deadline
+    budget = deadline.remaining()
+    res = await process_runner.run_process(cmd, env=env, cwd=popen_cwd, on_line=_on_line, deadline=deadline, tail_lines=50)
+    stdout_lines = res.stdout
+    stderr_lines = res.stderr
+    if res.timed_out:
+        # Process group already terminated; emit a failed artifact and do not crash the pipeline
         # Produce a .failed.json artifact alongside expected output
         failed_name = output_filename.replace(".json", ".failed.json")
         failed_path = os.path.join(output_folder, failed_name)
@@ -227,7 +170,8 @@ async def run_multi_agent_once(query_text: str, output_folder: str, run_index: i
             with open(failed_path, "w", encoding="utf-8") as fh:
                 json.dump({
                     "error": "MA_CLI subprocess timed out",
-                    "timeout_seconds": TIMEOUT_SECONDS,
+                    "reason": res.reason,
+                    "timeout_seconds": round(budget) if budget is not None else None,
                     "stdout_tail": tail_out,
                     "stderr_tail": tail_err
                 }, fh, ensure_ascii=False, indent=2)
@@ -235,13 +179,10 @@ async def run_multi_agent_once(query_text: str, output_folder: str, run_index: i
             pass
         return [os.path.abspath(failed_path)]
 
-    t_out.join(timeout=5)
-    t_err.join(timeout=5)
-
     stderr_out = "\n".join(stderr_lines)
 
     # Check return code
-    if process.returncode != 0:
+    if res.returncode != 0:
         # Produce a .failed.json artifact on non-zero exit, do not raise
         failed_name = output_filename.replace(".json", ".failed.json")
         failed_path = os.path.join(output_folder, failed_name)
@@ -251,7 +192,7 @@ async def run_multi_agent_once(query_text: str, output_folder: str, run_index: i
             with open(failed_path, "w", encoding="utf-8") as fh:
                 json.dump({
                     "error": "MA_CLI subprocess failed",
-                    "exit_code": process.returncode,
+                    "exit_code": res.returncode,
                     "stdout_tail": tail_out,
                     "stderr_tail": tail_err
                 }, fh, ensure_ascii=False, indent=2)
@@ -314,12 +255,32 @@ async def run_multi_agent_once(query_text: str, output_folder: str, run_index: i
 
     return artifacts
 
+def _guidelines_from_config() -> List[str]:
+    """Guideline lines from the repo config.yaml's guidelines_file (callers outside a runner batch)."""
+    try:
+        repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        config_path = os.path.join(repo_root, "config.yaml")
+        if os.path.exists(config_path):
+            import yaml
+            with open(config_path, "r", encoding="utf-8") as f:
+                cfg = yaml.safe_load(f) or {}
+            guidelines_file = cfg.get("guidelines_file")
+            if guidelines_file and os.path.exists(guidelines_file):
+                with open(guidelines_file, "r", encoding="utf-8") as gf:
+                    return [line.strip() for line in gf.readlines() if line.strip()]
+    except Exception as e:
+        print(f"  Warning: Failed to load guidelines: {e}")
+    return []
+
+
 async def run_multi_agent_runs_concurrent(
     query_text: str,
     num_runs: int = 3,
     model: str | None = None,
     max_sections: Optional[int] = 3,
-    max_concurrent: int | None = None
+    max_concurrent: int | None = None,
+    deadline: Optional[deadlines.Deadline] = None,
+    guidelines: Optional[Sequence[str]] = None,
 ) -> List[Tuple[str, str]]:
     """
     Run MA jobs concurrently with optional concurrency limiting via asyncio.Semaphore.
@@ -333,6 +294,8 @@ async def run_multi_agent_runs_concurrent(
         model: Explicit model name (required)
         max_sections: Max sections per report
         max_concurrent: Limit to N parallel MA runs (None = unlimited)
+        deadline: Shared deadline for every run (None = TIMEOUT_SECONDS per run)
+        guidelines: Guideline lines for the task config (None = from the run context)
     
     Returns:
         List of (path, model_name) tuples
@@ -341,35 +304,18 @@ async def run_multi_agent_runs_concurrent(
         raise RuntimeError("MA model is required; no defaults or env fallbacks are allowed.")
     model_value = model.strip()
 
+    if guidelines is None:
+        ctx = run_context.get_context()
+        guidelines = ctx.guidelines if ctx is not None else _guidelines_from_config()
+    guidelines_list = list(guidelines)
+
     results: List[Tuple[str, str]] = []
     sem = asyncio.Semaphore(max_concurrent or num_runs)
     
     async def _run_one(i: int):
         async with sem:
-            run_temp = ensure_temp_dir(os.path.join(TEMP_BASE, f"ma_run_{uuid.uuid4()}"))
+            run_temp = workspaces.create("ma_run").path
             try:
-                # Load guidelines if configured
-                guidelines_list = []
-                follow_guidelines = False
-                try:
-                    # Attempt to load config.yaml to find guidelines_file
-                    # This is a bit hacky as we are inside a library function, but we need the path
-                    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-                    config_path = os.path.join(repo_root, "config.yaml")
-                    if os.path.exists(config_path):
-                        import yaml
-                        with open(config_path, "r", encoding="utf-8") as f:
-                            cfg = yaml.safe_load(f)
-                            guidelines_file = cfg.get("guidelines_file")
-                            if guidelines_file and os.path.exists(guidelines_file):
-                                with open(guidelines_file, "r", encoding="utf-8") as gf:
-                                    # Read lines and filter empty
-                                    guidelines_list = [line.strip() for line in gf.readlines() if line.strip()]
-                                    if guidelines_list:
-                                        follow_guidelines = True
-                except Exception as e:
-                    print(f"  Warning: Failed to load guidelines: {e}")
-
                 task_cfg = {
                     "model": model_value,
                     "publish_formats": {
@@ -379,12 +325,12 @@ async def run_multi_agent_runs_concurrent(
                     },
                     "max_sections": max_sections,
                     "include_human_feedback": False,
-                    "follow_guidelines": follow_guidelines,
+                    "follow_guidelines": bool(guidelines_list),
                     "guidelines": guidelines_list,
                     "verbose": False,
                     # query is supplied via --query-file to MA_CLI
                 }
-                paths = await run_multi_agent_once(query_text, run_temp, i, task_config=task_cfg)
+                paths = await run_multi_agent_once(query_text, run_temp, i, task_config=task_cfg, deadline=deadline)
                 for p in paths:
                     results.append((p, model_value))
             except Exception as e:
@@ -397,7 +343,7 @@ async def run_multi_agent_runs_concurrent(
     return results
 
 
-async def run_multi_agent_runs(query_text: str, num_runs: int = 3, model: str | None = None, max_sections: Optional[int] = 3) -> List[Tuple[str, str]]:
+async def run_multi_agent_runs(query_text: str, num_runs: int = 3, model: str | None = None, max_sections: Optional[int] = 3, deadline: Optional[deadlines.Deadline] = None, guidelines: Optional[Sequence[str]] = None) -> List[Tuple[str, str]]:
     """
     Strictly file-based invocation:
     - Requires an explicit model (no defaults, no env inference)
@@ -409,5 +355,7 @@ async def run_multi_agent_runs(query_text: str, num_runs: int = 3, model: str |
         num_runs=num_runs,
         model=model,
         max_sections=max_sections,
-        max_concurrent=None
+        max_concurrent=None,
+        deadline=deadline,
+        guidelines=guidelines,
     )
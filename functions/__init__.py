@@ -1,8 +1,19 @@
 """
 Package init for process_markdown.functions
 
-Exports selected modules with minimal side effects.
+Exports selected modules with minimal side effects. The exported modules are
+imported on first attribute access, so leaf modules (process_runner,
+rate_limiter, run_journal, ...) can be imported without pulling in
+gpt_researcher and the FPF logging setup.
 """
-from . import pm_utils, MA_runner, fpf_runner, config_parser, file_manager, gpt_researcher_client
+import importlib
 
 __all__ = ["pm_utils", "MA_runner", "fpf_runner", "config_parser", "file_manager", "gpt_researcher_client"]
+
+
+def __getattr__(name):
+    if name in __all__:
+        module = importlib.import_module(f"{__name__}.{name}")
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
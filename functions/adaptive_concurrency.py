@@ -0,0 +1,263 @@
+"""
+AIMD adaptive concurrency for ACM providers.
+
+Static caps such as concurrency.gpt_researcher.max_concurrent_reports are
+either too low off-peak or too high at peak. This module watches run
+outcomes and moves each provider's concurrency cap at runtime:
+
+- additive increase: +increase/limit per success (about +increase per "window"
+  of `limit` successful runs)
+- multiplicative decrease: limit *= decrease_factor on a rate-limit (429) or
+  server error (5xx/overloaded/timeout), at most once per cooldown so a burst of
+  failures from the same congestion event only backs off once
+
+Signals come from:
+- FPF RUN_COMPLETE events (status=/error= fields)
+- GPT-R / MA subprocess failures (stderr text)
+- FilePromptForge's error_classifier categories, when importable
+
+The cap is enforced through the shared provider rate limiter
+(functions.rate_limiter), which this module enables when adaptive mode is on.
+FPF schedules its runs inside its own child process, where the limiter
+cannot reach, so the runner launches one FPF batch per provider with
+--max-concurrency set to cap(provider). The cap is read when the batch
+launches. A batch that is already running keeps its concurrency, and the next
+batch for that provider picks up the new cap.
+
+Config (ACM config.yaml):
+  concurrency:
+    adaptive:
+      enabled: false
+      initial: 8
+      min: 1
+      max: 32
+      increase: 1
+      decrease_factor: 0.5
+      cooldown_seconds: 15
+      providers:            # optional per-provider overrides of the keys above
+        openai: {initial: 11, max: 40}
+
+API:
+- configure(config, limiter=None) -> AdaptiveConcurrency   (module singleton)
+- get_controller() -> AdaptiveConcurrency
+- classify_outcome(ok, status=None, error_text="") -> "ok"|"rate_limit"|"server_error"|"error"
+- AdaptiveConcurrency.record_result(provider, model, ok, status=None, error_text="") -> None
+- AdaptiveConcurrency.cap(provider) -> int | None   (current cap; None when adaptive mode is off)
+- AdaptiveConcurrency.snapshot() -> dict
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+try:
+    # Made importable by functions.fpf_runner (adds FilePromptForge to sys.path)
+    from error_classifier import classify_error as _classify_error  # type: ignore
+    _HAS_ERROR_CLASSIFIER = True
+except Exception:
+    _classify_error = None
+    _HAS_ERROR_CLASSIFIER = False
+
+RATE_LIMIT_RE = re.compile(r"\b429\b|rate[\s_-]?limit|too many requests|resource[\s_]?exhausted|quota", re.IGNORECASE)
+SERVER_ERROR_RE = re.compile(
+    r"\b50[0234]\b|internal server error|bad gateway|service unavailable|overloaded|gateway timeout|timed? ?out",
+    re.IGNORECASE,
+)
+
+OUTCOME_OK = "ok"
+OUTCOME_RATE_LIMIT = "rate_limit"
+OUTCOME_SERVER_ERROR = "server_error"
+OUTCOME_ERROR = "error"
+
+
+def classify_outcome(ok: bool, status: Optional[str] = None, error_text: str = "") -> str:
+    """Map a run result to an AIMD signal. Plain errors (validation, bad input) do not adjust limits."""
+    if ok:
+        return OUTCOME_OK
+    st = str(status or "").strip().lower()
+    if st.isdigit():
+        code = int(st)
+        if code == 429:
+            return OUTCOME_RATE_LIMIT
+        if 500 <= code <= 599:
+            return OUTCOME_SERVER_ERROR
+    text = f"{st} {error_text or ''}"
+    if RATE_LIMIT_RE.search(text):
+        return OUTCOME_RATE_LIMIT
+    if SERVER_ERROR_RE.search(text):
+        return OUTCOME_SERVER_ERROR
+    if _HAS_ERROR_CLASSIFIER and error_text:
+        try:
+            category = _classify_error(Exception(error_text), stderr_text=error_text)
+            name = str(getattr(category, "name", category)).upper()
+            if "RATE" in name or "QUOTA" in name:
+                return OUTCOME_RATE_LIMIT
+            if "SERVER" in name or "TRANSIENT" in name or "TIMEOUT" in name or "NETWORK" in name:
+                return OUTCOME_SERVER_ERROR
+        except Exception:
+            pass
+    return OUTCOME_ERROR
+
+
+class AimdLimit:
+    def __init__(
+        self,
+        initial: float,
+        min_limit: float = 1,
+        max_limit: float = 32,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        cooldown_seconds: float = 15.0,
+    ) -> None:
+        self.min_limit = max(1.0, float(min_limit))
+        self.max_limit = max(self.min_limit, float(max_limit))
+        self.limit = min(self.max_limit, max(self.min_limit, float(initial)))
+        self.increase = max(0.0, float(increase))
+        self.decrease_factor = min(0.99, max(0.05, float(decrease_factor)))
+        self.cooldown_seconds = max(0.0, float(cooldown_seconds))
+        self._last_decrease = float("-inf")
+
+    @property
+    def value(self) -> int:
+        return int(self.limit)
+
+    def on_success(self) -> None:
+        self.limit = min(self.max_limit, self.limit + self.increase / max(1.0, self.limit))
+
+    def on_congestion(self, now: Optional[float] = None) -> bool:
+        """Multiplicative decrease; returns False when still inside the cooldown window."""
+        now = time.monotonic() if now is None else now
+        if now - self._last_decrease < self.cooldown_seconds:
+            return False
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        return True
+
+
+class AdaptiveConcurrency:
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, limiter=None) -> None:
+        settings = settings or {}
+        self.enabled = bool(settings.get("enabled", False))
+        self._defaults = {
+            "initial": settings.get("initial", 8),
+            "min": settings.get("min", 1),
+            "max": settings.get("max", 32),
+            "increase": settings.get("increase", 1),
+            "decrease_factor": settings.get("decrease_factor", 0.5),
+            "cooldown_seconds": settings.get("cooldown_seconds", 15),
+        }
+        self._overrides = {str(k).strip().lower(): dict(v or {}) for k, v in (settings.get("providers") or {}).items()}
+        self._limiter = limiter
+        self._lock = threading.Lock()
+        self._limits: Dict[str, AimdLimit] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._log = logging.getLogger("acm")
+
+    def ceiling(self) -> int:
+        """Largest cap any provider may reach (used to size local per-type semaphores)."""
+        vals = [self._defaults.get("max", 32)] + [o.get("max", 0) for o in self._overrides.values()]
+        try:
+            return max(1, max(int(v or 0) for v in vals))
+        except Exception:
+            return 32
+
+    def _limit_for(self, provider: str) -> AimdLimit:
+        lim = self._limits.get(provider)
+        if lim is None:
+            cfg = dict(self._defaults)
+            cfg.update(self._overrides.get(provider, {}))
+            lim = AimdLimit(
+                initial=cfg["initial"],
+                min_limit=cfg["min"],
+                max_limit=cfg["max"],
+                increase=cfg["increase"],
+                decrease_factor=cfg["decrease_factor"],
+                cooldown_seconds=cfg["cooldown_seconds"],
+            )
+            self._limits[provider] = lim
+            self._counts[provider] = {OUTCOME_OK: 0, OUTCOME_RATE_LIMIT: 0, OUTCOME_SERVER_ERROR: 0, OUTCOME_ERROR: 0}
+            self._apply(provider, lim.value)
+        return lim
+
+    def _apply(self, provider: str, value: int) -> None:
+        if self._limiter is not None:
+            try:
+                self._limiter.set_provider_max_concurrent(provider, value)
+            except Exception:
+                pass
+
+    def prime(self, provider: Optional[str]) -> None:
+        """Install the initial cap for a provider before its first run launches."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._limit_for((provider or "").strip().lower())
+
+    def cap(self, provider: Optional[str]) -> Optional[int]:
+        """Current cap for a provider (primed on first use); None when adaptive mode is off."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._limit_for((provider or "").strip().lower()).value
+
+    def record(self, provider: Optional[str], outcome: str) -> None:
+        if not self.enabled:
+            return
+        p = (provider or "").strip().lower()
+        if not p:
+            return
+        changed = None
+        with self._lock:
+            lim = self._limit_for(p)
+            before = lim.value
+            self._counts[p][outcome] = self._counts[p].get(outcome, 0) + 1
+            if outcome == OUTCOME_OK:
+                lim.on_success()
+            elif outcome in (OUTCOME_RATE_LIMIT, OUTCOME_SERVER_ERROR):
+                lim.on_congestion()
+            after = lim.value
+            if after != before:
+                changed = (before, after)
+        if changed:
+            self._apply(p, changed[1])
+            try:
+                self._log.info("[ADAPTIVE] provider=%s limit=%s->%s reason=%s", p, changed[0], changed[1], outcome)
+            except Exception:
+                pass
+
+    def record_result(self, provider: Optional[str], model: Optional[str], ok: bool, status: Optional[str] = None, error_text: str = "") -> str:
+        outcome = classify_outcome(ok, status, error_text)
+        self.record(provider, outcome)
+        return outcome
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                p: {"limit": lim.value, "raw": round(lim.limit, 3), "outcomes": dict(self._counts.get(p, {}))}
+                for p, lim in self._limits.items()
+            }
+
+
+_CONTROLLER: Optional[AdaptiveConcurrency] = None
+
+
+def configure(config: Optional[dict], limiter=None) -> AdaptiveConcurrency:
+    """Build the process-wide controller from concurrency.adaptive and attach it to the rate limiter."""
+    global _CONTROLLER
+    settings = (((config or {}).get("concurrency") or {}).get("adaptive")) or {}
+    _CONTROLLER = AdaptiveConcurrency(settings, limiter=limiter)
+    if _CONTROLLER.enabled and limiter is not None:
+        # Adaptive caps are enforced by the provider limiter, even without a rate_limits section
+        limiter.enabled = True
+    return _CONTROLLER
+
+
+def get_controller() -> AdaptiveConcurrency:
+    global _CONTROLLER
+    if _CONTROLLER is None:
+        _CONTROLLER = AdaptiveConcurrency({})
+    return _CONTROLLER
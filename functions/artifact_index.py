@@ -0,0 +1,245 @@
+"""
+Persistent index of produced artifacts for ACM's skip check.
+
+runner.main() skips an input file when `<base_name>.*` already exists in the
+eval output tree, the winners directory or the generated outputs directory.
+Answering that by walking/listing those directories for every input file is
+O(files x tree size); with thousands of historical eval runs it adds minutes to
+startup. This index is built once per directory ("root"), stored in SQLite and
+updated incrementally whenever runner writes outputs, winners or eval copies.
+
+Lookups are keyed by (root, prefix) where the prefixes of "a.b.gptr.1.m.x.md"
+are "a", "a.b", "a.b.gptr", ... - the same matches as
+`filename.startswith(f"{base_name}.")`. A hit is verified with os.path.exists
+and dropped when the file has since been deleted.
+
+Freshness: for non-recursive roots (the winners and generated outputs
+directories) the directory's st_mtime is stored with the listing and the root
+is re-listed whenever it changes, so files that another process (a second
+runner, the GUI, a copy by hand) added or removed show up on the next
+ensure(). A recursive root (the eval output tree) is not mtime-checked: a
+directory's mtime does not change when files land in its subdirectories, so
+it is re-listed only after max_age_hours and until then misses files that
+other processes wrote under it. This process's own writes reach every root
+through add_path().
+
+Config (ACM config.yaml):
+  skip_index:
+    path: logs/artifact_index.sqlite   # relative to the config file directory
+    max_age_hours: 24                  # rebuild a root when its listing is older than this (0 = never);
+                                       # the only refresh for the recursive eval output root
+
+API:
+- configure(config, config_dir) -> ArtifactIndex   (module singleton)
+- get_index() -> ArtifactIndex
+- ArtifactIndex.ensure(root, recursive=False, exts=None) -> None   (build once)
+- ArtifactIndex.add_path(path) -> None                               (incremental update)
+- ArtifactIndex.find(root, base_name) -> str | None
+- ArtifactIndex.count(root, base_name) -> int
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Sequence
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (
+    root TEXT PRIMARY KEY,
+    recursive INTEGER NOT NULL,
+    exts TEXT,
+    built_at REAL NOT NULL,
+    dir_mtime REAL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    root TEXT NOT NULL,
+    prefix TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (root, prefix, path)
+);
+"""
+
+
+def name_prefixes(filename: str) -> List[str]:
+    """Every base_name for which filename.startswith(f"{base_name}.") holds."""
+    parts = filename.split(".")
+    return [".".join(parts[:i]) for i in range(1, len(parts))]
+
+
+def _norm(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _dir_mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class ArtifactIndex:
+    def __init__(self, db_path: str = ":memory:", max_age_seconds: float = 0.0) -> None:
+        self.db_path = db_path
+        self.max_age_seconds = max(0.0, float(max_age_seconds or 0.0))
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.executescript(_SCHEMA)
+        if "dir_mtime" not in {row[1] for row in self._conn.execute("PRAGMA table_info(roots)")}:
+            # Index written before directory mtimes were tracked
+            self._conn.execute("ALTER TABLE roots ADD COLUMN dir_mtime REAL")
+            self._conn.commit()
+        # root -> (recursive, exts, built_at, dir_mtime) for roots already built in this process or on disk
+        self._roots: dict = {}
+        for root, recursive, exts, built_at, dir_mtime in self._conn.execute(
+            "SELECT root, recursive, exts, built_at, dir_mtime FROM roots"
+        ):
+            self._roots[root] = (bool(recursive), tuple(json.loads(exts)) if exts else None, float(built_at), dir_mtime)
+
+    # ---- building ----
+
+    def _scan(self, root: str, recursive: bool, exts: Optional[Sequence[str]]) -> Iterable[str]:
+        if recursive:
+            for dirpath, _dirs, files in os.walk(root):
+                for f in files:
+                    if exts is None or f.lower().endswith(tuple(exts)):
+                        yield os.path.join(dirpath, f)
+        else:
+            try:
+                with os.scandir(root) as it:
+                    for entry in it:
+                        if entry.is_file() and (exts is None or entry.name.lower().endswith(tuple(exts))):
+                            yield entry.path
+            except FileNotFoundError:
+                return
+
+    def ensure(self, root: str, recursive: bool = False, exts: Optional[Sequence[str]] = None) -> None:
+        """Index root once (re-index when older than max_age_seconds, the filter changed or, for a
+        non-recursive root, the directory's mtime changed)."""
+        key = _norm(root)
+        exts_t = tuple(e.lower() for e in exts) if exts else None
+        known = self._roots.get(key)
+        if known and known[0] == recursive and known[1] == exts_t:
+            fresh = not self.max_age_seconds or time.time() - known[2] < self.max_age_seconds
+            if fresh and (recursive or known[3] == _dir_mtime(root)):
+                return
+        self.rebuild(root, recursive=recursive, exts=exts_t)
+
+    def rebuild(self, root: str, recursive: bool = False, exts: Optional[Sequence[str]] = None) -> int:
+        key = _norm(root)
+        exts_t = tuple(e.lower() for e in exts) if exts else None
+        # Taken before listing: a file added mid-scan changes it again and triggers the next rebuild
+        dir_mtime = None if recursive else _dir_mtime(root)
+        rows = []
+        for path in self._scan(root, recursive, exts_t):
+            for prefix in name_prefixes(os.path.basename(path)):
+                rows.append((key, prefix, path))
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE root = ?", (key,))
+            self._conn.executemany("INSERT OR IGNORE INTO entries (root, prefix, path) VALUES (?, ?, ?)", rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO roots (root, recursive, exts, built_at, dir_mtime) VALUES (?, ?, ?, ?, ?)",
+                (key, 1 if recursive else 0, json.dumps(list(exts_t)) if exts_t else None, now, dir_mtime),
+            )
+            self._conn.commit()
+            self._roots[key] = (recursive, exts_t, now, dir_mtime)
+        return len(rows)
+
+    # ---- incremental updates ----
+
+    def _roots_for(self, path: str) -> List[str]:
+        full = _norm(path)
+        parent = os.path.dirname(full)
+        out = []
+        for root, (recursive, exts, _built, _mtime) in list(self._roots.items()):
+            if exts is not None and not full.lower().endswith(exts):
+                continue
+            if root == parent or (recursive and (parent + os.sep).startswith(root.rstrip(os.sep) + os.sep)):
+                out.append(root)
+        return out
+
+    def add_path(self, path: str) -> None:
+        """Record a newly written file in every indexed root that would have listed it."""
+        if not path:
+            return
+        roots = self._roots_for(path)
+        if not roots:
+            return
+        prefixes = name_prefixes(os.path.basename(path))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO entries (root, prefix, path) VALUES (?, ?, ?)",
+                [(root, prefix, path) for root in roots for prefix in prefixes],
+            )
+            self._conn.commit()
+
+    def add_paths(self, paths: Iterable[str]) -> None:
+        for p in paths or []:
+            try:
+                self.add_path(p)
+            except Exception:
+                continue
+
+    # ---- lookups ----
+
+    def find(self, root: str, base_name: str) -> Optional[str]:
+        """An existing artifact under root whose name starts with f"{base_name}.", or None."""
+        key = _norm(root)
+        while True:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT path FROM entries WHERE root = ? AND prefix = ? LIMIT 1", (key, base_name)
+                ).fetchone()
+            if row is None:
+                return None
+            if os.path.exists(row[0]):
+                return row[0]
+            # Deleted since it was indexed
+            with self._lock:
+                self._conn.execute("DELETE FROM entries WHERE path = ?", (row[0],))
+                self._conn.commit()
+
+    def count(self, root: str, base_name: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE root = ? AND prefix = ?", (_norm(root), base_name)
+            ).fetchone()
+        return int(row[0]) if row else 0
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+
+
+_INDEX: Optional[ArtifactIndex] = None
+
+
+def configure(config: Optional[dict], config_dir: str) -> ArtifactIndex:
+    """Open the process-wide index from skip_index (default logs/artifact_index.sqlite next to runner.py)."""
+    global _INDEX
+    cfg = (config or {}).get("skip_index") or {}
+    path = cfg.get("path") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "artifact_index.sqlite")
+    if not os.path.isabs(path):
+        path = os.path.abspath(os.path.join(config_dir, path))
+    try:
+        _INDEX = ArtifactIndex(path, max_age_seconds=float(cfg.get("max_age_hours", 24)) * 3600.0)
+    except Exception:
+        # Unwritable location: fall back to a per-process index (still one listing per root)
+        _INDEX = ArtifactIndex(":memory:")
+    return _INDEX
+
+
+def get_index() -> ArtifactIndex:
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = ArtifactIndex(":memory:")
+    return _INDEX
@@ -0,0 +1,161 @@
+"""
+Manifest of artifacts produced by an ACM batch.
+
+Evaluation used to find "this run's" reports by sleeping, listing the output
+directory and keeping .md/.txt files whose mtime was newer than the batch start.
+That races with writers, re-stats every file, and picks up or drops files when
+clocks/mtimes disagree. Instead, save_generated_reports() (used by the GPT-R,
+DR, MA and FPF batch paths) records every file it writes here and evaluation
+reads the list back.
+
+Each entry: path, type (gptr/dr/ma/fpf), model, size, sha256, input file, saved_at.
+Entries are kept in memory and appended to a JSONL file (one per batch) so a
+resumed batch (--resume) sees outputs written before the crash.
+
+Config (ACM config.yaml):
+  manifest:
+    dir: logs/manifests      # relative to the config file directory
+
+API:
+- configure(config, config_dir, batch_id) -> ArtifactManifest   (module singleton)
+- get_manifest() -> ArtifactManifest
+- ArtifactManifest.record(path, rtype, model=None, input_file=None) -> dict
+- ArtifactManifest.files(output_dir=None, input_file=None, exts=(".md", ".txt")) -> list[str]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import List, Optional, Sequence
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _norm(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+class ArtifactManifest:
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: List[dict] = []
+        self._index: dict = {}
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self._add(json.loads(line))
+                    except Exception:
+                        continue
+        except FileNotFoundError:
+            pass
+
+    def _add(self, entry: dict) -> None:
+        key = _norm(entry["path"])
+        if key in self._index:
+            self._entries[self._index[key]] = entry
+        else:
+            self._index[key] = len(self._entries)
+            self._entries.append(entry)
+
+    def record(self, path: str, rtype: str, model: Optional[str] = None, input_file: Optional[str] = None) -> dict:
+        """Add a written artifact (size and hash are taken from disk now)."""
+        entry = {
+            "path": os.path.abspath(path),
+            "type": rtype,
+            "model": model,
+            "size": None,
+            "sha256": None,
+            "input": os.path.abspath(input_file) if input_file else None,
+            "saved_at": time.time(),
+        }
+        try:
+            entry["size"] = os.path.getsize(path)
+            entry["sha256"] = _sha256(path)
+        except OSError:
+            pass
+        with self._lock:
+            self._add(entry)
+            if self.path:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as fh:
+                        fh.write(json.dumps(entry) + "\n")
+                except Exception as e:
+                    print(f"  Warning: failed to append to artifact manifest {self.path}: {e}")
+        return entry
+
+    def entries(self, output_dir: Optional[str] = None, input_file: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            items = list(self._entries)
+        if output_dir is not None:
+            d = _norm(output_dir)
+            items = [e for e in items if _norm(os.path.dirname(e["path"])) == d]
+        if input_file is not None:
+            src = os.path.abspath(input_file)
+            items = [e for e in items if e.get("input") == src]
+        return items
+
+    def files(
+        self,
+        output_dir: Optional[str] = None,
+        input_file: Optional[str] = None,
+        exts: Optional[Sequence[str]] = (".md", ".txt"),
+    ) -> List[str]:
+        """Recorded paths (in write order) that still exist, optionally filtered by dir/input/extension."""
+        out = []
+        for e in self.entries(output_dir, input_file):
+            p = e["path"]
+            if exts and not p.lower().endswith(tuple(exts)):
+                continue
+            if os.path.isfile(p):
+                out.append(p)
+        return out
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+_MANIFEST: Optional[ArtifactManifest] = None
+
+
+def configure(config: Optional[dict], config_dir: str, batch_id: Optional[str] = None) -> ArtifactManifest:
+    """Open the process-wide manifest for one batch (manifest.dir, default logs/manifests next to runner.py)."""
+    global _MANIFEST
+    cfg = (config or {}).get("manifest") or {}
+    mdir = cfg.get("dir") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "manifests")
+    if not os.path.isabs(mdir):
+        mdir = os.path.abspath(os.path.join(config_dir, mdir))
+    batch_id = batch_id or time.strftime("%Y%m%d_%H%M%S")
+    try:
+        _MANIFEST = ArtifactManifest(os.path.join(mdir, f"{batch_id}.jsonl"))
+    except Exception:
+        # Unwritable location: keep the in-memory manifest only
+        _MANIFEST = ArtifactManifest(None)
+    return _MANIFEST
+
+
+def get_manifest() -> ArtifactManifest:
+    global _MANIFEST
+    if _MANIFEST is None:
+        _MANIFEST = ArtifactManifest(None)
+    return _MANIFEST
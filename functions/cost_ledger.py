@@ -0,0 +1,419 @@
+"""
+Live cost ledger with soft/hard budgets for ACM batches.
+
+Cost used to be known only after the fact: `[EVAL COST] total_cost_usd` at the
+end of evaluate.py and per-call costs buried in FPF JSON logs. The ledger
+charges each call as it finishes and keeps the running spend per provider and
+per phase, so a runaway batch is noticed (and stopped) while it runs.
+
+Sources:
+- FPF JSON logs (generation runs and evaluate.py judge calls both go through
+  FPF): `watch()` polls the log folders and charges every new log once,
+  keyed by run_group_id/run_id. Phase comes from the folder name
+  (single_* / pairwise_* -> eval, combine* -> combine, else generate). The
+  provider is looked up from the configured runs/judges/combine models by
+  model name, since FPF's logged config.provider is not reliable.
+- GPT-R: functions/gptr_subprocess.py reports researcher.get_costs() as
+  `cost_usd` on its result line; the runner charges it per iteration.
+- MA runs do not report cost and are not charged.
+
+Budgets:
+- soft: once reached, no new work is launched (files are skipped, pending
+  runs are not started); inflight calls finish.
+- hard: once reached, registered callbacks fire once; the runner uses this to
+  cancel the batch, which kills inflight process groups (functions/deadlines).
+Budgets apply to the total and optionally per provider. With scope `day`,
+every charge is appended to logs/cost_ledger_YYYYMMDD.jsonl and earlier
+batches of the same day count against the budget.
+
+Config (ACM config.yaml):
+  budget:
+    soft_usd: null            # stop launching new work
+    hard_usd: null            # cancel inflight work
+    scope: batch              # batch | day
+    providers:                # optional per-provider limits
+      openai: {soft_usd: 20, hard_usd: 30}
+    poll_seconds: 5           # FPF log scan interval
+
+API:
+- configure(config, logs_dir=None) -> CostLedger   (module singleton)
+- get_ledger() -> CostLedger
+- ledger.charge(provider, model, usd, phase, ...) -> bool   (False = duplicate key)
+- ledger.allow_launch(provider=None) -> bool
+- ledger.on_hard(callback)
+- ledger.snapshot() -> dict / ledger.summary() -> str
+- await ledger.watch(dirs, since=None)   (runs until cancelled)
+- ledger.start_watch(dirs, since=None) / await ledger.stop()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+STATE_OK = "ok"
+STATE_SOFT = "soft"
+STATE_HARD = "hard"
+
+PHASE_GENERATE = "generate"
+PHASE_EVAL = "eval"
+PHASE_COMBINE = "combine"
+
+# Provider guess for models that are not in the config
+_MODEL_PREFIX_PROVIDERS = (("gemini", "google"), ("claude", "anthropic"), ("gpt", "openai"), ("o1", "openai"), ("o3", "openai"), ("o4", "openai"), ("grok", "xai"), ("sonar", "perplexity"))
+
+
+def _usd(value) -> Optional[float]:
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return None
+    return v if v > 0 else None
+
+
+@dataclass
+class Budget:
+    soft_usd: Optional[float] = None
+    hard_usd: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.soft_usd is not None or self.hard_usd is not None
+
+    def state(self, spent: float) -> str:
+        if self.hard_usd is not None and spent >= self.hard_usd:
+            return STATE_HARD
+        if self.soft_usd is not None and spent >= self.soft_usd:
+            return STATE_SOFT
+        return STATE_OK
+
+
+@dataclass
+class BudgetSettings:
+    total: Budget = field(default_factory=Budget)
+    providers: Dict[str, Budget] = field(default_factory=dict)
+    scope: str = "batch"
+    poll_seconds: float = 5.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.total.enabled or any(b.enabled for b in self.providers.values())
+
+
+def resolve_budget_settings(config: Optional[dict]) -> BudgetSettings:
+    cfg = (config or {}).get("budget") or {}
+    providers = {}
+    for name, spec in (cfg.get("providers") or {}).items():
+        if isinstance(spec, dict):
+            providers[str(name).strip().lower()] = Budget(_usd(spec.get("soft_usd")), _usd(spec.get("hard_usd")))
+    scope = str(cfg.get("scope") or "batch").strip().lower()
+    try:
+        poll = max(0.5, float(cfg.get("poll_seconds", 5.0)))
+    except (TypeError, ValueError):
+        poll = 5.0
+    return BudgetSettings(
+        total=Budget(_usd(cfg.get("soft_usd")), _usd(cfg.get("hard_usd"))),
+        providers=providers,
+        scope="day" if scope in ("day", "daily") else "batch",
+        poll_seconds=poll,
+    )
+
+
+def _model_key(model: Optional[str]) -> str:
+    m = (model or "").strip().lower()
+    return m.split(":", 1)[1] if ":" in m else m
+
+
+def model_providers(config: Optional[dict]) -> Dict[str, str]:
+    """model -> provider for every model the config names (runs, eval judges, combine models)."""
+    cfg = config or {}
+    entries: List[dict] = list(cfg.get("runs") or [])
+    entries += list(((cfg.get("eval") or {}).get("judges")) or [])
+    entries += list(((cfg.get("combine") or {}).get("models")) or [])
+    out: Dict[str, str] = {}
+    for e in entries:
+        if isinstance(e, dict) and e.get("model") and e.get("provider"):
+            out.setdefault(_model_key(e["model"]), str(e["provider"]).strip().lower())
+    return out
+
+
+def _phase_for_folder(folder: str) -> str:
+    f = (folder or "").lower()
+    if f.startswith("single_") or f.startswith("pairwise_"):
+        return PHASE_EVAL
+    if f.startswith("combine"):
+        return PHASE_COMBINE
+    return PHASE_GENERATE
+
+
+class CostLedger:
+    def __init__(self, settings: Optional[BudgetSettings] = None, providers: Optional[Dict[str, str]] = None, journal_path: Optional[str] = None) -> None:
+        self.settings = settings or BudgetSettings()
+        self._providers = dict(providers or {})
+        self._journal_path = journal_path
+        self._lock = threading.Lock()
+        self._seen: set = set()
+        self._by_provider: Dict[str, float] = {}
+        self._by_phase: Dict[str, float] = {}
+        self._calls = 0
+        self._carried = 0.0  # spend from earlier batches today (scope=day)
+        self._hard_callbacks: List[Callable[[str], None]] = []
+        self._hard_fired = False
+        self._soft_announced = False
+        self._scanned: Dict[str, float] = {}  # folder -> mtime at last scan
+        self._watch_task: Optional[asyncio.Task] = None
+
+    # ---- charging ----
+
+    def provider_for(self, model: Optional[str], fallback: Optional[str] = None) -> str:
+        key = _model_key(model)
+        if key in self._providers:
+            return self._providers[key]
+        for prefix, provider in _MODEL_PREFIX_PROVIDERS:
+            if key.startswith(prefix):
+                return provider
+        return (fallback or "unknown").strip().lower() or "unknown"
+
+    def charge(self, provider: Optional[str], model: Optional[str], usd, phase: str = PHASE_GENERATE, source: str = "",
+               key: Optional[str] = None, persist: bool = True) -> bool:
+        """Add one call's cost. Returns False for a duplicate key or a zero/unknown amount."""
+        amount = _usd(usd)
+        if amount is None:
+            return False
+        provider = (provider or self.provider_for(model)).strip().lower()
+        with self._lock:
+            if key is not None:
+                if key in self._seen:
+                    return False
+                self._seen.add(key)
+            self._by_provider[provider] = self._by_provider.get(provider, 0.0) + amount
+            self._by_phase[phase] = self._by_phase.get(phase, 0.0) + amount
+            self._calls += 1
+        if persist and self._journal_path:
+            self._append_journal({"ts": time.time(), "provider": provider, "model": model, "phase": phase, "usd": amount, "source": source, "key": key})
+        self._check_budgets()
+        return True
+
+    def _append_journal(self, record: dict) -> None:
+        try:
+            os.makedirs(os.path.dirname(self._journal_path), exist_ok=True)
+            with self._lock, open(self._journal_path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(record) + "\n")
+        except Exception as e:
+            print(f"  Warning: cost ledger journal write failed: {e}")
+
+    def load_journal(self) -> float:
+        """scope=day: count earlier batches' charges from today's journal (also marks their keys as seen)."""
+        if not self._journal_path or not os.path.isfile(self._journal_path):
+            return 0.0
+        total = 0.0
+        try:
+            with open(self._journal_path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        rec = json.loads(line)
+                    except Exception:
+                        continue
+                    if rec.get("key"):
+                        self._seen.add(rec["key"])
+                    amount = _usd(rec.get("usd")) or 0.0
+                    total += amount
+                    p = str(rec.get("provider") or "unknown")
+                    self._by_provider[p] = self._by_provider.get(p, 0.0) + amount
+        except Exception as e:
+            print(f"  Warning: cost ledger journal unreadable: {e}")
+        self._carried = total
+        return total
+
+    # ---- budgets ----
+
+    def spent(self, provider: Optional[str] = None, phase: Optional[str] = None) -> float:
+        with self._lock:
+            if provider is not None:
+                return self._by_provider.get(provider.strip().lower(), 0.0)
+            if phase is not None:
+                return self._by_phase.get(phase, 0.0)
+            return sum(self._by_provider.values())
+
+    def state(self, provider: Optional[str] = None) -> str:
+        """Worst budget state for the total and (if given) this provider."""
+        states = [self.settings.total.state(self.spent())]
+        if provider is not None:
+            budget = self.settings.providers.get(provider.strip().lower())
+            if budget is not None:
+                states.append(budget.state(self.spent(provider)))
+        else:
+            states += [b.state(self.spent(p)) for p, b in self.settings.providers.items()]
+        for s in (STATE_HARD, STATE_SOFT):
+            if s in states:
+                return s
+        return STATE_OK
+
+    def allow_launch(self, provider: Optional[str] = None) -> bool:
+        """False once a soft (or hard) budget covering this work has been reached."""
+        if not self.settings.enabled:
+            return True
+        if provider is None:
+            return self.settings.total.state(self.spent()) == STATE_OK
+        return self.state(provider) == STATE_OK
+
+    def on_hard(self, callback: Callable[[str], None]) -> None:
+        """callback(reason) runs once (on the charging thread) when a hard budget is reached."""
+        self._hard_callbacks.append(callback)
+        if self._hard_fired:
+            callback(self.reason())
+
+    def reason(self) -> str:
+        parts = []
+        total = self.spent()
+        if self.settings.total.enabled:
+            parts.append(f"total ${total:.4f} (soft={self.settings.total.soft_usd} hard={self.settings.total.hard_usd})")
+        for p, b in self.settings.providers.items():
+            if b.state(self.spent(p)) != STATE_OK:
+                parts.append(f"{p} ${self.spent(p):.4f} (soft={b.soft_usd} hard={b.hard_usd})")
+        return "budget exceeded: " + "; ".join(parts)
+
+    def _check_budgets(self) -> None:
+        if not self.settings.enabled:
+            return
+        hard = self.settings.total.state(self.spent()) == STATE_HARD or any(
+            b.state(self.spent(p)) == STATE_HARD for p, b in self.settings.providers.items()
+        )
+        if hard and not self._hard_fired:
+            self._hard_fired = True
+            print(f"[BUDGET] HARD {self.reason()}; cancelling inflight work", flush=True)
+            for cb in list(self._hard_callbacks):
+                try:
+                    cb(self.reason())
+                except Exception as e:
+                    print(f"  Warning: budget callback failed: {e}")
+        elif self.state() == STATE_SOFT and not self._soft_announced:
+            self._soft_announced = True
+            print(f"[BUDGET] SOFT {self.reason()}; no new work will be launched", flush=True)
+
+    @property
+    def hard_exceeded(self) -> bool:
+        return self._hard_fired
+
+    # ---- reporting ----
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            snap = {
+                "total_usd": round(sum(self._by_provider.values()), 6),
+                "carried_usd": round(self._carried, 6),
+                "calls": self._calls,
+                "by_provider": {k: round(v, 6) for k, v in sorted(self._by_provider.items())},
+                "by_phase": {k: round(v, 6) for k, v in sorted(self._by_phase.items())},
+            }
+        snap["state"] = self.state()
+        return snap
+
+    def summary(self) -> str:
+        snap = self.snapshot()
+        providers = " ".join(f"{k}=${v:.4f}" for k, v in snap["by_provider"].items()) or "none"
+        phases = " ".join(f"{k}=${v:.4f}" for k, v in snap["by_phase"].items()) or "none"
+        return f"spent=${snap['total_usd']:.4f} calls={snap['calls']} state={snap['state']} providers=[{providers}] phases=[{phases}]"
+
+    # ---- FPF log ingestion ----
+
+    def ingest_fpf_log(self, path: str) -> bool:
+        with open(path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        cost = data.get("cost") or {}
+        usd = data.get("total_cost_usd") or cost.get("total_cost_usd")
+        key = f"fpf:{data.get('run_group_id') or os.path.basename(os.path.dirname(path))}:{data.get('run_id') or os.path.basename(path)}"
+        model = data.get("model")
+        provider = self.provider_for(model, fallback=(data.get("config") or {}).get("provider"))
+        return self.charge(provider, model, usd, _phase_for_folder(os.path.basename(os.path.dirname(path))), source="fpf_log", key=key)
+
+    def scan(self, dirs: Iterable[str], since: float = 0.0) -> int:
+        """Charge FPF JSON logs written at/after `since` that were not charged yet. Returns the number charged."""
+        charged = 0
+        for root in dirs:
+            if not root or not os.path.isdir(root):
+                continue
+            folders = [root]
+            try:
+                with os.scandir(root) as it:
+                    folders += [e.path for e in it if e.is_dir() and e.name != "validation"]
+            except OSError:
+                continue
+            for folder in folders:
+                try:
+                    mtime = os.path.getmtime(folder)
+                except OSError:
+                    continue
+                # Only re-list folders that changed since the last scan (and are recent enough)
+                if mtime < since or self._scanned.get(folder) == mtime:
+                    continue
+                self._scanned[folder] = mtime
+                try:
+                    with os.scandir(folder) as it:
+                        files = [e for e in it if e.is_file() and e.name.endswith(".json") and not e.name.startswith("failure-")]
+                except OSError:
+                    continue
+                for entry in files:
+                    try:
+                        if entry.stat().st_mtime < since:
+                            continue
+                        if self.ingest_fpf_log(entry.path):
+                            charged += 1
+                    except Exception:
+                        # Probably still being written: list this folder again on the next scan
+                        self._scanned.pop(folder, None)
+        return charged
+
+    async def watch(self, dirs: Iterable[str], since: Optional[float] = None) -> None:
+        """Poll FPF log folders until cancelled (one final scan on the way out)."""
+        dirs = list(dirs)
+        since = time.time() if since is None else since
+        try:
+            while True:
+                await asyncio.to_thread(self.scan, dirs, since)
+                await asyncio.sleep(self.settings.poll_seconds)
+        finally:
+            try:
+                self.scan(dirs, since)
+            except Exception:
+                pass
+
+    def start_watch(self, dirs: Iterable[str], since: Optional[float] = None) -> asyncio.Task:
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self.watch(dirs, since))
+        return self._watch_task
+
+    async def stop(self) -> None:
+        task, self._watch_task = self._watch_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+_LEDGER: Optional[CostLedger] = None
+
+
+def configure(config: Optional[dict], logs_dir: Optional[str] = None) -> CostLedger:
+    """Build the process-wide ledger for a batch (scope=day also loads today's earlier spend)."""
+    global _LEDGER
+    settings = resolve_budget_settings(config)
+    journal = None
+    if logs_dir:
+        journal = os.path.join(logs_dir, f"cost_ledger_{datetime.now().strftime('%Y%m%d')}.jsonl")
+    _LEDGER = CostLedger(settings, model_providers(config), journal_path=journal)
+    if settings.scope == "day":
+        _LEDGER.load_journal()
+    return _LEDGER
+
+
+def get_ledger() -> CostLedger:
+    global _LEDGER
+    if _LEDGER is None:
+        _LEDGER = CostLedger()
+    return _LEDGER
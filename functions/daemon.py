@@ -0,0 +1,499 @@
+"""
+Long-lived ACM daemon: a warm process that accepts batch jobs over a local API.
+
+Every CLI / GUI / "run one file" invocation used to cold-start Python and
+re-import gpt_researcher, openai, run_gptr_local and patches/sitecustomize
+before doing any work. `python runner.py --daemon` imports all of that once
+and then serves jobs over HTTP on localhost (or a Unix socket). Submitting a
+job costs a request, not an interpreter start, and consecutive jobs share the
+warm imports and run history.
+
+Jobs run one at a time: runner.main() keeps per-batch state at module level
+(journal, subprocess logger, streaming eval manager). Later submissions wait
+in FIFO order. Everything a job prints (stdout/stderr, including heartbeat,
+child output forwarded by the runner and the FPF runner's console log, whose
+handler follows sys.stdout) is captured as its event stream and still echoed
+to the daemon console.
+
+HTTP API (JSON; NDJSON for events):
+  GET  /health                          -> {"ok": true, "uptime": .., "jobs": {state: n}}
+  POST /jobs      {"kind": "batch", "config": "...", "resume": false}
+                                        -> 202 {"id": ..., "state": "queued"}
+  GET  /jobs                            -> [job, ...]
+  GET  /jobs/<id>                       -> job
+  POST /jobs/<id>/cancel                -> job
+  GET  /jobs/<id>/events?after=N&follow=1
+                                        -> one JSON event per line; with follow=1 the
+                                           response stays open until the job finishes
+
+Job states: queued -> running -> done | failed | cancelled. Cancelling a running
+job cancels its task; the runner's process-group handling (functions/deadlines)
+kills the GPT-R/MA/FPF/eval children it had started.
+
+Clients: `python runner.py --submit` (or generate.py --submit) sends the batch
+to the daemon and streams its output; the GUI does the same when
+ACM_DAEMON_URL is set, falling back to launching generate.py.
+
+Config (ACM config.yaml):
+  daemon:
+    host: 127.0.0.1
+    port: 8765
+    socket: null          # serve on this Unix socket instead of TCP (POSIX only)
+    token: null           # if set, requests need header X-ACM-Token: <token>
+    max_events: 20000     # per job; older events are dropped
+
+API:
+- resolve_daemon_settings(config) -> DaemonSettings
+- JobManager(handlers, max_events) / await JobManager.run()
+- serve(manager, settings) -> server (runs in a background thread)
+- DaemonClient(url, token=None): health/submit/status/jobs/cancel/events
+- follow_job(client, job_id, echo=print) -> final job dict
+- client_from_env() -> DaemonClient | None   (ACM_DAEMON_URL / ACM_DAEMON_TOKEN)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import http.client
+import io
+import itertools
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional
+
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+STATE_CANCELLED = "cancelled"
+FINAL_STATES = (STATE_DONE, STATE_FAILED, STATE_CANCELLED)
+
+DEFAULT_PORT = 8765
+
+
+@dataclass
+class DaemonSettings:
+    host: str = "127.0.0.1"
+    port: int = DEFAULT_PORT
+    socket: Optional[str] = None
+    token: Optional[str] = None
+    max_events: int = 20000
+
+    @property
+    def url(self) -> str:
+        return f"unix://{self.socket}" if self.socket else f"http://{self.host}:{self.port}"
+
+
+def resolve_daemon_settings(config: Optional[dict]) -> DaemonSettings:
+    cfg = (config or {}).get("daemon") or {}
+    return DaemonSettings(
+        host=str(cfg.get("host") or "127.0.0.1"),
+        port=int(cfg.get("port") or DEFAULT_PORT),
+        socket=cfg.get("socket") or None,
+        token=cfg.get("token") or None,
+        max_events=max(100, int(cfg.get("max_events", 20000))),
+    )
+
+
+@dataclass
+class DaemonJob:
+    id: str
+    kind: str
+    spec: dict
+    state: str = STATE_QUEUED
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    events: Deque[dict] = field(default_factory=collections.deque)
+    next_seq: int = 1
+    task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "spec": self.spec,
+            "state": self.state,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "events": self.next_seq - 1,
+        }
+
+
+class _JobOutput(io.TextIOBase):
+    """stdout/stderr replacement while a job runs: echo to the console and record complete lines."""
+
+    def __init__(self, manager: "JobManager", job: DaemonJob, stream: str, echo) -> None:
+        self._manager = manager
+        self._job = job
+        self._stream = stream
+        self._echo = echo
+        self._buf = ""
+        self._lock = threading.Lock()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        try:
+            self._echo.write(s)
+        except Exception:
+            pass
+        with self._lock:
+            self._buf += s
+            lines = self._buf.split("\n")
+            self._buf = lines.pop()
+        for line in lines:
+            self._manager.emit(self._job, {"type": "log", "stream": self._stream, "line": line.rstrip("\r")})
+        return len(s)
+
+    def flush(self) -> None:
+        try:
+            self._echo.flush()
+        except Exception:
+            pass
+
+    def close_line(self) -> None:
+        with self._lock:
+            rest, self._buf = self._buf, ""
+        if rest:
+            self._manager.emit(self._job, {"type": "log", "stream": self._stream, "line": rest})
+
+
+class JobManager:
+    """
+    FIFO job runner living on the daemon's asyncio loop. handlers maps a job kind to
+    `async fn(spec)`. Thread-safe entry points (submit/cancel/get/list/events) are called
+    from HTTP handler threads.
+    """
+
+    def __init__(self, handlers: Dict[str, Callable[[dict], Awaitable[Any]]], max_events: int = 20000) -> None:
+        self.handlers = dict(handlers)
+        self.max_events = max(1, int(max_events))
+        self.started_at = time.time()
+        self._jobs: Dict[str, DaemonJob] = {}
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Optional[asyncio.Queue] = None
+
+    # ---- thread-safe API ----
+
+    def submit(self, kind: str, spec: dict) -> DaemonJob:
+        if kind not in self.handlers:
+            raise ValueError(f"unknown job kind {kind!r} (known: {sorted(self.handlers)})")
+        if self._loop is None:
+            raise RuntimeError("job manager is not running")
+        job = DaemonJob(id=f"{time.strftime('%Y%m%d_%H%M%S')}_{next(self._ids)}", kind=kind, spec=dict(spec or {}))
+        with self._cond:
+            self._jobs[job.id] = job
+        self.emit(job, {"type": "state", "state": STATE_QUEUED})
+        self._loop.call_soon_threadsafe(self._pending.put_nowait, job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[DaemonJob]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[DaemonJob]:
+        with self._cond:
+            return list(self._jobs.values())
+
+    def counts(self) -> Dict[str, int]:
+        out: Dict[str, int] = {}
+        for job in self.list():
+            out[job.state] = out.get(job.state, 0) + 1
+        return out
+
+    def cancel(self, job_id: str) -> Optional[DaemonJob]:
+        job = self.get(job_id)
+        if job is None or job.state in FINAL_STATES:
+            return job
+        if job.state == STATE_QUEUED:
+            self._finish(job, STATE_CANCELLED, "cancelled before start")
+        elif job.task is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(job.task.cancel)
+        return job
+
+    def emit(self, job: DaemonJob, event: dict) -> None:
+        with self._cond:
+            event = dict(event, seq=job.next_seq, ts=time.time())
+            job.next_seq += 1
+            job.events.append(event)
+            while len(job.events) > self.max_events:
+                job.events.popleft()
+            self._cond.notify_all()
+
+    def events(self, job_id: str, after: int = 0, timeout: float = 0.0) -> List[dict]:
+        """Events with seq > after; waits up to timeout for new ones while the job is live."""
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return []
+                out = [e for e in job.events if e["seq"] > after]
+                remaining = deadline - time.monotonic()
+                if out or job.state in FINAL_STATES or remaining <= 0:
+                    return out
+                self._cond.wait(remaining)
+
+    # ---- loop side ----
+
+    def _finish(self, job: DaemonJob, state: str, error: Optional[str] = None) -> None:
+        with self._cond:
+            job.state = state
+            job.error = error
+            job.finished_at = time.time()
+        self.emit(job, {"type": "state", "state": state, "error": error})
+
+    async def _run_job(self, job: DaemonJob) -> None:
+        with self._cond:
+            job.state = STATE_RUNNING
+            job.started_at = time.time()
+        self.emit(job, {"type": "state", "state": STATE_RUNNING})
+        out = _JobOutput(self, job, "stdout", sys.__stdout__)
+        err = _JobOutput(self, job, "stderr", sys.__stderr__)
+        job.task = asyncio.ensure_future(self.handlers[job.kind](job.spec))
+        try:
+            with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+                await job.task
+            state, error = STATE_DONE, None
+        except asyncio.CancelledError:
+            if not job.task.cancelled():
+                raise  # the daemon itself is shutting down
+            state, error = STATE_CANCELLED, "cancelled"
+        except BaseException as e:  # SystemExit from a script entry point counts as a failure too
+            state, error = STATE_FAILED, f"{type(e).__name__}: {e}"
+        finally:
+            out.close_line()
+            err.close_line()
+        self._finish(job, state, error)
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._pending = asyncio.Queue()
+        while True:
+            job = self.get(await self._pending.get())
+            if job is None or job.state != STATE_QUEUED:
+                continue  # cancelled while queued
+            await self._run_job(job)
+
+
+# ---- HTTP server ------------------------------------------------------------
+
+class _Handler(BaseHTTPRequestHandler):
+    manager: JobManager = None  # type: ignore[assignment]
+    token: Optional[str] = None
+
+    def log_message(self, format: str, *args) -> None:  # keep the job console readable
+        pass
+
+    def _send(self, status: int, body: Any) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        if self.token and self.headers.get("X-ACM-Token") != self.token:
+            self._send(401, {"error": "missing or wrong X-ACM-Token"})
+            return False
+        return True
+
+    def _route(self):
+        parsed = urllib.parse.urlparse(self.path)
+        parts = [p for p in parsed.path.split("/") if p]
+        return parts, urllib.parse.parse_qs(parsed.query)
+
+    def do_GET(self) -> None:
+        if not self._authorized():
+            return
+        parts, query = self._route()
+        m = self.manager
+        if parts == ["health"]:
+            return self._send(200, {"ok": True, "pid": os.getpid(), "uptime": round(time.time() - m.started_at, 1), "jobs": m.counts()})
+        if parts == ["jobs"]:
+            return self._send(200, [j.to_dict() for j in m.list()])
+        if len(parts) >= 2 and parts[0] == "jobs":
+            job = m.get(parts[1])
+            if job is None:
+                return self._send(404, {"error": f"no job {parts[1]}"})
+            if len(parts) == 2:
+                return self._send(200, job.to_dict())
+            if parts[2:] == ["events"]:
+                return self._stream_events(job, int((query.get("after") or ["0"])[0]), (query.get("follow") or ["0"])[0] in ("1", "true"))
+        self._send(404, {"error": "not found"})
+
+    def _stream_events(self, job: DaemonJob, after: int, follow: bool) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            while True:
+                events = self.manager.events(job.id, after, timeout=15.0 if follow else 0.0)
+                for e in events:
+                    self.wfile.write((json.dumps(e) + "\n").encode("utf-8"))
+                    after = e["seq"]
+                self.wfile.flush()
+                if not follow or (job.state in FINAL_STATES and not self.manager.events(job.id, after)):
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def do_POST(self) -> None:
+        if not self._authorized():
+            return
+        parts, _query = self._route()
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        except Exception:
+            return self._send(400, {"error": "body must be JSON"})
+        if parts == ["jobs"]:
+            spec = dict(body)
+            kind = spec.pop("kind", "batch")
+            try:
+                job = self.manager.submit(kind, spec)
+            except ValueError as e:
+                return self._send(400, {"error": str(e)})
+            return self._send(202, job.to_dict())
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+            job = self.manager.cancel(parts[1])
+            if job is None:
+                return self._send(404, {"error": f"no job {parts[1]}"})
+            return self._send(200, job.to_dict())
+        self._send(404, {"error": "not found"})
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        conn, _addr = super().get_request()
+        return conn, ("unix", 0)  # BaseHTTPRequestHandler expects a (host, port) address
+
+
+def serve(manager: JobManager, settings: DaemonSettings):
+    """Start the HTTP API in a background thread; returns the server (call .shutdown() to stop)."""
+    handler = type("AcmDaemonHandler", (_Handler,), {"manager": manager, "token": settings.token})
+    if settings.socket:
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("Unix sockets are not available on this platform; use host/port")
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(settings.socket)
+        server = _UnixHTTPServer(settings.socket, handler)
+    else:
+        server = ThreadingHTTPServer((settings.host, settings.port), handler)
+        server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="acm-daemon-http", daemon=True).start()
+    return server
+
+
+# ---- client -----------------------------------------------------------------
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: Optional[float] = None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+class DaemonClient:
+    """Minimal stdlib client for scripts and the GUI (url: http://host:port or unix:///path)."""
+
+    def __init__(self, url: str, token: Optional[str] = None, timeout: float = 30.0) -> None:
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+
+    def _conn(self, timeout: Optional[float] = None) -> http.client.HTTPConnection:
+        parsed = urllib.parse.urlparse(self.url)
+        if parsed.scheme == "unix":
+            return _UnixHTTPConnection(parsed.path, timeout=timeout or self.timeout)
+        return http.client.HTTPConnection(parsed.hostname or "127.0.0.1", parsed.port or DEFAULT_PORT, timeout=timeout or self.timeout)
+
+    def _request(self, method: str, path: str, body: Optional[dict] = None):
+        conn = self._conn()
+        try:
+            headers = {"Content-Type": "application/json"}
+            if self.token:
+                headers["X-ACM-Token"] = self.token
+            conn.request(method, path, body=json.dumps(body).encode("utf-8") if body is not None else None, headers=headers)
+            resp = conn.getresponse()
+            data = json.loads(resp.read() or b"null")
+            if resp.status >= 400:
+                raise RuntimeError(f"daemon {method} {path} -> {resp.status}: {(data or {}).get('error')}")
+            return data
+        finally:
+            conn.close()
+
+    def health(self) -> dict:
+        return self._request("GET", "/health")
+
+    def available(self) -> bool:
+        try:
+            return bool(self.health().get("ok"))
+        except Exception:
+            return False
+
+    def submit(self, kind: str = "batch", **spec) -> dict:
+        return self._request("POST", "/jobs", dict(spec, kind=kind))
+
+    def status(self, job_id: str) -> dict:
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def jobs(self) -> list:
+        return self._request("GET", "/jobs")
+
+    def cancel(self, job_id: str) -> dict:
+        return self._request("POST", f"/jobs/{job_id}/cancel")
+
+    def events(self, job_id: str, after: int = 0, follow: bool = True) -> Iterator[dict]:
+        """Yield events (with follow=True until the job finishes)."""
+        conn = self._conn(timeout=None if follow else self.timeout)
+        try:
+            headers = {"X-ACM-Token": self.token} if self.token else {}
+            conn.request("GET", f"/jobs/{job_id}/events?after={int(after)}&follow={1 if follow else 0}", headers=headers)
+            resp = conn.getresponse()
+            if resp.status >= 400:
+                raise RuntimeError(f"daemon events {job_id} -> {resp.status}")
+            for raw in resp:
+                raw = raw.strip()
+                if raw:
+                    yield json.loads(raw)
+        finally:
+            conn.close()
+
+
+def follow_job(client: DaemonClient, job_id: str, echo: Callable[[str], None] = print) -> dict:
+    """Echo a job's log lines until it finishes; returns its final status."""
+    for event in client.events(job_id, follow=True):
+        if event.get("type") == "log":
+            echo(event.get("line", ""))
+    return client.status(job_id)
+
+
+def client_from_env() -> Optional[DaemonClient]:
+    """DaemonClient for ACM_DAEMON_URL (token from ACM_DAEMON_TOKEN), or None when unset."""
+    url = (os.environ.get("ACM_DAEMON_URL") or "").strip()
+    return DaemonClient(url, token=os.environ.get("ACM_DAEMON_TOKEN") or None) if url else None
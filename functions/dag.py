@@ -0,0 +1,173 @@
+"""
+Small declarative DAG executor for ACM pipeline stages.
+
+The post-generation stages used to be hard-coded in one long function: eval,
+then (sequentially) the eval timeline export, top-report selection, every
+combine model one after another, playoffs and finally the unified HTML report.
+Most of those only depend on one or two predecessors. Declaring them as nodes
+with explicit inputs lets independent work overlap (timeline export runs while
+combine is in flight, combine models run side by side) while the shared
+provider limits in functions/rate_limiter still bound real API concurrency.
+
+A node is `fn(inputs) -> result`, where inputs maps each dependency name to its
+result. Coroutine functions are awaited; plain functions run on a worker thread
+(file/DB exports) so they do not block the event loop. A node runs as soon as
+all of its dependencies finished; if a dependency failed or was skipped, the
+node is skipped. Optional per-resource limits cap how many nodes sharing a
+resource label run at once.
+
+Scope: this is a first step. Only two things are nodes today:
+- the tail of runner.trigger_evaluation_for_all_files: eval_timeline,
+  top_reports -> combine -> playoffs -> unified_html
+- one node per combine model, in combiner.ReportCombiner.combine
+Still outside the DAG:
+- per-run generation
+- streaming single evals
+- the pairwise phase, which evaluate.py runs
+- main()'s phase order (generate -> wait for streaming evals -> evaluate)
+- the playoffs call back into trigger_evaluation_for_all_files
+Across files, generation and evaluation overlap through
+functions.file_pipeline and the per-file StreamingEvalManager scopes. Within
+one file, combine cannot start while other runs are still generating: its
+inputs are the pairwise top reports, and those need every report of the file.
+
+API:
+- Dag(name="dag", limits=None, log=print)
+- Dag.add(name, fn, deps=(), resource=None) -> None
+- await Dag.run() -> dict[name, NodeResult]
+- NodeResult: status ("done" | "failed" | "skipped"), result, error, started_at, finished_at
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+
+
+@dataclass
+class NodeResult:
+    status: str
+    result: Any = None
+    error: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == STATUS_DONE
+
+
+@dataclass
+class _Node:
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    deps: List[str]
+    resource: Optional[str] = None
+
+
+class Dag:
+    def __init__(self, name: str = "dag", limits: Optional[Dict[str, int]] = None, log: Optional[Callable[[str], None]] = print) -> None:
+        self.name = name
+        self._nodes: Dict[str, _Node] = {}
+        self._limits = {k: max(1, int(v)) for k, v in (limits or {}).items()}
+        self._log = log
+
+    def add(self, name: str, fn: Callable[[Dict[str, Any]], Any], deps: Iterable[str] = (), resource: Optional[str] = None) -> None:
+        if name in self._nodes:
+            raise ValueError(f"duplicate DAG node: {name}")
+        self._nodes[name] = _Node(name, fn, list(deps), resource)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def _validate(self) -> None:
+        for node in self._nodes.values():
+            for d in node.deps:
+                if d not in self._nodes:
+                    raise ValueError(f"DAG node {node.name!r} depends on unknown node {d!r}")
+        # Kahn's algorithm: every node must be reachable in topological order
+        indeg = {n: len(node.deps) for n, node in self._nodes.items()}
+        ready = [n for n, k in indeg.items() if k == 0]
+        seen = 0
+        while ready:
+            n = ready.pop()
+            seen += 1
+            for other in self._nodes.values():
+                if n in other.deps:
+                    indeg[other.name] -= 1
+                    if indeg[other.name] == 0:
+                        ready.append(other.name)
+        if seen != len(self._nodes):
+            raise ValueError(f"DAG {self.name!r} has a cycle")
+
+    def _emit(self, msg: str) -> None:
+        if self._log:
+            try:
+                self._log(f"[DAG] {self.name} {msg}")
+            except Exception:
+                pass
+
+    async def _execute(self, node: _Node, inputs: Dict[str, Any], sems: Dict[str, asyncio.Semaphore]) -> NodeResult:
+        sem = sems.get(node.resource) if node.resource else None
+        if sem is not None:
+            await sem.acquire()
+        started = time.time()
+        self._emit(f"node={node.name} start")
+        try:
+            if asyncio.iscoroutinefunction(node.fn):
+                value = await node.fn(inputs)
+            else:
+                value = await asyncio.to_thread(node.fn, inputs)
+                if inspect.isawaitable(value):
+                    value = await value
+            res = NodeResult(STATUS_DONE, value, None, started, time.time())
+            self._emit(f"node={node.name} done secs={res.finished_at - started:.1f}")
+            return res
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._emit(f"node={node.name} failed: {e}\n{traceback.format_exc()}")
+            return NodeResult(STATUS_FAILED, None, str(e), started, time.time())
+        finally:
+            if sem is not None:
+                sem.release()
+
+    async def run(self) -> Dict[str, NodeResult]:
+        """Execute every node once, each as soon as its inputs are ready."""
+        self._validate()
+        sems = {k: asyncio.Semaphore(v) for k, v in self._limits.items()}
+        results: Dict[str, NodeResult] = {}
+        running: Dict[asyncio.Task, str] = {}
+        waiting = dict(self._nodes)
+        try:
+            while waiting or running:
+                for name, node in list(waiting.items()):
+                    if not all(d in results for d in node.deps):
+                        continue
+                    del waiting[name]
+                    if any(not results[d].ok for d in node.deps):
+                        results[name] = NodeResult(STATUS_SKIPPED)
+                        self._emit(f"node={name} skipped (dependency did not complete)")
+                        continue
+                    inputs = {d: results[d].result for d in node.deps}
+                    running[asyncio.ensure_future(self._execute(node, inputs, sems))] = name
+                if not running:
+                    # Everything left was skipped in this pass; loop again to propagate
+                    continue
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    results[running.pop(task)] = task.result()
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+        return results
@@ -0,0 +1,280 @@
+"""
+Hierarchical deadlines for ACM batches, files and individual runs.
+
+Timeouts used to be per call site and inconsistent: GPTR_TIMEOUT_SECONDS only
+covered the legacy GPT-R path, process_file_run waited on GPT-R children with
+no limit, FPF batches ran with timeout=None and MA had a private 600 s
+constant. One hung child could stall a whole nightly batch.
+
+A Deadline is an absolute point in time (monotonic clock) plus the label of
+the level that set it. Children never outlive their parent: a run deadline
+created under a file deadline expires at whichever of the two comes first, and
+`bound_by` says which level it was, so the journal can record "deadline
+exceeded (file)" versus "(run:gptr)".
+
+The current deadline lives in a contextvar, so tasks created inside
+`scope(deadline)` inherit it without threading it through every call.
+Subprocesses are started in their own process group/session and, on expiry,
+the whole group is terminated (SIGTERM, then SIGKILL after a grace period;
+`taskkill /T /F` on Windows) so grandchildren (browsers, MA agents, FPF
+workers) go with it. The remaining budget is exported to children as
+ACM_DEADLINE_AT (epoch seconds) and ACM_RUN_TIMEOUT_SECONDS so FPF can bound
+its own per-run work.
+
+Config (ACM config.yaml):
+  deadlines:
+    batch_seconds: null        # whole runner.main() batch
+    file_seconds: null         # generation + evaluation of one input file
+    eval_seconds: null         # one evaluate.py invocation
+    kill_grace_seconds: 5      # SIGTERM -> SIGKILL delay for an expired process group
+    run_seconds:               # one run (one GPT-R child, one MA invocation, one FPF run)
+      gptr: 600
+      dr: 1800
+      ma: 600
+      fpf: null
+
+API:
+- configure(config) -> DeadlineSettings   (module singleton)
+- get_settings() -> DeadlineSettings
+- Deadline(seconds=None, parent=None, label="") / Deadline.child(seconds, label)
+- current() -> Deadline; scope(deadline) (context manager)
+- popen_group_kwargs() -> dict
+- await wait_process(proc, deadline, grace=None) -> bool (False = expired and killed)
+- kill_process_group(proc) / await terminate_process_group(proc, grace)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import os
+import signal
+import subprocess
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional
+
+ENV_DEADLINE_AT = "ACM_DEADLINE_AT"
+ENV_RUN_TIMEOUT = "ACM_RUN_TIMEOUT_SECONDS"
+
+DEFAULT_RUN_SECONDS: Dict[str, Optional[float]] = {"gptr": 600.0, "dr": 1800.0, "ma": 600.0, "fpf": None}
+DEFAULT_KILL_GRACE_SECONDS = 5.0
+
+
+def _seconds(value) -> Optional[float]:
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return None
+    return v if v > 0 else None
+
+
+class Deadline:
+    def __init__(self, seconds: Optional[float] = None, parent: Optional["Deadline"] = None, label: str = "") -> None:
+        self.label = label
+        self.parent = parent
+        own = time.monotonic() + seconds if _seconds(seconds) is not None else None
+        inherited = parent.expires_at if parent is not None else None
+        if own is not None and (inherited is None or own <= inherited):
+            self.expires_at, self.bound_by = own, label
+        else:
+            self.expires_at, self.bound_by = inherited, (parent.bound_by if parent is not None else None)
+
+    @property
+    def bounded(self) -> bool:
+        return self.expires_at is not None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (>= 0), or None when nothing above this level set a limit."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def child(self, seconds: Optional[float] = None, label: str = "") -> "Deadline":
+        return Deadline(seconds, parent=self, label=label)
+
+    def timeout(self, default: Optional[float] = None) -> Optional[float]:
+        """min(remaining, default), treating None as unbounded."""
+        rem = self.remaining()
+        if default is None:
+            return rem
+        return default if rem is None else min(rem, default)
+
+    def reason(self) -> str:
+        return f"deadline exceeded ({self.bound_by or 'unnamed'})"
+
+    def apply_env(self, env: dict, run_seconds: Optional[float] = None) -> dict:
+        """Export the remaining budget (and an optional per-run limit) to a child environment."""
+        rem = self.remaining()
+        if rem is not None:
+            env[ENV_DEADLINE_AT] = f"{time.time() + rem:.3f}"
+        run_timeout = self.timeout(_seconds(run_seconds))
+        if run_timeout is not None:
+            env[ENV_RUN_TIMEOUT] = f"{run_timeout:.0f}"
+        return env
+
+    def __repr__(self) -> str:
+        rem = self.remaining()
+        return f"Deadline(label={self.label!r}, remaining={'none' if rem is None else f'{rem:.1f}s'}, bound_by={self.bound_by!r})"
+
+
+UNBOUNDED = Deadline()
+
+_CURRENT: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("acm_deadline", default=None)
+
+
+def current() -> Deadline:
+    return _CURRENT.get() or UNBOUNDED
+
+
+@contextlib.contextmanager
+def scope(deadline: Optional[Deadline]) -> Iterator[Deadline]:
+    """Make `deadline` current for this block (and for tasks created inside it)."""
+    token = _CURRENT.set(deadline)
+    try:
+        yield deadline or UNBOUNDED
+    finally:
+        _CURRENT.reset(token)
+
+
+@dataclass
+class DeadlineSettings:
+    batch_seconds: Optional[float] = None
+    file_seconds: Optional[float] = None
+    eval_seconds: Optional[float] = None
+    kill_grace_seconds: float = DEFAULT_KILL_GRACE_SECONDS
+    run_seconds: Dict[str, Optional[float]] = field(default_factory=lambda: dict(DEFAULT_RUN_SECONDS))
+
+    def for_run(self, rtype: str) -> Optional[float]:
+        return self.run_seconds.get((rtype or "").strip().lower())
+
+
+def resolve_deadline_settings(config: Optional[dict]) -> DeadlineSettings:
+    cfg = (config or {}).get("deadlines") or {}
+    runs = dict(DEFAULT_RUN_SECONDS)
+    for k, v in (cfg.get("run_seconds") or {}).items():
+        runs[str(k).strip().lower()] = _seconds(v)
+    try:
+        grace = max(0.0, float(cfg.get("kill_grace_seconds", DEFAULT_KILL_GRACE_SECONDS)))
+    except (TypeError, ValueError):
+        grace = DEFAULT_KILL_GRACE_SECONDS
+    return DeadlineSettings(
+        batch_seconds=_seconds(cfg.get("batch_seconds")),
+        file_seconds=_seconds(cfg.get("file_seconds")),
+        eval_seconds=_seconds(cfg.get("eval_seconds")),
+        kill_grace_seconds=grace,
+        run_seconds=runs,
+    )
+
+
+_SETTINGS: Optional[DeadlineSettings] = None
+
+
+def configure(config: Optional[dict]) -> DeadlineSettings:
+    global _SETTINGS
+    _SETTINGS = resolve_deadline_settings(config)
+    return _SETTINGS
+
+
+def get_settings() -> DeadlineSettings:
+    global _SETTINGS
+    if _SETTINGS is None:
+        _SETTINGS = DeadlineSettings()
+    return _SETTINGS
+
+
+# ---- process groups ---------------------------------------------------------
+
+def popen_group_kwargs() -> dict:
+    """Popen/create_subprocess_exec kwargs that put the child in its own process group."""
+    if os.name == "nt":
+        return {"creationflags": getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)}
+    return {"start_new_session": True}
+
+
+def _alive(proc) -> bool:
+    poll = getattr(proc, "poll", None)
+    if poll is not None:
+        return poll() is None
+    return getattr(proc, "returncode", None) is None
+
+
+def _signal_group(proc, sig) -> bool:
+    """Signal the child's whole process group; False if that is not possible here."""
+    if os.name == "nt" or not hasattr(os, "killpg"):
+        return False
+    try:
+        # Children are spawned with popen_group_kwargs() (or setsid in a fork server), so the
+        # group id is the child's pid. Not looked up with getpgid(): once the leader has exited
+        # and been reaped that fails, and the group's survivors would never be signalled.
+        os.killpg(proc.pid, sig)
+        return True
+    except ProcessLookupError:
+        return True
+    except Exception:
+        return False
+
+
+def kill_process_group(proc) -> None:
+    """Kill the child and everything it spawned, immediately."""
+    if proc is None:
+        return
+    if os.name == "nt":
+        try:
+            subprocess.run(["taskkill", "/PID", str(proc.pid), "/T", "/F"], capture_output=True, timeout=10)
+        except Exception:
+            pass
+    elif _signal_group(proc, signal.SIGKILL):
+        return
+    try:
+        proc.kill()
+    except Exception:
+        pass
+
+
+async def _wait(proc, timeout: Optional[float]) -> bool:
+    """Wait for exit without blocking the loop; works for Popen and asyncio processes."""
+    if asyncio.iscoroutinefunction(getattr(proc, "wait", None)):
+        waiter = proc.wait()
+    else:
+        waiter = asyncio.get_running_loop().run_in_executor(None, proc.wait)
+    try:
+        await asyncio.wait_for(waiter, timeout=timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def terminate_process_group(proc, grace: Optional[float] = None) -> None:
+    """SIGTERM the group, give it `grace` seconds, then SIGKILL whatever is left."""
+    if proc is None:
+        return
+    grace = get_settings().kill_grace_seconds if grace is None else grace
+    if grace > 0 and _alive(proc) and _signal_group(proc, signal.SIGTERM):
+        if await _wait(proc, grace):
+            # The leader exited; sweep any stragglers left in its group
+            _signal_group(proc, signal.SIGKILL)
+            return
+    kill_process_group(proc)
+    await _wait(proc, 10)
+
+
+async def wait_process(proc, deadline: Optional[Deadline] = None, grace: Optional[float] = None) -> bool:
+    """
+    Wait for `proc` until `deadline` (default: the current one). Returns True if it exited on
+    its own, False if the deadline expired and its process group was terminated. Cancelling
+    the wait kills the group before re-raising.
+    """
+    deadline = deadline or current()
+    try:
+        if await _wait(proc, deadline.remaining()):
+            return True
+    except asyncio.CancelledError:
+        kill_process_group(proc)
+        raise
+    await terminate_process_group(proc, grace)
+    return False
@@ -0,0 +1,133 @@
+"""
+Cross-file pipelined scheduler for ACM.
+
+runner.main() historically processes input files strictly one after another:
+generation for file N must finish, then evaluation (single -> pairwise ->
+combine -> playoffs) runs, and only then does file N+1 start. This module
+overlaps those stages so file N+1 can generate while file N is evaluating.
+
+Each stage has its own depth (how many files may be inside that stage at
+once). Files enter the generation stage in input order; a file moves to the
+evaluation stage as soon as its generation finishes.
+
+API:
+- FilePipeline(generate, evaluate, generate_depth=1, evaluate_depth=1,
+               accept=None, max_items=None)
+    generate: async (item) -> result | None   (None = nothing to evaluate)
+    evaluate: async (item, result) -> Any
+    accept:   optional sync predicate (item) -> bool, checked in input order
+              before a file is admitted (e.g. skip-if-already-processed)
+    max_items: optional cap on admitted files (one_file_only -> 1)
+- await FilePipeline.run(items) -> list[dict]
+    One record per admitted item: {"item", "generated", "evaluated", "error"}
+- resolve_pipeline_settings(config) -> (enabled, generate_depth, evaluate_depth)
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def resolve_pipeline_settings(config: dict) -> Tuple[bool, int, int]:
+    """
+    Read concurrency.pipeline from ACM config.
+
+    concurrency:
+      pipeline:
+        enabled: false        # default: legacy sequential file loop
+        depth: 2              # files in flight per stage (shorthand)
+        generate_depth: 1     # optional per-stage override
+        evaluate_depth: 2     # optional per-stage override
+    """
+    conc = ((config or {}).get("concurrency") or {}).get("pipeline") or {}
+    enabled = bool(conc.get("enabled", False))
+
+    def _int(val, default: int) -> int:
+        try:
+            return max(1, int(val))
+        except Exception:
+            return default
+
+    depth = _int(conc.get("depth", 1), 1)
+    gen_depth = _int(conc.get("generate_depth", depth), depth)
+    eval_depth = _int(conc.get("evaluate_depth", depth), depth)
+    return enabled, gen_depth, eval_depth
+
+
+class FilePipeline:
+    def __init__(
+        self,
+        generate: Callable[[Any], Awaitable[Any]],
+        evaluate: Callable[[Any, Any], Awaitable[Any]],
+        generate_depth: int = 1,
+        evaluate_depth: int = 1,
+        accept: Optional[Callable[[Any], bool]] = None,
+        max_items: Optional[int] = None,
+    ) -> None:
+        self._generate = generate
+        self._evaluate = evaluate
+        self.generate_depth = max(1, int(generate_depth))
+        self.evaluate_depth = max(1, int(evaluate_depth))
+        self._accept = accept
+        self._max_items = int(max_items) if max_items is not None else None
+        self._gen_sem = asyncio.Semaphore(self.generate_depth)
+        self._eval_sem = asyncio.Semaphore(self.evaluate_depth)
+        self.inflight = {"generate": 0, "evaluate": 0}
+
+    async def _run_item(self, item: Any, record: Dict[str, Any]) -> None:
+        # The generation slot was acquired by the producer (keeps input order)
+        try:
+            self.inflight["generate"] += 1
+            result = await self._generate(item)
+            record["generated"] = result
+        except Exception as e:
+            record["error"] = f"generate: {e}"
+            print(f"[PIPELINE] Generation failed for {item}: {e}")
+            return
+        finally:
+            self.inflight["generate"] -= 1
+            self._gen_sem.release()
+
+        if result is None:
+            return
+
+        async with self._eval_sem:
+            self.inflight["evaluate"] += 1
+            try:
+                record["evaluated"] = await self._evaluate(item, result)
+            except Exception as e:
+                record["error"] = f"evaluate: {e}"
+                print(f"[PIPELINE] Evaluation failed for {item}: {e}")
+            finally:
+                self.inflight["evaluate"] -= 1
+
+    async def run(self, items: Iterable[Any]) -> List[Dict[str, Any]]:
+        records: List[Dict[str, Any]] = []
+        tasks: List[asyncio.Task] = []
+        admitted = 0
+        for item in items:
+            if self._max_items is not None and admitted >= self._max_items:
+                break
+            if self._accept is not None:
+                try:
+                    if not self._accept(item):
+                        continue
+                except Exception as e:
+                    print(f"[PIPELINE] Admission check failed for {item}: {e}")
+                    continue
+            # Backpressure: do not start the next file until a generation slot frees
+            await self._gen_sem.acquire()
+            admitted += 1
+            record: Dict[str, Any] = {"item": item, "generated": None, "evaluated": None, "error": None}
+            records.append(record)
+            print(
+                f"[PIPELINE] Admitted #{admitted}: {item} "
+                f"(generating={self.inflight['generate'] + 1}/{self.generate_depth}, "
+                f"evaluating={self.inflight['evaluate']}/{self.evaluate_depth})"
+            )
+            tasks.append(asyncio.create_task(self._run_item(item, record)))
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return records
@@ -0,0 +1,663 @@
+"""
+Pre-warmed interpreter fork servers for child launches.
+
+Every GPT-R iteration (functions/gptr_subprocess.py), MA run
+(Multi_Agent_CLI.py), FPF call (fpf_main.py) and streaming eval
+(evaluate.py --single-file) used to start a fresh interpreter and re-import
+gpt_researcher / openai / llm_doc_eval, at 2-6 s each. With hundreds of
+short runs per batch that startup tax was a large share of wall time.
+
+A fork server is this file run as a script
+(`python -u functions/fork_server.py --serve ...`). It imports a profile's
+heavy modules once and then forks one child per request. The batch starts
+one server per profile, and each profile lists the scripts it serves. A
+profile only preloads what its own scripts import anyway: the sitecustomize
+OpenAI patches, for example, are loaded only for GPT-R children.
+
+process_runner.run_process() routes a command of the form
+[sys.executable, "-u", <script served by a profile>, args...] to that
+profile's server. Any other command, or any failure, falls back to a normal
+exec.
+
+The client passes stdin/stdout/stderr and a status socket with SCM_RIGHTS
+over a Unix socketpair. The forked child does the following, so that it
+keeps the per-process isolation of a fresh interpreter:
+- setsid(), so it has its own process group for deadline kills and a
+  session id for proc_sampler
+- replaces os.environ with the request's env (per-run SMART_LLM etc.)
+- applies the request's rlimits
+- resets signal handlers and reseeds `random`
+- rebuilds sys.path as the real interpreter would: script dir, the child's
+  PYTHONPATH, site dirs
+- runs the script with runpy as __main__, runs atexit handlers, and exits
+  with its exit status
+The server reaps the child and writes its exit code to the status socket.
+The client sees an asyncio.subprocess-like object with pid, stdout,
+stderr, stdin, returncode and wait().
+
+Caveats:
+- A preloaded module that reads per-run environment at import time sees the
+  server's environment, so keep such modules out of `preload`. gpt_researcher
+  reads SMART_LLM & co. when its Config is built, not at import.
+- Forked children share the server's hash seed.
+- Only the -u flag is understood.
+- POSIX only (fork + AF_UNIX). Elsewhere every launch is a normal exec.
+
+Config (ACM config.yaml):
+  fork_server:
+    enabled: false
+    ready_timeout_seconds: 120
+    profiles:                     # replaces the defaults below when given
+      gptr: {scripts: [gptr_subprocess.py], preload: [openai, gpt_researcher, api_cost_multiplier.patches.sitecustomize]}
+      eval: {scripts: [evaluate.py], preload: [openai, llm_doc_eval.api], paths: [llm-doc-eval]}
+  (paths are added to sys.path while preloading; relative paths are relative to the ACM directory)
+
+API:
+- configure(config) -> ForkServerPool   (module singleton; empty until configured)
+- get_pool() -> ForkServerPool
+- await ForkServerPool.start() / await .stop() / .server_for(cmd) -> ForkServer | None / .summary()
+- await ForkServer.spawn(cmd, env=None, cwd=None, stdin=False, rlimits=None, limit=...) -> ForkedProcess | None
+- resolve_fork_settings(config) -> ForkSettings
+"""
+
+from __future__ import annotations
+
+import array
+import asyncio
+import json
+import os
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+_PACKAGE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))   # .../api_cost_multiplier
+_PROJECT_ROOT = os.path.dirname(_PACKAGE_DIR)
+
+DEFAULT_PROFILES: Dict[str, Dict[str, List[str]]] = {
+    "gptr": {
+        "scripts": ["gptr_subprocess.py"],
+        "preload": ["openai", "gpt_researcher", "api_cost_multiplier.patches.sitecustomize"],
+        "paths": [_PROJECT_ROOT, _PACKAGE_DIR],
+    },
+    "ma": {"scripts": ["Multi_Agent_CLI.py"], "preload": ["openai", "gpt_researcher"], "paths": []},
+    "fpf": {"scripts": ["fpf_main.py"], "preload": ["openai"], "paths": []},
+    "eval": {"scripts": ["evaluate.py"], "preload": ["openai", "llm_doc_eval.api"], "paths": [os.path.join(_PACKAGE_DIR, "llm-doc-eval")]},
+}
+
+_HEADER = struct.Struct("!I")
+_MAX_FDS = 4
+SUPPORTED = os.name == "posix" and hasattr(os, "fork") and hasattr(socket, "AF_UNIX")
+
+
+@dataclass
+class ForkSettings:
+    enabled: bool = False
+    ready_timeout_seconds: float = 120.0
+    profiles: Dict[str, Dict[str, List[str]]] = field(default_factory=lambda: {k: dict(v) for k, v in DEFAULT_PROFILES.items()})
+
+
+def resolve_fork_settings(config: Optional[dict]) -> ForkSettings:
+    raw = (config or {}).get("fork_server") or {}
+    if not isinstance(raw, dict):
+        raw = {}
+    s = ForkSettings(enabled=bool(raw.get("enabled", False)))
+    try:
+        s.ready_timeout_seconds = float(raw.get("ready_timeout_seconds", s.ready_timeout_seconds))
+    except (TypeError, ValueError):
+        print(f"  Warning: fork_server.ready_timeout_seconds={raw.get('ready_timeout_seconds')!r} ignored (not a number)")
+    if isinstance(raw.get("profiles"), dict):
+        s.profiles = {}
+        for name, prof in raw["profiles"].items():
+            prof = prof or {}
+            s.profiles[str(name)] = {
+                "scripts": [str(x) for x in prof.get("scripts") or []],
+                "preload": [str(x) for x in prof.get("preload") or []],
+                "paths": [p if os.path.isabs(str(p)) else os.path.join(_PACKAGE_DIR, str(p)) for p in prof.get("paths") or []],
+            }
+    return s
+
+
+# ---- wire format: 4-byte length + JSON, fds attached to the first byte -------------
+
+def _send(sock: socket.socket, obj: Any, fds: Sequence[int] = ()) -> None:
+    payload = json.dumps(obj).encode("utf-8")
+    data = _HEADER.pack(len(payload)) + payload
+    anc = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds).tobytes())] if fds else []
+    sent = sock.sendmsg([data], anc)
+    if sent < len(data):
+        sock.sendall(data[sent:])
+
+
+def _recv_exact(sock: socket.socket, n: int) -> Optional[bytes]:
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return buf
+
+
+def _recv(sock: socket.socket) -> Tuple[Optional[Any], List[int]]:
+    """One message and the fds sent with it; (None, []) on EOF."""
+    fds = array.array("i")
+    msg, anc, _flags, _addr = sock.recvmsg(_HEADER.size, socket.CMSG_SPACE(_MAX_FDS * fds.itemsize))
+    for level, kind, data in anc:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(data[: len(data) - (len(data) % fds.itemsize)])
+    if not msg:
+        return None, list(fds)
+    if len(msg) < _HEADER.size:
+        rest = _recv_exact(sock, _HEADER.size - len(msg))
+        if rest is None:
+            return None, list(fds)
+        msg += rest
+    payload = _recv_exact(sock, _HEADER.unpack(msg)[0])
+    if payload is None:
+        return None, list(fds)
+    return json.loads(payload.decode("utf-8")), list(fds)
+
+
+# ---- client side ------------------------------------------------------------------
+
+class _PipeWriter:
+    """The write/drain/close subset of asyncio.StreamWriter that process_runner uses for stdin."""
+
+    def __init__(self, fd: int) -> None:
+        self._fd = fd
+        self._buf = bytearray()
+
+    def write(self, data: bytes) -> None:
+        self._buf += data
+
+    async def drain(self) -> None:
+        data, self._buf = bytes(self._buf), bytearray()
+        if data:
+            await asyncio.to_thread(self._write_all, data)
+
+    def _write_all(self, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._fd, view):]
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            fd, self._fd = self._fd, -1
+            os.close(fd)
+
+
+class ForkedProcess:
+    """What run_process needs from asyncio.subprocess.Process, for a child forked by a server."""
+
+    def __init__(self, pid: int, stdin: Optional[_PipeWriter], stdout: asyncio.StreamReader, stderr: asyncio.StreamReader,
+                 status_sock: socket.socket, pending: bytes = b"") -> None:
+        self.pid = pid
+        self.stdin = stdin
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode: Optional[int] = None
+        self._status_sock = status_sock
+        self._pending = pending   # bytes read past the pid line (a fast child's exit status)
+        self._exited = asyncio.ensure_future(self._watch())
+
+    async def _watch(self) -> None:
+        loop = asyncio.get_running_loop()
+        buf = self._pending
+        try:
+            while b"\n" not in buf:
+                chunk = await loop.sock_recv(self._status_sock, 4096)
+                if not chunk:
+                    break
+                buf += chunk
+        finally:
+            self._status_sock.close()
+        try:
+            self.returncode = int(json.loads(buf.split(b"\n", 1)[0])["status"])
+        except Exception:
+            # Server went away before reporting; the child was reparented and cannot be waited on
+            self.returncode = -signal.SIGKILL if not _pid_alive(self.pid) else -1
+
+    async def wait(self) -> int:
+        await asyncio.shield(self._exited)
+        return self.returncode
+
+    def send_signal(self, sig: int) -> None:
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self) -> None:
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self.send_signal(signal.SIGKILL)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class ForkServer:
+    def __init__(self, name: str, scripts: Sequence[str], preload: Sequence[str], paths: Sequence[str] = (), python: str = sys.executable) -> None:
+        self.name = name
+        self.scripts = {os.path.basename(s) for s in scripts}
+        self.preload = list(preload)
+        self.paths = list(paths)
+        self.python = python
+        self.ready = False
+        self.spawned = 0
+        self.fallbacks = 0
+        self.preloaded: List[str] = []
+        self.failed: List[str] = []
+        self._proc: Optional[subprocess.Popen] = None
+        self._ctrl: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+
+    def serves(self, cmd: Sequence[str]) -> bool:
+        return (
+            self.ready
+            and len(cmd) >= 3
+            and cmd[0] == self.python
+            and cmd[1] == "-u"
+            and os.path.basename(str(cmd[2])) in self.scripts
+        )
+
+    def start(self, timeout: float) -> bool:
+        """Launch the server and wait for its preload to finish (blocking; call in a thread)."""
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        cmd = [self.python, "-u", os.path.abspath(__file__), "--serve", "--fd", str(child.fileno()), "--name", self.name]
+        for mod in self.preload:
+            cmd += ["--preload", mod]
+        for path in self.paths:
+            cmd += ["--path", path]
+        started = time.monotonic()
+        try:
+            self._proc = subprocess.Popen(
+                cmd, pass_fds=(child.fileno(),), stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                start_new_session=True, cwd=_PACKAGE_DIR,
+            )
+        except OSError as e:
+            print(f"  Warning: fork server '{self.name}' failed to start: {e}")
+            parent.close()
+            return False
+        finally:
+            child.close()
+        parent.settimeout(timeout)
+        try:
+            hello, _fds = _recv(parent)
+        except (OSError, ValueError) as e:
+            hello = None
+            print(f"  Warning: fork server '{self.name}' not ready: {e}")
+        if not hello or not hello.get("ready"):
+            self._kill()
+            parent.close()
+            return False
+        parent.settimeout(None)
+        self._ctrl = parent
+        self.preloaded = list(hello.get("preloaded") or [])
+        self.failed = list(hello.get("failed") or [])
+        self.ready = True
+        print(f"[FORK_SERVER] {self.name} ready in {time.monotonic() - started:.1f}s (pid={self._proc.pid}, "
+              f"preloaded={','.join(self.preloaded) or 'none'}" + (f", failed={','.join(self.failed)}" if self.failed else "") + ")")
+        return True
+
+    def _kill(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.kill()
+            try:
+                self._proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                pass
+
+    def stop(self) -> None:
+        """Close the control socket; the server exits on EOF. Children already forked keep running."""
+        self.ready = False
+        if self._ctrl is not None:
+            self._ctrl.close()
+            self._ctrl = None
+        if self._proc is not None:
+            try:
+                self._proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._kill()
+
+    async def spawn(self, cmd: Sequence[str], env: Optional[dict] = None, cwd: Optional[str] = None, stdin: bool = False,
+                    rlimits: Optional[List[Tuple[int, int]]] = None, limit: int = 2 ** 16) -> Optional[ForkedProcess]:
+        """Fork `cmd` from the warm server; None (caller execs normally) if the server cannot."""
+        loop = asyncio.get_running_loop()
+        request = {
+            "argv": [str(a) for a in cmd[2:]],
+            "env": dict(os.environ if env is None else env),
+            "cwd": os.path.abspath(cwd or os.getcwd()),
+            "rlimits": [list(r) for r in rlimits or []],
+        }
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        if stdin:
+            in_r, in_w = os.pipe()
+        else:
+            in_r, in_w = os.open(os.devnull, os.O_RDONLY), -1
+        status, status_child = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        ours = [out_r, err_r] + ([in_w] if in_w >= 0 else [])
+        try:
+            with self._lock:
+                if self._ctrl is None:
+                    raise OSError("fork server stopped")
+                _send(self._ctrl, request, [in_r, out_w, err_w, status_child.fileno()])
+        except OSError as e:
+            self._disable(f"send failed: {e}")
+            for fd in ours:
+                os.close(fd)
+            status.close()
+            return None
+        finally:
+            for fd in (in_r, out_w, err_w):
+                os.close(fd)
+            status_child.close()
+        status.setblocking(False)
+        try:
+            reply = b""
+            while b"\n" not in reply:
+                chunk = await loop.sock_recv(status, 4096)
+                if not chunk:
+                    raise OSError("no reply")
+                reply += chunk
+            first, rest = reply.split(b"\n", 1)
+            info = json.loads(first)
+            if "pid" not in info:
+                raise OSError(info.get("error") or "fork failed")
+        except BaseException as e:
+            status.close()
+            for fd in ours:
+                os.close(fd)
+            if isinstance(e, (asyncio.CancelledError, KeyboardInterrupt, SystemExit)):
+                raise
+            self.fallbacks += 1
+            print(f"  Warning: fork server '{self.name}' could not start {os.path.basename(str(cmd[2]))}: {e}")
+            return None
+        stdout = await _reader(loop, out_r, limit)
+        stderr = await _reader(loop, err_r, limit)
+        self.spawned += 1
+        return ForkedProcess(int(info["pid"]), _PipeWriter(in_w) if in_w >= 0 else None, stdout, stderr, status, pending=rest)
+
+    def _disable(self, why: str) -> None:
+        if self.ready:
+            print(f"  Warning: fork server '{self.name}' disabled ({why}); launching normally")
+        self.ready = False
+        self.fallbacks += 1
+
+
+async def _reader(loop: asyncio.AbstractEventLoop, fd: int, limit: int) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader(limit=limit, loop=loop)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader, loop=loop), os.fdopen(fd, "rb", 0))
+    return reader
+
+
+class ForkServerPool:
+    def __init__(self, settings: Optional[ForkSettings] = None) -> None:
+        self.settings = settings or ForkSettings()
+        self.servers: List[ForkServer] = []
+        if self.settings.enabled and SUPPORTED:
+            for name, prof in self.settings.profiles.items():
+                if prof.get("scripts"):
+                    self.servers.append(ForkServer(name, prof["scripts"], prof.get("preload") or [], prof.get("paths") or []))
+
+    async def start(self) -> "ForkServerPool":
+        if self.servers:
+            await asyncio.gather(*(asyncio.to_thread(s.start, self.settings.ready_timeout_seconds) for s in self.servers))
+        return self
+
+    async def stop(self) -> None:
+        if self.servers:
+            await asyncio.gather(*(asyncio.to_thread(s.stop) for s in self.servers))
+
+    def server_for(self, cmd: Sequence[str]) -> Optional[ForkServer]:
+        for server in self.servers:
+            if server.serves(cmd):
+                return server
+        return None
+
+    def summary(self) -> str:
+        return " ".join(f"{s.name}: forked={s.spawned} fallbacks={s.fallbacks}" for s in self.servers)
+
+
+_POOL: Optional[ForkServerPool] = None
+
+
+def configure(config: Optional[dict]) -> ForkServerPool:
+    """Build the process-wide fork servers for a batch (call start() from the batch's loop)."""
+    global _POOL
+    settings = resolve_fork_settings(config)
+    if settings.enabled and not SUPPORTED:
+        print("  Warning: fork_server needs fork() and Unix sockets; launching children normally")
+    _POOL = ForkServerPool(settings)
+    return _POOL
+
+
+def get_pool() -> ForkServerPool:
+    global _POOL
+    if _POOL is None:
+        _POOL = ForkServerPool()
+    return _POOL
+
+
+# ---- server side (runs in the `--serve` process and its forks) ---------------------
+
+def _stdio(fd: int, mode: str, encoding: str, errors: str, unbuffered: bool):
+    import io
+    raw = io.FileIO(fd, mode[0], closefd=False)
+    if mode == "rb":
+        return io.TextIOWrapper(io.BufferedReader(raw), encoding=encoding, errors=errors)
+    return io.TextIOWrapper(io.BufferedWriter(raw), encoding=encoding, errors=errors,
+                            line_buffering=False, write_through=unbuffered)
+
+
+def _exit_code(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, int):
+        return value
+    print(value, file=sys.stderr)
+    return 1
+
+
+def _run_child(request: dict, fds: List[int], base_path: List[str], env_defaults: Dict[str, str], close: List[int]) -> None:
+    """In the forked child: become the requested script, then os._exit with its status."""
+    code = 1
+    try:
+        os.setsid()
+        signal.set_wakeup_fd(-1)
+        for sig in (signal.SIGCHLD, signal.SIGTERM, signal.SIGHUP):
+            signal.signal(sig, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        for fd in close:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        in_fd, out_fd, err_fd = fds[0], fds[1], fds[2]
+        for src, dst in ((in_fd, 0), (out_fd, 1), (err_fd, 2)):
+            os.dup2(src, dst)
+            os.close(src)
+
+        env = dict(request.get("env") or {})
+        for key, value in env_defaults.items():
+            env.setdefault(key, value)
+        os.environ.clear()
+        os.environ.update(env)
+        if request.get("rlimits"):
+            import resource
+            for res, cap in request["rlimits"]:
+                try:
+                    resource.setrlimit(res, (cap, cap))
+                except (OSError, ValueError):
+                    pass
+        os.chdir(request.get("cwd") or "/")
+
+        enc, _, errs = (env.get("PYTHONIOENCODING") or "").partition(":")
+        enc = enc or "utf-8"
+        sys.stdin = sys.__stdin__ = _stdio(0, "rb", enc, errs or "strict", False)
+        sys.stdout = sys.__stdout__ = _stdio(1, "wb", enc, errs or "strict", True)
+        sys.stderr = sys.__stderr__ = _stdio(2, "wb", enc, "backslashreplace", True)
+
+        argv = list(request["argv"])
+        script = argv[0]
+        extra = [p for p in (env.get("PYTHONPATH") or "").split(os.pathsep) if p]
+        sys.path[:] = [os.path.dirname(os.path.abspath(script))] + extra + base_path
+        sys.argv = argv
+        if "random" in sys.modules:
+            sys.modules["random"].seed()
+
+        import runpy
+        try:
+            runpy.run_path(script, run_name="__main__")
+            code = 0
+        except SystemExit as e:
+            code = _exit_code(e.code)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        try:
+            shutdown = getattr(threading, "_shutdown", None)
+            if shutdown is not None:
+                shutdown()
+            import atexit
+            atexit._run_exitfuncs()
+        except BaseException:
+            pass
+    except BaseException:
+        try:
+            import traceback
+            traceback.print_exc()
+        except BaseException:
+            pass
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except BaseException:
+                pass
+        os._exit(code & 0xFF if code >= 0 else 1)
+
+
+def _serve(ctrl_fd: int, preload: List[str], paths: List[str]) -> int:
+    import selectors
+
+    ctrl = socket.socket(fileno=ctrl_fd)
+    inherited = {p for p in (os.environ.get("PYTHONPATH") or "").split(os.pathsep) if p}
+    base_path = [p for p in sys.path[1:] if p not in inherited]
+    sys.path[:0] = [p for p in paths if p not in sys.path]
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the batch stops us by closing the socket
+
+    env_before = dict(os.environ)
+    loaded, failed = [], []
+    for mod in preload:
+        try:
+            __import__(mod)
+            loaded.append(mod)
+        except BaseException as e:
+            failed.append(mod)
+            print(f"[FORK_SERVER] preload {mod} failed: {type(e).__name__}: {e}", file=sys.stderr)
+    # Environment defaults set by preloaded modules (e.g. GPTR_DISABLE_STREAMING) still apply per child
+    env_defaults = {k: v for k, v in os.environ.items() if env_before.get(k) != v}
+
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_r, False)
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda _sig, _frame: None)
+    _send(ctrl, {"ready": True, "pid": os.getpid(), "preloaded": loaded, "failed": failed})
+
+    sel = selectors.DefaultSelector()
+    sel.register(ctrl, selectors.EVENT_READ)
+    sel.register(wake_r, selectors.EVENT_READ)
+    children: Dict[int, socket.socket] = {}
+    running = True
+    while running or children:
+        # After EOF keep reaping so children that are still running get their status reported
+        for key, _mask in sel.select(timeout=5.0 if running else 0.5):
+            if key.fileobj is ctrl:
+                try:
+                    request, fds = _recv(ctrl)
+                except (OSError, ValueError):
+                    request, fds = None, []
+                if request is None:
+                    for fd in fds:
+                        os.close(fd)
+                    running = False
+                    sel.unregister(ctrl)
+                    continue
+                status = socket.socket(fileno=fds[3])
+                sys.stdout.flush()
+                sys.stderr.flush()
+                try:
+                    pid = os.fork()
+                except OSError as e:
+                    status.sendall((json.dumps({"error": f"fork: {e}"}) + "\n").encode())
+                    status.close()
+                    for fd in fds[:3]:
+                        os.close(fd)
+                    continue
+                if pid == 0:
+                    _run_child(request, fds[:3], base_path, env_defaults,
+                               [ctrl.fileno(), wake_r, wake_w, status.fileno(), sel.fileno()] + [c.fileno() for c in children.values()])
+                for fd in fds[:3]:
+                    os.close(fd)
+                try:
+                    status.sendall((json.dumps({"pid": pid}) + "\n").encode())
+                except OSError:
+                    pass
+                children[pid] = status
+            else:
+                try:
+                    while os.read(wake_r, 512):
+                        pass
+                except (BlockingIOError, InterruptedError):
+                    pass
+        while children:
+            try:
+                pid, st = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            sock = children.pop(pid, None)
+            if sock is not None:
+                try:
+                    sock.sendall((json.dumps({"status": os.waitstatus_to_exitcode(st)}) + "\n").encode())
+                except OSError:
+                    pass
+                sock.close()
+    return 0
+
+
+def _serve_main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ACM pre-warmed fork server (started by functions.fork_server).")
+    parser.add_argument("--serve", action="store_true", required=True)
+    parser.add_argument("--fd", type=int, required=True)
+    parser.add_argument("--name", default="")
+    parser.add_argument("--preload", action="append", default=[])
+    parser.add_argument("--path", action="append", default=[])
+    args = parser.parse_args(argv)
+    return _serve(args.fd, args.preload, args.path)
+
+
+if __name__ == "__main__":
+    sys.exit(_serve_main())
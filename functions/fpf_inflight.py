@@ -7,18 +7,49 @@ Tracks:
 - totals provided upfront (rest/deep)
 - effective max concurrency (eff_max) learned from events
 
+Waiting for headroom is event-driven: update() runs on FPF reader threads and
+wakes awaiting coroutines through loop.call_soon_threadsafe the moment a
+completion (or a new concurrency ceiling) makes a watermark ready, instead of
+callers polling headroom() on a timer. Named watermarks let several consumers
+gate on the same group at different thresholds (e.g. gptr=1, dr=2).
+
+Config (ACM config.yaml), optional; no watermarks means GPT-R is not gated:
+  concurrency:
+    fpf_watermarks:
+      gptr: 1      # launch GPT-R standard when >= 1 FPF-rest slot is free
+      dr: 1
+
 API:
 - FpfInflightTracker.update(event: dict) -> None
-- FpfInflightTracker.headroom(low_watermark: int | None = None) -> dict
+- FpfInflightTracker.headroom(low_watermark: int | None = None, group="rest") -> dict
+- FpfInflightTracker.set_watermark(name, low_watermark, group="rest") -> None
+- await FpfInflightTracker.wait_for_headroom(low_watermark=None, group="rest", timeout=None) -> dict
+- await FpfInflightTracker.wait_for(name, timeout=None) -> dict
+- FpfInflightTracker.close(group=None) -> None   (batch finished; release waiters)
 - FpfInflightTracker.snapshot() -> dict
+- resolve_watermarks(config) -> dict[name, int]
 """
 
 from __future__ import annotations
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
 import threading
 
 
+def resolve_watermarks(config: Optional[dict]) -> Dict[str, int]:
+    """concurrency.fpf_watermarks as {name: low_watermark}; invalid entries are ignored."""
+    raw = (((config or {}).get("concurrency") or {}).get("fpf_watermarks")) or {}
+    out: Dict[str, int] = {}
+    if isinstance(raw, dict):
+        for name, val in raw.items():
+            try:
+                out[str(name).strip().lower()] = max(0, int(val))
+            except Exception:
+                continue
+    return out
+
+
 class FpfInflightTracker:
     def __init__(self, totals: Dict[str, int], eff_max: Optional[int] = None) -> None:
         """
@@ -34,8 +65,17 @@ class FpfInflightTracker:
         self.inflight = {"rest": 0, "deep": 0}
         self.completed = {"rest": 0, "deep": 0}
         self.eff_max = int(eff_max) if eff_max is not None else None
+        # name -> (group, low_watermark)
+        self._watermarks: Dict[str, Tuple[str, int]] = {}
+        # (group, low_watermark, future) awaiting headroom; futures belong to self._loop
+        self._waiters: List[Tuple[str, Optional[int], "asyncio.Future[None]"]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closed: set = set()
 
-    def _eff_max_or_default(self) -> int:
+    def _eff_max_or_default(self, group: str = "rest") -> int:
+        if group == "deep":
+            # FPF reports one ceiling (REST); deep runs are bounded by their own count
+            return max(1, int(self.totals.get("deep", 1)) or 1)
         # Default to totals["rest"] if no concurrency event seen; clamp to at least 1
         base = self.eff_max if self.eff_max is not None else max(1, int(self.totals.get("rest", 1)) or 1)
         return max(1, int(base))
@@ -58,28 +98,29 @@ class FpfInflightTracker:
                     self.eff_max = max(1, mc)
                 except Exception:
                     # Keep prior eff_max if parse fails
-                    pass
-                return
-
-            if etype == "run_start":
+                    return
+            elif etype == "run_start":
                 k = str(event.get("kind", "rest")).strip().lower()
                 if k not in self.inflight:
                     k = "rest"
                 self.inflight[k] = max(0, int(self.inflight.get(k, 0)) + 1)
                 return
-
-            if etype == "run_complete":
+            elif etype == "run_complete":
                 k = str(event.get("kind", "rest")).strip().lower()
                 if k not in self.inflight:
                     k = "rest"
                 # Decrement inflight and increment completed
                 self.inflight[k] = max(0, int(self.inflight.get(k, 0)) - 1)
                 self.completed[k] = max(0, int(self.completed.get(k, 0)) + 1)
+            else:
                 return
+        # Only completions and ceiling changes can make a waiter ready
+        self._notify()
 
-    def headroom(self, low_watermark: Optional[int] = None) -> Dict[str, Any]:
+    def headroom(self, low_watermark: Optional[int] = None, group: str = "rest") -> Dict[str, Any]:
         """
-        Compute readiness and availability for launching GPT‑R based on FPF-rest inflight.
+        Compute readiness and availability for launching GPT‑R based on FPF-rest inflight
+        (or FPF-deep inflight with group="deep").
 
         If low_watermark is None:
           - ready = available > 0 (i.e., inflight_rest < eff_max)
@@ -97,8 +138,8 @@ class FpfInflightTracker:
           }
         """
         with self._lock:
-            eff = self._eff_max_or_default()
-            rest_inflight = int(self.inflight.get("rest", 0))
+            eff = self._eff_max_or_default(group)
+            rest_inflight = int(self.inflight.get(group, 0))
         available = max(0, eff - rest_inflight)
         if low_watermark is None:
             ready = available > 0
@@ -115,6 +156,83 @@ class FpfInflightTracker:
             "ready": bool(ready),
         }
 
+    # ---- event-driven waiting ----
+
+    def set_watermark(self, name: str, low_watermark: int, group: str = "rest") -> None:
+        with self._lock:
+            self._watermarks[str(name).strip().lower()] = (group, max(0, int(low_watermark)))
+
+    def has_watermark(self, name: str) -> bool:
+        with self._lock:
+            return str(name).strip().lower() in self._watermarks
+
+    def _notify(self) -> None:
+        with self._lock:
+            loop = self._loop if self._waiters else None
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            # Loop already closed; nothing is waiting any more
+            pass
+
+    def _wake(self) -> None:
+        """Resolve every waiter whose watermark is now satisfied (runs on the waiters' loop)."""
+        with self._lock:
+            waiters = list(self._waiters)
+            closed = set(self._closed)
+        for group, lw, fut in waiters:
+            if fut.done():
+                continue
+            if group in closed or self.headroom(lw, group).get("ready", False):
+                fut.set_result(None)
+
+    async def wait_for_headroom(self, low_watermark: Optional[int] = None, group: str = "rest", timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Return as soon as headroom(low_watermark, group) is ready, the group was closed,
+        or timeout expires. Returns the headroom dict at wake-up ("ready" tells which).
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            closed = group in self._closed
+        hr = self.headroom(low_watermark, group)
+        if hr.get("ready", False) or closed:
+            return hr
+        fut: "asyncio.Future[None]" = loop.create_future()
+        entry = (group, low_watermark, fut)
+        with self._lock:
+            self._loop = loop
+            self._waiters.append(entry)
+        # An update may have landed between the check and the registration
+        self._wake()
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                try:
+                    self._waiters.remove(entry)
+                except ValueError:
+                    pass
+        return self.headroom(low_watermark, group)
+
+    async def wait_for(self, name: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """wait_for_headroom for a named watermark (unknown names are ready immediately)."""
+        with self._lock:
+            spec = self._watermarks.get(str(name).strip().lower())
+        if spec is None:
+            return self.headroom(None)
+        group, lw = spec
+        return await self.wait_for_headroom(lw, group, timeout)
+
+    def close(self, group: Optional[str] = None) -> None:
+        """The group's batch has finished: no further completions will arrive, so release its waiters."""
+        with self._lock:
+            self._closed.update([group] if group else list(self.inflight.keys()))
+        self._notify()
+
     def snapshot(self) -> Dict[str, Any]:
         with self._lock:
             return {
@@ -122,4 +240,5 @@ class FpfInflightTracker:
                 "inflight": dict(self.inflight),
                 "completed": dict(self.completed),
                 "eff_max": self._eff_max_or_default(),
+                "watermarks": {name: lw for name, (_g, lw) in self._watermarks.items()},
             }
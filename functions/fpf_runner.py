@@ -4,11 +4,14 @@ Provides:
 - TEMP_BASE (reuses MA_runner.TEMP_BASE)
 - async run_filepromptforge_runs(file_a_path: str, file_b_path: str, num_runs: int = 1, options: dict | None = None)
     -> list[(path, model_name)]
+- async run_filepromptforge_batch(runs, options=None, on_event=None, timeout=None) -> list[(path, model_name)]
 
 Notes:
 - This integration calls the FPF main entrypoint (no importing of FPF internals).
 - It uses the new two-file contract: --file-a (instructions), --file-b (input markdown).
 - Output is a .txt file written to an explicit --out path; no output_dir scanning.
+- Children run through functions.process_runner (asyncio subprocess, async line readers,
+  process-group kill on expiry/cancellation); no reader threads or executor waits.
 
 Intelligent Retry System (4-Layer Architecture):
 - Layer 1: Exit Code Protocol - FPF exits with codes 1-5 based on failure type
@@ -36,16 +39,15 @@ from __future__ import annotations
 
 import os
 import sys
-import uuid
-import subprocess
+import re
 import shutil
-import threading
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict, Any, Callable
 import asyncio
-import functools
 import logging
 
+from .log_sink import StdoutHandler
+
 # Configure logging for fpf_runner
 LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -72,8 +74,9 @@ try:
 except Exception as e:
     logger.error(f"Failed to set up file handler for {LOG_FILE}: {e}")
 
-# Console handler with UTF-8 encoding
-ch = logging.StreamHandler(sys.stdout)
+# Console handler with UTF-8 encoding. It follows sys.stdout, so a redirect_stdout() around a
+# run (the daemon's per-job capture) gets FPF's log lines as well.
+ch = StdoutHandler()
 ch.setLevel(logging.DEBUG)
 ch.setFormatter(formatter)
 # Explicitly set encoding to utf-8 for the stream handler
@@ -84,9 +87,6 @@ except Exception:
     pass
 logger.addHandler(ch)
 
-# Ensure clean, non-interleaved console output across threads/processes
-_PRINT_LOCK = threading.Lock()
-
 # Optional dependency for reading YAML config (to extract model name for labeling)
 try:
     import yaml  # type: ignore
@@ -97,6 +97,9 @@ except Exception:
 from .MA_runner import TEMP_BASE as _PM_TEMP_BASE
 from .pm_utils import ensure_temp_dir
 from . import fpf_events
+from . import deadlines
+from . import process_runner
+from . import workspaces
 
 # Import error classifier for intelligent retry
 import sys as _sys
@@ -175,10 +178,22 @@ def _resolve_env_path(options: Optional[Dict[str, Any]]) -> str:
     return env_path
 
 
-def _apply_json_override_to_config(base_config_path: str, json_value: bool, temp_dir: str) -> str:
+def _set_dotted(data: Dict[str, Any], dotted: str, value: Any) -> None:
+    """Set data["a"]["b"] for dotted key "a.b", creating intermediate mappings."""
+    parts = str(dotted).split(".")
+    node = data
+    for part in parts[:-1]:
+        if not isinstance(node.get(part), dict):
+            node[part] = {}
+        node = node[part]
+    node[parts[-1]] = value
+
+
+def _apply_json_override_to_config(base_config_path: str, json_value: bool, temp_dir: str, overrides: Optional[Dict[str, Any]] = None) -> str:
     """
     Create a patched copy of the FPF YAML config with `json` set to the boolean `json_value`
-    and any deprecated keys removed. Returns path to the patched file.
+    and any deprecated keys removed. `overrides` ({"dotted.key": value}, e.g. from a preset)
+    are applied on top (YAML only). Returns path to the patched file.
     """
     try:
         os.makedirs(temp_dir, exist_ok=True)
@@ -191,6 +206,8 @@ def _apply_json_override_to_config(base_config_path: str, json_value: bool, temp
             # Remove deprecated keys if present
             if "allow_json_with_tools" in data:
                 del data["allow_json_with_tools"]
+            for key, value in (overrides or {}).items():
+                _set_dotted(data, key, value)
             with open(patched_path, "w", encoding="utf-8") as fh:
                 yaml.safe_dump(data, fh, sort_keys=False, allow_unicode=True)
         else:
@@ -206,6 +223,8 @@ def _apply_json_override_to_config(base_config_path: str, json_value: bool, temp
             txt = _re.sub(r"(?mi)^\s*allow_json_with_tools\s*:\s*.*\r?\n?", "", txt)
             with open(patched_path, "w", encoding="utf-8") as fh:
                 fh.write(txt)
+            if overrides:
+                logger.warning(f"PyYAML not available; FPF config overrides not applied: {sorted(overrides)}")
         logger.debug(f"Patched FPF config written to: {patched_path} (json={json_value})")
         return patched_path
     except Exception as e:
@@ -381,7 +400,71 @@ def _should_retry_for_validation(stderr_text: str) -> bool:
     return any(k in s for k in keywords)
 
 
-def _run_once_sync(file_a_path: str, file_b_path: str, run_index: int, options: Optional[Dict[str, Any]]) -> Tuple[str, Optional[str]]:
+_FPF_RUN_START = re.compile(r"\[FPF RUN_START\]\s+id=(\S+)\s+kind=(\S+)\s+provider=(\S+)\s+model=(\S+)")
+# Path may contain spaces, so capture everything until error= or end of line
+_FPF_RUN_COMPLETE = re.compile(r"\[FPF RUN_COMPLETE\]\s+id=(\S+)\s+kind=(\S+)\s+provider=(\S+)\s+model=(\S+)\s+ok=(true|false)\s+elapsed=\S+\s+status=(\S+)\s+path=(.+?)(?:\s+error=(.*)|$)")
+
+
+def _parse_run_event(line: str) -> Optional[Dict[str, Any]]:
+    """Orchestrator event for an FPF RUN_START / RUN_COMPLETE console line, else None."""
+    m_start = _FPF_RUN_START.search(line)
+    if m_start:
+        return {
+            "type": "run_start",
+            "data": {
+                "id": m_start.group(1),
+                "kind": m_start.group(2),
+                "provider": m_start.group(3),
+                "model": m_start.group(4),
+            }
+        }
+    m_complete = _FPF_RUN_COMPLETE.search(line)
+    if m_complete:
+        path_val = m_complete.group(7)
+        error_val = (m_complete.group(8) or "").strip()
+        return {
+            "type": "run_complete",
+            "data": {
+                "id": m_complete.group(1),
+                "kind": m_complete.group(2),
+                "provider": m_complete.group(3),
+                "model": m_complete.group(4),
+                "ok": m_complete.group(5).lower() == 'true',
+                "status": m_complete.group(6),
+                "path": path_val if path_val and path_val != "na" else None,
+                "error": error_val if error_val and error_val != "na" else None,
+            }
+        }
+    return None
+
+
+def _batch_result_line(_stream: str, line: str) -> bool:
+    """process_runner keep() predicate: batch JSON array lines and RUN_COMPLETE lines."""
+    s = line.strip()
+    return (s.startswith("[") and s.endswith("]")) or "[FPF RUN_COMPLETE]" in line
+
+
+def _line_logger(label: str, on_event: Optional[Callable[[Dict[str, Any]], None]] = None):
+    """process_runner on_line callback: log child lines as "[label] ..." / "[label ERR] ..."."""
+    def _on_line(stream: str, line: str) -> None:
+        # Tagged per child so functions/log_sink can sample/rate-limit chatty runs
+        if stream == process_runner.STDERR:
+            logger.error(f"[{label} ERR] {line.strip()}")
+        else:
+            logger.info(f"[{label}] {line.strip()}", extra={"acm_source": f"fpf:{label}"})
+        # Forward parsed FPF events to orchestrator (best-effort)
+        if on_event:
+            try:
+                evt = _parse_run_event(line)
+                if evt:
+                    on_event(evt)
+            except Exception:
+                # Do not let event parsing failures disrupt the run
+                pass
+    return _on_line
+
+
+async def _run_once(file_a_path: str, file_b_path: str, run_index: int, options: Optional[Dict[str, Any]]) -> Tuple[str, Optional[str]]:
     """
     Run FilePromptForge once in a subprocess using the new main entrypoint contract.
     Returns (absolute_path_to_output_txt, model_name_or_None).
@@ -399,7 +482,7 @@ def _run_once_sync(file_a_path: str, file_b_path: str, run_index: int, options:
         raise FileNotFoundError(f"file_b not found: {file_b_path}")
 
     # Prepare temp run directories
-    run_temp = ensure_temp_dir(os.path.join(TEMP_BASE, f"fpf_run_{uuid.uuid4()}"))
+    run_temp = workspaces.create("fpf_run").path
     out_dir = ensure_temp_dir(os.path.join(run_temp, "out"))
     log_file_path = os.path.join(run_temp, f"fpf_run_{run_index}.log")  # local runner log if needed
     logger.debug(f"Temp directories created: out={out_dir}, log={log_file_path}")
@@ -411,8 +494,9 @@ def _run_once_sync(file_a_path: str, file_b_path: str, run_index: int, options:
     # Optional json boolean override: create a patched config copy for this run
     try:
         json_override = options.get("json") if options else None
+        overrides = options.get("config_overrides") if options else None
         if isinstance(json_override, bool):
-            config_file = _apply_json_override_to_config(config_file, bool(json_override), run_temp)
+            config_file = _apply_json_override_to_config(config_file, bool(json_override), run_temp, overrides)
             logger.debug(f"Applied json override ({json_override}) to config: {config_file}")
     except Exception as e:
         logger.error(f"Failed to handle json override: {e}")
@@ -488,52 +572,18 @@ def _run_once_sync(file_a_path: str, file_b_path: str, run_index: int, options:
         pass
     logger.debug(f"Subprocess environment: {env.get('PYTHONIOENCODING')}, PYTHONPATH includes repo root={_REPO_ROOT in env.get('PYTHONPATH', '')}")
 
-    # Spawn subprocess, stream stdout/stderr with prefixed lines
-    process = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        stdin=subprocess.DEVNULL,
-        env=env,
-        text=True,
-        encoding="utf-8",
-        errors="replace",
-        bufsize=1,
-        cwd=_FPF_DIR,  # run from FPF dir so relative paths in logs/config make sense
-    )
-
-    stdout_lines: List[str] = []
-    stderr_lines: List[str] = []
-
-    def _reader(stream, prefix: str, collector: List[str]) -> None:
-        try:
-            for line in iter(stream.readline, ""):
-                with _PRINT_LOCK:
-                    # Log to our logger as well as printing to console
-                    if prefix.endswith("ERR]"):
-                        logger.error(f"{prefix} {line.strip()}")
-                    else:
-                        logger.info(f"{prefix} {line.strip()}")
-                collector.append(line.rstrip("\r\n"))
-        except Exception as e:
-            logger.error(f"Error reading stream for {prefix}: {e}")
-        finally:
-            try:
-                stream.close()
-            except Exception:
-                pass
-
-    t_out = threading.Thread(target=_reader, args=(process.stdout, f"[FPF run {run_index}]", stdout_lines), daemon=True)
-    t_err = threading.Thread(target=_reader, args=(process.stderr, f"[FPF run {run_index} ERR]", stderr_lines), daemon=True)
-    t_out.start()
-    t_err.start()
-
-    process.wait()
-    t_out.join(timeout=5)
-    t_err.join(timeout=5)
+    # Spawn subprocess, stream stdout/stderr with prefixed lines; run from FPF dir so
+    # relative paths in logs/config make sense
+    res = await process_runner.run_process(cmd, env=env, cwd=_FPF_DIR, on_line=_line_logger(f"FPF run {run_index}"))
+    if res.timed_out:
+        logger.error(f"FPF run {run_index} stopped: {res.reason}. Killed process group.")
+        raise asyncio.TimeoutError(res.reason)
+    returncode = res.returncode
+    stdout_lines: List[str] = res.stdout
+    stderr_lines: List[str] = res.stderr
 
     # LAYER 2: Check for validation failure reports even if exit code is 0 (fallback detection)
-    if process.returncode == 0:
+    if returncode == 0:
         import time
         from pathlib import Path
         validation_log_dir = Path(_FPF_DIR) / "logs" / "validation"
@@ -565,25 +615,25 @@ def _run_once_sync(file_a_path: str, file_b_path: str, run_index: int, options:
                     
                     # Override returncode to trigger retry logic
                     if not has_grounding and not has_reasoning:
-                        process.returncode = 3
+                        returncode = 3
                     elif not has_grounding:
-                        process.returncode = 1
+                        returncode = 1
                     elif not has_reasoning:
-                        process.returncode = 2
+                        returncode = 2
                     else:
-                        process.returncode = 4
+                        returncode = 4
                     
-                    logger.info(f"FPF run {run_index}: Layer 2 detection - set returncode={process.returncode} based on failure report")
+                    logger.info(f"FPF run {run_index}: Layer 2 detection - set returncode={returncode} based on failure report")
                     
                 except Exception as e:
                     logger.error(f"Failed to parse failure report: {e}")
 
-    if process.returncode != 0:
+    if returncode != 0:
         stderr_out = "\n".join(stderr_lines)
-        exc = RuntimeError(f"FilePromptForge run {run_index} failed with exit code {process.returncode}")
+        exc = RuntimeError(f"FilePromptForge run {run_index} failed with exit code {returncode}")
         
         # LAYER 3: Detect validation failures by exit code (1=grounding, 2=reasoning, 3=both)
-        is_validation_failure = process.returncode in (1, 2, 3, 4)
+        is_validation_failure = returncode in (1, 2, 3, 4)
         
         if is_validation_failure:
             # Map exit code to error category for validation failures
@@ -593,7 +643,7 @@ def _run_once_sync(file_a_path: str, file_b_path: str, run_index: int, options:
                 3: "both",
                 4: "both",  # Unknown, treat as both
             }
-            validation_failure_type = validation_type_map.get(process.returncode, "both")
+            validation_failure_type = validation_type_map.get(returncode, "both")
             
             if _HAS_ERROR_CLASSIFIER:
                 # Use error classifier for validation failures
@@ -603,7 +653,7 @@ def _run_once_sync(file_a_path: str, file_b_path: str, run_index: int, options:
                     3: ErrorCategory.VALIDATION_BOTH,
                     4: ErrorCategory.VALIDATION_BOTH,
                 }
-                error_category = error_category_map.get(process.returncode, ErrorCategory.VALIDATION_BOTH)
+                error_category = error_category_map.get(returncode, ErrorCategory.VALIDATION_BOTH)
                 retry_strategy = get_retry_strategy(error_category)
                 max_retries = retry_strategy.max_retries  # Should be 2 from error_classifier
             else:
@@ -611,7 +661,7 @@ def _run_once_sync(file_a_path: str, file_b_path: str, run_index: int, options:
                 max_retries = 2  # Fallback to 2 retries for validation failures
             
             logger.warning(
-                f"FPF run {run_index}: validation failure (code {process.returncode}), "
+                f"FPF run {run_index}: validation failure (code {returncode}), "
                 f"type={validation_failure_type}, max_retries={max_retries}"
             )
         else:
@@ -638,14 +688,12 @@ def _run_once_sync(file_a_path: str, file_b_path: str, run_index: int, options:
                 # Exponential backoff for validation: 1s, 2s, 4s
                 delay_ms = 1000 * (2 ** (attempt - 1))
                 logger.info(f"Validation retry backoff: {delay_ms}ms (attempt {attempt})")
-                import time
-                time.sleep(delay_ms / 1000.0)
+                await asyncio.sleep(delay_ms / 1000.0)
             elif _HAS_ERROR_CLASSIFIER and error_category:
                 delay_ms = calculate_backoff_delay(error_category, attempt)
                 if delay_ms > 0:
                     logger.info(f"Backing off {delay_ms}ms before retry attempt {attempt}")
-                    import time
-                    time.sleep(delay_ms / 1000.0)
+                    await asyncio.sleep(delay_ms / 1000.0)
             
             # Prepare retry with enhanced instructions
             use_retry_file_a = use_file_a_path
@@ -704,32 +752,17 @@ def _run_once_sync(file_a_path: str, file_b_path: str, run_index: int, options:
 
             logger.info(f"Executing FPF RETRY command (attempt {attempt}/{max_retries}): {' '.join(cmd_retry)}")
 
-            process = subprocess.Popen(
-                cmd_retry,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.DEVNULL,
-                env=env,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
-                bufsize=1,
-                cwd=_FPF_DIR,
+            res = await process_runner.run_process(
+                cmd_retry, env=env, cwd=_FPF_DIR, on_line=_line_logger(f"FPF run {run_index} RETRY {attempt}")
             )
-
-            stdout_lines_retry: List[str] = []
-            stderr_lines_retry: List[str] = []
-
-            t_out_retry = threading.Thread(target=_reader, args=(process.stdout, f"[FPF run {run_index} RETRY {attempt}]", stdout_lines_retry), daemon=True)
-            t_err_retry = threading.Thread(target=_reader, args=(process.stderr, f"[FPF run {run_index} RETRY {attempt} ERR]", stderr_lines_retry), daemon=True)
-            t_out_retry.start()
-            t_err_retry.start()
-
-            process.wait()
-            t_out_retry.join(timeout=5)
-            t_err_retry.join(timeout=5)
-
-            if process.returncode == 0:
+            if res.timed_out:
+                logger.error(f"FPF run {run_index} retry attempt {attempt} stopped: {res.reason}. Killed process group.")
+                raise asyncio.TimeoutError(res.reason)
+            returncode = res.returncode
+            stdout_lines_retry = res.stdout
+            stderr_lines_retry = res.stderr
+
+            if returncode == 0:
                 # Success on retry
                 stdout_lines = stdout_lines_retry
                 stderr_lines = stderr_lines_retry
@@ -738,17 +771,17 @@ def _run_once_sync(file_a_path: str, file_b_path: str, run_index: int, options:
                 break  # Exit retry loop on success
             else:
                 stderr_retry = "\n".join(stderr_lines_retry)
-                logger.error(f"FilePromptForge run {run_index} retry attempt {attempt}/{max_retries} failed with exit code {process.returncode}. Stderr: {stderr_retry}")
+                logger.error(f"FilePromptForge run {run_index} retry attempt {attempt}/{max_retries} failed with exit code {returncode}. Stderr: {stderr_retry}")
                 
                 # If this was the last retry, raise the error
                 if attempt >= max_retries:
                     raise RuntimeError(f"FilePromptForge run {run_index} failed after {max_retries} retries. Original stderr: {stderr_out}\nFinal retry stderr: {stderr_retry}")
         else:
             # No retries attempted (max_retries was 0)
-            logger.error(f"FilePromptForge run {run_index} failed with exit code {process.returncode}. Stderr: {stderr_out}")
+            logger.error(f"FilePromptForge run {run_index} failed with exit code {returncode}. Stderr: {stderr_out}")
             if _HAS_ERROR_CLASSIFIER and error_category:
                 logger.error(f"Error category {error_category.value} does not allow retries.")
-            raise RuntimeError(f"FilePromptForge run {run_index} failed with exit code {process.returncode}. Stderr: {stderr_out}")
+            raise RuntimeError(f"FilePromptForge run {run_index} failed with exit code {returncode}. Stderr: {stderr_out}")
 
     # Determine output path: prefer explicit --out; fallback to path printed on stdout if present
     output_path: Optional[str] = out_file if os.path.exists(out_file) else None
@@ -777,13 +810,11 @@ async def run_filepromptforge_runs(file_a_path: str, file_b_path: str, num_runs:
     Returns a list of tuples: [(absolute_path_to_output_txt, model_name_or_none), ...]
     """
     logger.info(f"Starting {num_runs} FPF runs for inputs. file_a={file_a_path}, file_b={file_b_path}")
-    loop = asyncio.get_running_loop()
     successful: List[Tuple[str, Optional[str]]] = []
     for i in range(1, num_runs + 1):
         try:
-            logger.debug(f"Calling _run_once_sync for run {i} with options: {options}")
-            res = await loop.run_in_executor(None, functools.partial(_run_once_sync, file_a_path, file_b_path, i, options))
-            successful.append(res)
+            logger.debug(f"Calling _run_once for run {i} with options: {options}")
+            successful.append(await _run_once(file_a_path, file_b_path, i, options))
         except Exception as e:
             logger.error(f"  FPF run {i} failed: {e}")
     logger.info(f"Successfully completed {len(successful)} out of {num_runs} FPF runs.")
@@ -804,6 +835,9 @@ async def run_filepromptforge_batch(runs: List[Dict[str, Any]], options: Optiona
       - overrides: Optional[dict] (e.g., {"reasoning_effort": "high", "max_completion_tokens": 50000})
 
     Returns a list of (output_path, model_name) for successful runs only.
+    The batch is bounded by `timeout` and the current deadlines scope; on expiry the FPF process
+    group is killed and asyncio.TimeoutError is raised. options["run_timeout_seconds"] is passed
+    to FPF as its per-run limit.
     """
     import json
 
@@ -813,10 +847,11 @@ async def run_filepromptforge_batch(runs: List[Dict[str, Any]], options: Optiona
 
     # Optional json boolean override for batch: patch config into a temp dir
     try:
-        batch_temp = ensure_temp_dir(os.path.join(TEMP_BASE, f"fpf_batch_{uuid.uuid4()}"))
+        batch_temp = workspaces.create("fpf_batch").path
         json_override = options.get("json") if options else None
+        overrides = options.get("config_overrides") if options else None
         if isinstance(json_override, bool):
-            config_file = _apply_json_override_to_config(config_file, bool(json_override), batch_temp)
+            config_file = _apply_json_override_to_config(config_file, bool(json_override), batch_temp, overrides)
             logger.debug(f"(batch) Applied json override ({json_override}) to config: {config_file}")
     except Exception as e:
         logger.error(f"(batch) Failed to handle json override: {e}")
@@ -863,132 +898,39 @@ async def run_filepromptforge_batch(runs: List[Dict[str, Any]], options: Optiona
             env["FPF_LOG_DIR"] = str(fpf_log_dir)
     except Exception:
         pass
-
-    # Spawn subprocess; send runs JSON via stdin; capture stdout for results
-    try:
-        proc = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            env=env,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-            bufsize=1,
-            cwd=_FPF_DIR,
-        )
-    except Exception as e:
-        logger.error("Failed to spawn FPF batch process: %s", e)
-        raise
+    # Batch deadline = min(caller timeout, current file/batch deadline); FPF sees the remaining
+    # budget and its per-run limit (deadlines.run_seconds.fpf) via ACM_DEADLINE_AT / ACM_RUN_TIMEOUT_SECONDS
+    deadline = deadlines.current().child(timeout, "fpf_batch")
+    deadline.apply_env(env, run_seconds=(options or {}).get("run_timeout_seconds"))
 
     payload = json.dumps(runs, ensure_ascii=False)
 
-    # Stream stdout/stderr in real time while sending stdin payload
-    stdout_lines: List[str] = []
-    stderr_lines: List[str] = []
-
-    def _reader(stream, prefix: str, collector: List[str]) -> None:
-        try:
-            for line in iter(stream.readline, ""):
-                with _PRINT_LOCK:
-                    if prefix.endswith("ERR]"):
-                        logger.error(f"{prefix} {line.strip()}")
-                    else:
-                        logger.info(f"{prefix} {line.strip()}")
-                collector.append(line.rstrip("\r\n"))
-                # Forward parsed FPF events to orchestrator (best-effort)
-                try:
-                    if on_event:
-                        import re
-                        FPF_RUN_START = re.compile(r"\[FPF RUN_START\]\s+id=(\S+)\s+kind=(\S+)\s+provider=(\S+)\s+model=(\S+)")
-                        # Path may contain spaces, so capture everything until error= or end of line
-                        FPF_RUN_COMPLETE = re.compile(r"\[FPF RUN_COMPLETE\]\s+id=(\S+)\s+kind=(\S+)\s+provider=(\S+)\s+model=(\S+)\s+ok=(true|false)\s+elapsed=\S+\s+status=\S+\s+path=(.+?)(?:\s+error=|$)")
-
-                        m_start = FPF_RUN_START.search(line)
-                        if m_start:
-                            evt = {
-                                "type": "run_start",
-                                "data": {
-                                    "id": m_start.group(1),
-                                    "kind": m_start.group(2),
-                                    "provider": m_start.group(3),
-                                    "model": m_start.group(4),
-                                }
-                            }
-                            on_event(evt)
-
-                        m_complete = FPF_RUN_COMPLETE.search(line)
-                        if m_complete:
-                            path_val = m_complete.group(6) if len(m_complete.groups()) >= 6 else None
-                            evt = {
-                                "type": "run_complete",
-                                "data": {
-                                    "id": m_complete.group(1),
-                                    "kind": m_complete.group(2),
-                                    "provider": m_complete.group(3),
-                                    "model": m_complete.group(4),
-                                    "ok": m_complete.group(5).lower() == 'true',
-                                    "path": path_val if path_val and path_val != "na" else None,
-                                }
-                            }
-                            on_event(evt)
-                except Exception:
-                    # Do not let event parsing failures disrupt the run
-                    pass
-        except Exception as e:
-            logger.error(f"Error reading stream for {prefix}: {e}")
-        finally:
-            try:
-                stream.close()
-            except Exception:
-                pass
-
-    # Start readers
-    t_out = threading.Thread(target=_reader, args=(proc.stdout, "[FPF batch]", stdout_lines), daemon=True)
-    t_err = threading.Thread(target=_reader, args=(proc.stderr, "[FPF batch ERR]", stderr_lines), daemon=True)
-    t_out.start()
-    t_err.start()
-
-    # Send stdin payload and close stdin to signal EOF
+    # Spawn subprocess; send runs JSON via stdin; stream stdout/stderr in real time (full output goes
+    # to the log) and keep only the stdout tail, JSON array lines and RUN_COMPLETE lines for results.
+    # The wait does not block the asyncio event loop.
     try:
-        if proc.stdin:
-            proc.stdin.write(payload)
-            proc.stdin.flush()
-            proc.stdin.close()
+        res = await process_runner.run_process(
+            cmd, env=env, cwd=_FPF_DIR, stdin_data=payload, on_line=_line_logger("FPF batch", on_event), deadline=deadline,
+            keep=_batch_result_line,
+        )
+    except asyncio.CancelledError:
+        # Caller gave up on this batch (e.g. a hedged duplicate lost the race): the process group is already killed
+        logger.info("FPF batch cancelled. Killed process group.")
+        raise
     except Exception as e:
-        logger.error("Failed to write runs JSON to FPF stdin: %s", e)
-        try:
-            proc.kill()
-        except Exception:
-            pass
+        logger.error("Failed to run FPF batch process: %s", e)
         raise
+    if res.timed_out:
+        logger.error(f"FPF batch stopped: {res.reason}. Killed process group.")
+        raise asyncio.TimeoutError(res.reason)
+    stdout_text = res.stdout_text
+    stderr_text = res.stderr_text
 
-    # Wait for process to exit and join readers (do not block the asyncio event loop)
-    loop = asyncio.get_running_loop()
-    if timeout:
-        try:
-            await asyncio.wait_for(loop.run_in_executor(None, proc.wait), timeout=timeout)
-        except asyncio.TimeoutError:
-            logger.error(f"FPF batch timed out after {timeout} seconds. Killing process.")
-            try:
-                proc.kill()
-            except Exception:
-                pass
-            raise
-    else:
-        await loop.run_in_executor(None, proc.wait)
-    t_out.join(timeout=5)
-    t_err.join(timeout=5)
-
-    stdout_text = "\n".join(stdout_lines)
-    stderr_text = "\n".join(stderr_lines)
-
-    if proc.returncode != 0:
+    if res.returncode != 0:
         # Include some stderr in error for debugging
         snippet = (stderr_text or "").strip()
-        logger.error("FPF batch failed (rc=%s). Stderr: %s", proc.returncode, snippet)
-        raise RuntimeError(f"FPF batch failed (rc={proc.returncode}). {snippet}")
+        logger.error("FPF batch failed (rc=%s). Stderr: %s", res.returncode, snippet)
+        raise RuntimeError(f"FPF batch failed (rc={res.returncode}). {snippet}")
 
     # Parse JSON array from stdout; tolerate stray log lines by scanning for a JSON array
     results: List[Dict[str, Any]] = []
@@ -1002,19 +944,26 @@ async def run_filepromptforge_batch(runs: List[Dict[str, Any]], options: Optiona
                 parsed = True
         except Exception:
             pass
-        if not parsed:
-            # Fallback: try to find a JSON array on a single line
-            for line in reversed(stdout_text.splitlines()):
-                s = line.strip()
-                if s.startswith("[") and s.endswith("]"):
-                    try:
-                        maybe = json.loads(s)
-                        if isinstance(maybe, list):
-                            results = maybe
-                            parsed = True
-                            break
-                    except Exception:
-                        continue
+    if not parsed:
+        # Fallback: try to find a JSON array on a single line
+        for line in reversed(res.kept):
+            s = line.strip()
+            if s.startswith("[") and s.endswith("]"):
+                try:
+                    maybe = json.loads(s)
+                    if isinstance(maybe, list):
+                        results = maybe
+                        parsed = True
+                        break
+                except Exception:
+                    continue
+    if not parsed and res.truncated:
+        # Pretty-printed array longer than the kept tail: rebuild results from RUN_COMPLETE lines
+        for line in res.kept:
+            evt = _parse_run_event(line)
+            if evt and evt["type"] == "run_complete" and evt["data"]["ok"]:
+                results.append(evt["data"])
+                parsed = True
     if not parsed:
         logger.error("Failed to parse FPF batch JSON results. Raw stdout:\n%s", stdout_text)
         raise RuntimeError("Failed to parse FPF batch JSON results from stdout")
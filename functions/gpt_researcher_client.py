@@ -20,10 +20,11 @@ def generate_query_prompt(markdown_content, instructions_content):
     """
     return f"{instructions_content}\n\n{markdown_content}"
 
-async def run_gpt_researcher_programmatic(query_prompt, report_type="research_report"):
+async def run_gpt_researcher_programmatic(query_prompt, report_type="research_report", on_cost=None):
     """
     Uses the gpt-researcher library programmatically to generate a report of the given type.
     Returns a tuple: (path_to_report, model_name_used).
+    on_cost(usd) is called with researcher.get_costs() once the run ends (also on failure).
 
     This version includes best-effort cleanup of async clients created by the researcher
     so that closing operations happen while the event loop that created them is still active.
@@ -106,6 +107,12 @@ async def run_gpt_researcher_programmatic(query_prompt, report_type="research_re
         print(f"Error running gpt-researcher programmatically: {e}")
         raise Exception(f"gpt-researcher programmatic run failed: {e}")
     finally:
+        # Report spend even for failed runs: the tokens were used either way
+        if on_cost is not None and researcher is not None:
+            try:
+                on_cost(float(researcher.get_costs() or 0.0))
+            except Exception:
+                pass
         # Best-effort cleanup: ensure async clients are closed while the event loop is active.
         try:
             if researcher is not None:
@@ -47,14 +47,19 @@ async def _amain() -> int:
     with open(args.prompt_file, "r", encoding="utf-8") as fh:
         prompt = fh.read()
 
+    costs = {"usd": 0.0}
+
+    def _on_cost(usd: float) -> None:
+        costs["usd"] = usd
+
     try:
-        path, model = await run_gpt_researcher_programmatic(prompt, report_type=args.report_type)
+        path, model = await run_gpt_researcher_programmatic(prompt, report_type=args.report_type, on_cost=_on_cost)
     except Exception as e:
-        print(json.dumps({"error": f"gpt-researcher failed: {e}"}), file=sys.stderr)
+        print(json.dumps({"error": f"gpt-researcher failed: {e}", "cost_usd": costs["usd"]}), file=sys.stderr)
         return 1
 
-    # Emit a single JSON line with the results to stdout
-    print(json.dumps({"path": path, "model": model}, ensure_ascii=False))
+    # Emit a single JSON line with the results to stdout (cost_usd feeds the parent's cost ledger)
+    print(json.dumps({"path": path, "model": model, "cost_usd": costs["usd"]}, ensure_ascii=False))
     return 0
 
 
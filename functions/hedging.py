@@ -0,0 +1,213 @@
+"""
+Hedged (speculative) re-launch for straggler ACM runs.
+
+A few GPT-R / FPF runs take far longer than their peers (slow provider shard,
+stuck retry loop) and hold up the whole batch. When hedging is on and a run has
+been going for longer than the historical p90 for its (type, model), a duplicate
+is launched; whichever finishes successfully first is kept and the other one is
+cancelled (its child process is killed).
+
+Hedges cost real tokens, so they are opt-in, need enough history to trust the
+percentile, and are capped per process by max_hedges. Hedge children are tagged
+in the subprocess log ([GPTR_START] ... hedge=1, FPF ids ending in "-hedge") so
+tools/timeline_from_logs.py can report their cost separately.
+
+Config (ACM config.yaml):
+  concurrency:
+    hedging:
+      enabled: false
+      percentile: 0.9          # launch the hedge after this quantile of past durations
+      min_samples: 5           # (type, model) pairs with less history are never hedged
+      min_delay_seconds: 60    # never hedge earlier than this
+      max_hedges: 4            # per ACM process
+      types: [gptr, dr, fpf]
+
+API:
+- configure(config, history=None) -> HedgePolicy   (module singleton)
+- get_policy() -> HedgePolicy
+- HedgePolicy.delay_for(rtype, model) -> float | None
+- HedgePolicy.race(primary_factory, hedge_factory, delay, ...) -> (result, winner)
+- HedgeLedger.claim(run_id, who) -> bool            (first successful finisher wins)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+HEDGE_SUFFIX = "-hedge"
+
+WINNER_PRIMARY = "primary"
+WINNER_HEDGE = "hedge"
+WINNER_NONE = "none"
+
+
+def _default_success(result: Any) -> bool:
+    return result is not None
+
+
+class HedgeLedger:
+    """
+    Thread-safe winner bookkeeping for runs whose completions arrive on reader threads
+    (FPF batch events). The first successful claim for a run_id wins; later claims lose.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._winners: Dict[str, str] = {}
+
+    def claim(self, run_id: str, who: str) -> bool:
+        with self._lock:
+            current = self._winners.get(run_id)
+            if current is None:
+                self._winners[run_id] = who
+                return True
+            return current == who
+
+    def winner(self, run_id: str) -> Optional[str]:
+        with self._lock:
+            return self._winners.get(run_id)
+
+
+class HedgePolicy:
+    def __init__(self, settings: Optional[dict] = None, history=None) -> None:
+        s = settings or {}
+        self.enabled = bool(s.get("enabled", False))
+        self.percentile = float(s.get("percentile", 0.9))
+        self.min_samples = max(1, int(s.get("min_samples", 5)))
+        self.min_delay_seconds = max(0.0, float(s.get("min_delay_seconds", 60)))
+        self.max_hedges = max(0, int(s.get("max_hedges", 4)))
+        self.types = {str(t).strip().lower() for t in (s.get("types") or ("gptr", "dr", "fpf"))}
+        self.history = history
+        self._lock = threading.Lock()
+        self._launched = 0
+        self._won = 0
+        self._extra_seconds = 0.0
+
+    def applies(self, rtype: str) -> bool:
+        return self.enabled and self.history is not None and (rtype or "").strip().lower() in self.types
+
+    def delay_for(self, rtype: str, model: Optional[str]) -> Optional[float]:
+        """Seconds after which a duplicate should be launched, or None when this run is not hedged."""
+        if not self.applies(rtype):
+            return None
+        try:
+            if self.history.count(rtype, model) < self.min_samples:
+                return None
+            pct = self.history.percentile(rtype, model, self.percentile)
+        except Exception:
+            return None
+        if pct is None:
+            return None
+        return max(self.min_delay_seconds, float(pct))
+
+    def try_reserve(self) -> bool:
+        """Take one hedge from the per-process budget."""
+        with self._lock:
+            if self._launched >= self.max_hedges:
+                return False
+            self._launched += 1
+            return True
+
+    def record(self, winner: str, extra_seconds: float) -> None:
+        with self._lock:
+            if winner == WINNER_HEDGE:
+                self._won += 1
+            self._extra_seconds += max(0.0, float(extra_seconds or 0.0))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "launched": self._launched,
+                "won": self._won,
+                "extra_seconds": round(self._extra_seconds, 1),
+                "budget": self.max_hedges,
+            }
+
+    async def race(
+        self,
+        primary_factory: Callable[[], Awaitable[Any]],
+        hedge_factory: Callable[[], Awaitable[Any]],
+        delay: Optional[float],
+        is_success: Callable[[Any], bool] = _default_success,
+        label: str = "",
+        log: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[Any, str]:
+        """
+        Run primary; if it is still going after `delay` seconds (and the budget allows),
+        start a hedge. The first attempt whose result passes is_success wins and the other
+        is cancelled. Returns (result, winner). When both fail, the primary's result is
+        returned with winner "none". Exceptions from an attempt count as failure.
+        """
+        primary = asyncio.ensure_future(primary_factory())
+        if delay is None:
+            return await primary, WINNER_PRIMARY
+
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=max(0.0, float(delay)))
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done or not self.try_reserve():
+            return await primary, WINNER_PRIMARY
+
+        hedge_started = time.monotonic()
+        if log:
+            log(f"[HEDGE_START] {label} after={float(delay):.0f}s".strip())
+        hedge = asyncio.ensure_future(hedge_factory())
+        roles = {primary: WINNER_PRIMARY, hedge: WINNER_HEDGE}
+        pending = set(roles)
+        result: Any = None
+        winner = WINNER_NONE
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        value = task.result()
+                    except asyncio.CancelledError:
+                        continue
+                    except Exception:
+                        continue
+                    if roles[task] == WINNER_PRIMARY and winner == WINNER_NONE:
+                        result = value
+                    if winner == WINNER_NONE and is_success(value):
+                        result, winner = value, roles[task]
+                if winner != WINNER_NONE:
+                    break
+        finally:
+            # The loser (or both attempts, if the race itself is cancelled)
+            await _cancel_all(pending)
+        extra = time.monotonic() - hedge_started
+        self.record(winner, extra)
+        if log:
+            log(f"[HEDGE_END] {label} winner={winner} extra_seconds={extra:.1f}".strip())
+        return result, winner
+
+
+async def _cancel_all(tasks: Iterable["asyncio.Future[Any]"]) -> None:
+    tasks = [t for t in tasks if not t.done()]
+    for t in tasks:
+        t.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_POLICY: Optional[HedgePolicy] = None
+
+
+def configure(config: Optional[dict], history=None) -> HedgePolicy:
+    """Build the process-wide policy from concurrency.hedging."""
+    global _POLICY
+    settings = (((config or {}).get("concurrency") or {}).get("hedging")) or {}
+    _POLICY = HedgePolicy(settings, history=history)
+    return _POLICY
+
+
+def get_policy() -> HedgePolicy:
+    global _POLICY
+    if _POLICY is None:
+        _POLICY = HedgePolicy({})
+    return _POLICY
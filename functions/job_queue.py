@@ -0,0 +1,358 @@
+"""
+Job queue for distributed ACM batches (coordinator / worker mode).
+
+`runner.py --coordinator` expands config.runs x iterations x input files into
+jobs instead of running them; any number of `runner.py --worker` processes, on
+any host that can open the queue, lease jobs, run them with process_file_run /
+process_file_fpf_batch and post the resulting reports back. The coordinator
+collects the reports into the normal output folder (manifest, artifact index,
+journal) and runs evaluation per file as soon as all of its jobs are finished.
+
+Jobs carry everything a worker needs: the run entry, and the input document
+and instructions are stored once in the queue itself, so workers only need the
+queue file (and their own API keys), not the coordinator's folders. Reports
+travel back the same way.
+
+Job kinds:
+- gen   one GPT-R / DR / MA iteration        (unit = journal gen unit)
+- fpf   one FPF run entry, all iterations    (FPF schedules iterations inside one child)
+
+States: queued -> leased -> done | failed. A worker holds a lease for
+lease_seconds and renews it while the job runs; a lease that runs out (worker
+died, host lost) puts the job back in the queue until max_attempts is used up.
+
+The default broker is a SQLite file. On shared storage keep it on a
+filesystem with working POSIX locks (SQLite's rollback journal is used, not
+WAL, for that reason). Other brokers can be plugged in with
+register_broker(scheme, factory) and selected by "<scheme>://..." specs.
+
+Config (ACM config.yaml):
+  distributed:
+    queue: logs/job_queue.sqlite   # path or sqlite:///path; relative to the config file directory
+    lease_seconds: 900
+    poll_seconds: 5
+    max_attempts: 3
+    worker_slots: 1                # jobs one worker process runs at a time
+    worker_dir: temp_worker        # per-job scratch space on the worker host
+
+API:
+- resolve_queue_settings(config, config_dir) -> QueueSettings
+- open_queue(spec, base_dir=None) -> SqliteJobQueue
+- register_broker(scheme, factory)
+- SqliteJobQueue.put_blob/get_blob, enqueue, lease, renew, complete, fail,
+  jobs, artifacts, mark_collected, counts
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+STATE_QUEUED = "queued"
+STATE_LEASED = "leased"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+KIND_GEN = "gen"
+KIND_FPF = "fpf"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    file TEXT,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    error TEXT,
+    collected INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (batch_id, unit)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state, job_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_file ON jobs (batch_id, file);
+CREATE TABLE IF NOT EXISTS blobs (
+    key TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    job_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    model TEXT,
+    data BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_job ON artifacts (job_id);
+"""
+
+
+@dataclass
+class Job:
+    job_id: int
+    batch_id: str
+    unit: str
+    kind: str
+    file: Optional[str]
+    payload: dict
+    state: str
+    worker: Optional[str] = None
+    attempts: int = 0
+    error: Optional[str] = None
+    collected: bool = False
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (STATE_DONE, STATE_FAILED)
+
+
+_JOB_COLUMNS = "job_id, batch_id, unit, kind, file, payload, state, worker, attempts, error, collected"
+
+
+def _job(row) -> Job:
+    try:
+        payload = json.loads(row[5]) if row[5] else {}
+    except Exception:
+        payload = {}
+    return Job(row[0], row[1], row[2], row[3], row[4], payload, row[6], row[7], row[8], row[9], bool(row[10]))
+
+
+class SqliteJobQueue:
+    def __init__(self, path: str) -> None:
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        # isolation_level=None: transactions are explicit (BEGIN IMMEDIATE) so a lease is atomic across hosts
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=60, isolation_level=None)
+        self._conn.executescript(_SCHEMA)
+
+    def _all(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _write(self, fn: Callable[[sqlite3.Connection], object]):
+        """Run fn inside one write transaction (takes the database write lock up front)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # ---- coordinator side ----
+
+    def put_blob(self, data: bytes) -> str:
+        """Store content once (keyed by sha256) and return its key."""
+        key = hashlib.sha256(data).hexdigest()
+        self._write(lambda c: c.execute("INSERT OR IGNORE INTO blobs (key, data) VALUES (?, ?)", (key, sqlite3.Binary(data))))
+        return key
+
+    def get_blob(self, key: str) -> Optional[bytes]:
+        rows = self._all("SELECT data FROM blobs WHERE key = ?", (key,))
+        return bytes(rows[0][0]) if rows else None
+
+    def enqueue(self, batch_id: str, unit: str, kind: str, payload: dict, file: Optional[str] = None, max_attempts: int = 3) -> bool:
+        """
+        Add a job. On a coordinator restart (--resume) a unit that is already queued, leased or
+        done is left as it is; a failed one is queued again with fresh attempts.
+        """
+        now = time.time()
+
+        def _do(c):
+            cur = c.execute(
+                "INSERT INTO jobs (batch_id, unit, kind, file, payload, state, max_attempts, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (batch_id, unit) DO UPDATE SET state = excluded.state, payload = excluded.payload,"
+                " attempts = 0, error = NULL, collected = 0, worker = NULL, updated_at = excluded.updated_at"
+                " WHERE jobs.state = ?",
+                (batch_id, unit, kind, file, json.dumps(payload), STATE_QUEUED, max(1, int(max_attempts)), now, now, STATE_FAILED),
+            )
+            return cur.rowcount > 0
+
+        return bool(self._write(_do))
+
+    def jobs(self, batch_id: str, file: Optional[str] = None) -> List[Job]:
+        if file is None:
+            rows = self._all(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE batch_id = ? ORDER BY job_id", (batch_id,))
+        else:
+            rows = self._all(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE batch_id = ? AND file = ? ORDER BY job_id", (batch_id, file))
+        return [_job(r) for r in rows]
+
+    def artifacts(self, job_id: int) -> List[dict]:
+        rows = self._all("SELECT name, type, model, data FROM artifacts WHERE job_id = ? ORDER BY rowid", (job_id,))
+        return [{"name": r[0], "type": r[1], "model": r[2], "data": bytes(r[3])} for r in rows]
+
+    def mark_collected(self, job_id: int) -> None:
+        """The coordinator has stored this job's reports; drop the payload copies."""
+        def _do(c):
+            c.execute("UPDATE jobs SET collected = 1, updated_at = ? WHERE job_id = ?", (time.time(), job_id))
+            c.execute("DELETE FROM artifacts WHERE job_id = ?", (job_id,))
+
+        self._write(_do)
+
+    def counts(self, batch_id: Optional[str] = None) -> Dict[str, int]:
+        if batch_id is None:
+            rows = self._all("SELECT state, COUNT(*) FROM jobs GROUP BY state")
+        else:
+            rows = self._all("SELECT state, COUNT(*) FROM jobs WHERE batch_id = ? GROUP BY state", (batch_id,))
+        return {state: n for state, n in rows}
+
+    # ---- worker side ----
+
+    def _expire_leases(self, c: sqlite3.Connection, now: float) -> None:
+        c.execute(
+            "UPDATE jobs SET state = ?, worker = NULL, lease_until = NULL, error = 'lease expired', updated_at = ?"
+            " WHERE state = ? AND lease_until < ? AND attempts >= max_attempts",
+            (STATE_FAILED, now, STATE_LEASED, now),
+        )
+        c.execute(
+            "UPDATE jobs SET state = ?, worker = NULL, lease_until = NULL, updated_at = ?"
+            " WHERE state = ? AND lease_until < ?",
+            (STATE_QUEUED, now, STATE_LEASED, now),
+        )
+
+    def lease(self, worker: str, lease_seconds: float = 900, batch_id: Optional[str] = None) -> Optional[Job]:
+        """Claim the oldest queued job (optionally of one batch) for `worker`, or None."""
+        now = time.time()
+
+        def _do(c):
+            self._expire_leases(c, now)
+            if batch_id is None:
+                row = c.execute("SELECT job_id FROM jobs WHERE state = ? ORDER BY job_id LIMIT 1", (STATE_QUEUED,)).fetchone()
+            else:
+                row = c.execute(
+                    "SELECT job_id FROM jobs WHERE state = ? AND batch_id = ? ORDER BY job_id LIMIT 1",
+                    (STATE_QUEUED, batch_id),
+                ).fetchone()
+            if row is None:
+                return None
+            c.execute(
+                "UPDATE jobs SET state = ?, worker = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+                (STATE_LEASED, worker, now + float(lease_seconds), now, row[0]),
+            )
+            return _job(c.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE job_id = ?", (row[0],)).fetchone())
+
+        return self._write(_do)
+
+    def renew(self, job_id: int, worker: str, lease_seconds: float = 900) -> bool:
+        """Extend a lease; False means the job is no longer ours (expired and re-leased, or finished)."""
+        now = time.time()
+
+        def _do(c):
+            cur = c.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE job_id = ? AND worker = ? AND state = ?",
+                (now + float(lease_seconds), now, job_id, worker, STATE_LEASED),
+            )
+            return cur.rowcount > 0
+
+        return bool(self._write(_do))
+
+    def complete(self, job_id: int, worker: str, artifacts: List[dict]) -> bool:
+        """Post reports ({name, type, model, data}) and mark the job done, if the lease is still ours."""
+        now = time.time()
+
+        def _do(c):
+            cur = c.execute(
+                "UPDATE jobs SET state = ?, lease_until = NULL, error = NULL, updated_at = ? WHERE job_id = ? AND worker = ? AND state = ?",
+                (STATE_DONE, now, job_id, worker, STATE_LEASED),
+            )
+            if cur.rowcount == 0:
+                return False
+            for a in artifacts:
+                c.execute(
+                    "INSERT INTO artifacts (job_id, name, type, model, data, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, a["name"], a["type"], a.get("model"), sqlite3.Binary(a["data"]), now),
+                )
+            return True
+
+        return bool(self._write(_do))
+
+    def fail(self, job_id: int, worker: str, error: str, retry: bool = True) -> bool:
+        """Give the job back (retry, while attempts remain) or mark it failed."""
+        now = time.time()
+
+        def _do(c):
+            row = c.execute("SELECT attempts, max_attempts FROM jobs WHERE job_id = ? AND worker = ? AND state = ?", (job_id, worker, STATE_LEASED)).fetchone()
+            if row is None:
+                return False
+            state = STATE_QUEUED if retry and row[0] < row[1] else STATE_FAILED
+            c.execute(
+                "UPDATE jobs SET state = ?, worker = NULL, lease_until = NULL, error = ?, updated_at = ? WHERE job_id = ?",
+                (state, (error or "")[:2000], now, job_id),
+            )
+            return True
+
+        return bool(self._write(_do))
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+
+
+_BROKERS: Dict[str, Callable[[str], object]] = {"sqlite": SqliteJobQueue}
+
+
+def register_broker(scheme: str, factory: Callable[[str], object]) -> None:
+    """Make "<scheme>://<rest>" queue specs open through factory(rest)."""
+    _BROKERS[scheme.lower()] = factory
+
+
+def open_queue(spec: str, base_dir: Optional[str] = None):
+    """Open a queue from a path or "<scheme>://..." spec (relative paths resolve against base_dir)."""
+    scheme, sep, rest = str(spec).partition("://")
+    if not sep:
+        scheme, rest = "sqlite", str(spec)
+    factory = _BROKERS.get(scheme.lower())
+    if factory is None:
+        raise ValueError(f"unsupported job queue broker: {scheme!r} (known: {sorted(_BROKERS)})")
+    if scheme.lower() == "sqlite":
+        # sqlite:///abs/path -> /abs/path
+        if sep and rest.startswith("/") and len(rest) > 2 and rest[2] == ":":
+            rest = rest[1:]  # sqlite:///C:/path on Windows
+        if not os.path.isabs(rest) and base_dir:
+            rest = os.path.join(base_dir, rest)
+    return factory(rest)
+
+
+@dataclass
+class QueueSettings:
+    queue: str
+    lease_seconds: float = 900.0
+    poll_seconds: float = 5.0
+    max_attempts: int = 3
+    worker_slots: int = 1
+    worker_dir: str = ""
+
+
+def resolve_queue_settings(config: Optional[dict], config_dir: str) -> QueueSettings:
+    cfg = (config or {}).get("distributed") or {}
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    worker_dir = cfg.get("worker_dir") or os.path.join(root, "temp_worker")
+    if not os.path.isabs(worker_dir):
+        worker_dir = os.path.abspath(os.path.join(config_dir, worker_dir))
+    return QueueSettings(
+        queue=str(cfg.get("queue") or os.path.join(root, "logs", "job_queue.sqlite")),
+        lease_seconds=max(30.0, float(cfg.get("lease_seconds", 900))),
+        poll_seconds=max(0.1, float(cfg.get("poll_seconds", 5))),
+        max_attempts=max(1, int(cfg.get("max_attempts", 3))),
+        worker_slots=max(1, int(cfg.get("worker_slots", 1))),
+        worker_dir=worker_dir,
+    )
@@ -0,0 +1,352 @@
+"""
+Queue-based, batched log sink for forwarded subprocess output.
+
+Every child line used to go through SUBPROC_LOGGER (and, when forwarding is
+on, the 'acm' logger) synchronously from the code that read it, and
+fpf_runner logged every line to fpf_run.log and stdout as well. Each write
+took the handler lock and flushed, so under high concurrency log I/O slowed
+the readers and, through them, pipe draining.
+
+attach(logger, ...) moves a logger's handlers behind a bounded queue: the
+logger keeps a single enqueueing handler and a listener thread writes the
+records in batches (one write + one flush per handler per batch for stream
+and plain file handlers; rotating handlers still get record-by-record
+emits). Before enqueueing, per-source sampling and a token-bucket rate limit
+can shed INFO/DEBUG chatter; a record's source is its `acm_source` extra
+(e.g. "gptr:1234", "fpf:FPF batch") or else the logger name. WARNING and
+above are never sampled, rate-limited or dropped (they wait for queue space).
+Counters (queued, written, dropped, sampled/rate-limited) feed the heartbeat
+line and are logged when the sink stops. stop() drains the queue and puts
+the original handlers back.
+
+StdoutHandler is a console handler that writes to whatever sys.stdout is
+when a record goes out, so a contextlib.redirect_stdout() around the caller
+(the daemon's per-job capture) also sees that logger's lines. It is batched
+like a plain StreamHandler.
+
+Config (ACM config.yaml):
+  log_sink:
+    enabled: true
+    max_queue: 20000            # records buffered before INFO/DEBUG lines are dropped
+    batch_size: 500             # records written per batch
+    flush_seconds: 0.2          # longest a record waits in the queue
+    rate_per_source: null       # INFO/DEBUG lines/second per source (null = unlimited)
+    burst: 200                  # token-bucket burst for rate_per_source
+    sample:                     # keep 1 in N INFO/DEBUG lines per source prefix (default: none)
+      "fpf:": 5                 #   e.g. "gptr:", "fpf:", "seval:", "acm.subproc"
+
+API:
+- configure(config) -> LogSink   (module singleton; stops the previous one)
+- get_sink() -> LogSink (disabled no-op sink until configured)
+- LogSink.attach(*loggers) / LogSink.stats() -> dict / LogSink.summary() -> str
+- LogSink.stop() -> None (flush, restore handlers)
+- resolve_log_sink_settings(config) -> LogSinkSettings
+- StdoutHandler(fallback=None) -> logging.Handler (console handler following sys.stdout)
+"""
+
+from __future__ import annotations
+
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, TextIO, Tuple
+
+DEFAULT_MAX_QUEUE = 20000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_SECONDS = 0.2
+DEFAULT_BURST = 200
+
+
+@dataclass
+class LogSinkSettings:
+    enabled: bool = True
+    max_queue: int = DEFAULT_MAX_QUEUE
+    batch_size: int = DEFAULT_BATCH_SIZE
+    flush_seconds: float = DEFAULT_FLUSH_SECONDS
+    rate_per_source: Optional[float] = None
+    burst: int = DEFAULT_BURST
+    sample: Dict[str, int] = field(default_factory=dict)
+
+    def sample_every(self, source: str) -> int:
+        """Keep 1 in N lines for `source` (longest matching prefix wins)."""
+        best, every = -1, 1
+        for prefix, n in self.sample.items():
+            if source.startswith(prefix) and len(prefix) > best:
+                best, every = len(prefix), n
+        return max(1, every)
+
+
+def _int(value, default: int) -> int:
+    try:
+        return int(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+def resolve_log_sink_settings(config: Optional[dict]) -> LogSinkSettings:
+    raw = (config or {}).get("log_sink") or {}
+    if not isinstance(raw, dict):
+        raw = {}
+    rate = raw.get("rate_per_source")
+    try:
+        rate = float(rate) if rate is not None else None
+    except (TypeError, ValueError):
+        rate = None
+    sample = {}
+    for prefix, n in (raw.get("sample") or {}).items():
+        sample[str(prefix)] = max(1, _int(n, 1))
+    try:
+        flush = float(raw.get("flush_seconds", DEFAULT_FLUSH_SECONDS))
+    except (TypeError, ValueError):
+        flush = DEFAULT_FLUSH_SECONDS
+    return LogSinkSettings(
+        enabled=bool(raw.get("enabled", True)),
+        max_queue=max(1, _int(raw.get("max_queue"), DEFAULT_MAX_QUEUE)),
+        batch_size=max(1, _int(raw.get("batch_size"), DEFAULT_BATCH_SIZE)),
+        flush_seconds=max(0.01, flush),
+        rate_per_source=rate if rate and rate > 0 else None,
+        burst=max(1, _int(raw.get("burst"), DEFAULT_BURST)),
+        sample=sample,
+    )
+
+
+class _SourceGate:
+    """Per-source sampling counter and token bucket."""
+
+    def __init__(self, every: int, rate: Optional[float], burst: int) -> None:
+        self.every = every
+        self.seen = 0
+        self.rate = rate
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+
+    def admit(self) -> Tuple[bool, str]:
+        self.seen += 1
+        if self.every > 1 and (self.seen - 1) % self.every:
+            return False, "sampled"
+        if self.rate is not None:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if self.tokens < 1.0:
+                return False, "rate_limited"
+            self.tokens -= 1.0
+        return True, ""
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that sheds INFO/DEBUG lines instead of blocking the producer."""
+
+    def __init__(self, sink: "LogSink", target: logging.Logger) -> None:
+        super().__init__(sink._queue)
+        self.sink = sink
+        self.target = target
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens in the listener against the original handlers
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.sink._put(self.target, record)
+
+
+class LogSink:
+    def __init__(self, settings: Optional[LogSinkSettings] = None) -> None:
+        self.settings = settings or LogSinkSettings(enabled=False)
+        self._queue: "queue.Queue[Optional[Tuple[logging.Logger, logging.LogRecord]]]" = queue.Queue(self.settings.max_queue)
+        self._lock = threading.Lock()
+        self._gates: Dict[str, _SourceGate] = {}
+        self._attached: Dict[logging.Logger, List[logging.Handler]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"queued": 0, "written": 0, "batches": 0, "dropped": 0, "sampled": 0, "rate_limited": 0, "max_depth": 0}
+
+    # ---- producer side -------------------------------------------------
+
+    def attach(self, *loggers: Optional[logging.Logger]) -> "LogSink":
+        """Route these loggers' handlers through the queue (no-op when disabled)."""
+        if not self.settings.enabled:
+            return self
+        with self._lock:
+            for lg in loggers:
+                if lg is None or lg in self._attached or not lg.handlers:
+                    continue
+                self._attached[lg] = list(lg.handlers)
+                for h in list(lg.handlers):
+                    lg.removeHandler(h)
+                lg.addHandler(_EnqueueHandler(self, lg))
+            if self._attached and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="acm-log-sink", daemon=True)
+                self._thread.start()
+        return self
+
+    def _put(self, target: logging.Logger, record: logging.LogRecord) -> None:
+        important = record.levelno >= logging.WARNING
+        if not important:
+            source = str(getattr(record, "acm_source", None) or record.name)
+            with self._lock:
+                gate = self._gates.get(source)
+                if gate is None:
+                    gate = _SourceGate(self.settings.sample_every(source), self.settings.rate_per_source, self.settings.burst)
+                    self._gates[source] = gate
+                ok, why = gate.admit()
+                if not ok:
+                    self._stats[why] += 1
+                    return
+        try:
+            if important:
+                self._queue.put((target, record), timeout=5)
+            else:
+                self._queue.put_nowait((target, record))
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            return
+        with self._lock:
+            self._stats["queued"] += 1
+            depth = self._queue.qsize()
+            if depth > self._stats["max_depth"]:
+                self._stats["max_depth"] = depth
+
+    # ---- consumer side -------------------------------------------------
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch: List[Tuple[logging.Logger, logging.LogRecord]] = []
+            try:
+                item = self._queue.get(timeout=self.settings.flush_seconds)
+            except queue.Empty:
+                continue
+            while True:
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.settings.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[Tuple[logging.Logger, logging.LogRecord]]) -> None:
+        by_handler: Dict[logging.Handler, List[logging.LogRecord]] = {}
+        for target, record in batch:
+            for h in self._attached.get(target, ()):
+                if record.levelno >= h.level:
+                    by_handler.setdefault(h, []).append(record)
+        for h, records in by_handler.items():
+            try:
+                _emit_batch(h, records)
+            except Exception:
+                pass
+        with self._lock:
+            self._stats["written"] += len(batch)
+            self._stats["batches"] += 1
+
+    # ---- lifecycle / metrics -------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        out["depth"] = self._queue.qsize()
+        return out
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (f"queued={s['queued']} written={s['written']} batches={s['batches']} depth={s['depth']} "
+                f"max_depth={s['max_depth']} dropped={s['dropped']} sampled={s['sampled']} rate_limited={s['rate_limited']}")
+
+    def stop(self) -> None:
+        """Drain the queue, stop the listener and restore the original handlers."""
+        with self._lock:
+            attached = dict(self._attached)
+        # New records go straight to the original handlers again...
+        for lg, handlers in attached.items():
+            for h in list(lg.handlers):
+                if isinstance(h, _EnqueueHandler):
+                    lg.removeHandler(h)
+            for h in handlers:
+                lg.addHandler(h)
+        # ...while the listener writes out what is still queued
+        thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=30)
+            self._thread = None
+        with self._lock:
+            self._attached = {}
+
+
+class StdoutHandler(logging.StreamHandler):
+    """StreamHandler bound to the current sys.stdout rather than the one seen at construction.
+
+    While stdout is not redirected it writes to `fallback` when one is set (e.g. a UTF-8 copy of
+    fd 1); assigning `stream` (or setStream) replaces the fallback.
+    """
+
+    def __init__(self, fallback: Optional[TextIO] = None) -> None:
+        logging.Handler.__init__(self)
+        self.fallback = fallback
+
+    @property
+    def stream(self) -> TextIO:
+        if self.fallback is not None and sys.stdout is sys.__stdout__:
+            return self.fallback
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value: TextIO) -> None:
+        self.fallback = value
+
+
+def _emit_batch(handler: logging.Handler, records: List[logging.LogRecord]) -> None:
+    """One write + flush for plain stream/file handlers; per-record handle() otherwise."""
+    plain = type(handler) in (logging.StreamHandler, logging.FileHandler, StdoutHandler)
+    if not plain:
+        for record in records:
+            handler.handle(record)
+        return
+    lines = []
+    for record in records:
+        if handler.filter(record):
+            try:
+                lines.append(handler.format(record) + handler.terminator)
+            except Exception:
+                handler.handleError(record)
+    if not lines:
+        return
+    handler.acquire()
+    try:
+        if isinstance(handler, logging.FileHandler) and handler.stream is None:
+            handler.stream = handler._open()
+        handler.stream.write("".join(lines))
+        handler.flush()
+    finally:
+        handler.release()
+
+
+_SINK: Optional[LogSink] = None
+
+
+def configure(config: Optional[dict]) -> LogSink:
+    """Build the module-level sink for a batch, stopping any previous one."""
+    global _SINK
+    if _SINK is not None:
+        _SINK.stop()
+    _SINK = LogSink(resolve_log_sink_settings(config))
+    return _SINK
+
+
+def get_sink() -> LogSink:
+    global _SINK
+    if _SINK is None:
+        _SINK = LogSink()
+    return _SINK
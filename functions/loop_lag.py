@@ -0,0 +1,93 @@
+"""
+Event-loop lag monitor for the ACM runner.
+
+Everything in runner.main() shares one asyncio loop: generation launches, FPF
+event forwarding, streaming single evals and (since the evaluation launcher is
+built on asyncio subprocesses) the evaluate.py children. Any blocking call on
+the loop thread stalls all of them. This monitor sleeps for a fixed interval
+in a background task and records how late it wakes up; sustained lag means
+something is blocking the loop.
+
+The heartbeat line includes the latest/max lag, and main() prints a summary
+line at the end of the batch:
+
+  [LOOP_LAG] samples=N mean_ms=.. p95_ms=.. max_ms=.. over_1s=K
+
+API:
+- LoopLagMonitor(interval=0.5)
+- LoopLagMonitor.start() / await LoopLagMonitor.stop()
+- LoopLagMonitor.snapshot() -> dict
+- LoopLagMonitor.summary_line() -> str
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import List, Optional
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.5, max_samples: int = 20000) -> None:
+        self.interval = max(0.01, float(interval))
+        self.max_samples = max(1, int(max_samples))
+        self._lock = threading.Lock()
+        self._samples: List[float] = []
+        self._count = 0
+        self._max = 0.0
+        self._last = 0.0
+        self._over_1s = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _record(self, lag: float) -> None:
+        lag = max(0.0, lag)
+        with self._lock:
+            self._count += 1
+            self._last = lag
+            self._max = max(self._max, lag)
+            if lag >= 1.0:
+                self._over_1s += 1
+            self._samples.append(lag)
+            if len(self._samples) > self.max_samples:
+                # Keep a bounded window for the percentiles; count/max cover the whole run
+                del self._samples[: len(self._samples) - self.max_samples]
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self._record(time.monotonic() - expected)
+
+    def start(self) -> "LoopLagMonitor":
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return self
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            count, mx, last, over = self._count, self._max, self._last, self._over_1s
+        p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))] if samples else 0.0
+        mean = (sum(samples) / len(samples)) if samples else 0.0
+        return {
+            "samples": count,
+            "last_ms": round(last * 1000.0, 1),
+            "mean_ms": round(mean * 1000.0, 1),
+            "p95_ms": round(p95 * 1000.0, 1),
+            "max_ms": round(mx * 1000.0, 1),
+            "over_1s": over,
+        }
+
+    def summary_line(self) -> str:
+        s = self.snapshot()
+        return (
+            f"[LOOP_LAG] samples={s['samples']} mean_ms={s['mean_ms']} p95_ms={s['p95_ms']} "
+            f"max_ms={s['max_ms']} over_1s={s['over_1s']}"
+        )
@@ -0,0 +1,370 @@
+"""
+Memory-aware admission control and per-child resource limits for subprocess launches.
+
+A batch can start 11 GPT-R children, the MA iterations and the FPF batches
+at the same moment. Each GPT-R child loads its own scraping stack, and
+that has OOM-killed 16 GB workers. process_runner.run_process() now asks
+this module before every spawn. A launch waits while
+
+  MemAvailable - reserve_mb - (footprints of our children still ramping up) < footprint(kind)
+
+MemAvailable comes from /proc/meminfo. A child that started less than
+ramp_seconds ago counts with its full footprint, because MemAvailable
+only drops once the child has loaded its imports. A launch is never
+delayed while none of our children are running, since waiting cannot free
+anything. After max_wait_seconds it is let through (counted as "forced").
+
+Footprints start from the per-kind defaults below, or from the config. They
+are then learned from the peak tree RSS that functions.proc_sampler
+measures for each child: a higher peak is taken at once, and a lower one
+decays the estimate slowly. Learning needs proc_stats enabled.
+
+Kinds are the proc_sampler kinds: gptr, dr, ma, fpf, eval, and proc for
+anything untagged.
+
+rlimits make a runaway child get MemoryError or SIGXCPU instead of taking
+the host down. process_runner applies them from the parent with
+prlimit(2) right after the spawn returns, while the child is still starting
+its interpreter. A preexec_fn is not safe once the runner has threads
+(heartbeat, log sink, sampler), and it also rules out the posix_spawn/vfork
+path. Limits are per process and are inherited by the child's later
+descendants. Fork-server children (functions.fork_server) set them
+themselves before running their script. prlimit is Linux only, so elsewhere
+rlimits apply only to fork-server children. data_mb
+(RLIMIT_DATA) is the better memory cap. as_mb (RLIMIT_AS) also counts
+reserved virtual memory, which browsers and some BLAS builds reserve in
+large amounts. Without /proc/meminfo admission is a pass-through, but
+rlimits still apply.
+
+Config (ACM config.yaml):
+  memory_admission:
+    enabled: false               # gates launches; rlimits apply whenever they are configured
+    reserve_mb: 1024             # always left free for the host
+    ramp_seconds: 30
+    max_wait_seconds: 600
+    footprints_mb: {gptr: 700, dr: 900, ma: 1200, fpf: 300, eval: 400, proc: 250}
+    rlimits:                     # per kind; "default" applies to every kind
+      default: {nofile: 4096}
+      gptr: {data_mb: 4096}
+      dr: {data_mb: 6144, cpu_seconds: 7200}
+
+API:
+- configure(config) -> MemoryAdmission   (module singleton; disabled when not configured)
+- get_admission() -> MemoryAdmission
+- resolve_admission_settings(config) -> AdmissionSettings
+- await MemoryAdmission.admit(kind) -> Ticket ; Ticket.release()
+- MemoryAdmission.observe(kind, peak_mb) / .footprint(kind) -> float
+- MemoryAdmission.limit_process(pid, kind)   (prlimit the kind's rlimits onto a spawned child)
+- MemoryAdmission.rlimits_for(kind) -> [(resource, cap)] / apply_rlimits(resolved) / prlimit_rlimits(pid, resolved)
+- MemoryAdmission.stats() -> dict / .summary() -> str
+- read_available_mb() -> float | None
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource  # POSIX only
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+MEMINFO_PATH = "/proc/meminfo"
+
+# Starting estimates (MB of tree RSS per child) until a kind has been measured
+DEFAULT_FOOTPRINT_MB: Dict[str, float] = {
+    "gptr": 700.0,
+    "dr": 900.0,
+    "ma": 1200.0,
+    "fpf": 300.0,
+    "eval": 400.0,
+    "proc": 250.0,
+}
+
+# rlimits config key -> (resource constant name, multiplier to the kernel's unit)
+RLIMIT_KEYS: Dict[str, Tuple[str, int]] = {
+    "data_mb": ("RLIMIT_DATA", 1024 * 1024),
+    "as_mb": ("RLIMIT_AS", 1024 * 1024),
+    "cpu_seconds": ("RLIMIT_CPU", 1),
+    "nofile": ("RLIMIT_NOFILE", 1),
+}
+
+# Learned footprint: new = max(peak, (1 - DECAY) * old + DECAY * peak)
+DECAY = 0.3
+
+
+def read_available_mb(path: str = MEMINFO_PATH) -> Optional[float]:
+    """MemAvailable in MB, or None where /proc/meminfo does not exist."""
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024.0
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+@dataclass
+class AdmissionSettings:
+    enabled: bool = False
+    reserve_mb: float = 1024.0
+    ramp_seconds: float = 30.0
+    max_wait_seconds: float = 600.0
+    poll_seconds: float = 1.0
+    footprints_mb: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_FOOTPRINT_MB))
+    rlimits: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+
+def resolve_admission_settings(config: Optional[dict]) -> AdmissionSettings:
+    raw = (config or {}).get("memory_admission") or {}
+    if not isinstance(raw, dict):
+        raw = {}
+    s = AdmissionSettings(enabled=bool(raw.get("enabled", False)))
+    for key in ("reserve_mb", "ramp_seconds", "max_wait_seconds", "poll_seconds"):
+        if raw.get(key) is not None:
+            try:
+                setattr(s, key, max(0.0, float(raw[key])))
+            except (TypeError, ValueError):
+                print(f"  Warning: memory_admission.{key}={raw[key]!r} ignored (not a number)")
+    for kind, mb in (raw.get("footprints_mb") or {}).items():
+        try:
+            s.footprints_mb[str(kind)] = float(mb)
+        except (TypeError, ValueError):
+            print(f"  Warning: memory_admission.footprints_mb.{kind}={mb!r} ignored (not a number)")
+    for kind, limits in (raw.get("rlimits") or {}).items():
+        if not isinstance(limits, dict):
+            continue
+        clean = {}
+        for key, value in limits.items():
+            if key not in RLIMIT_KEYS:
+                print(f"  Warning: memory_admission.rlimits.{kind}.{key} is not one of {', '.join(RLIMIT_KEYS)}")
+                continue
+            try:
+                clean[key] = int(value)
+            except (TypeError, ValueError):
+                print(f"  Warning: memory_admission.rlimits.{kind}.{key}={value!r} ignored (not a number)")
+        s.rlimits[str(kind)] = clean
+    return s
+
+
+class Ticket:
+    """One admitted launch. release() (idempotent) is called when the child has exited."""
+
+    def __init__(self, admission: Optional["MemoryAdmission"], kind: str, footprint_mb: float) -> None:
+        self._admission = admission
+        self.kind = kind
+        self.footprint_mb = footprint_mb
+        self.started = time.monotonic()
+        self._released = admission is None
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._admission._release(self)
+
+
+class MemoryAdmission:
+    def __init__(self, settings: Optional[AdmissionSettings] = None, meminfo: Callable[[], Optional[float]] = read_available_mb) -> None:
+        self.settings = settings or AdmissionSettings()
+        self._meminfo = meminfo
+        self.enabled = self.settings.enabled and meminfo() is not None
+        self._lock = threading.Lock()
+        self._inflight: List[Ticket] = []
+        self._learned: Dict[str, float] = {}
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._rlimits: Dict[str, List[Tuple[int, int]]] = {}
+        self.admitted = 0
+        self.delayed = 0
+        self.forced = 0
+        self.waited_seconds = 0.0
+
+    # ---- footprints ----
+
+    def footprint(self, kind: str) -> float:
+        with self._lock:
+            learned = self._learned.get(kind)
+        if learned is not None:
+            return learned
+        fp = self.settings.footprints_mb
+        return float(fp.get(kind, fp.get("proc", DEFAULT_FOOTPRINT_MB["proc"])))
+
+    def observe(self, kind: str, peak_mb: Optional[float]) -> None:
+        """Feed a finished child's peak tree RSS into its kind's footprint."""
+        if not peak_mb or peak_mb <= 0:
+            return
+        with self._lock:
+            old = self._learned.get(kind)
+            self._learned[kind] = peak_mb if old is None else max(peak_mb, (1 - DECAY) * old + DECAY * peak_mb)
+
+    # ---- admission ----
+
+    def _ramping_mb(self, now: float) -> float:
+        ramp = self.settings.ramp_seconds
+        return sum(t.footprint_mb for t in self._inflight if now - t.started < ramp)
+
+    def _try_admit(self, kind: str, need: float, waited: float) -> Optional[Ticket]:
+        """Caller must hold self._lock."""
+        available = self._meminfo()
+        now = time.monotonic()
+        forced = waited >= self.settings.max_wait_seconds
+        fits = (
+            available is None
+            or not self._inflight
+            or available - self.settings.reserve_mb - self._ramping_mb(now) >= need
+        )
+        if not (fits or forced):
+            return None
+        if forced and not fits:
+            self.forced += 1
+        ticket = Ticket(self, kind, need)
+        self._inflight.append(ticket)
+        self.admitted += 1
+        return ticket
+
+    async def admit(self, kind: str = "proc") -> Ticket:
+        """Wait until a `kind` child fits in the memory headroom; returns its Ticket."""
+        if not self.enabled:
+            return Ticket(None, kind, 0.0)
+        need = self.footprint(kind)
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        announced = False
+        while True:
+            with self._lock:
+                ticket = self._try_admit(kind, need, time.monotonic() - started)
+                if ticket is not None:
+                    if announced:
+                        self.waited_seconds += time.monotonic() - started
+                    return ticket
+                fut = loop.create_future()
+                self._waiters.append((loop, fut))
+            if not announced:
+                announced = True
+                self.delayed += 1
+                print(f"  [MEM_ADMIT] delaying {kind} launch: needs ~{need:.0f} MB, "
+                      f"{self._meminfo() or 0:.0f} MB available (reserve {self.settings.reserve_mb:.0f} MB)")
+            try:
+                # Memory freed by other processes sends no wake-up, so re-check periodically
+                await asyncio.wait_for(fut, timeout=max(0.05, self.settings.poll_seconds))
+            except asyncio.TimeoutError:
+                pass
+
+    def _release(self, ticket: Ticket) -> None:
+        with self._lock:
+            try:
+                self._inflight.remove(ticket)
+            except ValueError:
+                pass
+            waiters, self._waiters = self._waiters, []
+        for loop, fut in waiters:
+            try:
+                loop.call_soon_threadsafe(lambda f=fut: f.done() or f.set_result(None))
+            except RuntimeError:
+                pass
+
+    # ---- rlimits ----
+
+    def rlimits_for(self, kind: str) -> List[Tuple[int, int]]:
+        """(resource, cap) pairs for `kind`, already clamped to this process's hard limits."""
+        if resource is None:
+            return []
+        if kind not in self._rlimits:
+            merged = dict(self.settings.rlimits.get("default") or {})
+            merged.update(self.settings.rlimits.get(kind) or {})
+            self._rlimits[kind] = _resolve_rlimits(merged)
+        return self._rlimits[kind]
+
+    def limit_process(self, pid: int, kind: str) -> None:
+        """Apply the configured rlimits for `kind` to a just-spawned child, from the parent."""
+        resolved = self.rlimits_for(kind)
+        if resolved:
+            prlimit_rlimits(pid, resolved)
+
+    # ---- telemetry ----
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            inflight = len(self._inflight)
+            learned = {k: round(v, 1) for k, v in self._learned.items()}
+        return {
+            "admitted": self.admitted,
+            "delayed": self.delayed,
+            "forced": self.forced,
+            "waited_seconds": round(self.waited_seconds, 1),
+            "inflight": inflight,
+            "learned_footprints_mb": learned,
+        }
+
+    def summary(self) -> str:
+        s = self.stats()
+        learned = " ".join(f"{k}={v:.0f}MB" for k, v in sorted(s["learned_footprints_mb"].items()))
+        return (f"admitted={s['admitted']} delayed={s['delayed']} forced={s['forced']} "
+                f"waited={s['waited_seconds']:.0f}s" + (f" footprints: {learned}" if learned else ""))
+
+
+def _resolve_rlimits(limits: Dict[str, int]) -> List[Tuple[int, int]]:
+    """Resolve limits against the parent's hard limits once, so spawning only sets them."""
+    resolved: List[Tuple[int, int]] = []
+    for key, value in limits.items():
+        name, unit = RLIMIT_KEYS[key]
+        res = getattr(resource, name, None)
+        if res is None or value <= 0:
+            continue
+        cap = value * unit
+        try:
+            _soft, hard = resource.getrlimit(res)
+        except (OSError, ValueError):
+            continue
+        if hard != resource.RLIM_INFINITY:
+            cap = min(cap, hard)
+        resolved.append((res, cap))
+    return resolved
+
+
+def apply_rlimits(resolved: List[Tuple[int, int]]) -> None:
+    """Set rlimits on this process (a fork-server child before it runs its script); never raises."""
+    for res, cap in resolved:
+        try:
+            resource.setrlimit(res, (cap, cap))
+        except (OSError, ValueError):
+            pass
+
+
+def prlimit_rlimits(pid: int, resolved: List[Tuple[int, int]]) -> None:
+    """Set rlimits on another process (Linux prlimit); a child that already exited is ignored."""
+    if not hasattr(resource, "prlimit"):
+        return
+    for res, cap in resolved:
+        try:
+            resource.prlimit(pid, res, (cap, cap))
+        except (OSError, ValueError):
+            pass
+
+
+_ADMISSION: Optional[MemoryAdmission] = None
+
+
+def configure(config: Optional[dict]) -> MemoryAdmission:
+    """Build the process-wide admission gate from ACM config (memory_admission section)."""
+    global _ADMISSION
+    settings = resolve_admission_settings(config)
+    _ADMISSION = MemoryAdmission(settings)
+    if settings.enabled and not _ADMISSION.enabled:
+        print("  Warning: memory_admission enabled but /proc/meminfo is unavailable; launches are not gated (rlimits still apply)")
+    if any(settings.rlimits.values()) and not hasattr(resource, "prlimit"):
+        print("  Warning: memory_admission.rlimits need prlimit (Linux); only fork-server children are limited here")
+    return _ADMISSION
+
+
+def get_admission() -> MemoryAdmission:
+    """Return the process-wide gate (a disabled pass-through until configure() is called)."""
+    global _ADMISSION
+    if _ADMISSION is None:
+        _ADMISSION = MemoryAdmission()
+    return _ADMISSION
@@ -2,7 +2,10 @@
 Output manager: saving generated reports into mirrored output folder.
 
 Provides:
-- save_generated_reports(input_md_path, input_base_dir, output_base_dir, generated_paths) -> list[str]
+- save_generated_reports(input_md_path, input_base_dir, output_base_dir, generated_paths, one_file_only=None) -> list[str]
+
+one_file_only defaults to the current batch's run context (functions.run_context);
+config.yaml is only read when there is no context (standalone callers).
 """
 
 from __future__ import annotations
@@ -10,12 +13,26 @@ from __future__ import annotations
 import os
 import shutil
 import yaml
-from typing import List
+from typing import List, Optional
+
+from . import pm_utils, run_context
 
-from . import pm_utils
 
+def _one_file_only_from_config() -> bool:
+    """one_file_only from the repo config.yaml (callers outside a runner batch)."""
+    try:
+        repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        cfg_path = os.path.join(repo_root, "config.yaml")
+        if os.path.isfile(cfg_path):
+            with open(cfg_path, "r", encoding="utf-8") as _fh:
+                cfg = yaml.safe_load(_fh) or {}
+                return bool(cfg.get("one_file_only", False))
+    except Exception:
+        pass
+    return False
 
-def save_generated_reports(input_md_path: str, input_base_dir: str, output_base_dir: str, generated_paths: dict) -> List[str]:
+
+def save_generated_reports(input_md_path: str, input_base_dir: str, output_base_dir: str, generated_paths: dict, one_file_only: Optional[bool] = None) -> List[str]:
     """
     Copy generated files into the output folder that mirrors the input structure,
     using the naming scheme specified.
@@ -71,17 +88,9 @@ def save_generated_reports(input_md_path: str, input_base_dir: str, output_base_
                 return candidate
             counter += 1
 
-    # Load one_file_only from config
-    one_file_only = False
-    try:
-        repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-        cfg_path = os.path.join(repo_root, "config.yaml")
-        if os.path.isfile(cfg_path):
-            with open(cfg_path, "r", encoding="utf-8") as _fh:
-                cfg = yaml.safe_load(_fh) or {}
-                one_file_only = bool(cfg.get("one_file_only", False))
-    except Exception:
-        pass
+    if one_file_only is None:
+        ctx = run_context.get_context()
+        one_file_only = ctx.one_file_only if ctx is not None else _one_file_only_from_config()
 
     # Prepare MA list, optionally reduce to a single preferred artifact
     ma_items = list(generated_paths.get("ma", [])) if isinstance(generated_paths.get("ma", []), list) else []
@@ -0,0 +1,442 @@
+"""
+Dry-run planner: expand an ACM config into its call graph and project tokens, USD and wall time.
+
+The GUI's "expected runs" panel (GUI/functions.py::_compute_expected_runs) only
+counts calls, and only for the widgets on screen. `python runner.py --plan`
+does the same expansion from config.yaml for every input file and attaches a
+projection to each call, so a batch can be sized before any money is spent.
+
+Call counts per input file (same formulas as the GUI):
+  generate            iterations_default x runs[]
+  single_eval         reports x eval.iterations x judges          (eval.mode both|single)
+  pairwise_eval       C(min(reports, pairwise_top_n), 2) x judges  (eval.mode both|pairwise)
+  combine             combine.models                               (combine.enabled)
+  post_pairwise_eval  (parents x combiners + C(combiners, 2)) x judges, parents = min(pool, 2)
+Evaluation phases only count when eval.auto_run is on. Combined reports skip
+single eval, so there is no post-combine single phase.
+
+Projections:
+- tokens and USD come from FPF JSON logs (FilePromptForge/logs and
+  logs/eval_fpf_logs): the median prompt/completion tokens and cost of the same
+  (kind, model). Without samples, tokens are estimated like the rate limiter
+  does (input size / 4 + per-kind output allowance) and priced with the
+  model's per-million prices seen in any FPF log; with no price the call's USD
+  is unknown and reported as such.
+- durations come from RunHistory (generation: acm_subprocess logs and
+  timeline_data.json) and FPF log start/finish times (eval and combine).
+- wall time packs each phase's calls onto the configured concurrency
+  (gpt_researcher.max_concurrent_reports, multi_agent.max_concurrent_runs,
+  FPF max_concurrency seen in its logs, rate_limits max_concurrent per
+  provider) longest-first, and runs files sequentially or through the
+  concurrency.pipeline stages when that is enabled.
+
+API:
+- CostHistory.load(dirs) -> CostHistory
+- expected_call_counts(reports, eval_iterations, judges, top_n, mode, eval_enabled, combiners) -> dict
+- build_plan(config, files, history=None, costs=None) -> Plan
+- Plan.to_dict() / Plan.format() -> str
+"""
+
+from __future__ import annotations
+
+import glob
+import heapq
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .rate_limiter import DEFAULT_OUTPUT_TOKENS
+from .run_history import RunHistory, _norm_model
+
+PHASES = ("generate", "single_eval", "pairwise_eval", "combine", "post_pairwise_eval")
+
+# Seconds per call when neither RunHistory nor FPF logs know the (kind, model)
+DEFAULT_CALL_SECONDS: Dict[str, float] = {"single": 60.0, "pairwise": 60.0, "combine": 180.0}
+DEFAULT_FPF_CONCURRENCY = 8
+
+
+def _median(vals: List[float]) -> Optional[float]:
+    if not vals:
+        return None
+    s = sorted(vals)
+    mid = len(s) // 2
+    return s[mid] if len(s) % 2 else (s[mid - 1] + s[mid]) / 2.0
+
+
+def _comb2(n: int) -> int:
+    return n * (n - 1) // 2 if n >= 2 else 0
+
+
+@dataclass
+class _Samples:
+    seconds: List[float] = field(default_factory=list)
+    prompt_tokens: List[float] = field(default_factory=list)
+    completion_tokens: List[float] = field(default_factory=list)
+    usd: List[float] = field(default_factory=list)
+
+
+class CostHistory:
+    """Per-(kind, model) token/cost/duration samples from FPF JSON logs. kind: fpf | single | pairwise | combine."""
+
+    def __init__(self) -> None:
+        self._samples: Dict[Tuple[str, str], _Samples] = {}
+        self._prices: Dict[str, Tuple[float, float]] = {}
+        self.fpf_max_concurrency: Optional[int] = None
+        self._concurrency_seen_at = ""
+
+    def add(self, kind: str, model: Optional[str], seconds: Optional[float] = None, prompt_tokens: Optional[float] = None,
+            completion_tokens: Optional[float] = None, usd: Optional[float] = None) -> None:
+        s = self._samples.setdefault(((kind or "").strip().lower(), _norm_model(model)), _Samples())
+        if seconds and seconds > 0:
+            s.seconds.append(float(seconds))
+        if prompt_tokens:
+            s.prompt_tokens.append(float(prompt_tokens))
+        if completion_tokens:
+            s.completion_tokens.append(float(completion_tokens))
+        if usd is not None and usd > 0:
+            s.usd.append(float(usd))
+
+    def set_price(self, model: Optional[str], input_per_million: float, output_per_million: float) -> None:
+        self._prices[_norm_model(model)] = (float(input_per_million), float(output_per_million))
+
+    def price(self, model: Optional[str]) -> Optional[Tuple[float, float]]:
+        return self._prices.get(_norm_model(model))
+
+    def count(self, kind: str, model: Optional[str]) -> int:
+        s = self._samples.get(((kind or "").strip().lower(), _norm_model(model)))
+        return len(s.usd) if s else 0
+
+    def estimate(self, kind: str, model: Optional[str]) -> Dict[str, Optional[float]]:
+        """Medians for this (kind, model); missing values are None."""
+        s = self._samples.get(((kind or "").strip().lower(), _norm_model(model))) or _Samples()
+        return {
+            "seconds": _median(s.seconds),
+            "prompt_tokens": _median(s.prompt_tokens),
+            "completion_tokens": _median(s.completion_tokens),
+            "usd": _median(s.usd),
+        }
+
+    def _ingest(self, path: str, kind: str) -> None:
+        with open(path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        model = data.get("model")
+        usage = data.get("usage") or {}
+        cost = data.get("cost") or {}
+        seconds = None
+        try:
+            seconds = (datetime.fromisoformat(data["finished_at"]) - datetime.fromisoformat(data["started_at"])).total_seconds()
+        except Exception:
+            pass
+        usd = data.get("total_cost_usd") or cost.get("total_cost_usd")
+        self.add(kind, model, seconds, usage.get("prompt_tokens"), usage.get("completion_tokens"), float(usd) if usd else None)
+        if cost.get("input_price_per_million_usd") is not None and cost.get("output_price_per_million_usd") is not None:
+            self.set_price(model, cost["input_price_per_million_usd"], cost["output_price_per_million_usd"])
+        conc = ((data.get("config") or {}).get("concurrency") or {})
+        started = str(data.get("started_at") or "")
+        if conc.get("max_concurrency") and started >= self._concurrency_seen_at:
+            self.fpf_max_concurrency = int(conc["max_concurrency"])
+            self._concurrency_seen_at = started
+
+    @classmethod
+    def load(cls, dirs: Iterable[str], max_files: int = 2000) -> "CostHistory":
+        """Best-effort: unreadable files and failure-* logs are skipped. Eval logs live in single_*/pairwise_* folders."""
+        hist = cls()
+        paths: List[str] = []
+        for d in dirs:
+            if d and os.path.isdir(d):
+                paths.extend(glob.glob(os.path.join(d, "*.json")))
+                paths.extend(glob.glob(os.path.join(d, "*", "*.json")))
+        paths = [p for p in paths if not os.path.basename(p).startswith("failure-")]
+        paths.sort(key=os.path.getmtime, reverse=True)
+        for path in paths[: max(0, int(max_files))]:
+            folder = os.path.basename(os.path.dirname(path)).lower()
+            kind = "single" if folder.startswith("single_") else "pairwise" if folder.startswith("pairwise_") else "combine" if folder.startswith("combine") else "fpf"
+            try:
+                hist._ingest(path, kind)
+            except Exception:
+                continue
+        return hist
+
+
+def expected_call_counts(reports: int, eval_iterations: int, judges: int, top_n: int, mode: str = "both",
+                         eval_enabled: bool = True, combiners: int = 0) -> Dict[str, int]:
+    """Per-file call counts for the phases after generation (mirrors the GUI expected-runs panel)."""
+    mode = (mode or "both").strip().lower()
+    pool = min(reports, top_n)
+    single = reports * eval_iterations * judges if eval_enabled and mode in ("both", "single") else 0
+    pairwise = _comb2(pool) * judges if eval_enabled and mode in ("both", "pairwise") else 0
+    post_pairwise = 0
+    if combiners and eval_enabled and mode in ("both", "pairwise"):
+        parents = min(pool, 2)
+        post_pairwise = (parents * combiners + _comb2(combiners)) * judges
+    return {"single_eval": single, "pairwise_eval": pairwise, "combine": combiners, "post_pairwise_eval": post_pairwise}
+
+
+@dataclass
+class PlannedCall:
+    phase: str
+    kind: str          # fpf | gptr | dr | ma | single | pairwise | combine
+    provider: str
+    model: str
+    file: str
+    seconds: float
+    prompt_tokens: int
+    completion_tokens: int
+    usd: Optional[float]
+    source: str        # history | estimate
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+@dataclass
+class PhasePlan:
+    name: str
+    calls: List[PlannedCall] = field(default_factory=list)
+    wall_seconds: float = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return sum(c.tokens for c in self.calls)
+
+    @property
+    def usd(self) -> float:
+        return sum(c.usd for c in self.calls if c.usd is not None)
+
+    @property
+    def unpriced(self) -> int:
+        return sum(1 for c in self.calls if c.usd is None)
+
+
+@dataclass
+class Plan:
+    files: List[str]
+    phases: Dict[str, PhasePlan]
+    wall_seconds: float
+    slots: Dict[str, int]
+    pipelined: bool = False
+
+    @property
+    def calls(self) -> int:
+        return sum(len(p.calls) for p in self.phases.values())
+
+    @property
+    def usd(self) -> float:
+        return sum(p.usd for p in self.phases.values())
+
+    @property
+    def tokens(self) -> int:
+        return sum(p.tokens for p in self.phases.values())
+
+    @property
+    def unpriced(self) -> int:
+        return sum(p.unpriced for p in self.phases.values())
+
+    def to_dict(self) -> dict:
+        return {
+            "files": self.files,
+            "pipelined": self.pipelined,
+            "slots": self.slots,
+            "totals": {"calls": self.calls, "tokens": self.tokens, "usd": round(self.usd, 6), "unpriced_calls": self.unpriced,
+                       "wall_seconds": round(self.wall_seconds, 1)},
+            "phases": {
+                name: {
+                    "calls": len(p.calls),
+                    "tokens": p.tokens,
+                    "usd": round(p.usd, 6),
+                    "unpriced_calls": p.unpriced,
+                    "wall_seconds": round(p.wall_seconds, 1),
+                    "by_model": _by_model(p.calls),
+                }
+                for name, p in self.phases.items()
+            },
+        }
+
+    def format(self) -> str:
+        lines = [f"Plan for {len(self.files)} file(s)" + (" (pipelined)" if self.pipelined else "") + ":"]
+        lines.append(f"  {'phase':<20} {'calls':>6} {'tokens':>12} {'usd':>10} {'wall':>10}")
+        for name, p in self.phases.items():
+            usd = f"${p.usd:.4f}" + ("+" if p.unpriced else "")
+            lines.append(f"  {name:<20} {len(p.calls):>6} {p.tokens:>12,} {usd:>10} {_fmt_secs(p.wall_seconds):>10}")
+        usd = f"${self.usd:.4f}" + ("+" if self.unpriced else "")
+        lines.append(f"  {'total':<20} {self.calls:>6} {self.tokens:>12,} {usd:>10} {_fmt_secs(self.wall_seconds):>10}")
+        if self.unpriced:
+            lines.append(f"  + {self.unpriced} call(s) have no price history (GPT-R/DR/MA or unseen models) and are not in the USD total")
+        lines.append("  slots: " + ", ".join(f"{k}={v}" for k, v in sorted(self.slots.items())))
+        return "\n".join(lines)
+
+
+def _by_model(calls: List[PlannedCall]) -> Dict[str, dict]:
+    out: Dict[str, dict] = {}
+    for c in calls:
+        row = out.setdefault(f"{c.kind}:{c.provider}:{c.model}", {"calls": 0, "tokens": 0, "usd": 0.0, "seconds_each": round(c.seconds, 1), "source": c.source})
+        row["calls"] += 1
+        row["tokens"] += c.tokens
+        row["usd"] = round(row["usd"] + (c.usd or 0.0), 6)
+    return out
+
+
+def _fmt_secs(s: float) -> str:
+    s = int(round(s))
+    return f"{s // 3600}h{(s % 3600) // 60:02d}m" if s >= 3600 else f"{s // 60}m{s % 60:02d}s"
+
+
+def makespan(durations: Iterable[float], slots: int) -> float:
+    """Longest-processing-time-first packing of durations onto `slots` parallel workers."""
+    heap = [0.0] * max(1, int(slots))
+    for d in sorted(durations, reverse=True):
+        heapq.heappush(heap, heapq.heappop(heap) + d)
+    return max(heap)
+
+
+def _provider_cap(config: dict, provider: str, model: str) -> Optional[int]:
+    """rate_limits max_concurrent for this key (models > providers > default), None when unlimited/disabled."""
+    rl = (config or {}).get("rate_limits") or {}
+    if not rl.get("enabled"):
+        return None
+    for spec in ((rl.get("models") or {}).get(f"{provider}:{model}"), (rl.get("providers") or {}).get(provider), rl.get("default")):
+        if isinstance(spec, dict) and "max_concurrent" in spec:
+            cap = int(spec.get("max_concurrent") or 0)
+            return cap if cap > 0 else None
+    return None
+
+
+def _phase_wall(config: dict, calls: List[PlannedCall], slots_for) -> float:
+    """Call groups (by slot pool) run side by side; each is packed onto its slots and any tighter provider cap."""
+    groups: Dict[str, List[PlannedCall]] = {}
+    for c in calls:
+        groups.setdefault(slots_for(c)[0], []).append(c)
+    wall = 0.0
+    for pool, group in groups.items():
+        slots = slots_for(group[0])[1]
+        span = makespan([c.seconds for c in group], slots)
+        by_provider: Dict[Tuple[str, str], List[float]] = {}
+        for c in group:
+            by_provider.setdefault((c.provider, c.model), []).append(c.seconds)
+        for (provider, model), secs in by_provider.items():
+            cap = _provider_cap(config, provider, model)
+            if cap is not None and cap < slots:
+                span = max(span, makespan(secs, cap))
+        wall = max(wall, span)
+    return wall
+
+
+def _pipeline_wall(per_file: List[Tuple[float, float]], generate_depth: int, evaluate_depth: int) -> float:
+    """Two-stage flow shop: files enter generation in order, evaluation starts when a file's generation ends."""
+    gen_free = [0.0] * max(1, generate_depth)
+    eval_free = [0.0] * max(1, evaluate_depth)
+    end = 0.0
+    for gen, ev in per_file:
+        start = heapq.heappop(gen_free)
+        gen_done = start + gen
+        heapq.heappush(gen_free, gen_done)
+        ev_start = max(gen_done, heapq.heappop(eval_free))
+        heapq.heappush(eval_free, ev_start + ev)
+        end = max(end, ev_start + ev)
+    return end
+
+
+def build_plan(config: dict, files: List[str], history: Optional[RunHistory] = None, costs: Optional[CostHistory] = None,
+               file_sizes: Optional[Dict[str, int]] = None) -> Plan:
+    """Expand config x files into planned calls and project tokens, USD and wall time per phase."""
+    from .file_pipeline import resolve_pipeline_settings
+
+    config = config or {}
+    history = history or RunHistory()
+    costs = costs or CostHistory()
+    if config.get("one_file_only") and files:
+        files = files[:1]
+
+    runs = [r for r in (config.get("runs") or []) if isinstance(r, dict) and r.get("model")]
+    iterations = int(config.get("iterations_default", 1) or 1)
+    eval_cfg = config.get("eval") or {}
+    judges = [j for j in (eval_cfg.get("judges") or []) if isinstance(j, dict) and j.get("model")]
+    combine_cfg = config.get("combine") or {}
+    combiners = [m for m in (combine_cfg.get("models") or []) if isinstance(m, dict) and m.get("model")] if combine_cfg.get("enabled") else []
+    counts = expected_call_counts(
+        reports=iterations * len(runs),
+        eval_iterations=int(eval_cfg.get("iterations", 1) or 1),
+        judges=len(judges),
+        top_n=int(eval_cfg.get("pairwise_top_n", 3) or 3),
+        mode=str(eval_cfg.get("mode", "both") or "both"),
+        eval_enabled=bool(eval_cfg.get("auto_run", False)),
+        combiners=len(combiners),
+    )
+
+    # Concurrency pools (see runner._resolve_gptr_concurrency / _resolve_ma_concurrency)
+    conc = config.get("concurrency") or {}
+    gptr_cfg = conc.get("gpt_researcher") or {}
+    ma_cfg = conc.get("multi_agent") or {}
+    fpf_slots = int(costs.fpf_max_concurrency or DEFAULT_FPF_CONCURRENCY)
+    slots = {
+        "gptr": max(1, int(gptr_cfg.get("max_concurrent_reports", 1) or 1)) if gptr_cfg.get("enabled") else 1,
+        "ma": max(1, int(ma_cfg.get("max_concurrent_runs", 1) or 1)) if ma_cfg.get("enabled") else 1,
+        "fpf": fpf_slots,
+    }
+    cap = ((config.get("policies") or {}).get("concurrency") or {}).get("gpt_researcher") or {}
+    if cap.get("enforce") and cap.get("max_concurrent_reports_cap") is not None:
+        slots["gptr"] = max(1, min(slots["gptr"], int(cap["max_concurrent_reports_cap"])))
+
+    def slots_for(call: PlannedCall) -> Tuple[str, int]:
+        pool = "gptr" if call.kind in ("gptr", "dr") else "ma" if call.kind == "ma" else "fpf"
+        return pool, slots[pool]
+
+    report_tokens = DEFAULT_OUTPUT_TOKENS["fpf"]
+
+    def project(phase: str, kind: str, provider: str, model: str, file: str, prompt_guess: int, output_kind: str) -> PlannedCall:
+        est = costs.estimate(kind, model)
+        if kind in ("fpf", "gptr", "dr", "ma"):
+            seconds = history.predict(kind, model)
+        else:
+            seconds = est["seconds"] or DEFAULT_CALL_SECONDS.get(kind, 60.0)
+        prompt = int(est["prompt_tokens"] or prompt_guess)
+        completion = int(est["completion_tokens"] or DEFAULT_OUTPUT_TOKENS.get(output_kind, 0))
+        usd, source = est["usd"], "history"
+        if usd is None:
+            source = "estimate"
+            price = costs.price(model)
+            if price is not None:
+                usd = (prompt * price[0] + completion * price[1]) / 1_000_000
+        return PlannedCall(phase, kind, provider, model, file, seconds, prompt, completion, usd, source)
+
+    phases = {name: PhasePlan(name) for name in PHASES}
+    per_file_stage: List[Tuple[float, float]] = []
+    for path in files:
+        size = (file_sizes or {}).get(path)
+        if size is None:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+        input_tokens = size // 4
+        file_calls: Dict[str, List[PlannedCall]] = {name: [] for name in PHASES}
+        for run in runs:
+            rtype = str(run.get("type") or "").strip().lower()
+            for _ in range(iterations):
+                file_calls["generate"].append(project("generate", rtype, str(run.get("provider") or ""), str(run["model"]), path, input_tokens, rtype))
+        for phase, kind, prompt_guess, models, n_each in (
+            ("single_eval", "single", report_tokens, judges, counts["single_eval"] // max(1, len(judges))),
+            ("pairwise_eval", "pairwise", 2 * report_tokens, judges, counts["pairwise_eval"] // max(1, len(judges))),
+            ("combine", "combine", 2 * report_tokens + input_tokens, combiners, 1 if counts["combine"] else 0),
+            ("post_pairwise_eval", "pairwise", 2 * report_tokens, judges, counts["post_pairwise_eval"] // max(1, len(judges))),
+        ):
+            out_kind = "combine" if kind == "combine" else "eval"
+            for m in models:
+                for _ in range(n_each):
+                    file_calls[phase].append(project(phase, kind, str(m.get("provider") or ""), str(m["model"]), path, prompt_guess, out_kind))
+        walls = {}
+        for name in PHASES:
+            phases[name].calls.extend(file_calls[name])
+            walls[name] = _phase_wall(config, file_calls[name], slots_for)
+            phases[name].wall_seconds += walls[name]
+        per_file_stage.append((walls["generate"], sum(v for k, v in walls.items() if k != "generate")))
+
+    pipelined, gen_depth, eval_depth = resolve_pipeline_settings(config)
+    if pipelined:
+        wall = _pipeline_wall(per_file_stage, gen_depth, eval_depth)
+    else:
+        wall = sum(g + e for g, e in per_file_stage)
+    return Plan(files=list(files), phases=phases, wall_seconds=wall, slots=slots, pipelined=pipelined)
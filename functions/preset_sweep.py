@@ -0,0 +1,369 @@
+"""
+Preset sweep: run several presets.yaml configurations over the same inputs
+concurrently and compare cost, latency and eval score per preset.
+
+presets.yaml holds whole GUI configurations ('8', '888', 'low', ...). Tuning
+used to mean applying one in the GUI, running the batch, and repeating for
+the next preset, which takes days. A sweep turns each preset into a full ACM
+config and starts one `runner.py --config <preset config>` child per preset,
+`concurrency` at a time, through functions.process_runner.
+
+What the presets share:
+- inputs: every preset reads the base config's input_folder and
+  instructions_file (the presets' own paths are machine-specific), and writes
+  to <sweep_dir>/<preset>/outputs;
+- caches: run history, cost journal, FPF logs and eval caches live under the
+  repo's logs/ and are shared by all children;
+- rate limits: the base config's rate_limits are divided between the presets
+  running at the same time (rpm, tpm and max_concurrent per provider/model),
+  so the sweep as a whole never exceeds the configured provider limits.
+
+Preset keys map onto the child config:
+- iterations_default, runs, eval, combine, guidelines_file: copied
+- enable.{fpf,gptr,dr,ma}: false drops runs of that type
+- enable.evaluation / enable.pairwise: eval.auto_run / eval.mode=single
+- UPPER_CASE GPT-R keys (SMART_TOKEN_LIMIT, TEMPERATURE, ...): `gptr_env`,
+  exported to GPT-R children (gpt-researcher reads config overrides from env)
+- fpf: {dotted.key: value}: `fpf_overrides`, patched into a per-run copy of
+  fpf_config.yaml
+- anything else (ma.*, follow_guidelines, task.json settings) is listed as
+  "not applied" in the report: those live in shared files that concurrent
+  runs cannot each own.
+
+The report (<sweep_dir>/sweep_report.json and .md) has, per preset: exit
+status, wall seconds, spend (from the child's [COST] line), number of eval
+databases and the mean single-doc score (and best document mean) read from
+them.
+
+Config (ACM config.yaml):
+  sweep:
+    concurrency: 2                 # presets running at once
+    dir: sweeps                    # relative to the config file directory
+
+API:
+- load_presets(path) -> dict
+- preset_config(base_config, preset, name, sweep_dir, config_dir, share=1) -> (config, not_applied)
+- split_rate_limits(rate_limits, share) -> dict
+- eval_scores(db_paths) -> dict
+- await run_sweep(base_config_path, presets_path, names=None, concurrency=None, sweep_dir=None, runner_path=None) -> SweepReport
+- SweepReport.to_dict() / .format()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import yaml  # type: ignore
+except Exception:  # pragma: no cover - PyYAML is a hard dependency elsewhere in ACM
+    yaml = None
+
+from . import process_runner
+
+DEFAULT_CONCURRENCY = 2
+DEFAULT_DIR = "sweeps"
+
+RUN_TYPES = ("fpf", "gptr", "dr", "ma")
+_COPIED_KEYS = ("iterations_default", "runs", "combine", "guidelines_file")
+_PATH_KEYS = ("input_folder", "output_folder", "instructions_file")
+_COST_RE = re.compile(r"\[COST\] spent=\$([0-9.]+)")
+_DB_RE = re.compile(r"\[EVAL_SUMMARY\] Database path: (.+)$")
+
+
+def load_presets(path: str) -> Dict[str, dict]:
+    if yaml is None:
+        raise RuntimeError("PyYAML is required to read presets")
+    with open(path, "r", encoding="utf-8") as fh:
+        data = yaml.safe_load(fh) or {}
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a mapping of preset name -> settings")
+    return {str(k): (v or {}) for k, v in data.items() if isinstance(v, dict)}
+
+
+def _divide(value, share: int, integer: bool = False):
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return value
+    if v <= 0:
+        return value
+    out = v / share
+    return max(1, int(math.floor(out))) if integer else out
+
+
+def split_rate_limits(rate_limits: Optional[dict], share: int) -> Optional[dict]:
+    """Copy of `rate_limits` with every rpm/tpm/max_concurrent divided by `share`."""
+    if not rate_limits or share <= 1:
+        return copy.deepcopy(rate_limits) if rate_limits else rate_limits
+    out = copy.deepcopy(rate_limits)
+
+    def _split(entry):
+        if isinstance(entry, dict):
+            for k in ("rpm", "tpm"):
+                if k in entry:
+                    entry[k] = _divide(entry[k], share)
+            if "max_concurrent" in entry:
+                entry["max_concurrent"] = _divide(entry["max_concurrent"], share, integer=True)
+
+    _split(out.get("default"))
+    for section in ("providers", "models"):
+        for entry in (out.get(section) or {}).values():
+            _split(entry)
+    return out
+
+
+def _abs(path: Optional[str], base_dir: str) -> Optional[str]:
+    if not path:
+        return path
+    return path if os.path.isabs(path) else os.path.abspath(os.path.join(base_dir, path))
+
+
+def preset_config(base_config: dict, preset: dict, name: str, sweep_dir: str, config_dir: str, share: int = 1) -> Tuple[dict, List[str]]:
+    """Child config for one preset, plus the preset keys that could not be applied."""
+    cfg = copy.deepcopy(base_config or {})
+    not_applied: List[str] = []
+    for key in _PATH_KEYS:
+        if cfg.get(key):
+            cfg[key] = _abs(cfg[key], config_dir)
+    for key in ("input_folder", "instructions_file"):
+        if key in preset:
+            not_applied.append(f"{key} (inputs are shared: {cfg.get(key)})")
+    cfg["output_folder"] = os.path.join(sweep_dir, name, "outputs")
+
+    for key in _COPIED_KEYS:
+        if key in preset:
+            cfg[key] = copy.deepcopy(preset[key])
+    if cfg.get("guidelines_file"):
+        cfg["guidelines_file"] = _abs(cfg["guidelines_file"], config_dir)
+
+    ev = dict(cfg.get("eval") or {})
+    ev.update(preset.get("eval") or {})
+    enable = preset.get("enable") or {}
+    if "evaluation" in enable:
+        ev["auto_run"] = bool(enable["evaluation"])
+    if enable.get("pairwise") is False and ev.get("mode", "both") != "single":
+        ev["mode"] = "single"
+    cfg["eval"] = ev
+    disabled = {t for t in RUN_TYPES if enable.get(t) is False}
+    if disabled:
+        cfg["runs"] = [r for r in (cfg.get("runs") or []) if str((r or {}).get("type", "")).lower() not in disabled]
+
+    gptr_env = {k: v for k, v in preset.items() if isinstance(k, str) and k.isupper()}
+    if gptr_env:
+        cfg["gptr_env"] = {k: str(v) for k, v in gptr_env.items()}
+    if isinstance(preset.get("fpf"), dict) and preset["fpf"]:
+        cfg["fpf_overrides"] = dict(preset["fpf"])
+
+    handled = set(_COPIED_KEYS) | set(_PATH_KEYS) | set(gptr_env) | {"eval", "enable", "fpf"}
+    for key, value in preset.items():
+        if key in handled:
+            continue
+        if isinstance(value, dict):
+            not_applied.extend(f"{key}.{sub}" for sub in value)
+        else:
+            not_applied.append(str(key))
+
+    if cfg.get("rate_limits"):
+        cfg["rate_limits"] = split_rate_limits(cfg["rate_limits"], share)
+    # Each preset keeps its own journal/queue state next to its outputs
+    cfg.pop("sweep", None)
+    return cfg, not_applied
+
+
+def eval_scores(db_paths: List[str]) -> Dict[str, Any]:
+    """Mean single-doc score over all eval DBs, and the best document's mean."""
+    per_doc: Dict[str, List[float]] = {}
+    for path in db_paths:
+        if not path or not os.path.isfile(path):
+            continue
+        try:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                rows = conn.execute("SELECT doc_id, score FROM single_doc_results").fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            continue
+        for doc_id, score in rows:
+            try:
+                per_doc.setdefault(str(doc_id), []).append(float(score))
+            except (TypeError, ValueError):
+                continue
+    scores = [s for values in per_doc.values() for s in values]
+    if not scores:
+        return {"mean_score": None, "best_doc_score": None, "best_doc": None, "scored_docs": 0}
+    best_doc, best = max(((d, sum(v) / len(v)) for d, v in per_doc.items()), key=lambda t: t[1])
+    return {
+        "mean_score": round(sum(scores) / len(scores), 3),
+        "best_doc_score": round(best, 3),
+        "best_doc": best_doc,
+        "scored_docs": len(per_doc),
+    }
+
+
+@dataclass
+class PresetResult:
+    name: str
+    config_path: str
+    returncode: Optional[int] = None
+    wall_seconds: float = 0.0
+    cost_usd: Optional[float] = None
+    eval_dbs: List[str] = field(default_factory=list)
+    scores: Dict[str, Any] = field(default_factory=dict)
+    not_applied: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "config": self.config_path,
+            "returncode": self.returncode,
+            "wall_seconds": round(self.wall_seconds, 1),
+            "cost_usd": self.cost_usd,
+            "eval_dbs": list(self.eval_dbs),
+            **self.scores,
+            "not_applied": list(self.not_applied),
+            "error": self.error,
+        }
+
+
+@dataclass
+class SweepReport:
+    sweep_dir: str
+    concurrency: int
+    results: List[PresetResult] = field(default_factory=list)
+    wall_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "sweep_dir": self.sweep_dir,
+            "concurrency": self.concurrency,
+            "wall_seconds": round(self.wall_seconds, 1),
+            "presets": [r.to_dict() for r in self.results],
+        }
+
+    def format(self) -> str:
+        def _fmt(v, spec):
+            return "-" if v is None else format(v, spec)
+
+        lines = [
+            f"Preset sweep ({len(self.results)} presets, {self.concurrency} at a time, {self.wall_seconds / 60:.1f} min)",
+            "",
+            "| preset | rc | wall (min) | cost ($) | $ per score point | mean score | best doc score |",
+            "|---|---|---|---|---|---|---|",
+        ]
+        for r in self.results:
+            mean = r.scores.get("mean_score")
+            per_point = (r.cost_usd / mean) if (r.cost_usd is not None and mean) else None
+            lines.append(
+                f"| {r.name} | {_fmt(r.returncode, 'd')} | {r.wall_seconds / 60:.1f} | {_fmt(r.cost_usd, '.4f')} | "
+                f"{_fmt(per_point, '.4f')} | {_fmt(mean, '.3f')} | {_fmt(r.scores.get('best_doc_score'), '.3f')} |"
+            )
+        notes = [f"- {r.name}: not applied: {', '.join(r.not_applied)}" for r in self.results if r.not_applied]
+        errors = [f"- {r.name}: {r.error}" for r in self.results if r.error]
+        if notes:
+            lines += ["", *notes]
+        if errors:
+            lines += ["", "Errors:", *errors]
+        return "\n".join(lines)
+
+
+async def _run_preset(result: PresetResult, runner_path: str, sem: asyncio.Semaphore) -> None:
+    def _on_line(_stream, line):
+        print(f"[SWEEP {result.name}] {line}", flush=True)
+        m = _COST_RE.search(line)
+        if m:
+            result.cost_usd = float(m.group(1))
+        m = _DB_RE.search(line)
+        if m and m.group(1).strip() not in result.eval_dbs:
+            result.eval_dbs.append(m.group(1).strip())
+
+    async with sem:
+        started = time.monotonic()
+        env = os.environ.copy()
+        env.setdefault("PYTHONIOENCODING", "utf-8")
+        env.setdefault("PYTHONUTF8", "1")
+        try:
+            res = await process_runner.run_process(
+                [sys.executable, "-u", runner_path, "--config", result.config_path], env=env, on_line=_on_line, tail_lines=20,
+            )
+            result.returncode = res.returncode
+            if res.timed_out:
+                result.error = res.reason
+            elif res.returncode != 0:
+                result.error = (res.stderr[-1] if res.stderr else f"exit code {res.returncode}")
+        except Exception as e:
+            result.error = str(e)
+        finally:
+            result.wall_seconds = time.monotonic() - started
+    result.scores = await asyncio.to_thread(eval_scores, result.eval_dbs)
+
+
+def resolve_sweep_settings(config: Optional[dict], config_dir: str) -> Tuple[int, str]:
+    raw = (config or {}).get("sweep") or {}
+    try:
+        concurrency = max(1, int(raw.get("concurrency", DEFAULT_CONCURRENCY)))
+    except (TypeError, ValueError):
+        concurrency = DEFAULT_CONCURRENCY
+    return concurrency, _abs(raw.get("dir") or DEFAULT_DIR, config_dir)
+
+
+async def run_sweep(
+    base_config_path: str,
+    presets_path: str,
+    names: Optional[List[str]] = None,
+    concurrency: Optional[int] = None,
+    sweep_dir: Optional[str] = None,
+    runner_path: Optional[str] = None,
+) -> SweepReport:
+    """Run the selected presets concurrently and write sweep_report.json/.md."""
+    if yaml is None:
+        raise RuntimeError("PyYAML is required for preset sweeps")
+    base_config_path = os.path.abspath(base_config_path)
+    config_dir = os.path.dirname(base_config_path)
+    with open(base_config_path, "r", encoding="utf-8") as fh:
+        base = yaml.safe_load(fh) or {}
+    presets = load_presets(presets_path)
+    names = names or list(presets)
+    missing = [n for n in names if n not in presets]
+    if missing:
+        raise KeyError(f"unknown preset(s): {', '.join(missing)} (available: {', '.join(presets)})")
+
+    default_concurrency, default_dir = resolve_sweep_settings(base, config_dir)
+    concurrency = max(1, min(int(concurrency or default_concurrency), len(names)))
+    sweep_dir = os.path.join(os.path.abspath(sweep_dir or default_dir), time.strftime("sweep_%Y%m%d_%H%M%S"))
+    runner_path = runner_path or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runner.py")
+
+    report = SweepReport(sweep_dir=sweep_dir, concurrency=concurrency)
+    for name in names:
+        cfg, not_applied = preset_config(base, presets[name], name, sweep_dir, config_dir, share=concurrency)
+        os.makedirs(os.path.join(sweep_dir, name), exist_ok=True)
+        path = os.path.join(sweep_dir, name, "config.yaml")
+        with open(path, "w", encoding="utf-8") as fh:
+            yaml.safe_dump(cfg, fh, sort_keys=False, allow_unicode=True)
+        report.results.append(PresetResult(name=name, config_path=path, not_applied=not_applied))
+
+    print(f"[SWEEP] {len(names)} preset(s), {concurrency} at a time -> {sweep_dir}")
+    started = time.monotonic()
+    sem = asyncio.Semaphore(concurrency)
+    await asyncio.gather(*(_run_preset(r, runner_path, sem) for r in report.results))
+    report.wall_seconds = time.monotonic() - started
+
+    try:
+        with open(os.path.join(sweep_dir, "sweep_report.json"), "w", encoding="utf-8") as fh:
+            json.dump(report.to_dict(), fh, indent=2)
+        with open(os.path.join(sweep_dir, "sweep_report.md"), "w", encoding="utf-8") as fh:
+            fh.write(report.format() + "\n")
+    except Exception as e:
+        print(f"[SWEEP] WARNING: could not write report: {e}")
+    return report
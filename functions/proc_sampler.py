@@ -0,0 +1,371 @@
+"""
+Per-subprocess CPU / RSS / IO sampling from /proc, surfaced in the run timeline.
+
+We could not tell which children (GPT-R scraping, MA, FPF batches,
+evaluate.py) used the CPU and memory of a host, so worker counts were
+guesswork. The sampler is one asyncio task. Every interval_seconds it reads
+/proc/<pid>/stat and /proc/<pid>/io, in a worker thread, for every tracked
+child and its descendants. Descendants are found by parent link and by
+session id. process_runner starts each child in its own session, so
+grandchildren that were re-parented to init are still counted.
+
+Samples are accounted to a tag, which is one timeline run:
+- run_process(..., stats_tag="gptr-{pid}") tags a single child. The
+  "{pid}" is filled in once the child exists.
+- `with proc_sampler.tag("ma-<uid>", "ma"):` collects every child started
+  inside the block, including children started by tasks created inside it.
+  MA iterations and FPF batches use this form.
+
+When a tag closes, one line goes to the subprocess log:
+
+  [PROC_STATS] run=gptr-1234 kind=gptr peak_rss_mb=512.3 cpu_s=45.20 read_mb=1.2 write_mb=0.4 procs=7 samples=120 wall_s=240.1 [runs=id1,id2]
+
+tools/timeline_from_logs.py attaches this line to the matching record in
+timeline_data.json. An FPF batch's line is attached to every run id it
+lists. The file also gets per-kind totals.
+
+Because of the sampling, a process that lives shorter than one interval is
+seen at most once, and CPU used by a descendant between its last sample
+and its exit is missed. RSS is summed over the whole tree, so shared pages
+count once per process. On platforms without /proc the sampler is
+disabled and nothing is logged.
+
+Config (ACM config.yaml):
+  proc_stats:
+    enabled: true
+    interval_seconds: 2.0
+
+API:
+- configure(config, logger=None) -> ProcSampler   (module singleton)
+- get_sampler() -> ProcSampler (disabled until configured)
+- await ProcSampler.start() / await .stop()
+- tag(run_id, kind) -> context manager / note_run(run_id) (adds a member id to the current tag)
+- ProcSampler.open_tag(run_id, kind) / .close_tag(tag) -> ProcStats / .track(pid, tag=None)
+- ProcSampler.untrack(pid) -> peak tree RSS in MB | None
+- current_kind() -> kind of the enclosing tag() | None
+- ProcStats(...).format() / .to_dict()
+- read_proc(pid) -> dict | None
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Set
+
+PROC_ROOT = "/proc"
+DEFAULT_INTERVAL = 2.0
+
+try:
+    _CLK_TCK = os.sysconf("SC_CLK_TCK")
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # non-POSIX
+    _CLK_TCK, _PAGE_SIZE = 100, 4096
+
+_MB = 1024 * 1024
+
+
+def proc_available() -> bool:
+    return os.path.isdir(os.path.join(PROC_ROOT, "self"))
+
+
+def read_proc(pid: int, io: bool = True) -> Optional[dict]:
+    """ppid, session, cpu ticks (utime+stime), rss bytes and storage IO bytes for `pid` (None if gone)."""
+    try:
+        with open(os.path.join(PROC_ROOT, str(pid), "stat"), "r", encoding="utf-8", errors="replace") as fh:
+            raw = fh.read()
+    except OSError:
+        return None
+    # comm may contain spaces/parens: fields start after the last ')'
+    fields = raw[raw.rfind(")") + 2:].split()
+    try:
+        info = {
+            "ppid": int(fields[1]),
+            "session": int(fields[3]),
+            "cpu_ticks": int(fields[11]) + int(fields[12]),
+            "rss": int(fields[21]) * _PAGE_SIZE,
+            "read": 0,
+            "write": 0,
+        }
+    except (IndexError, ValueError):
+        return None
+    if io:
+        _read_io(pid, info)
+    return info
+
+
+def _read_io(pid: int, info: dict) -> None:
+    try:
+        with open(os.path.join(PROC_ROOT, str(pid), "io"), "r", encoding="utf-8") as fh:
+            for line in fh:
+                key, _, value = line.partition(":")
+                if key == "read_bytes":
+                    info["read"] = int(value)
+                elif key == "write_bytes":
+                    info["write"] = int(value)
+    except (OSError, ValueError):
+        pass  # io needs the same uid; cpu/rss are still useful without it
+
+
+def _all_pids() -> List[int]:
+    try:
+        return [int(n) for n in os.listdir(PROC_ROOT) if n.isdigit()]
+    except OSError:
+        return []
+
+
+@dataclass
+class ProcStats:
+    run_id: str
+    kind: str
+    peak_rss_mb: float = 0.0
+    cpu_seconds: float = 0.0
+    read_mb: float = 0.0
+    write_mb: float = 0.0
+    procs: int = 0
+    samples: int = 0
+    wall_seconds: float = 0.0
+    runs: List[str] = field(default_factory=list)
+
+    def format(self) -> str:
+        line = (f"[PROC_STATS] run={self.run_id} kind={self.kind} peak_rss_mb={self.peak_rss_mb:.1f} "
+                f"cpu_s={self.cpu_seconds:.2f} read_mb={self.read_mb:.1f} write_mb={self.write_mb:.1f} "
+                f"procs={self.procs} samples={self.samples} wall_s={self.wall_seconds:.1f}")
+        if self.runs:
+            line += f" runs={','.join(self.runs)}"
+        return line
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class _Tag:
+    def __init__(self, run_id: str, kind: str) -> None:
+        self.run_id = run_id
+        self.kind = kind
+        self.roots: Set[int] = set()
+        self.runs: List[str] = []
+        self.last: Dict[int, tuple] = {}   # pid -> (cpu_ticks, read, write), cumulative so latest wins
+        self.peak_rss = 0
+        self.samples = 0
+        self.started = time.monotonic()
+        self.closed = False
+
+    def add_sample(self, infos: Dict[int, dict]) -> None:
+        if not infos:
+            return
+        self.samples += 1
+        self.peak_rss = max(self.peak_rss, sum(i["rss"] for i in infos.values()))
+        for pid, i in infos.items():
+            self.last[pid] = (i["cpu_ticks"], i["read"], i["write"])
+
+    def stats(self) -> ProcStats:
+        return ProcStats(
+            run_id=self.run_id,
+            kind=self.kind,
+            peak_rss_mb=round(self.peak_rss / _MB, 1),
+            cpu_seconds=round(sum(v[0] for v in self.last.values()) / _CLK_TCK, 2),
+            read_mb=round(sum(v[1] for v in self.last.values()) / _MB, 1),
+            write_mb=round(sum(v[2] for v in self.last.values()) / _MB, 1),
+            procs=len(self.last),
+            samples=self.samples,
+            wall_seconds=round(time.monotonic() - self.started, 1),
+            runs=list(self.runs),
+        )
+
+
+_CURRENT_TAG: contextvars.ContextVar[Optional[_Tag]] = contextvars.ContextVar("acm_proc_tag", default=None)
+
+
+class ProcSampler:
+    def __init__(self, enabled: bool = False, interval: float = DEFAULT_INTERVAL, logger: Optional[logging.Logger] = None) -> None:
+        self.enabled = bool(enabled) and proc_available()
+        self.interval = max(0.1, float(interval))
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._roots: Dict[int, _Tag] = {}
+        self._peaks: Dict[int, int] = {}   # root pid -> peak tree RSS bytes (memory_admission footprints)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ---- tags / tracking -----------------------------------------------
+
+    def open_tag(self, run_id: str, kind: str) -> _Tag:
+        return _Tag(run_id, kind)
+
+    def close_tag(self, tag: _Tag) -> Optional[ProcStats]:
+        """Stop accounting to `tag` and log its [PROC_STATS] line (None when nothing was tracked)."""
+        if tag.closed:
+            return None
+        tag.closed = True
+        with self._lock:
+            for pid in [p for p, t in self._roots.items() if t is tag]:
+                del self._roots[pid]
+                self._peaks.pop(pid, None)
+        if not self.enabled or not tag.samples:
+            return None
+        stats = tag.stats()
+        if self.logger is not None:
+            try:
+                self.logger.info(stats.format())
+            except Exception:
+                pass
+        return stats
+
+    def track(self, pid: Optional[int], tag: Optional[_Tag] = None) -> bool:
+        """Sample `pid` and its descendants for `tag` (default: the current tag()); False if not tracked."""
+        tag = tag or _CURRENT_TAG.get()
+        if not self.enabled or pid is None or tag is None or tag.closed:
+            return False
+        with self._lock:
+            self._roots[pid] = tag
+            tag.roots.add(pid)
+        self._notify()
+        return True
+
+    def untrack(self, pid: Optional[int]) -> Optional[float]:
+        """Stop sampling `pid`; returns the peak RSS (MB) seen for its tree, if it was sampled."""
+        with self._lock:
+            tag = self._roots.pop(pid, None)
+            peak = self._peaks.pop(pid, None)
+        if tag is not None:
+            tag.roots.discard(pid)
+        return round(peak / _MB, 1) if peak else None
+
+    def _notify(self) -> None:
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            pass
+
+    # ---- sampling ------------------------------------------------------
+
+    def sample(self) -> None:
+        """Read /proc once for every tracked tree (blocking; the loop runs it in a thread)."""
+        with self._lock:
+            roots = dict(self._roots)
+        if not roots:
+            return
+        infos: Dict[int, dict] = {}
+        children: Dict[int, List[int]] = {}
+        by_session: Dict[int, List[int]] = {}
+        for pid in _all_pids():
+            info = read_proc(pid, io=False)
+            if info is None:
+                continue
+            infos[pid] = info
+            children.setdefault(info["ppid"], []).append(pid)
+            by_session.setdefault(info["session"], []).append(pid)
+        per_tag: Dict[_Tag, Dict[int, dict]] = {}
+        for root, tag in roots.items():
+            if root not in infos:
+                continue
+            tree: Set[int] = set(by_session.get(root, ()))
+            seen: Set[int] = set()
+            stack = [root]
+            while stack:
+                pid = stack.pop()
+                if pid in seen:
+                    continue
+                seen.add(pid)
+                tree.add(pid)
+                stack.extend(children.get(pid, ()))
+            tree_rss = sum(infos[pid]["rss"] for pid in tree if pid in infos)
+            with self._lock:
+                if root in self._roots:
+                    self._peaks[root] = max(self._peaks.get(root, 0), tree_rss)
+            bucket = per_tag.setdefault(tag, {})
+            for pid in tree:
+                if pid in infos and pid not in bucket:
+                    _read_io(pid, infos[pid])
+                    bucket[pid] = infos[pid]
+        for tag, tag_infos in per_tag.items():
+            if not tag.closed:
+                tag.add_sample(tag_infos)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await asyncio.to_thread(self.sample)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"  Warning: proc sampler: {e}")
+
+    async def start(self) -> "ProcSampler":
+        if self.enabled and self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        self._loop = self._wake = None
+
+
+@contextlib.contextmanager
+def tag(run_id: str, kind: str):
+    """Account every child started inside the block to `run_id`; logs [PROC_STATS] on exit."""
+    sampler = get_sampler()
+    t = sampler.open_tag(run_id, kind)
+    token = _CURRENT_TAG.set(t)
+    try:
+        yield t
+    finally:
+        _CURRENT_TAG.reset(token)
+        sampler.close_tag(t)
+
+
+def current_kind() -> Optional[str]:
+    t = _CURRENT_TAG.get()
+    return t.kind if t is not None else None
+
+
+def note_run(run_id: Optional[str]) -> None:
+    """Record `run_id` (e.g. an FPF run inside a batch) as covered by the current tag."""
+    t = _CURRENT_TAG.get()
+    if t is not None and run_id and run_id not in t.runs:
+        t.runs.append(str(run_id))
+
+
+_SAMPLER: Optional[ProcSampler] = None
+
+
+def configure(config: Optional[dict], logger: Optional[logging.Logger] = None) -> ProcSampler:
+    """Build the module-level sampler for a batch (call start() from the batch's loop)."""
+    global _SAMPLER
+    raw = (config or {}).get("proc_stats") or {}
+    if not isinstance(raw, dict):
+        raw = {}
+    try:
+        interval = float(raw.get("interval_seconds", DEFAULT_INTERVAL))
+    except (TypeError, ValueError):
+        interval = DEFAULT_INTERVAL
+    _SAMPLER = ProcSampler(enabled=bool(raw.get("enabled", True)), interval=interval, logger=logger)
+    return _SAMPLER
+
+
+def get_sampler() -> ProcSampler:
+    global _SAMPLER
+    if _SAMPLER is None:
+        _SAMPLER = ProcSampler()
+    return _SAMPLER
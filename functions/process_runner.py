@@ -0,0 +1,282 @@
+"""
+Shared asyncio subprocess layer for runner.py, fpf_runner and MA_runner.
+
+Every child used to be a subprocess.Popen plus two reader threads (`_stream`,
+`_reader`) and, more often than not, a `run_in_executor(None, proc.wait)` on
+top. A 30-run batch meant 90+ OS threads contending on fpf_runner's
+_PRINT_LOCK, and each call site had its own idea of how a timeout or a
+cancelled task should tear the child down.
+
+run_process() starts the child with asyncio.create_subprocess_exec in its own
+process group, reads stdout and stderr with async line readers on the event
+loop itself and waits via deadlines.wait_process, so expiry (SIGTERM, grace,
+SIGKILL of the whole group) and cancellation (immediate group kill) behave
+the same everywhere. Line callbacks run on the loop thread one at a time, so
+no print lock is needed. Lines are decoded as UTF-8 with errors="replace";
+a line longer than the reader limit is delivered in limit-sized pieces
+instead of raising.
+
+Captured output is bounded. Deep-research children print for half an hour
+and FPF batches carry dozens of runs, so keeping every line used to hold
+hundreds of MB of log text in RAM. Each stream keeps only its last
+`tail_lines` lines (ring buffer). Lines that a `keep(stream, line)`
+predicate accepts (final JSON result, summary markers) are collected
+separately, capped at MAX_KEPT_LINES. The full output goes only where the
+caller's on_line sends it, normally a log file.
+
+Each child is registered with functions.proc_sampler, under the current
+proc_sampler.tag() or under its own `stats_tag`. Its CPU, RSS and IO end up
+as a [PROC_STATS] line in the subprocess log and in ProcessResult.proc_stats.
+Before the spawn, functions.memory_admission may hold the launch until the
+child's kind (stats_kind, else the enclosing tag's kind) fits in free memory.
+Right after the spawn it sets that kind's rlimits on the child with prlimit,
+and it learns the kind's footprint from the peak RSS sampled for the child.
+When a functions.fork_server profile serves the command's script, the child
+is forked from that pre-warmed interpreter instead of exec'd; the rest of
+run_process sees the same process interface either way.
+
+On Windows asyncio subprocesses need the Proactor event loop, which is the
+default since Python 3.8.
+
+API:
+- await run_process(cmd, env=None, cwd=None, stdin_data=None, on_line=None,
+                    on_start=None, deadline=None, grace=None,
+                    tail_lines=DEFAULT_TAIL_LINES, keep=None, stats_tag=None,
+                    stats_kind="proc") -> ProcessResult
+- ProcessResult(pid, returncode, stdout, stderr, kept, timed_out, reason, elapsed,
+                stdout_count, stderr_count, proc_stats)
+  .ok / .stdout_text / .stderr_text / .kept_text / .truncated
+- STDOUT / STDERR: stream names passed to on_line(stream, line) and keep(stream, line)
+- json_line(stream, line) / marker_lines(*markers): ready-made keep predicates
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Deque, List, Optional, Sequence, Union
+
+from . import deadlines
+from . import fork_server
+from . import memory_admission
+from . import proc_sampler
+
+STDOUT = "out"
+STDERR = "err"
+
+# Reader buffer limit; longer lines are split rather than dropped
+LINE_LIMIT = 4 * 1024 * 1024
+# How long to keep draining pipes after the child exits (grandchildren may hold them open)
+DRAIN_SECONDS = 5.0
+# Lines kept per stream by default (None = keep everything)
+DEFAULT_TAIL_LINES = 200
+# Cap on lines accepted by a keep() predicate
+MAX_KEPT_LINES = 1000
+
+
+@dataclass
+class ProcessResult:
+    pid: Optional[int]
+    returncode: Optional[int]
+    stdout: List[str] = field(default_factory=list)   # last tail_lines lines
+    stderr: List[str] = field(default_factory=list)
+    kept: List[str] = field(default_factory=list)     # lines accepted by keep(), both streams, in order
+    timed_out: bool = False
+    reason: str = ""
+    elapsed: float = 0.0
+    stdout_count: int = 0                             # lines seen, including those not kept
+    stderr_count: int = 0
+    proc_stats: Optional[proc_sampler.ProcStats] = None  # set when run with stats_tag
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+    @property
+    def stdout_text(self) -> str:
+        return "\n".join(self.stdout)
+
+    @property
+    def stderr_text(self) -> str:
+        return "\n".join(self.stderr)
+
+    @property
+    def kept_text(self) -> str:
+        return "\n".join(self.kept)
+
+    @property
+    def truncated(self) -> bool:
+        return self.stdout_count > len(self.stdout) or self.stderr_count > len(self.stderr)
+
+
+def json_line(stream: str, line: str) -> bool:
+    """keep() predicate for JSON object lines on stdout (children's final result line)."""
+    s = line.strip()
+    return stream == STDOUT and s.startswith("{") and s.endswith("}")
+
+
+def marker_lines(*markers: str) -> Callable[[str, str], bool]:
+    """keep() predicate for lines containing any of `markers`."""
+    def _keep(_stream: str, line: str) -> bool:
+        return any(m in line for m in markers)
+    return _keep
+
+
+class _Capture:
+    """Per-run line capture: a ring buffer per stream plus the kept lines."""
+
+    def __init__(self, tail_lines: Optional[int], keep) -> None:
+        self.tails = {STDOUT: collections.deque(maxlen=tail_lines), STDERR: collections.deque(maxlen=tail_lines)}
+        self.counts = {STDOUT: 0, STDERR: 0}
+        self.kept: Deque[str] = collections.deque(maxlen=MAX_KEPT_LINES)
+        self.keep = keep
+
+    def add(self, stream: str, line: str) -> None:
+        self.counts[stream] += 1
+        self.tails[stream].append(line)
+        if self.keep is not None:
+            try:
+                if self.keep(stream, line):
+                    self.kept.append(line)
+            except Exception:
+                pass
+
+    def fill(self, result: "ProcessResult") -> None:
+        result.stdout, result.stderr = list(self.tails[STDOUT]), list(self.tails[STDERR])
+        result.stdout_count, result.stderr_count = self.counts[STDOUT], self.counts[STDERR]
+        result.kept = list(self.kept)
+
+
+async def _read_line(stream: asyncio.StreamReader) -> bytes:
+    """One line including its newline; b"" at EOF. Over-long lines come back in pieces."""
+    try:
+        return await stream.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError as e:
+        return await stream.read(max(e.consumed, 1))
+
+
+async def _pump(stream, name: str, capture: _Capture, on_line) -> None:
+    if stream is None:
+        return
+    while True:
+        raw = await _read_line(stream)
+        if not raw:
+            break
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        capture.add(name, line)
+        if on_line is not None:
+            try:
+                on_line(name, line)
+            except Exception:
+                # Do not let a logging/parsing callback stop the reader (the pipe would fill up)
+                pass
+
+
+async def _feed(proc, data: Union[str, bytes]) -> None:
+    if proc.stdin is None:
+        return
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    try:
+        proc.stdin.write(data)
+        await proc.stdin.drain()
+    finally:
+        proc.stdin.close()
+
+
+async def _drain(readers: Sequence[asyncio.Task]) -> None:
+    _done, pending = await asyncio.wait(readers, timeout=DRAIN_SECONDS)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def run_process(
+    cmd: Sequence[str],
+    env: Optional[dict] = None,
+    cwd: Optional[str] = None,
+    stdin_data: Optional[Union[str, bytes]] = None,
+    on_line: Optional[Callable[[str, str], None]] = None,
+    on_start: Optional[Callable[[object], None]] = None,
+    deadline: Optional[deadlines.Deadline] = None,
+    grace: Optional[float] = None,
+    tail_lines: Optional[int] = DEFAULT_TAIL_LINES,
+    keep: Optional[Callable[[str, str], bool]] = None,
+    stats_tag: Optional[str] = None,
+    stats_kind: str = "proc",
+) -> ProcessResult:
+    """
+    Run `cmd` to completion (or until `deadline`, default the current one) and return its
+    exit status and captured lines. `on_start(proc)` is called once the child exists;
+    `on_line(stream, line)` for every line as it arrives. Only the last `tail_lines` lines
+    of each stream and the lines `keep(stream, line)` accepts are returned. Cancelling the
+    caller kills the child's process group and re-raises; spawn and stdin errors propagate
+    after the kill. `stats_tag` ("gptr-{pid}") gives the child its own [PROC_STATS] line;
+    otherwise it is accounted to the enclosing proc_sampler.tag(), if any. The launch waits
+    for memory admission first; `started`/`elapsed` include that wait.
+    """
+    deadline = deadline or deadlines.current()
+    started = time.monotonic()
+    kind = stats_kind if stats_tag else (proc_sampler.current_kind() or stats_kind)
+    admission = memory_admission.get_admission()
+    ticket = await admission.admit(kind)
+    try:
+        proc = None
+        server = fork_server.get_pool().server_for(cmd)
+        if server is not None:
+            proc = await server.spawn(cmd, env=env, cwd=cwd, stdin=stdin_data is not None,
+                                      rlimits=admission.rlimits_for(kind), limit=LINE_LIMIT)
+        if proc is None:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.PIPE if stdin_data is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                env=env,
+                cwd=cwd,
+                limit=LINE_LIMIT,
+                **deadlines.popen_group_kwargs(),
+            )
+            # From the parent: no preexec_fn in a threaded process (see memory_admission)
+            admission.limit_process(proc.pid, kind)
+    except BaseException:
+        ticket.release()
+        raise
+    result = ProcessResult(pid=proc.pid, returncode=None)
+    sampler = proc_sampler.get_sampler()
+    own_tag = sampler.open_tag(stats_tag.format(pid=proc.pid), stats_kind) if stats_tag else None
+    sampler.track(proc.pid, own_tag)
+    capture = _Capture(tail_lines, keep)
+    readers = [
+        asyncio.ensure_future(_pump(proc.stdout, STDOUT, capture, on_line)),
+        asyncio.ensure_future(_pump(proc.stderr, STDERR, capture, on_line)),
+    ]
+    try:
+        if on_start is not None:
+            on_start(proc)
+        if stdin_data is not None:
+            await _feed(proc, stdin_data)
+        if not await deadlines.wait_process(proc, deadline, grace):
+            result.timed_out = True
+            result.reason = deadline.reason()
+        await _drain(readers)
+    except BaseException:
+        if proc.returncode is None:
+            deadlines.kill_process_group(proc)
+        for task in readers:
+            task.cancel()
+        raise
+    finally:
+        admission.observe(kind, sampler.untrack(proc.pid))
+        ticket.release()
+        if own_tag is not None:
+            result.proc_stats = sampler.close_tag(own_tag)
+    capture.fill(result)
+    result.returncode = proc.returncode
+    result.elapsed = time.monotonic() - started
+    return result
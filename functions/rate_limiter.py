@@ -0,0 +1,348 @@
+"""
+Provider-aware rate limiting shared by every ACM run type.
+
+All run types (gptr, dr, ma, fpf, eval, combine) acquire from one scheduler
+keyed by (provider, model), so the combined load against one provider key is
+controlled in one place instead of per run type.
+
+Each key has:
+- a requests-per-minute token bucket (rpm)
+- a tokens-per-minute token bucket (tpm)
+- an optional cap on concurrent holders (max_concurrent)
+
+A limit of 0 (or missing) means "unlimited" for that dimension.
+
+Config (ACM config.yaml):
+  rate_limits:
+    enabled: false
+    default: {rpm: 0, tpm: 0, max_concurrent: 0}
+    providers:
+      openai: {rpm: 500, tpm: 800000, max_concurrent: 16}
+    models:
+      "openai:gpt-5.1": {rpm: 200}
+    output_tokens: {dr: 30000}   # per-kind output allowance used in tpm estimates
+
+Lookup order for a key: models["provider:model"] > providers[provider] > default.
+
+API:
+- configure(config) -> ProviderRateLimiter   (module singleton; disabled when not configured)
+- get_rate_limiter() -> ProviderRateLimiter
+- estimate_tokens(text, kind) -> int
+- await limiter.acquire(provider, model, requests=1, tokens=0, kind="") -> Lease
+- async with limiter.limit(provider, model, ...): ...
+- async with limiter.limit_many([(provider, model), ...], ...): ...
+- await limiter.reserve(provider, model, requests, tokens)   # rate only, no slot held
+- limiter.note_start(provider, model) / note_end(provider, model)   # externally scheduled work (FPF batch)
+- limiter.set_provider_max_concurrent(provider, n)   # runtime cap (adaptive concurrency)
+- limiter.snapshot() -> dict
+
+State is guarded by a threading.Lock and waiters are woken with
+call_soon_threadsafe, so one limiter can be shared by coroutines running on
+different event loops (e.g. evaluations offloaded to worker threads).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Output-token allowance per run kind, used when estimating tpm cost up front
+DEFAULT_OUTPUT_TOKENS: Dict[str, int] = {
+    "gptr": 8000,
+    "dr": 30000,
+    "ma": 20000,
+    "fpf": 8000,
+    "eval": 2000,
+    "combine": 8000,
+}
+
+
+class TokenBucket:
+    """Continuous-refill token bucket. rate_per_minute <= 0 means unlimited."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None) -> None:
+        self.rate = float(rate_per_minute or 0)
+        self.capacity = float(capacity if capacity is not None else self.rate)
+        self.tokens = self.capacity
+        self._ts = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self, now: float) -> None:
+        if self.unlimited:
+            return
+        elapsed = max(0.0, now - self._ts)
+        self._ts = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate / 60.0)
+
+    def wait_time(self, amount: float, now: Optional[float] = None) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        if self.unlimited or amount <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        # Requests larger than the bucket can never fit; admit them once the bucket is full
+        need = min(float(amount), self.capacity)
+        if self.tokens >= need:
+            return 0.0
+        return (need - self.tokens) * 60.0 / self.rate
+
+    def take(self, amount: float) -> None:
+        if self.unlimited or amount <= 0:
+            return
+        self.tokens -= min(float(amount), self.capacity)
+
+
+class _KeyState:
+    def __init__(self, rpm: float, tpm: float, max_concurrent: int) -> None:
+        self.rpm = TokenBucket(rpm)
+        self.tpm = TokenBucket(tpm)
+        self.max_concurrent = max(0, int(max_concurrent or 0))
+        self.inflight = 0
+        self.external_inflight = 0
+        self.acquired = 0
+        self.waited_seconds = 0.0
+
+    def slots_free(self) -> bool:
+        if self.max_concurrent <= 0:
+            return True
+        return (self.inflight + self.external_inflight) < self.max_concurrent
+
+
+class Lease:
+    """A held slot for one (provider, model). release() is idempotent."""
+
+    def __init__(self, limiter: "ProviderRateLimiter", key: Optional[Tuple[str, str]]) -> None:
+        self._limiter = limiter
+        self.key = key
+        self._released = key is None
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._limiter._release(self.key)
+
+
+class ProviderRateLimiter:
+    def __init__(self, settings: Optional[Dict[str, Any]] = None) -> None:
+        settings = settings or {}
+        self.enabled = bool(settings.get("enabled", False))
+        self._default = dict(settings.get("default") or {})
+        self._providers = {str(k).strip().lower(): dict(v or {}) for k, v in (settings.get("providers") or {}).items()}
+        self._models = {str(k).strip().lower(): dict(v or {}) for k, v in (settings.get("models") or {}).items()}
+        self.output_tokens = dict(DEFAULT_OUTPUT_TOKENS)
+        try:
+            self.output_tokens.update({str(k): int(v) for k, v in (settings.get("output_tokens") or {}).items()})
+        except Exception:
+            pass
+        self._lock = threading.Lock()
+        self._keys: Dict[Tuple[str, str], _KeyState] = {}
+        # Runtime concurrency caps per provider (set by functions.adaptive_concurrency)
+        self._provider_caps: Dict[str, int] = {}
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    # ---- configuration ----
+
+    @staticmethod
+    def _norm(provider: Optional[str], model: Optional[str]) -> Tuple[str, str]:
+        p = (provider or "").strip().lower()
+        m = (model or "").strip().lower()
+        if not p and ":" in m:
+            p, m = m.split(":", 1)
+        return p, m
+
+    def limits_for(self, provider: Optional[str], model: Optional[str]) -> Dict[str, float]:
+        p, m = self._norm(provider, model)
+        merged: Dict[str, Any] = {}
+        merged.update(self._default)
+        merged.update(self._providers.get(p, {}))
+        merged.update(self._models.get(f"{p}:{m}", {}))
+        out = {}
+        for k in ("rpm", "tpm", "max_concurrent"):
+            try:
+                out[k] = float(merged.get(k, 0) or 0)
+            except Exception:
+                out[k] = 0.0
+        return out
+
+    def _state(self, key: Tuple[str, str]) -> _KeyState:
+        st = self._keys.get(key)
+        if st is None:
+            lim = self.limits_for(*key)
+            cap = self._provider_caps.get(key[0])
+            st = _KeyState(lim["rpm"], lim["tpm"], int(lim["max_concurrent"]) if cap is None else cap)
+            self._keys[key] = st
+        return st
+
+    def set_max_concurrent(self, provider: Optional[str], model: Optional[str], value: int) -> None:
+        """Adjust a key's concurrency cap at runtime (wakes waiters if raised)."""
+        key = self._norm(provider, model)
+        with self._lock:
+            self._state(key).max_concurrent = max(0, int(value))
+        self._wake_all()
+
+    def set_provider_max_concurrent(self, provider: Optional[str], value: int) -> None:
+        """Set the concurrency cap for every model of a provider (existing and future keys)."""
+        p = (provider or "").strip().lower()
+        v = max(0, int(value))
+        with self._lock:
+            self._provider_caps[p] = v
+            for (kp, _km), st in self._keys.items():
+                if kp == p:
+                    st.max_concurrent = v
+        self._wake_all()
+
+    # ---- acquisition ----
+
+    def _wake_all(self) -> None:
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        for loop, fut in waiters:
+            try:
+                loop.call_soon_threadsafe(lambda f=fut: f.done() or f.set_result(None))
+            except RuntimeError:
+                # Loop already closed; nothing is waiting on it anymore
+                pass
+
+    def _try_take(self, key: Tuple[str, str], requests: float, tokens: float, hold_slot: bool) -> Tuple[bool, float]:
+        """Returns (acquired, suggested_wait_seconds). Caller must hold self._lock."""
+        st = self._state(key)
+        if hold_slot and not st.slots_free():
+            return False, -1.0  # wait for a release
+        now = time.monotonic()
+        wait = max(st.rpm.wait_time(requests, now), st.tpm.wait_time(tokens, now))
+        if wait > 0:
+            return False, wait
+        st.rpm.take(requests)
+        st.tpm.take(tokens)
+        if hold_slot:
+            st.inflight += 1
+        st.acquired += 1
+        return True, 0.0
+
+    async def _acquire_key(self, key: Tuple[str, str], requests: float, tokens: float, hold_slot: bool) -> None:
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                ok, wait = self._try_take(key, requests, tokens, hold_slot)
+                if ok:
+                    self._state(key).waited_seconds += time.monotonic() - started
+                    return
+                fut = None
+                if wait < 0:
+                    fut = loop.create_future()
+                    self._waiters.append((loop, fut))
+            if fut is not None:
+                try:
+                    # Periodic re-check guards against a missed wake-up
+                    await asyncio.wait_for(fut, timeout=5.0)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(wait, 5.0))
+
+    async def acquire(self, provider: Optional[str], model: Optional[str], requests: float = 1, tokens: float = 0, kind: str = "") -> Lease:
+        if not self.enabled:
+            return Lease(self, None)
+        key = self._norm(provider, model)
+        await self._acquire_key(key, requests, tokens, hold_slot=True)
+        return Lease(self, key)
+
+    async def reserve(self, provider: Optional[str], model: Optional[str], requests: float = 1, tokens: float = 0) -> None:
+        """Debit rate buckets without holding a concurrency slot."""
+        if not self.enabled:
+            return
+        await self._acquire_key(self._norm(provider, model), requests, tokens, hold_slot=False)
+
+    def _release(self, key: Tuple[str, str]) -> None:
+        with self._lock:
+            st = self._state(key)
+            st.inflight = max(0, st.inflight - 1)
+        self._wake_all()
+
+    @contextlib.asynccontextmanager
+    async def limit(self, provider: Optional[str], model: Optional[str], requests: float = 1, tokens: float = 0, kind: str = ""):
+        lease = await self.acquire(provider, model, requests=requests, tokens=tokens, kind=kind)
+        try:
+            yield lease
+        finally:
+            lease.release()
+
+    @contextlib.asynccontextmanager
+    async def limit_many(self, pairs: Iterable[Tuple[Optional[str], Optional[str]]], requests: float = 1, tokens: float = 0, kind: str = ""):
+        """Hold one slot on each distinct key. Keys are acquired in sorted order to avoid deadlock."""
+        keys = sorted({self._norm(p, m) for p, m in pairs})
+        leases: List[Lease] = []
+        try:
+            for p, m in keys:
+                leases.append(await self.acquire(p, m, requests=requests, tokens=tokens, kind=kind))
+            yield leases
+        finally:
+            for lease in reversed(leases):
+                lease.release()
+
+    # ---- externally scheduled work (e.g. runs inside an FPF batch) ----
+
+    def note_start(self, provider: Optional[str], model: Optional[str]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._state(self._norm(provider, model)).external_inflight += 1
+
+    def note_end(self, provider: Optional[str], model: Optional[str]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            st = self._state(self._norm(provider, model))
+            st.external_inflight = max(0, st.external_inflight - 1)
+        self._wake_all()
+
+    # ---- telemetry ----
+
+    def estimate_tokens(self, text: Optional[str], kind: str = "") -> int:
+        return estimate_tokens(text, kind, self.output_tokens)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            out = {}
+            for (p, m), st in self._keys.items():
+                out[f"{p}:{m}"] = {
+                    "inflight": st.inflight,
+                    "external_inflight": st.external_inflight,
+                    "max_concurrent": st.max_concurrent,
+                    "acquired": st.acquired,
+                    "waited_seconds": round(st.waited_seconds, 3),
+                }
+            return out
+
+
+def estimate_tokens(text: Optional[str], kind: str = "", output_tokens: Optional[Dict[str, int]] = None) -> int:
+    """Rough prompt tokens (~4 chars/token) plus the output allowance for this run kind."""
+    table = output_tokens if output_tokens is not None else DEFAULT_OUTPUT_TOKENS
+    prompt = len(text or "") // 4
+    return int(prompt + int(table.get(kind, 0)))
+
+
+_LIMITER: Optional[ProviderRateLimiter] = None
+
+
+def configure(config: Optional[dict]) -> ProviderRateLimiter:
+    """Build the process-wide limiter from ACM config (rate_limits section)."""
+    global _LIMITER
+    _LIMITER = ProviderRateLimiter((config or {}).get("rate_limits") or {})
+    return _LIMITER
+
+
+def get_rate_limiter() -> ProviderRateLimiter:
+    """Return the process-wide limiter (a disabled pass-through until configure() is called)."""
+    global _LIMITER
+    if _LIMITER is None:
+        _LIMITER = ProviderRateLimiter({})
+    return _LIMITER
@@ -0,0 +1,144 @@
+"""
+Immutable per-batch run context: config snapshot, resolved paths and input texts.
+
+Parts of the pipeline used to go back to disk for things the batch already
+knew. save_generated_reports (runner and output_manager) parsed config.yaml
+on every call for one_file_only. MA_runner re-read config.yaml and the
+guidelines file for every MA run. process_file_run re-read the input markdown
+and the instructions for every run entry. Besides thousands of redundant
+reads and YAML parses per batch, this meant that editing config.yaml
+mid-run changed half of a batch.
+
+build() runs once in runner.main() after the config is loaded and its paths
+resolved. It validates the required keys, reads the instructions, the
+guidelines and every input markdown file, and returns a frozen RunContext.
+The batch installs it with set_context(); code that needs these values reads
+them from get_context(), or through read_text(path), which answers from the
+snapshot and only falls back to disk for files outside it (e.g. a worker's
+scratch copy).
+
+RunContext.config is a deep copy taken at build time. Its nested values stay
+plain dicts and lists, because the rest of ACM checks isinstance(..., dict);
+treat it as read-only.
+
+API:
+- build(config_path, config, input_files=()) -> RunContext   (raises ValueError on invalid config)
+- set_context(ctx) -> Optional[RunContext] (returns the previous one) / get_context() -> Optional[RunContext]
+- read_text(path) -> str   (snapshot first, then disk)
+- RunContext.text(path) -> Optional[str] / .follow_guidelines
+"""
+
+from __future__ import annotations
+
+import copy
+import os
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+REQUIRED_PATHS = ("input_folder", "output_folder", "instructions_file")
+
+
+def _norm(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _read(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as fh:
+        return fh.read()
+
+
+@dataclass(frozen=True)
+class RunContext:
+    config_path: str
+    config: Dict[str, Any]
+    input_folder: str
+    output_folder: str
+    instructions_file: str
+    instructions: str
+    guidelines_file: Optional[str] = None
+    guidelines: Tuple[str, ...] = ()
+    one_file_only: bool = False
+    input_files: Tuple[str, ...] = ()
+    _texts: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}), repr=False)
+
+    @property
+    def follow_guidelines(self) -> bool:
+        return bool(self.guidelines)
+
+    def text(self, path: str) -> Optional[str]:
+        """Contents of an input or the instructions file as read at build time (None if not in the snapshot)."""
+        return self._texts.get(_norm(path))
+
+
+def build(config_path: str, config: dict, input_files: Iterable[str] = ()) -> RunContext:
+    """Snapshot `config` (paths already resolved) and read the batch's input texts once."""
+    config_path = os.path.abspath(config_path)
+    config_dir = os.path.dirname(config_path)
+    missing = [k for k in REQUIRED_PATHS if not config.get(k)]
+    if missing:
+        raise ValueError(f"missing required configuration: {', '.join(missing)}")
+
+    def _resolve(p):
+        return p if os.path.isabs(p) else os.path.abspath(os.path.join(config_dir, p))
+
+    instructions_file = _resolve(config["instructions_file"])
+    try:
+        instructions = _read(instructions_file)
+    except OSError as e:
+        raise ValueError(f"cannot read instructions file {instructions_file}: {e}") from e
+    texts = {_norm(instructions_file): instructions}
+
+    guidelines_file = _resolve(config["guidelines_file"]) if config.get("guidelines_file") else None
+    guidelines: Tuple[str, ...] = ()
+    if guidelines_file:
+        try:
+            guidelines = tuple(line.strip() for line in _read(guidelines_file).splitlines() if line.strip())
+        except OSError as e:
+            print(f"  Warning: Failed to load guidelines from {guidelines_file}: {e}")
+
+    files = tuple(os.path.abspath(f) for f in input_files)
+    for f in files:
+        try:
+            texts[_norm(f)] = _read(f)
+        except OSError as e:
+            # Left to the per-file step, which reports the error for that file
+            print(f"  Warning: could not pre-read input {f}: {e}")
+
+    return RunContext(
+        config_path=config_path,
+        config=copy.deepcopy(config),
+        input_folder=_resolve(config["input_folder"]),
+        output_folder=_resolve(config["output_folder"]),
+        instructions_file=instructions_file,
+        instructions=instructions,
+        guidelines_file=guidelines_file,
+        guidelines=guidelines,
+        one_file_only=bool(config.get("one_file_only", False)),
+        input_files=files,
+        _texts=MappingProxyType(texts),
+    )
+
+
+_CONTEXT: Optional[RunContext] = None
+
+
+def set_context(ctx: Optional[RunContext]) -> Optional[RunContext]:
+    """Install `ctx` as the current batch's context; returns the one it replaces."""
+    global _CONTEXT
+    previous, _CONTEXT = _CONTEXT, ctx
+    return previous
+
+
+def get_context() -> Optional[RunContext]:
+    return _CONTEXT
+
+
+def read_text(path: str) -> str:
+    """Text of `path` from the current context's snapshot, else from disk."""
+    ctx = _CONTEXT
+    if ctx is not None:
+        cached = ctx.text(path)
+        if cached is not None:
+            return cached
+    return _read(path)
@@ -0,0 +1,229 @@
+"""
+Historical run durations for ACM scheduling.
+
+Learns how long each (run type, model) pair takes from earlier batches:
+- logs/acm_subprocess_*.log   ([FPF RUN_START]/[FPF RUN_COMPLETE], [GPTR_START]/[GPTR_END], [MA_START]/[MA_END])
+- logs/timeline_data.json     (records exported by tools/timeline_from_logs.py)
+
+Run types use the config.yaml `runs[].type` vocabulary: fpf | gptr | dr | ma.
+Models are compared without a provider prefix ("openai:gpt-5.1" -> "gpt-5.1").
+
+API:
+- RunHistory.load(logs_dir, max_files=40) -> RunHistory
+- RunHistory.add(rtype, model, seconds) -> None
+- RunHistory.predict(rtype, model) -> float          (median; type median / default as fallback)
+- RunHistory.percentile(rtype, model, q) -> float | None
+- RunHistory.order_longest_first(items, key) -> list  (stable; longest predicted first)
+- resolve_launch_order(config) -> "config" | "longest_first"
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Used when a (type, model) pair has never been observed
+DEFAULT_SECONDS: Dict[str, float] = {
+    "dr": 900.0,
+    "ma": 600.0,
+    "gptr": 300.0,
+    "fpf": 120.0,
+}
+
+TS_PREFIX = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})[,.](\d{3})\b")
+FPF_RUN_START = re.compile(r"\[FPF RUN_START\]\s+id=(\S+)\s+kind=(\S+)\s+provider=(\S+)\s+model=(\S+)")
+FPF_RUN_COMPLETE = re.compile(r"\[FPF RUN_COMPLETE\]\s+id=(\S+)\s+kind=(\S+)\s+provider=(\S+)\s+model=(\S+)\s+ok=(true|false)", re.IGNORECASE)
+GPTR_START = re.compile(r"\[GPTR_START\]\s+pid=(\d+)\s+type=(\S+)\s+model=(\S+)")
+GPTR_END = re.compile(r"\[GPTR_END\]\s+pid=(\d+)\s+result=(success|failure)", re.IGNORECASE)
+MA_START = re.compile(r"\[MA_START\]\s+id=(\S+)\s+model=(\S+)")
+MA_END = re.compile(r"\[MA_END\]\s+id=(\S+)\s+model=(\S+)\s+result=(success|failure)", re.IGNORECASE)
+
+# tools/timeline_from_logs.py report_type -> runs[].type
+REPORT_TYPE_TO_RTYPE = {
+    "fpf rest": "fpf",
+    "fpf deep": "fpf",
+    "gpt-r standard": "gptr",
+    "gpt‑r standard": "gptr",
+    "gpt-r deep": "dr",
+    "gpt‑r deep": "dr",
+    "ma": "ma",
+}
+
+
+def resolve_launch_order(config: dict) -> str:
+    """concurrency.launch_order: 'config' (default, as listed) or 'longest_first'."""
+    val = str(((config or {}).get("concurrency") or {}).get("launch_order", "config") or "config").strip().lower()
+    return "longest_first" if val in ("longest_first", "longest-first", "lef") else "config"
+
+
+def _norm_model(model: Optional[str]) -> str:
+    m = (model or "").strip().lower()
+    if ":" in m:
+        m = m.split(":", 1)[1]
+    return m
+
+
+def _parse_ts(line: str) -> Optional[datetime]:
+    m = TS_PREFIX.match(line)
+    if not m:
+        return None
+    try:
+        return datetime.strptime(m.group(1), "%Y-%m-%d %H:%M:%S").replace(microsecond=int(m.group(2)) * 1000)
+    except Exception:
+        return None
+
+
+def _quantile(sorted_vals: List[float], q: float) -> float:
+    if len(sorted_vals) == 1:
+        return sorted_vals[0]
+    q = min(1.0, max(0.0, float(q)))
+    pos = q * (len(sorted_vals) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    frac = pos - lo
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * frac
+
+
+class RunHistory:
+    def __init__(self) -> None:
+        self._samples: Dict[Tuple[str, str], List[float]] = {}
+        self._seen: set = set()
+
+    def add(self, rtype: str, model: Optional[str], seconds: float, start: Optional[datetime] = None) -> None:
+        try:
+            secs = float(seconds)
+        except Exception:
+            return
+        if secs <= 0:
+            return
+        key = ((rtype or "").strip().lower(), _norm_model(model))
+        if start is not None:
+            # The same run can appear in a log and in the timeline JSON exported from it
+            marker = (key, start.replace(microsecond=0).isoformat())
+            if marker in self._seen:
+                return
+            self._seen.add(marker)
+        self._samples.setdefault(key, []).append(secs)
+
+    def count(self, rtype: Optional[str] = None, model: Optional[str] = None) -> int:
+        if rtype is None:
+            return sum(len(v) for v in self._samples.values())
+        return len(self._samples.get(((rtype or "").strip().lower(), _norm_model(model)), []))
+
+    def _values(self, rtype: str, model: Optional[str]) -> List[float]:
+        rt = (rtype or "").strip().lower()
+        vals = self._samples.get((rt, _norm_model(model)))
+        if vals:
+            return sorted(vals)
+        return []
+
+    def _type_values(self, rtype: str) -> List[float]:
+        rt = (rtype or "").strip().lower()
+        out: List[float] = []
+        for (t, _m), vals in self._samples.items():
+            if t == rt:
+                out.extend(vals)
+        return sorted(out)
+
+    def percentile(self, rtype: str, model: Optional[str], q: float) -> Optional[float]:
+        """q in [0, 1]. None when this exact (type, model) has no history."""
+        vals = self._values(rtype, model)
+        if not vals:
+            return None
+        return _quantile(vals, q)
+
+    def predict(self, rtype: str, model: Optional[str]) -> float:
+        vals = self._values(rtype, model) or self._type_values(rtype)
+        if vals:
+            return _quantile(vals, 0.5)
+        return DEFAULT_SECONDS.get((rtype or "").strip().lower(), 60.0)
+
+    def order_longest_first(self, items: Iterable[Any], key: Callable[[Any], Tuple[str, Optional[str]]]) -> List[Any]:
+        """Sort items by predicted duration, longest first. key(item) -> (rtype, model)."""
+        items = list(items)
+        return sorted(items, key=lambda it: -self.predict(*key(it)))
+
+    # ---- loading ----
+
+    def _ingest_subprocess_log(self, path: str) -> None:
+        fpf_open: Dict[str, List[Tuple[datetime, str]]] = {}
+        gptr_open: Dict[str, Tuple[datetime, str, str]] = {}
+        ma_open: Dict[str, Tuple[datetime, str]] = {}
+        with open(path, "r", encoding="utf-8", errors="replace") as fh:
+            for line in fh:
+                if "[FPF RUN_" not in line and "[GPTR_" not in line and "[MA_" not in line:
+                    continue
+                ts = _parse_ts(line)
+                if ts is None:
+                    continue
+                m = FPF_RUN_START.search(line)
+                if m:
+                    fpf_open.setdefault(m.group(1), []).append((ts, m.group(4)))
+                    continue
+                m = FPF_RUN_COMPLETE.search(line)
+                if m:
+                    pending = fpf_open.get(m.group(1))
+                    if pending:
+                        start, model = pending.pop(0)
+                        if m.group(5).lower() == "true":
+                            self.add("fpf", model, (ts - start).total_seconds(), start)
+                    continue
+                m = GPTR_START.search(line)
+                if m:
+                    rtype = "dr" if m.group(2).strip().lower() == "deep" else "gptr"
+                    gptr_open[m.group(1)] = (ts, rtype, m.group(3))
+                    continue
+                m = GPTR_END.search(line)
+                if m:
+                    opened = gptr_open.pop(m.group(1), None)
+                    if opened and m.group(2).lower() == "success":
+                        self.add(opened[1], opened[2], (ts - opened[0]).total_seconds(), opened[0])
+                    continue
+                m = MA_START.search(line)
+                if m:
+                    ma_open[m.group(1)] = (ts, m.group(2))
+                    continue
+                m = MA_END.search(line)
+                if m:
+                    opened = ma_open.pop(m.group(1), None)
+                    if opened and m.group(3).lower() == "success":
+                        self.add("ma", opened[1], (ts - opened[0]).total_seconds(), opened[0])
+
+    def _ingest_timeline_json(self, path: str) -> None:
+        with open(path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        for rec in (data or {}).get("records") or []:
+            if str(rec.get("result") or "").lower() != "success":
+                continue
+            rtype = REPORT_TYPE_TO_RTYPE.get(str(rec.get("report_type") or "").strip().lower())
+            if not rtype:
+                continue
+            start = None
+            try:
+                start = datetime.fromisoformat(rec.get("start_ts")) if rec.get("start_ts") else None
+            except Exception:
+                start = None
+            self.add(rtype, rec.get("model"), rec.get("duration_seconds") or 0, start)
+
+    @classmethod
+    def load(cls, logs_dir: str, max_files: int = 40) -> "RunHistory":
+        """Best-effort: unreadable or malformed files are skipped."""
+        hist = cls()
+        if not logs_dir or not os.path.isdir(logs_dir):
+            return hist
+        logs = sorted(glob.glob(os.path.join(logs_dir, "acm_subprocess_*.log")), key=os.path.getmtime, reverse=True)
+        for path in logs[: max(0, int(max_files))]:
+            try:
+                hist._ingest_subprocess_log(path)
+            except Exception:
+                continue
+        for path in glob.glob(os.path.join(logs_dir, "timeline_data*.json")):
+            try:
+                hist._ingest_timeline_json(path)
+            except Exception:
+                continue
+        return hist
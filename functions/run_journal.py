@@ -0,0 +1,265 @@
+"""
+Durable run journal for ACM batches (crash-resume).
+
+Every unit of work planned by runner.main() is recorded in a small SQLite file
+together with its state, so a batch that dies half-way can be resumed without
+redoing the parts that already finished:
+
+- gen|<input.md>|<run index>|<iteration>     one generation (runs[] entry x iteration)
+- eval|<input.md>|precombine                 evaluate.py on the generated reports
+- eval|<input.md>|combine                    combiner on the top reports
+- eval|<input.md>|postcombine                playoffs evaluation
+
+States: planned -> running -> done | failed. A unit left in "running" by a crash
+counts as incomplete. `python runner.py --resume` (or generate.py --resume)
+reopens the most recent unfinished batch for the same config file and only
+re-executes units that are not done.
+
+Journaling is opt-in. Only a batch that ran with journal.enabled can be resumed
+later. --resume always journals the batch it starts or continues, even when
+journal.enabled is false.
+
+Config (ACM config.yaml):
+  journal:
+    enabled: false
+    path: logs/run_journal.sqlite    # relative to the config file directory
+
+API:
+- RunJournal.open(db_path, config_path, resume=False) -> RunJournal
+- RunJournal.plan/start/finish/fail(unit, ...)
+- RunJournal.is_done(unit) / state(unit) / outputs(unit) / detail(unit)
+- RunJournal.has_file(file) / pending(file=None) / file_outputs(file=None)
+- RunJournal.close_batch(status="complete")
+- gen_unit(md, run_index, iteration), eval_unit(md, phase)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+STATE_PLANNED = "planned"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+EVAL_PHASES = ("precombine", "combine", "postcombine")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    config_path TEXT NOT NULL,
+    config_hash TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS units (
+    batch_id TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    file TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    detail TEXT,
+    outputs TEXT,
+    started_at REAL,
+    finished_at REAL,
+    PRIMARY KEY (batch_id, unit)
+);
+CREATE INDEX IF NOT EXISTS idx_units_file ON units (batch_id, file);
+"""
+
+
+def gen_unit(md: str, run_index: int, iteration: int) -> str:
+    return f"gen|{os.path.abspath(md)}|{int(run_index)}|{int(iteration)}"
+
+
+def eval_unit(md: str, phase: str) -> str:
+    return f"eval|{os.path.abspath(md)}|{phase}"
+
+
+def resolve_journal_settings(config: dict, config_dir: str) -> tuple[bool, str]:
+    """journal.enabled (default False) and journal.path (default logs/run_journal.sqlite next to runner.py)."""
+    cfg = (config or {}).get("journal") or {}
+    enabled = bool(cfg.get("enabled", False))
+    path = cfg.get("path") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "run_journal.sqlite")
+    if not os.path.isabs(path):
+        path = os.path.abspath(os.path.join(config_dir, path))
+    return enabled, path
+
+
+def _config_hash(config_path: str) -> str:
+    try:
+        with open(config_path, "rb") as fh:
+            return hashlib.sha1(fh.read()).hexdigest()
+    except Exception:
+        return ""
+
+
+class RunJournal:
+    def __init__(self, db_path: str, batch_id: str, resumed: bool = False) -> None:
+        self.db_path = db_path
+        self.batch_id = batch_id
+        self.resumed = resumed
+        self._lock = threading.Lock()
+        # Generation events arrive on FPF reader threads
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.executescript(_SCHEMA)
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        except Exception:
+            pass
+
+    @classmethod
+    def open(cls, db_path: str, config_path: str, resume: bool | str = False) -> "RunJournal":
+        """
+        Start a new batch, or with resume reopen an unfinished one. resume may be True
+        (latest unfinished batch for this config file) or an explicit batch id.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        config_path = os.path.abspath(config_path)
+        conn = sqlite3.connect(db_path, timeout=30)
+        try:
+            conn.executescript(_SCHEMA)
+            row = None
+            if isinstance(resume, str) and resume not in ("", "latest"):
+                row = conn.execute("SELECT batch_id FROM batches WHERE batch_id = ?", (resume,)).fetchone()
+            elif resume:
+                row = conn.execute(
+                    "SELECT batch_id FROM batches WHERE config_path = ? AND status != 'complete' ORDER BY created_at DESC LIMIT 1",
+                    (config_path,),
+                ).fetchone()
+            now = time.time()
+            if row:
+                batch_id = row[0]
+                conn.execute("UPDATE batches SET status = 'running', updated_at = ? WHERE batch_id = ?", (now, batch_id))
+                conn.commit()
+                return cls(db_path, batch_id, resumed=True)
+            batch_id = time.strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:6]
+            conn.execute(
+                "INSERT INTO batches (batch_id, config_path, config_hash, status, created_at, updated_at) VALUES (?, ?, ?, 'running', ?, ?)",
+                (batch_id, config_path, _config_hash(config_path), now, now),
+            )
+            conn.commit()
+            return cls(db_path, batch_id, resumed=False)
+        finally:
+            conn.close()
+
+    def _exec(self, sql: str, params: tuple = ()) -> None:
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+
+    def _one(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def _all(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # ---- state transitions ----
+
+    def plan(self, unit: str, kind: str, file: Optional[str] = None, detail: Optional[str] = None) -> None:
+        """Record a unit once; re-planning an existing unit (resume) keeps its state."""
+        self._exec(
+            "INSERT OR IGNORE INTO units (batch_id, unit, kind, file, state, detail) VALUES (?, ?, ?, ?, ?, ?)",
+            (self.batch_id, unit, kind, os.path.abspath(file) if file else None, STATE_PLANNED, detail),
+        )
+
+    def start(self, unit: str, kind: str = "", file: Optional[str] = None) -> None:
+        self.plan(unit, kind or unit.split("|", 1)[0], file)
+        self._exec(
+            "UPDATE units SET state = ?, attempts = attempts + 1, started_at = ?, finished_at = NULL WHERE batch_id = ? AND unit = ?",
+            (STATE_RUNNING, time.time(), self.batch_id, unit),
+        )
+
+    def finish(self, unit: str, outputs: Optional[List[str]] = None, detail: Optional[str] = None) -> None:
+        self._exec(
+            "UPDATE units SET state = ?, finished_at = ?, outputs = COALESCE(?, outputs), detail = COALESCE(?, detail) WHERE batch_id = ? AND unit = ?",
+            (STATE_DONE, time.time(), json.dumps(list(outputs)) if outputs is not None else None, detail, self.batch_id, unit),
+        )
+
+    def fail(self, unit: str, detail: Optional[str] = None) -> None:
+        """Failed units are retried on resume; a unit that already finished stays done."""
+        self._exec(
+            "UPDATE units SET state = ?, finished_at = ?, detail = COALESCE(?, detail) WHERE batch_id = ? AND unit = ? AND state != ?",
+            (STATE_FAILED, time.time(), (detail or "")[:2000] or None, self.batch_id, unit, STATE_DONE),
+        )
+
+    def close_batch(self, status: str = "complete") -> None:
+        self._exec("UPDATE batches SET status = ?, updated_at = ? WHERE batch_id = ?", (status, time.time(), self.batch_id))
+
+    # ---- queries ----
+
+    def state(self, unit: str) -> Optional[str]:
+        row = self._one("SELECT state FROM units WHERE batch_id = ? AND unit = ?", (self.batch_id, unit))
+        return row[0] if row else None
+
+    def is_done(self, unit: str) -> bool:
+        return self.state(unit) == STATE_DONE
+
+    def detail(self, unit: str) -> Optional[str]:
+        row = self._one("SELECT detail FROM units WHERE batch_id = ? AND unit = ?", (self.batch_id, unit))
+        return row[0] if row else None
+
+    def outputs(self, unit: str) -> List[str]:
+        row = self._one("SELECT outputs FROM units WHERE batch_id = ? AND unit = ?", (self.batch_id, unit))
+        try:
+            return list(json.loads(row[0])) if row and row[0] else []
+        except Exception:
+            return []
+
+    def has_file(self, file: str) -> bool:
+        row = self._one("SELECT 1 FROM units WHERE batch_id = ? AND file = ? LIMIT 1", (self.batch_id, os.path.abspath(file)))
+        return row is not None
+
+    def pending(self, file: Optional[str] = None) -> List[str]:
+        if file is None:
+            rows = self._all("SELECT unit FROM units WHERE batch_id = ? AND state != ?", (self.batch_id, STATE_DONE))
+        else:
+            rows = self._all(
+                "SELECT unit FROM units WHERE batch_id = ? AND file = ? AND state != ?",
+                (self.batch_id, os.path.abspath(file), STATE_DONE),
+            )
+        return [r[0] for r in rows]
+
+    def file_outputs(self, file: Optional[str] = None, kind: str = "gen") -> List[str]:
+        """Outputs recorded by finished units of one kind (default: generation), in completion order."""
+        if file is None:
+            rows = self._all(
+                "SELECT outputs FROM units WHERE batch_id = ? AND kind = ? AND state = ? ORDER BY finished_at",
+                (self.batch_id, kind, STATE_DONE),
+            )
+        else:
+            rows = self._all(
+                "SELECT outputs FROM units WHERE batch_id = ? AND kind = ? AND file = ? AND state = ? ORDER BY finished_at",
+                (self.batch_id, kind, os.path.abspath(file), STATE_DONE),
+            )
+        out: List[str] = []
+        for (raw,) in rows:
+            try:
+                for p in json.loads(raw) if raw else []:
+                    if p not in out:
+                        out.append(p)
+            except Exception:
+                continue
+        return out
+
+    def counts(self) -> dict:
+        rows = self._all("SELECT state, COUNT(*) FROM units WHERE batch_id = ? GROUP BY state", (self.batch_id,))
+        return {state: n for state, n in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
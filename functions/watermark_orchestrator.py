@@ -8,6 +8,9 @@ Coordinates:
 - After GPT‑R standard completes, launch GPT‑R deep group when headroom holds.
 - Never gate on openaidp; optionally await openaidp at shutdown.
 
+Headroom waits are event-driven (FpfInflightTracker.wait_for_headroom): GPT‑R
+launches the moment an FPF-rest completion frees a slot, with no polling delay.
+
 API:
 - async run_for_file(
     md: str,
@@ -20,7 +23,9 @@ API:
     await_open_at_shutdown: bool = False,
     launch_gptr=None,   # callable: (idx:int, entry:dict) -> asyncio.Task
     launch_dr=None,     # callable: (idx:int, entry:dict) -> asyncio.Task
-    run_fpf_batch=None  # callable: (run_id:str, entries:list[dict], on_event:callable) -> asyncio.Task
+    run_fpf_batch=None, # callable: (run_id:str, entries:list[dict], on_event:callable) -> asyncio.Task
+    tracker=None,       # optional shared FpfInflightTracker (e.g. for caller telemetry)
+    watermarks=None,    # optional {"gptr": int, "dr": int}; overrides low_watermark per group
   ) -> tuple[list, list]
     Returns (rest_tasks, open_tasks) so caller can decide what to await.
 """
@@ -34,18 +39,19 @@ from typing import Callable, Awaitable, Optional, Tuple, List, Dict, Any
 from .fpf_inflight import FpfInflightTracker
 
 
-async def _wait_for_headroom(tracker: Optional[FpfInflightTracker], low_watermark: Optional[int]) -> None:
+async def _wait_for_headroom(tracker: Optional[FpfInflightTracker], low_watermark: Optional[int], name: Optional[str] = None) -> None:
     if tracker is None:
         return
-    while True:
-        try:
-            hr = tracker.headroom(low_watermark=low_watermark)
-            if hr.get("ready", False):
-                return
-            await asyncio.sleep(0.5)
-        except Exception:
-            # Best-effort; avoid blocking on telemetry failures
-            await asyncio.sleep(0.5)
+    try:
+        if name and tracker.has_watermark(name):
+            await tracker.wait_for(name)
+        else:
+            await tracker.wait_for_headroom(low_watermark)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        # Best-effort; never block launches on telemetry failures
+        return
 
 
 async def run_for_file(
@@ -60,6 +66,8 @@ async def run_for_file(
     launch_gptr: Optional[Callable[[int, dict], Awaitable[asyncio.Task]]] = None,
     launch_dr: Optional[Callable[[int, dict], Awaitable[asyncio.Task]]] = None,
     run_fpf_batch: Optional[Callable[[str, list[dict], Callable[[dict], None]], Awaitable[asyncio.Task]]] = None,
+    tracker: Optional[FpfInflightTracker] = None,
+    watermarks: Optional[Dict[str, int]] = None,
 ) -> Tuple[list, list]:
     # Classify configured runs for this file
     fpf_entries: list[dict] = []
@@ -88,7 +96,10 @@ async def run_for_file(
     # Initialize inflight tracker for watermark gating
     totals_rest = len(fpf_rest) * int(iterations)
     totals_deep = len(fpf_openaidp) * int(iterations)
-    tracker = FpfInflightTracker({"rest": totals_rest, "deep": totals_deep})
+    if tracker is None:
+        tracker = FpfInflightTracker({"rest": totals_rest, "deep": totals_deep})
+    for name, lw in (watermarks or {}).items():
+        tracker.set_watermark(name, lw)
 
     # Launch FPF batches immediately (non-blocking)
     rest_task: asyncio.Task | None = None
@@ -96,23 +107,32 @@ async def run_for_file(
     rest_tasks: list = []
     open_tasks: list = []
 
-    async def _run_fpf(run_id: str, group_entries: list[dict]):
-        if run_fpf_batch is None or not group_entries:
-            return None
-        return await run_fpf_batch(run_id, group_entries, tracker.update)
+    async def _run_fpf(run_id: str, group_entries: list[dict], group: str):
+        try:
+            if run_fpf_batch is None or not group_entries:
+                return None
+            return await run_fpf_batch(run_id, group_entries, tracker.update)
+        finally:
+            # No more completions will arrive for this group; do not leave GPT‑R waiting
+            tracker.close(group)
 
     if fpf_openaidp:
         run_id_open = f"fpf-openAidp-{Path(md).stem}"
-        open_task = asyncio.create_task(_run_fpf(run_id_open, fpf_openaidp))
+        open_task = asyncio.create_task(_run_fpf(run_id_open, fpf_openaidp, "deep"))
         open_tasks.append(open_task)
 
     if fpf_rest:
         run_id_rest = f"fpf-rest-{Path(md).stem}"
-        rest_task = asyncio.create_task(_run_fpf(run_id_rest, fpf_rest))
+        rest_task = asyncio.create_task(_run_fpf(run_id_rest, fpf_rest, "rest"))
+    else:
+        tracker.close("rest")
         rest_tasks.append(rest_task)
 
+    # Let the FPF batches start (and report their first events) before checking headroom
+    await asyncio.sleep(0)
+
     # Watermark-gated GPT‑R standard group
-    await _wait_for_headroom(tracker, low_watermark)
+    await _wait_for_headroom(tracker, low_watermark, "gptr")
     if launch_gptr and gptr_entries:
         std_tasks: list[asyncio.Task] = []
         for idx, e in gptr_entries:
@@ -124,7 +144,7 @@ async def run_for_file(
             await asyncio.gather(*std_tasks, return_exceptions=False)
 
     # Watermark-gated GPT‑R deep group (after std completes)
-    await _wait_for_headroom(tracker, low_watermark)
+    await _wait_for_headroom(tracker, low_watermark, "dr")
     if launch_dr and dr_entries:
         dr_tasks: list[asyncio.Task] = []
         for idx, e in dr_entries:
@@ -0,0 +1,413 @@
+"""
+Per-run temp workspaces with reference-counted lifetimes and a background reaper.
+
+All runners used to share one TEMP_BASE (temp_process_markdown_noeval).
+process_file and the end of main() removed it with a synchronous rmtree on
+the event loop, while runs for other files could still be writing into it.
+evaluate.py, for its part, listed the whole system temp dir for stale
+llm_eval_* folders on every run. A multi-GB rmtree blocked the loop for
+seconds and sometimes deleted directories that concurrent tasks still
+used.
+
+Every run now gets its own workspace: a directory under ROOT, created with
+create(kind) and tagged with an owner file (pid, kind). A workspace is
+reference-counted. The creating scope holds one reference. Consumers that
+outlive that scope take their own with acquire() and give it back with
+release(). A scope is the runner step that copies a run's outputs: the
+@scoped process_file_run and process_file_fpf_batch, or the batch itself
+when there is no step scope. When the count drops to zero the workspace
+is queued for the reaper. The reaper is an asyncio task that does the
+rmtree in a worker thread.
+
+Every orphan_scan_seconds the reaper also enforces quotas. A directory
+under ROOT that no workspace object tracks, and whose owner process is
+gone, is an orphan: a crashed batch, or an evaluate.py run. Orphans
+older than max_age are removed. So are llm_eval_* leftovers in the
+system temp dir. If ROOT grows past max_total_mb, the oldest orphans go
+first. Live workspaces are never touched, and neither are workspaces
+owned by another live process. On Windows, where liveness cannot be
+probed, only age counts.
+
+Config (ACM config.yaml):
+  workspaces:
+    keep: false                   # keep every workspace (same as keep_temp)
+    max_age_hours: 6              # orphaned workspaces older than this are removed
+    max_total_mb: 4096            # past this, orphans are removed oldest first (0 = no quota)
+    reap_interval_seconds: 30     # longest a released workspace waits for deletion
+    orphan_scan_seconds: 300      # how often ROOT and the system temp dir are scanned
+
+API:
+- ROOT
+- configure(config, keep=False) -> WorkspaceManager   (module singleton)
+- get_manager() -> WorkspaceManager
+- create(kind) -> Workspace   (held by the current scope, else by the batch)
+- scope(label) -> context manager / scoped(coroutine_fn) -> decorator
+- Workspace.path / .acquire() / .release() (also a context manager holding one reference)
+- await WorkspaceManager.start() / await .stop() / .reap() / .stats() / .summary()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "temp_process_markdown_noeval"))
+OWNER_FILE = ".acm_workspace"
+# evaluate.py / llm_doc_eval leftovers in the system temp dir
+SYSTEM_TEMP_PREFIXES = ("llm_eval_", "llm_doc_eval_single_batch_")
+
+DEFAULT_MAX_AGE_HOURS = 6.0
+DEFAULT_MAX_TOTAL_MB = 4096
+DEFAULT_REAP_INTERVAL = 30.0
+DEFAULT_ORPHAN_SCAN = 300.0
+
+
+@dataclass
+class WorkspaceSettings:
+    keep: bool = False
+    max_age_seconds: float = DEFAULT_MAX_AGE_HOURS * 3600
+    max_total_bytes: int = DEFAULT_MAX_TOTAL_MB * 1024 * 1024
+    reap_interval: float = DEFAULT_REAP_INTERVAL
+    orphan_scan_seconds: float = DEFAULT_ORPHAN_SCAN
+
+
+def _float(value, default: float) -> float:
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+def resolve_workspace_settings(config: Optional[dict], keep: bool = False) -> WorkspaceSettings:
+    raw = (config or {}).get("workspaces") or {}
+    if not isinstance(raw, dict):
+        raw = {}
+    return WorkspaceSettings(
+        keep=bool(keep or raw.get("keep", False)),
+        max_age_seconds=max(0.0, _float(raw.get("max_age_hours"), DEFAULT_MAX_AGE_HOURS) * 3600),
+        max_total_bytes=max(0, int(_float(raw.get("max_total_mb"), DEFAULT_MAX_TOTAL_MB) * 1024 * 1024)),
+        reap_interval=max(0.1, _float(raw.get("reap_interval_seconds"), DEFAULT_REAP_INTERVAL)),
+        orphan_scan_seconds=max(1.0, _float(raw.get("orphan_scan_seconds"), DEFAULT_ORPHAN_SCAN)),
+    )
+
+
+def _pid_alive(pid: int) -> Optional[bool]:
+    """True/False on POSIX; None where it cannot be probed safely (os.kill(pid, 0) terminates on Windows)."""
+    if os.name != "posix":
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _owner_pid(path: str) -> Optional[int]:
+    try:
+        with open(os.path.join(path, OWNER_FILE), "r", encoding="utf-8") as fh:
+            return int(json.load(fh).get("pid"))
+    except Exception:
+        return None
+
+
+def _du(path: str) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.lstat(os.path.join(root, f)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class Workspace:
+    def __init__(self, manager: "WorkspaceManager", path: str, kind: str) -> None:
+        self.manager = manager
+        self.path = path
+        self.kind = kind
+        self.refs = 1
+        self.created = time.time()
+
+    def acquire(self) -> "Workspace":
+        """Take another reference; the directory stays until every reference is released."""
+        with self.manager._lock:
+            if self.refs <= 0:
+                raise RuntimeError(f"workspace {self.path} was already released")
+            self.refs += 1
+        return self
+
+    def release(self) -> None:
+        self.manager._release(self)
+
+    def __enter__(self) -> "Workspace":
+        return self.acquire()
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def __repr__(self) -> str:
+        return f"Workspace({self.path!r}, refs={self.refs})"
+
+
+class _Scope:
+    def __init__(self, label: str) -> None:
+        self.label = label
+        self.held: List[Workspace] = []
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+        held, self.held = self.held, []
+        for ws in held:
+            ws.release()
+
+
+_CURRENT_SCOPE: contextvars.ContextVar[Optional[_Scope]] = contextvars.ContextVar("acm_workspace_scope", default=None)
+
+
+class WorkspaceManager:
+    def __init__(self, settings: Optional[WorkspaceSettings] = None, root: str = ROOT) -> None:
+        self.settings = settings or WorkspaceSettings()
+        self.root = root
+        self._lock = threading.Lock()
+        self._live: Dict[str, Workspace] = {}
+        self._pending: List[str] = []
+        self._batch = _Scope("batch")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"created": 0, "released": 0, "reaped": 0, "orphans_reaped": 0, "quota_reaped": 0, "errors": 0}
+
+    # ---- workspaces ----------------------------------------------------
+
+    def create(self, kind: str) -> Workspace:
+        """New workspace under root, held by the current scope (or the batch)."""
+        os.makedirs(self.root, exist_ok=True)
+        path = tempfile.mkdtemp(prefix=f"{kind}_", dir=self.root)
+        try:
+            with open(os.path.join(path, OWNER_FILE), "w", encoding="utf-8") as fh:
+                json.dump({"pid": os.getpid(), "kind": kind, "created": time.time()}, fh)
+        except Exception as e:
+            print(f"  Warning: could not tag workspace {path}: {e}")
+        ws = Workspace(self, path, kind)
+        with self._lock:
+            self._live[path] = ws
+            self._stats["created"] += 1
+        owner = _CURRENT_SCOPE.get()
+        if owner is None or owner.closed:
+            owner = self._batch
+        owner.held.append(ws)
+        return ws
+
+    def _release(self, ws: Workspace) -> None:
+        with self._lock:
+            if ws.refs <= 0:
+                return
+            ws.refs -= 1
+            if ws.refs > 0:
+                return
+            self._live.pop(ws.path, None)
+            self._stats["released"] += 1
+            if self.settings.keep:
+                return
+            self._pending.append(ws.path)
+        self._notify()
+
+    def _notify(self) -> None:
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            pass  # loop already closed; stop()/reap() picks the path up
+
+    # ---- deletion ------------------------------------------------------
+
+    def _remove(self, path: str, counter: str = "reaped") -> None:
+        try:
+            shutil.rmtree(path)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            shutil.rmtree(path, ignore_errors=True)
+            if os.path.exists(path):
+                with self._lock:
+                    self._stats["errors"] += 1
+                return
+        with self._lock:
+            self._stats[counter] += 1
+
+    def reap(self) -> int:
+        """Delete released workspaces now (blocking); returns how many were removed."""
+        with self._lock:
+            paths, self._pending = self._pending, []
+        for path in paths:
+            self._remove(path)
+        return len(paths)
+
+    def _orphans(self) -> List[Tuple[float, str, bool]]:
+        """(mtime, path, owner_unknown) of directories under root that no live owner holds, oldest first."""
+        out: List[Tuple[float, str, bool]] = []
+        with self._lock:
+            tracked = set(self._live) | set(self._pending)
+        try:
+            entries = list(os.scandir(self.root))
+        except OSError:
+            return out
+        me = os.getpid()
+        for entry in entries:
+            try:
+                if not entry.is_dir(follow_symlinks=False) or entry.path in tracked:
+                    continue
+                pid = _owner_pid(entry.path)
+                if pid == me:
+                    continue  # ours, from an earlier manager in this process (or kept)
+                alive = _pid_alive(pid) if pid is not None else False
+                if alive:
+                    continue
+                out.append((entry.stat(follow_symlinks=False).st_mtime, entry.path, alive is None))
+            except OSError:
+                continue
+        return sorted(out)
+
+    def scan(self) -> None:
+        """Age and size quotas over root, plus stale eval dirs in the system temp dir (blocking)."""
+        if self.settings.keep:
+            return
+        now = time.time()
+        cutoff = now - self.settings.max_age_seconds
+        orphans = self._orphans()
+        for mtime, path, _unknown in orphans:
+            if mtime < cutoff:
+                self._remove(path, "orphans_reaped")
+        try:
+            temp_root = tempfile.gettempdir()
+            for entry in os.scandir(temp_root):
+                if entry.name.startswith(SYSTEM_TEMP_PREFIXES) and entry.is_dir(follow_symlinks=False):
+                    if entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                        self._remove(entry.path, "orphans_reaped")
+        except OSError:
+            pass
+        if not self.settings.max_total_bytes:
+            return
+        try:
+            total = sum(_du(e.path) for e in os.scandir(self.root) if e.is_dir(follow_symlinks=False))
+        except OSError:
+            return
+        # Under quota pressure only directories whose owner is known to be gone (or untagged) go
+        for _mtime, path, unknown in self._orphans():
+            if total <= self.settings.max_total_bytes:
+                break
+            if unknown or not os.path.exists(path):
+                continue
+            size = _du(path)
+            self._remove(path, "quota_reaped")
+            total -= size
+
+    async def _run(self) -> None:
+        last_scan = 0.0
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.settings.reap_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await asyncio.to_thread(self.reap)
+                if time.monotonic() - last_scan >= self.settings.orphan_scan_seconds:
+                    last_scan = time.monotonic()
+                    await asyncio.to_thread(self.scan)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"  Warning: workspace reaper: {e}")
+
+    # ---- lifecycle / metrics -------------------------------------------
+
+    async def start(self) -> "WorkspaceManager":
+        """Start the reaper on the running loop (idempotent)."""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def stop(self) -> None:
+        """Release the batch's remaining workspaces and delete everything released, off the loop."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        self._batch.close()
+        self._loop = self._wake = None
+        await asyncio.to_thread(self.reap)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["live"] = len(self._live)
+            out["pending"] = len(self._pending)
+        return out
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (f"created={s['created']} live={s['live']} pending={s['pending']} reaped={s['reaped']} "
+                f"orphans_reaped={s['orphans_reaped']} quota_reaped={s['quota_reaped']} errors={s['errors']}")
+
+
+@contextlib.contextmanager
+def scope(label: str = "scope"):
+    """Workspaces created inside (including by tasks started inside) are released on exit."""
+    s = _Scope(label)
+    token = _CURRENT_SCOPE.set(s)
+    try:
+        yield s
+    finally:
+        _CURRENT_SCOPE.reset(token)
+        s.close()
+
+
+def scoped(fn):
+    """Decorator form of scope() for coroutine functions."""
+    @functools.wraps(fn)
+    async def _wrapper(*args, **kwargs):
+        with scope(fn.__name__):
+            return await fn(*args, **kwargs)
+    return _wrapper
+
+
+_MANAGER: Optional[WorkspaceManager] = None
+
+
+def configure(config: Optional[dict], keep: bool = False) -> WorkspaceManager:
+    """Build the module-level manager for a batch (call start() from the batch's loop)."""
+    global _MANAGER
+    _MANAGER = WorkspaceManager(resolve_workspace_settings(config, keep=keep))
+    return _MANAGER
+
+
+def get_manager() -> WorkspaceManager:
+    global _MANAGER
+    if _MANAGER is None:
+        _MANAGER = WorkspaceManager()
+    return _MANAGER
+
+
+def create(kind: str) -> Workspace:
+    return get_manager().create(kind)
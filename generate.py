@@ -217,12 +217,17 @@ async def main():
 
 
 if __name__ == "__main__":
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    cfg = os.path.join(current_dir, "config.yaml")
     # Delegate orchestration to the centralized runner to avoid duplicated logic.
     try:
         import runner
     except Exception:
         # If running as a module, try package import
         from api_cost_multiplier import runner
-    runner.run(cfg)
+    # --config / --resume [BATCH_ID] / --plan / --submit (see runner.parse_cli_args)
+    args = runner.parse_cli_args()
+    if args.plan:
+        runner.plan_main(args.config, json_path=args.plan if isinstance(args.plan, str) else None)
+        sys.exit(0)
+    if args.submit:
+        sys.exit(0 if runner.submit_to_daemon(args.config, url=args.daemon_url, resume=args.resume) else 1)
+    runner.run(args.config, resume=args.resume)
@@ -5,7 +5,7 @@ import shutil
 import json
 import re
 import tempfile
-import subprocess
+import collections
 from pathlib import Path
 import logging
 import logging.handlers
@@ -31,7 +31,13 @@ from functions import pm_utils, MA_runner
 from functions import fpf_runner
 from functions import config_parser, file_manager, gpt_researcher_client
 from functions import logging_levels
-from functions.fpf_inflight import FpfInflightTracker
+from functions.fpf_inflight import FpfInflightTracker, resolve_watermarks
+from functions.file_pipeline import FilePipeline, resolve_pipeline_settings
+from functions.dag import Dag
+from functions.loop_lag import LoopLagMonitor
+from functions import rate_limiter, adaptive_concurrency, hedging, artifact_index, artifact_manifest, deadlines, job_queue, daemon, planner, cost_ledger, process_runner, log_sink, preset_sweep, run_context, workspaces, proc_sampler, memory_admission, fork_server
+from functions.run_history import RunHistory, resolve_launch_order
+from functions.run_journal import RunJournal, gen_unit, eval_unit, resolve_journal_settings
 
 """
 runner.py
@@ -40,13 +46,20 @@ Centralized orchestration for process_markdown pipelines.
 This consolidates duplicated logic from generate.py and generate_gptr_only.py.
 
 Primary entrypoints:
-- async main(config_path, run_ma=True, run_fpf=True, num_runs=3, keep_temp=False)
-- run(config_path, run_ma=True, run_fpf=True, num_runs=3, keep_temp=False)  # sync wrapper
+- async main(config_path, run_ma=True, run_fpf=True, num_runs=3, keep_temp=False, resume=False)
+- run(config_path, run_ma=True, run_fpf=True, num_runs=3, keep_temp=False, resume=False)  # sync wrapper
 """
 
 TEMP_BASE = MA_runner.TEMP_BASE
 # Hard timeout for GPT-Researcher programmatic runs (seconds)
 GPTR_TIMEOUT_SECONDS = 600
+# evaluate.py stdout lines kept in memory once streamed; everything else is only echoed
+EVAL_STDOUT_MARKERS = (
+    "[EVAL_SUMMARY]",
+    "[EVAL_EXPORTS]",
+    "Copied best report to final location:",
+    "Saved winner to winners directory:",
+)
 
 # Dedicated file logger for subprocess output (initialized in main)
 SUBPROC_LOGGER: logging.Logger | None = None
@@ -54,6 +67,9 @@ SUBPROC_LOGGER: logging.Logger | None = None
 # Active streaming eval manager (initialized when streaming eval is enabled in main)
 STREAMING_EVAL_MANAGER: "StreamingEvalManager | None" = None
 
+# Durable run journal for crash-resume (initialized in main when journal.enabled)
+RUN_JOURNAL: RunJournal | None = None
+
 
 class StreamingEvalManager:
     """
@@ -66,27 +82,35 @@ class StreamingEvalManager:
         # After all generation complete:
         await manager.wait_all()
         # Then run pairwise...
+
+    Pipelined mode (concurrency.pipeline) evaluates several input files at once, so each
+    file gets its own scope: open_scope() routes that file's outputs to a dedicated DB
+    and wait_scope() waits for just those evals.
     """
     
-    def __init__(self, db_path: str, config_path: str, iterations: int = 1):
+    def __init__(self, db_path: str, config_path: str, iterations: int = 1, judges: list[tuple[str, str]] | None = None):
         self.db_path = db_path
         self.config_path = config_path
         self.iterations = iterations
+        self.judges = list(judges or [])  # (provider, model) pairs; each eval holds a rate-limiter slot per judge
         self.tasks: list[asyncio.Task] = []
         self.results: list[dict] = []
         self._lock = asyncio.Lock()
         self._spawned_files: set[str] = set()  # Track spawned files to prevent duplicates
         self._spawned_lock = threading.Lock()  # Thread-safe lock for spawned_files
         self._loop: asyncio.AbstractEventLoop = None  # Will be set when first task is spawned from main loop
+        # Per-file scopes (pipelined mode): key -> {"output_dir", "base_name", "db_path", "tasks", "results"}
+        self._scopes: dict[str, dict] = {}
         
         # Ensure the shared DB exists with proper schema
         self._ensure_db_exists()
         
-    def _ensure_db_exists(self) -> None:
+    def _ensure_db_exists(self, db_path: str | None = None) -> None:
         """Create the streaming eval database with required tables."""
         import sqlite3
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        conn = sqlite3.connect(self.db_path)
+        db_path = db_path or self.db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = sqlite3.connect(db_path)
         try:
             cur = conn.cursor()
             cur.execute("""
@@ -124,6 +148,50 @@ class StreamingEvalManager:
             conn.commit()
         finally:
             conn.close()
+
+    def open_scope(self, key: str, output_dir: str, base_name: str) -> str:
+        """Route evals for `{output_dir}/{base_name}.*` to a per-file DB. Returns the DB path."""
+        root, ext = os.path.splitext(self.db_path)
+        safe = re.sub(r"[^A-Za-z0-9._-]+", "_", base_name)[:60] or "file"
+        db_path = f"{root}_{safe}{ext or '.db'}"
+        self._ensure_db_exists(db_path)
+        with self._spawned_lock:
+            self._scopes[key] = {
+                "output_dir": os.path.normcase(os.path.normpath(os.path.abspath(output_dir))),
+                "base_name": base_name,
+                "db_path": db_path,
+                "tasks": [],
+                "results": [],
+            }
+        return db_path
+
+    # Generated outputs are named {base_name}.{kind}.{idx}.{model}.{uid}.{ext} (see save_generated_reports)
+    _OUTPUT_KINDS = ("fpf", "gptr", "dr", "ma")
+
+    def _scope_for(self, norm_path: str) -> dict | None:
+        # Match the full "{base_name}.{kind}." prefix so that report.md and report.v2.md in the
+        # same directory don't both claim report.v2.fpf.1.x.md; the longest base name wins.
+        d = os.path.normcase(os.path.dirname(norm_path))
+        fname = os.path.basename(norm_path)
+        best = None
+        for scope in self._scopes.values():
+            if scope["output_dir"] != d:
+                continue
+            base = scope["base_name"]
+            if any(fname.startswith(f"{base}.{kind}.") for kind in self._OUTPUT_KINDS):
+                if best is None or len(base) > len(best["base_name"]):
+                    best = scope
+        return best
+
+    async def wait_scope(self, key: str) -> list[dict]:
+        """Wait for the evals spawned for one scope (see open_scope) and return their results."""
+        scope = self._scopes.get(key)
+        if not scope:
+            return []
+        pending = [t if isinstance(t, asyncio.Task) else asyncio.wrap_future(t) for t in list(scope["tasks"])]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        return list(scope["results"])
         
     def spawn_eval(self, file_path: str) -> None:
         """Spawn a streaming eval task for a single file (non-blocking). Deduplicates by path.
@@ -140,23 +208,29 @@ class StreamingEvalManager:
                 print(f"  [STREAMING_EVAL] Skipping duplicate: {os.path.basename(file_path)}")
                 return
             self._spawned_files.add(norm_path)
+            scope = self._scope_for(norm_path)
+        db_path = scope["db_path"] if scope else self.db_path
         
         # Try to get the running loop - if we're in the main async context, use create_task
         # If we're in a different thread, use run_coroutine_threadsafe
         try:
             loop = asyncio.get_running_loop()
             # We're in an async context, can use create_task directly
-            task = asyncio.create_task(self._run_single_eval(file_path))
+            task = asyncio.create_task(self._run_single_eval(file_path, db_path, scope))
             self.tasks.append(task)
+            if scope is not None:
+                scope["tasks"].append(task)
             print(f"  [STREAMING_EVAL] Spawned eval for: {os.path.basename(file_path)} (full path: {file_path})")
         except RuntimeError:
             # No running event loop - we're being called from a thread
             # Use the stored loop reference if available
             if self._loop is not None:
-                future = asyncio.run_coroutine_threadsafe(self._run_single_eval(file_path), self._loop)
+                future = asyncio.run_coroutine_threadsafe(self._run_single_eval(file_path, db_path, scope), self._loop)
                 # Wrap the concurrent.futures.Future in a way we can track
                 # We'll use a sentinel approach - store the future and later await it
                 self.tasks.append(future)  # Note: this is a concurrent.futures.Future, not asyncio.Task
+                if scope is not None:
+                    scope["tasks"].append(future)
                 print(f"  [STREAMING_EVAL] Spawned eval (threadsafe) for: {os.path.basename(file_path)} (full path: {file_path})")
             else:
                 print(f"  [STREAMING_EVAL] WARNING: No event loop available, cannot spawn eval for: {os.path.basename(file_path)}")
@@ -165,8 +239,9 @@ class StreamingEvalManager:
         """Set the event loop reference for thread-safe spawning."""
         self._loop = loop
         
-    async def _run_single_eval(self, file_path: str) -> dict:
+    async def _run_single_eval(self, file_path: str, db_path: str | None = None, scope: dict | None = None) -> dict:
         """Run single eval subprocess for one file."""
+        db_path = db_path or self.db_path
         try:
             script_dir = os.path.dirname(os.path.abspath(__file__))
             eval_script = os.path.join(script_dir, "evaluate.py")
@@ -174,7 +249,7 @@ class StreamingEvalManager:
             cmd = [
                 sys.executable, "-u", eval_script,
                 "--single-file", file_path,
-                "--db-path", self.db_path,
+                "--db-path", db_path,
                 "--config", self.config_path,
                 "--iterations", str(self.iterations),
             ]
@@ -183,15 +258,18 @@ class StreamingEvalManager:
             env.setdefault("PYTHONIOENCODING", "utf-8")
             env.setdefault("PYTHONUTF8", "1")
             
-            proc = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT,
-                env=env,
-            )
-            
-            stdout, _ = await proc.communicate()
-            output = stdout.decode("utf-8", errors="replace") if stdout else ""
+            # Full output goes to the subprocess log; only a short merged tail is kept per file
+            tail: collections.deque[str] = collections.deque(maxlen=10)
+
+            def _on_line(stream, line):
+                tail.append(line)
+                if SUBPROC_LOGGER is not None:
+                    SUBPROC_LOGGER.info("[SEVAL %s] %s", os.path.basename(file_path), line, extra={"acm_source": f"seval:{file_path}"})
+
+            limiter = rate_limiter.get_rate_limiter()
+            async with limiter.limit_many(self.judges, requests=int(self.iterations or 1), kind="eval"):
+                proc = await process_runner.run_process(cmd, env=env, on_line=_on_line, tail_lines=0, stats_tag="seval-{pid}", stats_kind="eval")
+            output = "\n".join(tail)
             
             result = {
                 "file": file_path,
@@ -202,17 +280,16 @@ class StreamingEvalManager:
             
             async with self._lock:
                 self.results.append(result)
+                if scope is not None:
+                    scope["results"].append(result)
             
             if proc.returncode == 0:
                 print(f"  [STREAMING_EVAL] ✓ Completed: {os.path.basename(file_path)}")
             else:
                 print(f"  [STREAMING_EVAL] ✗ Failed: {os.path.basename(file_path)} (code {proc.returncode})")
                 # Print last lines of output for debugging (errors typically at end)
-                if output:
-                    lines = output.strip().split('\n')
-                    # Show last 10 lines
-                    for line in lines[-10:]:
-                        print(f"    > {line}")
+                for line in tail:
+                    print(f"    > {line}")
                 
             return result
             
@@ -221,6 +298,8 @@ class StreamingEvalManager:
             result = {"file": file_path, "error": str(e)}
             async with self._lock:
                 self.results.append(result)
+                if scope is not None:
+                    scope["results"].append(result)
             return result
     
     async def wait_all(self) -> list[dict]:
@@ -265,6 +344,18 @@ class StreamingEvalManager:
         return self.results
 
 
+def _eval_judge_pairs(cfg: dict) -> list[tuple[str, str]]:
+    """(provider, model) pairs of the configured eval judges, for provider rate limiting."""
+    pairs = []
+    try:
+        for j in ((cfg or {}).get("eval") or {}).get("judges") or []:
+            if isinstance(j, dict) and j.get("model"):
+                pairs.append((str(j.get("provider") or ""), str(j.get("model"))))
+    except Exception:
+        pass
+    return pairs
+
+
 def _resolve_gptr_concurrency(cfg: dict) -> tuple[bool, int, float]:
     """
     Resolve GPTâ€‘Researcher concurrency settings from ACM config.yaml with optional policy overlay.
@@ -414,8 +505,12 @@ def save_generated_reports(input_md_path: str, input_base_dir: str, output_base_
     saved = []
     seen_src = set()
     
-    def _notify_saved(file_path: str):
-        """Notify callback or global streaming eval manager."""
+    def _notify_saved(file_path: str, kind: str, model=None):
+        """Record the artifact in the batch manifest, then notify callback or global streaming eval manager."""
+        try:
+            artifact_manifest.get_manifest().record(file_path, kind, model, input_file=input_md_path)
+        except Exception as e:
+            print(f"    Warning: failed to record {file_path} in artifact manifest: {e}")
         if on_file_saved:
             try:
                 on_file_saved(file_path)
@@ -427,20 +522,6 @@ def save_generated_reports(input_md_path: str, input_base_dir: str, output_base_
             except Exception as e:
                 print(f"    Warning: streaming eval spawn failed: {e}")
 
-    # Honor one_file_only policy for MA artifacts (align with output_manager)
-    one_file_only = False
-    try:
-        # Prefer repo-local config.yaml
-        repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-        cfg_path = os.path.join(repo_root, "config.yaml")
-        if os.path.isfile(cfg_path) and (yaml is not None):
-            with open(cfg_path, "r", encoding="utf-8") as _fh:
-                _cfg = yaml.safe_load(_fh) or {}
-                one_file_only = bool(_cfg.get("one_file_only", False))
-    except Exception:
-        # Best-effort: default to False if config cannot be read
-        pass
-
     # Prepare MA list with optional reduction to a single preferred artifact
     ma_items = list(generated_paths.get("ma", [])) if isinstance(generated_paths.get("ma", []), list) else []
     if ma_items: # Always apply this logic for MA outputs
@@ -522,7 +603,7 @@ def save_generated_reports(input_md_path: str, input_base_dir: str, output_base_
             shutil.copy2(p, dest)
             saved.append(dest)
             seen_src.add(p)
-            _notify_saved(dest)
+            _notify_saved(dest, "ma", model)
         except Exception as e:
             print(f"    Failed to save MA report {p} -> {dest}: {e}")
 
@@ -540,7 +621,7 @@ def save_generated_reports(input_md_path: str, input_base_dir: str, output_base_
             shutil.copy2(p, dest)
             saved.append(dest)
             seen_src.add(p)
-            _notify_saved(dest)
+            _notify_saved(dest, "gptr", model)
         except Exception as e:
             print(f"    Failed to save GPT-R report {p} -> {dest}: {e}")
 
@@ -558,7 +639,7 @@ def save_generated_reports(input_md_path: str, input_base_dir: str, output_base_
             shutil.copy2(p, dest)
             saved.append(dest)
             seen_src.add(p)
-            _notify_saved(dest)
+            _notify_saved(dest, "dr", model)
         except Exception as e:
             print(f"    Failed to save Deep research report {p} -> {dest}: {e}")
 
@@ -588,13 +669,16 @@ def save_generated_reports(input_md_path: str, input_base_dir: str, output_base_
                 final_dest = p
             saved.append(final_dest)
             seen_src.add(p)
-            _notify_saved(final_dest)
+            _notify_saved(final_dest, "fpf", model)
         except Exception as e:
             print(f"    Failed to save FPF report {p}: {e}")
 
+    # Keep the skip-check index current without re-listing the output directory
+    artifact_index.get_index().add_paths(saved)
     return saved
 
 
+@workspaces.scoped
 async def process_file(md_file_path: str, config: dict, run_ma: bool = True, run_fpf: bool = True, num_runs_group: dict | None = None, keep_temp: bool = False):
     input_folder = os.path.abspath(config["input_folder"])
     output_folder = os.path.abspath(config["output_folder"])
@@ -608,15 +692,13 @@ async def process_file(md_file_path: str, config: dict, run_ma: bool = True, run
         return
 
     try:
-        with open(md_file_path, "r", encoding="utf-8") as f:
-            markdown_content = f.read()
+        markdown_content = run_context.read_text(md_file_path)
     except Exception as e:
         print(f"  Error reading {md_file_path}: {e}")
         return
 
     try:
-        with open(instructions_file, "r", encoding="utf-8") as f:
-            instructions_content = f.read()
+        instructions_content = run_context.read_text(instructions_file)
     except Exception as e:
         print(f"  Error reading instructions {instructions_file}: {e}")
         return
@@ -711,23 +793,56 @@ async def process_file(md_file_path: str, config: dict, run_ma: bool = True, run
     # NOTE: Evaluation trigger removed - now centralized in main() after ALL processing completes
     # This prevents partial evaluations that waste API costs on incomplete file sets
 
-    # Cleanup
+    # Temp workspaces created for this file are released when this (scoped) call returns
+
+
+def _journal_finish_units(journal: RunJournal, units: list[str], saved: list[str]) -> None:
+    """Mark generation units done; outputs pair up with units when counts match (one file per iteration)."""
     try:
-        if os.path.exists(TEMP_BASE) and not keep_temp:
-            shutil.rmtree(TEMP_BASE)
+        if len(units) == len(saved):
+            for unit, path in zip(units, saved):
+                journal.finish(unit, outputs=[path])
+        else:
+            for unit in units:
+                journal.finish(unit, outputs=list(saved))
     except Exception as e:
-        print(f"  Warning: failed to cleanup temp dir {TEMP_BASE}: {e}")
+        print(f"  Warning: run journal update failed: {e}")
 
 
-async def process_file_run(md_file_path: str, config: dict, run_entry: dict, iterations: int, keep_temp: bool = False, forward_subprocess_output: bool = True):
+@workspaces.scoped
+async def process_file_run(md_file_path: str, config: dict, run_entry: dict, iterations: int, keep_temp: bool = False, forward_subprocess_output: bool = True, run_index: int | None = None):
     """
     Runs exactly one 'run' (type+model+provider) for the given markdown file, repeating 'iterations' times.
     Mutates tool config files on disk per run (with backup/restore), executes, and saves outputs.
+    run_index (position in config runs[]) ties each iteration to a run journal unit; iterations the
+    journal already records as done are skipped.
     """
     input_folder = os.path.abspath(config["input_folder"])
     output_folder = os.path.abspath(config["output_folder"])
     instructions_file = os.path.abspath(config["instructions_file"])
 
+    journal = RUN_JOURNAL if run_index is not None else None
+    pending_iters = list(range(1, int(iterations) + 1))
+    if journal is not None:
+        pending_iters = [i for i in pending_iters if not journal.is_done(gen_unit(md_file_path, run_index, i))]
+        if not pending_iters:
+            print(f"  [JOURNAL] run #{run_index} already complete for {os.path.basename(md_file_path)}; skipping")
+            return
+    pending_units = [gen_unit(md_file_path, run_index, i) for i in pending_iters] if journal is not None else []
+    ok_units: list[str] = []
+    if deadlines.current().expired():
+        # File/batch budget already spent: do not launch (left failed for --resume)
+        print(f"  [DEADLINE] skipping {run_entry.get('type')}:{run_entry.get('model')} for {os.path.basename(md_file_path)}: {deadlines.current().reason()}")
+        for unit in pending_units:
+            journal.fail(unit, deadlines.current().reason())
+        return
+    if not cost_ledger.get_ledger().allow_launch(run_entry.get("provider") or None):
+        # Soft budget reached: launch nothing new (left failed for --resume)
+        print(f"  [BUDGET] skipping {run_entry.get('type')}:{run_entry.get('model')} for {os.path.basename(md_file_path)}: {cost_ledger.get_ledger().reason()}")
+        for unit in pending_units:
+            journal.fail(unit, cost_ledger.get_ledger().reason())
+        return
+
     print(f"\n[RUN] type={run_entry.get('type')} provider={run_entry.get('provider')} model={run_entry.get('model')} file={md_file_path}")
     # Emit standardized RUN_START event via ACM logger
     try:
@@ -740,15 +855,13 @@ async def process_file_run(md_file_path: str, config: dict, run_entry: dict, ite
 
     # Read inputs
     try:
-        with open(md_file_path, "r", encoding="utf-8") as f:
-            markdown_content = f.read()
+        markdown_content = run_context.read_text(md_file_path)
     except Exception as e:
         print(f"  Error reading {md_file_path}: {e}")
         return
 
     try:
-        with open(instructions_file, "r", encoding="utf-8") as f:
-            instructions_content = f.read()
+        instructions_content = run_context.read_text(instructions_file)
     except Exception as e:
         print(f"  Error reading instructions {instructions_file}: {e}")
         return
@@ -780,8 +893,7 @@ async def process_file_run(md_file_path: str, config: dict, run_entry: dict, ite
 
         # Build prompt file once
         try:
-            pm_utils.ensure_temp_dir(TEMP_BASE)
-            tmp_prompt = tempfile.NamedTemporaryFile(delete=False, dir=TEMP_BASE, suffix=".txt")
+            tmp_prompt = tempfile.NamedTemporaryFile(delete=False, dir=workspaces.create("gptr_prompt").path, suffix=".txt")
             tmp_prompt_path = tmp_prompt.name
             tmp_prompt.write(query_prompt.encode("utf-8"))
             try:
@@ -799,8 +911,37 @@ async def process_file_run(md_file_path: str, config: dict, run_entry: dict, ite
         report_type = "research_report" if rtype == "gptr" else "deep"
 
         # Run N iterations via subprocess to ensure the patched file is respected
-        for i in range(1, int(iterations) + 1):
-            print(f"  Running GPT-Researcher ({report_type}) iteration {i}/{iterations} ...")
+        limiter = rate_limiter.get_rate_limiter()
+        est_tokens = limiter.estimate_tokens(query_prompt, rtype)
+        deadline_settings = deadlines.get_settings()
+        expired_iters: dict[int, str] = {}  # iteration -> journal detail for deadline kills
+
+        def _charge_gptr(lines: list[str], pid) -> None:
+            # gptr_subprocess reports researcher.get_costs() as cost_usd on its JSON result/error line
+            for line in reversed(lines):
+                s = line.strip()
+                if s.startswith("{") and "cost_usd" in s:
+                    try:
+                        usd = json.loads(s).get("cost_usd")
+                    except Exception:
+                        continue
+                    cost_ledger.get_ledger().charge(provider, model, usd, cost_ledger.PHASE_GENERATE, source=rtype, key=f"{rtype}:{pid}")
+                    return
+
+        async def _gptr_attempt(i: int, hedge: bool = False):
+            """One GPT-R child for iteration i. Returns (path, model) on success, else None."""
+            # Hold a provider slot (rpm/tpm/concurrency) for the lifetime of this child
+            lease = await limiter.acquire(provider, model, requests=1, tokens=est_tokens, kind=rtype)
+            # The run budget starts once the child can actually launch; file/batch deadlines still bound it
+            run_deadline = deadlines.current().child(deadline_settings.for_run(rtype), f"run:{rtype}")
+            iter_ok = False
+            cancelled = False
+            proc = None
+            err_tail: list[str] = []  # last stderr lines, classified for adaptive concurrency
+            # Only JSON result/error lines are kept (path, model, cost_usd); the full output goes to SUBPROC_LOGGER
+            json_lines: collections.deque[str] = collections.deque(maxlen=8)
+            res = None
+            print(f"  Running GPT-Researcher ({report_type}) iteration {i}/{iterations}{' (hedge)' if hedge else ''} ...")
             cmd = [
                 sys.executable,
                 "-u",
@@ -815,84 +956,79 @@ async def process_file_run(md_file_path: str, config: dict, run_entry: dict, ite
                 env = os.environ.copy()
                 env.setdefault("PYTHONIOENCODING", "utf-8")
                 env.setdefault("PYTHONUTF8", "1")
+                # Preset GPT-R settings (sweeps) as env overrides, read by gpt-researcher's Config
+                for key, value in (config.get("gptr_env") or {}).items():
+                    env[str(key)] = str(value)
                 # Inject provider/model for this subprocess only (no shared file edits)
                 env["SMART_LLM"] = target
                 env["STRATEGIC_LLM"] = target
                 env["FAST_LLM"] = target
-                # Spawn subprocess and stream stdout/stderr so progress is visible in parent console.
-                proc = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    stdin=subprocess.DEVNULL,
-                    env=env,
-                    text=True,
-                    encoding="utf-8",
-                    errors="replace",
-                )
-                if SUBPROC_LOGGER:
-                    SUBPROC_LOGGER.info(f"[GPTR_START] pid={proc.pid} type={report_type} model={target}")
+                run_deadline.apply_env(env)
 
-                out_lines = []
                 missing_prompt_err = False
                 had_retry = False
 
-                def _stream(pipe, prefix):
+                def _on_start(p):
+                    nonlocal proc
+                    proc = p
+                    if SUBPROC_LOGGER:
+                        SUBPROC_LOGGER.info(f"[GPTR_START] pid={p.pid} type={report_type} model={target}" + (" hedge=1" if hedge else ""))
+
+                def _on_line(stream, line):
                     nonlocal missing_prompt_err
+                    prefix = "ERR" if stream == process_runner.STDERR else "OUT"
+                    # Always write child output to file logger (if configured)
                     try:
-                        for raw_line in iter(pipe.readline, ''):
-                            if raw_line == '':
-                                break
-                            line = raw_line.rstrip("\n")
-                            # Always write child output to file logger (if configured)
-                            try:
-                                if SUBPROC_LOGGER is not None:
-                                    if prefix == "ERR":
-                                        SUBPROC_LOGGER.warning("[%s] %s", prefix, line)
-                                    else:
-                                        SUBPROC_LOGGER.info("[%s] %s", prefix, line)
-                            except Exception:
-                                # Do not let logging failures disrupt the run
-                                pass
+                        if SUBPROC_LOGGER is not None:
+                            source = {"acm_source": f"gptr:{proc.pid if proc is not None else i}"}
+                            if prefix == "ERR":
+                                SUBPROC_LOGGER.warning("[%s] %s", prefix, line, extra=source)
+                            else:
+                                SUBPROC_LOGGER.info("[%s] %s", prefix, line, extra=source)
+                    except Exception:
+                        # Do not let logging failures disrupt the run
+                        pass
 
-                            # Detect prompt-file missing error for single auto-retry
-                            if prefix == "ERR" and "Prompt file not found:" in line:
-                                missing_prompt_err = True
+                    # Detect prompt-file missing error for single auto-retry
+                    if prefix == "ERR" and "Prompt file not found:" in line:
+                        missing_prompt_err = True
+                    if prefix == "ERR":
+                        err_tail.append(line)
+                        del err_tail[:-40]
 
-                            # Respect forwarding toggle to console/logger
-                            if forward_subprocess_output:
-                                try:
-                                    acm_logger = logging.getLogger("acm")
-                                    if prefix == "ERR":
-                                        acm_logger.warning("[%s] %s", prefix, line)
-                                    else:
-                                        acm_logger.info("[%s] %s", prefix, line)
-                                except Exception:
-                                    print(f"    [{prefix}] {line}")
-                                    sys.stdout.flush()
-                            # Regardless of forwarding, preserve logic that needs OUT lines for JSON parsing
-                            if prefix == "OUT":
-                                out_lines.append(line)
-                    finally:
+                    # Respect forwarding toggle to console/logger
+                    if forward_subprocess_output:
                         try:
-                            pipe.close()
+                            acm_logger = logging.getLogger("acm")
+                            if prefix == "ERR":
+                                acm_logger.warning("[%s] %s", prefix, line)
+                            else:
+                                acm_logger.info("[%s] %s", prefix, line, extra={"acm_source": f"gptr:{proc.pid if proc is not None else i}"})
                         except Exception:
-                            pass
-
-                import threading as _threading
-                t_out = _threading.Thread(target=_stream, args=(proc.stdout, "OUT"), daemon=True)
-                t_err = _threading.Thread(target=_stream, args=(proc.stderr, "ERR"), daemon=True)
-                t_out.start()
-                t_err.start()
-
-                # Do not block the asyncio event loop while waiting for the child to exit
-                loop = asyncio.get_running_loop()
-                await loop.run_in_executor(None, proc.wait)
-                t_out.join(timeout=1)
-                t_err.join(timeout=1)
+                            print(f"    [{prefix}] {line}")
+                            sys.stdout.flush()
+                    # Regardless of forwarding, preserve logic that needs JSON lines for parsing/costs
+                    if line.lstrip().startswith("{"):
+                        json_lines.append(line)
+
+                # Stream stdout/stderr on the event loop so progress is visible in parent console.
+                # Own process group: a deadline kill takes the child's browsers/helpers down with it.
+                # stats_tag matches the timeline's "gptr-<pid>" run id, so [PROC_STATS] lands on this run
+                res = await process_runner.run_process(
+                    cmd, env=env, on_line=_on_line, on_start=_on_start, deadline=run_deadline, tail_lines=40,
+                    stats_tag="gptr-{pid}", stats_kind="dr" if report_type == "deep" else "gptr",
+                )
+                finished = not res.timed_out
 
-                if proc.returncode != 0:
-                    print(f"    ERROR: gpt-researcher subprocess failed (rc={proc.returncode})")
+                if not finished:
+                    # Expired: the whole process group was terminated; not a provider failure
+                    cancelled = True
+                    expired_iters[i] = run_deadline.reason()
+                    print(f"    ERROR: gpt-researcher subprocess killed: {run_deadline.reason()}")
+                    if SUBPROC_LOGGER:
+                        SUBPROC_LOGGER.info(f"[GPTR_END] pid={proc.pid} result=failure reason=deadline")
+                elif res.returncode != 0:
+                    print(f"    ERROR: gpt-researcher subprocess failed (rc={res.returncode})")
                     # One-time auto-retry if the prompt file was reported missing
                     if missing_prompt_err and not had_retry:
                         try:
@@ -909,28 +1045,23 @@ async def process_file_run(md_file_path: str, config: dict, run_entry: dict, ite
                         try:
                             if SUBPROC_LOGGER:
                                 SUBPROC_LOGGER.info("[GPTR_RETRY] reason=missing_prompt_file")
-                            proc2 = subprocess.Popen(
-                                cmd,
-                                stdout=subprocess.PIPE,
-                                stderr=subprocess.PIPE,
-                                stdin=subprocess.DEVNULL,
-                                env=env,
-                                text=True,
-                                encoding="utf-8",
-                                errors="replace",
+                            proc2 = await process_runner.run_process(
+                                cmd, env=env, deadline=run_deadline.child(GPTR_TIMEOUT_SECONDS, "run:gptr_retry"),
+                                tail_lines=40, keep=process_runner.json_line,
+                                stats_tag="gptr-{pid}", stats_kind="dr" if report_type == "deep" else "gptr",
                             )
-                            out2, err2 = proc2.communicate(timeout=GPTR_TIMEOUT_SECONDS)
                             had_retry = True
-                            if proc2.returncode == 0:
+                            _charge_gptr(proc2.kept + proc2.stderr, proc2.pid)
+                            if proc2.ok:
                                 # Parse last JSON line from stdout
                                 last_line2 = ""
-                                for l2 in reversed(out2.splitlines() if out2 else []):
+                                for l2 in reversed(proc2.kept):
                                     s2 = l2.strip()
                                     if s2.startswith("{") and s2.endswith("}"):
                                         last_line2 = s2
                                         break
-                                if not last_line2 and out2:
-                                    last_line2 = out2.splitlines()[-1]
+                                if not last_line2 and proc2.stdout:
+                                    last_line2 = proc2.stdout[-1]
                                 data2 = {}
                                 try:
                                     data2 = json.loads(last_line2) if last_line2 else {}
@@ -939,14 +1070,11 @@ async def process_file_run(md_file_path: str, config: dict, run_entry: dict, ite
                                 out_path2 = data2.get("path")
                                 out_model2 = data2.get("model") or target
                                 if out_path2 and os.path.exists(out_path2):
-                                    if rtype == "gptr":
-                                        generated["gptr"].append((out_path2, out_model2))
-                                    else:
-                                        generated["dr"].append((out_path2, out_model2))
                                     print(f"    OK (retry): {out_path2} ({out_model2})")
                                     if SUBPROC_LOGGER:
                                         SUBPROC_LOGGER.info(f"[GPTR_END] pid={proc2.pid} result=success")
-                                    continue
+                                    iter_ok = True
+                                    return (out_path2, out_model2)
                         except Exception:
                             pass
                     if SUBPROC_LOGGER:
@@ -954,13 +1082,13 @@ async def process_file_run(md_file_path: str, config: dict, run_entry: dict, ite
                 else:
                     # Try to parse the last JSON line emitted by the child (if any).
                     last_line = ""
-                    for l in reversed(out_lines):
+                    for l in reversed(json_lines):
                         s = l.strip()
                         if s.startswith("{") and s.endswith("}"):
                             last_line = s
                             break
-                    if not last_line and out_lines:
-                        last_line = out_lines[-1]
+                    if not last_line and res.stdout:
+                        last_line = res.stdout[-1]
                     data = {}
                     try:
                         data = json.loads(last_line) if last_line else {}
@@ -969,19 +1097,68 @@ async def process_file_run(md_file_path: str, config: dict, run_entry: dict, ite
                     out_path = data.get("path")
                     out_model = data.get("model") or target
                     if out_path and os.path.exists(out_path):
-                        if rtype == "gptr":
-                            generated["gptr"].append((out_path, out_model))
-                        else:
-                            generated["dr"].append((out_path, out_model))
                         print(f"    OK: {out_path} ({out_model})")
                         if SUBPROC_LOGGER:
                             SUBPROC_LOGGER.info(f"[GPTR_END] pid={proc.pid} result=success")
+                        iter_ok = True
+                        return (out_path, out_model)
                     else:
                         print(f"    WARN: No output path parsed from subprocess: {last_line}")
                         if SUBPROC_LOGGER:
                             SUBPROC_LOGGER.info(f"[GPTR_END] pid={proc.pid} result=failure")
+            except asyncio.CancelledError:
+                # Lost a hedge race (or the batch was cancelled): stop the child so it stops spending tokens
+                cancelled = True
+                if proc is not None:
+                    # run_process has already killed the process group
+                    if SUBPROC_LOGGER:
+                        SUBPROC_LOGGER.info(f"[GPTR_END] pid={proc.pid} result=failure reason=hedge_cancelled")
+                raise
             except Exception as e:
                 print(f"    ERROR: Subprocess execution failed: {e}")
+                err_tail.append(str(e))
+            finally:
+                lease.release()
+                if proc is not None:
+                    _charge_gptr(list(json_lines) + err_tail, proc.pid)
+                if not cancelled:
+                    adaptive_concurrency.get_controller().record_result(provider, model, iter_ok, error_text="\n".join(err_tail))
+            return None
+
+        hedge_policy = hedging.get_policy()
+        hedge_delay = hedge_policy.delay_for(rtype, model)
+        for i in pending_iters:
+            unit = gen_unit(md_file_path, run_index, i) if journal is not None else None
+            if deadlines.current().expired():
+                # File/batch budget already spent: do not launch (left failed for --resume)
+                print(f"  [DEADLINE] skipping {report_type} iteration {i}: {deadlines.current().reason()}")
+                if unit:
+                    journal.fail(unit, deadlines.current().reason())
+                continue
+            if not cost_ledger.get_ledger().allow_launch(provider):
+                print(f"  [BUDGET] skipping {report_type} iteration {i}: {cost_ledger.get_ledger().reason()}")
+                if unit:
+                    journal.fail(unit, cost_ledger.get_ledger().reason())
+                continue
+            if unit:
+                journal.start(unit, "gen", md_file_path)
+            if hedge_delay is None:
+                result = await _gptr_attempt(i)
+            else:
+                # Straggler guard: duplicate this iteration once it runs past the historical p90
+                result, _winner = await hedge_policy.race(
+                    lambda: _gptr_attempt(i),
+                    lambda: _gptr_attempt(i, hedge=True),
+                    hedge_delay,
+                    label=f"id=gptr-{Path(md_file_path).stem}-{i} type={report_type} model={target}",
+                    log=SUBPROC_LOGGER.info if SUBPROC_LOGGER else print,
+                )
+            if result:
+                generated[rtype].append(result)
+                if unit:
+                    ok_units.append(unit)
+            elif unit:
+                journal.fail(unit, expired_iters.get(i, "no output"))
 
         # Cleanup: remove temp prompt
         try:
@@ -1030,8 +1207,11 @@ async def process_file_run(md_file_path: str, config: dict, run_entry: dict, ite
             return
 
         try:
-            fpf_results = await fpf_runner.run_filepromptforge_runs(instructions_file, md_file_path, num_runs=int(iterations))
+            for unit in pending_units:
+                journal.start(unit, "gen", md_file_path)
+            fpf_results = await fpf_runner.run_filepromptforge_runs(instructions_file, md_file_path, num_runs=len(pending_iters))
             generated["fpf"] = fpf_results
+            ok_units.extend(pending_units[: len(fpf_results)])
         except Exception as e:
             print(f"  FPF run failed: {e}")
 
@@ -1055,20 +1235,43 @@ async def process_file_run(md_file_path: str, config: dict, run_entry: dict, ite
                 SUBPROC_LOGGER.info(f"[MA_START] id={uid} model={model}")
                 SUBPROC_LOGGER.info(f"[MA run {iterations}] Starting research for query: {query_prompt[:100]}...")  # Legacy start marker for compatibility
 
-            ma_results = await MA_runner.run_multi_agent_runs(
-                query_text=query_prompt,
-                num_runs=int(iterations),
-                model=model
-            )
+            for unit in pending_units:
+                journal.start(unit, "gen", md_file_path)
+            limiter = rate_limiter.get_rate_limiter()
+            async with limiter.limit(provider or "openai", model, requests=len(pending_iters), tokens=limiter.estimate_tokens(query_prompt, "ma") * len(pending_iters), kind="ma"):
+                # MA iterations run side by side, so one run deadline covers all of them
+                ma_deadline = deadlines.current().child(deadlines.get_settings().for_run("ma"), "run:ma")
+                with proc_sampler.tag(f"ma-{uid}", "ma"):
+                    ma_results = await MA_runner.run_multi_agent_runs(
+                        query_text=query_prompt,
+                        num_runs=len(pending_iters),
+                        model=model,
+                        deadline=ma_deadline,
+                    )
+            expired = ma_deadline.expired()
+            if expired:
+                # Killed iterations come back as .failed.json stubs: keep them out of the outputs and the journal
+                ma_results = [r for r in ma_results if not str(r[0]).endswith(".failed.json")]
+                for unit in pending_units[len(ma_results):]:
+                    journal.fail(unit, ma_deadline.reason())
             generated["ma"] = ma_results
+            ok_units.extend(pending_units[: len(ma_results)])
+            if ma_results or not expired:
+                adaptive_concurrency.get_controller().record_result(provider or "openai", model, bool(ma_results))
             
             if SUBPROC_LOGGER:
                 for path, model_name in ma_results:
                     SUBPROC_LOGGER.info(f"[MA run {iterations}] Multi-agent report (Markdown) written to {path} model={model_name}")  # Legacy per-artifact line
                 # Emit a single canonical END for the run
-                SUBPROC_LOGGER.info(f"[MA_END] id={uid} model={model} result=success")
+                if expired:
+                    SUBPROC_LOGGER.info(f"[MA_END] id={uid} model={model} result=failure reason=deadline")
+                else:
+                    SUBPROC_LOGGER.info(f"[MA_END] id={uid} model={model} result=success")
         except Exception as e:
             print(f"  MA generation failed: {e}")
+            adaptive_concurrency.get_controller().record_result(provider or "openai", model, False, error_text=str(e))
+            for unit in pending_units:
+                journal.fail(unit, str(e))
             try:
                 if SUBPROC_LOGGER:
                     SUBPROC_LOGGER.info(f"[MA_END] id={uid} model={model} result=failure")
@@ -1082,6 +1285,8 @@ async def process_file_run(md_file_path: str, config: dict, run_entry: dict, ite
     # Save outputs (only the populated bucket will be saved)
     try:
         saved_files = save_generated_reports(md_file_path, input_folder, output_folder, generated)
+        if journal is not None and ok_units:
+            _journal_finish_units(journal, ok_units, saved_files)
         if saved_files:
             print(f"  Saved {len(saved_files)} report(s) to {os.path.dirname(saved_files[0])}")
             try:
@@ -1122,6 +1327,15 @@ def _fpf_event_handler(event: dict):
                 data.get("id"), data.get("kind"), data.get("provider"), data.get("model"), 
                 str(data.get("ok", "false")).lower(), data.get("path", "na")
             )
+
+        # Feed 429/5xx outcomes into adaptive (AIMD) concurrency
+        try:
+            adaptive_concurrency.get_controller().record_result(
+                data.get("provider"), data.get("model"), bool(data.get("ok")),
+                status=data.get("status"), error_text=data.get("error") or "",
+            )
+        except Exception:
+            pass
         
         # Trigger streaming eval immediately when file completes successfully
         file_path = data.get("path")
@@ -1146,7 +1360,6 @@ async def trigger_evaluation_for_all_files(
     output_folder: str, 
     config: dict, 
     generated_files: list[str] = None,
-    timeout_seconds: int = 1800,
     is_combined_run: bool = False,
     save_winner: bool = False,
     winners_dir: str = None,
@@ -1155,7 +1368,8 @@ async def trigger_evaluation_for_all_files(
     new_docs_only: list[str] = None,
     source_db: str = None,
     skip_single_eval: bool = False,
-    existing_db_path: str = None
+    existing_db_path: str = None,
+    journal_file: str = None
 ):
     """
     Centralized evaluation trigger with explicit file list passing.
@@ -1164,7 +1378,6 @@ async def trigger_evaluation_for_all_files(
         output_folder: Directory containing generated files (for reference/logging)
         config: ACM configuration dict
         generated_files: EXPLICIT list of absolute file paths to evaluate (NEW)
-        timeout_seconds: Maximum time to wait for evaluation (default: 30 minutes)
         is_combined_run: Whether this is the secondary "Playoffs" run (default: False)
         save_winner: Whether to save the winning report (default: False)
         winners_dir: Directory to save the winner (required if save_winner is True)
@@ -1174,6 +1387,12 @@ async def trigger_evaluation_for_all_files(
         source_db: Path to source database for copying cached scores (used with new_docs_only for playoffs optimization).
         skip_single_eval: If True, skip single evaluation phase (e.g., already done via streaming).
         existing_db_path: Path to existing database with single scores (e.g., from streaming eval). If provided, pairwise will use this DB.
+        journal_file: Input markdown file whose eval units (precombine/combine/postcombine) are tracked in the run journal.
+
+    Returns:
+        {"db_path", "export_dir"} as reported by evaluate.py ([EVAL_SUMMARY] Database path / [EVAL_EXPORTS] dir)
+        when the evaluation succeeded, else None. Concurrent evaluations (pipelined mode) must use these
+        rather than the newest results_*.sqlite / eval_run_* on disk, which may belong to another file.
     
     Usage in main():
         # After all processing completes for a markdown file:
@@ -1297,84 +1516,111 @@ async def trigger_evaluation_for_all_files(
         env.setdefault("PYTHONIOENCODING", "utf-8")
         env.setdefault("PYTHONUTF8", "1")
 
-        proc = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            env=env,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-        )
-        
-        # STREAMING FIX: Read output line-by-line instead of blocking with communicate()
-        stdout_lines = []
-        stderr_lines = []
-
-        def _stream_eval(pipe, lines_list):
+        # Run journal: a phase finished before a crash is replayed from its recorded summary on --resume
+        journal = RUN_JOURNAL if journal_file else None
+        phase_unit = eval_unit(journal_file, "postcombine" if is_combined_run else "precombine") if journal is not None else None
+        replay_stdout = None
+        deadline_reason = None
+        if phase_unit and journal.is_done(phase_unit):
+            replay_stdout = journal.detail(phase_unit) or ""
+            print(f"  [JOURNAL] {'postcombine' if is_combined_run else 'precombine'} evaluation already complete; replaying its summary")
+        elif phase_unit:
+            journal.start(phase_unit, "eval", journal_file)
+
+        if replay_stdout is None:
+            # Judges share provider capacity with generation; hold one slot per judge while evaluating
+            judge_leases = []
+            limiter = rate_limiter.get_rate_limiter()
+            for jp, jm in sorted(set(_eval_judge_pairs(config))):
+                judge_leases.append(await limiter.acquire(jp, jm, requests=1, kind="eval"))
+
+            # Bounded by deadlines.eval_seconds under the current file/batch deadline (unbounded by default)
+            eval_deadline = deadlines.current().child(deadlines.get_settings().eval_seconds, "eval")
+            eval_deadline.apply_env(env)
             try:
-                for line in iter(pipe.readline, ''):
-                    if not line: break
-                    print(line, end='', flush=True)
-                    lines_list.append(line)
-            except Exception:
-                pass
+                # asyncio subprocess + async readers: the loop keeps serving generation, streaming
+                # evals and other files' evaluations for the whole (often 30+ minute) run.
+                # STREAMING: forward output line by line as it arrives
+                res = await process_runner.run_process(
+                    cmd, env=env, on_line=lambda _stream, line: print(line, flush=True), deadline=eval_deadline,
+                    keep=process_runner.marker_lines(*EVAL_STDOUT_MARKERS),
+                    stats_tag="eval-{pid}", stats_kind="eval",
+                )
+                if res.timed_out:
+                    deadline_reason = res.reason
+                    print(f"\n  [DEADLINE] evaluation subprocess killed: {deadline_reason}")
+                    if SUBPROC_LOGGER:
+                        SUBPROC_LOGGER.error("[EVAL_ERROR] %s (pid=%s)", deadline_reason, res.pid)
             finally:
-                pipe.close()
-
-        t_out = threading.Thread(target=_stream_eval, args=(proc.stdout, stdout_lines), daemon=True)
-        t_err = threading.Thread(target=_stream_eval, args=(proc.stderr, stderr_lines), daemon=True)
-        t_out.start()
-        t_err.start()
-
-        # Wait for process to finish
-        proc.wait()
-        
-        t_out.join(timeout=5)
-        t_err.join(timeout=5)
-
-        stdout = "".join(stdout_lines)
-        stderr = "".join(stderr_lines)
+                for lease in judge_leases:
+                    lease.release()
+
+            # Full output was streamed above; keep only the marker lines and the stderr tail
+            stdout = res.kept_text
+            stderr = res.stderr_text
+            returncode = res.returncode
+            stdout_count, stderr_count = res.stdout_count, res.stderr_count
+        else:
+            stdout, stderr, returncode = replay_stdout, "", 0
+            stdout_count, stderr_count = len(stdout.splitlines()), 0
         
         print(f"\n=== SUBPROCESS COMPLETED ===")
         print(f"  Time: {datetime.datetime.now()}")
-        print(f"  Return code: {proc.returncode}")
-        print(f"  Stdout length: {len(stdout)} chars")
-        print(f"  Stderr length: {len(stderr)} chars")
+        print(f"  Return code: {returncode}")
+        print(f"  Stdout lines: {stdout_count}")
+        print(f"  Stderr lines: {stderr_count}")
         
-        if proc.returncode != 0:
-            print(f"  âŒ ERROR: Evaluation subprocess failed (rc={proc.returncode})")
+        if returncode != 0:
+            if phase_unit:
+                journal.fail(phase_unit, deadline_reason or (stderr or "")[-2000:])
+            print(f"  âŒ ERROR: Evaluation subprocess failed (rc={returncode})")
             if stderr:
                 print(f"\n=== EVALUATION STDERR ===")
                 print(stderr)
             if SUBPROC_LOGGER:
                 SUBPROC_LOGGER.error("[EVAL_ERROR] Evaluation failed: rc=%d stderr=%s", 
-                                    proc.returncode, stderr[:500])
+                                    returncode, stderr[:500])
         else:
+            if phase_unit and replay_stdout is None:
+                # Keep the summary lines so a resumed batch can continue into combine/playoffs
+                summary = "\n".join(ln.strip() for ln in stdout.splitlines() if "[EVAL_SUMMARY]" in ln or "[EVAL_EXPORTS]" in ln)
+                journal.finish(phase_unit, outputs=valid_files, detail=summary)
             print(f"  âœ… SUCCESS: Evaluation completed without errors")
             if stdout:
-                print(f"\n=== EVALUATION STDOUT ===")
+                print(f"\n=== EVALUATION SUMMARY ===")
                 print(stdout)
             
             # Log success
             if SUBPROC_LOGGER:
                 SUBPROC_LOGGER.info("[EVAL_COMPLETE] Successfully evaluated %d files in %s", 
                                   len(valid_files), output_folder)
+
+            # Record the copies evaluate.py made (final report, winner) in the skip-check index
+            try:
+                written = re.findall(r"^(?:Copied best report to final location|Saved winner to winners directory): (.+)$", stdout, flags=re.MULTILINE)
+                artifact_index.get_index().add_paths(p.strip() for p in written)
+            except Exception:
+                pass
             
-            # --- GENERATE EVAL TIMELINE ---
-            # Extract DB path and export dir from stdout to generate eval timeline
+            # --- POST-EVALUATION STAGES ---
+            # Declared as a DAG so independent stages overlap:
+            #   eval_timeline                      (export; runs in the background)
+            #   top_reports -> combine -> playoffs -> unified_html (+ eval_timeline)
+            # Generation, streaming single evals and pairwise happen before this point and are
+            # not nodes (see functions/dag.py "Scope").
             pre_db_path = None
             pre_export_dir = None
-            match = re.search(r"\\[EVAL_SUMMARY\\] Database path: (.*)", stdout)
+            match = re.search(r"\[EVAL_SUMMARY\] Database path: (.*)", stdout)
             if match:
                 pre_db_path = match.group(1).strip()
-            match_export = re.search(r"\\[EVAL_EXPORTS\\] dir=(.*)", stdout)
+            match_export = re.search(r"\[EVAL_EXPORTS\] dir=(.*)", stdout)
             if match_export:
                 pre_export_dir = match_export.group(1).strip()
-            
-            # Generate pre-combiner eval timeline JSON
-            pre_eval_timeline_path = None
-            if pre_db_path and os.path.exists(pre_db_path):
+
+            def _eval_timeline_stage(_inputs):
+                """Eval timeline JSON for this phase (pre-combiner or playoffs)."""
+                if not (pre_db_path and os.path.exists(pre_db_path)):
+                    return None
                 try:
                     # Add tools directory to path
                     import sys as _sys
@@ -1383,7 +1629,7 @@ async def trigger_evaluation_for_all_files(
                         _sys.path.insert(0, tools_path)
                     from eval_timeline_from_db import generate_eval_timeline
                     import json as _json
-                    
+
                     acm_log_path = os.path.join(os.path.dirname(__file__), "logs", "acm_session.log")
                     eval_timeline = generate_eval_timeline(
                         db_path=pre_db_path,
@@ -1391,302 +1637,304 @@ async def trigger_evaluation_for_all_files(
                         export_dir=pre_export_dir,
                         eval_type_label="pre_combiner" if not is_combined_run else "playoffs"
                     )
-                    
+
                     # Save to export dir if available, else logs
                     if pre_export_dir and os.path.isdir(pre_export_dir):
-                        pre_eval_timeline_path = os.path.join(pre_export_dir, "eval_timeline.json")
+                        timeline_path = os.path.join(pre_export_dir, "eval_timeline.json")
                     else:
-                        pre_eval_timeline_path = os.path.join(os.path.dirname(__file__), "logs", f"eval_timeline_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-                    
-                    with open(pre_eval_timeline_path, "w", encoding="utf-8") as f:
+                        timeline_path = os.path.join(os.path.dirname(__file__), "logs", f"eval_timeline_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+
+                    with open(timeline_path, "w", encoding="utf-8") as f:
                         _json.dump(eval_timeline, f, indent=2)
-                    print(f"  Generated eval timeline: {pre_eval_timeline_path}")
+                    print(f"  Generated eval timeline: {timeline_path}")
+                    return timeline_path
                 except Exception as e:
                     print(f"  Warning: Failed to generate eval timeline: {e}")
+                    return None
 
-            # --- COMBINE & REVISE LOGIC ---
-            # Only run if enabled, not already a combined run, and evaluation succeeded
-            combine_config = config.get('combine', {})
-            if not is_combined_run and combine_config.get('enabled', False):
-                print("\n=== COMBINE & REVISE TRIGGERED ===")
-                
-                # 1. Extract DB Path from stdout
-                db_path = None
-                # Look for: [EVAL_SUMMARY] Database path: ...
-                match = re.search(r"\[EVAL_SUMMARY\] Database path: (.*)", stdout)
-                if match:
-                    db_path = match.group(1).strip()
+            async def _top_reports_stage(_inputs):
+                db_path = pre_db_path
+                if db_path:
                     print(f"  Found DB Path: {db_path}")
                 else:
                     print("  âš ï¸  WARNING: Could not find DB path in evaluation output. Skipping combine.")
-                
-                if db_path and os.path.exists(db_path):
+                    return None
+                if not os.path.exists(db_path):
+                    print(f"  DB path invalid or not found: {db_path}")
+                    return None
+
+                # Import Combiner here to avoid circular imports
+                try:
+                    from api_cost_multiplier.combiner import ReportCombiner
+                except ImportError:
+                    from combiner import ReportCombiner
+
+                combiner = ReportCombiner(config)
+
+                # Get Top 2 Reports
+                top_reports = combiner.get_top_reports(db_path, output_folder, limit=2)
+                print(f"  Top Reports selected: {len(top_reports)}")
+                for tr in top_reports:
+                    print(f"    - {os.path.basename(tr)}")
+                if len(top_reports) < 2:
+                    print("  Not enough top reports found to combine (need 2).")
+                    return None
+                return {"db_path": db_path, "combiner": combiner, "top_reports": top_reports}
+
+            async def _combine_stage(inputs):
+                selected = inputs["top_reports"]
+                if not selected:
+                    return None
+                top_reports = selected["top_reports"]
+                instructions_file = config.get('instructions_file')
+                print(f"  Running Combiner...")
+
+                # Determine base_name from the first top report
+                # Assuming filename format: {base_name}.{type}.{idx}.{model}.{uid}.md
+                # We'll take the first part as base_name
+                first_report_name = os.path.basename(top_reports[0])
+                base_name = first_report_name.split('.')[0]
+
+                combine_unit = eval_unit(journal_file, "combine") if journal is not None else None
+                recorded = journal.outputs(combine_unit) if combine_unit and journal.is_done(combine_unit) else []
+                if recorded and all(os.path.isfile(f) for f in recorded):
+                    print(f"  [JOURNAL] combine already complete; reusing {len(recorded)} combined file(s)")
+                    combined_files = recorded
+                else:
+                    if combine_unit:
+                        journal.start(combine_unit, "eval", journal_file)
+                    combined_files = await selected["combiner"].combine(
+                        top_reports,
+                        instructions_file,
+                        output_folder,
+                        base_name=base_name
+                    )
+                    artifact_index.get_index().add_paths(combined_files or [])
+                    if combine_unit:
+                        if combined_files:
+                            journal.finish(combine_unit, outputs=combined_files)
+                        else:
+                            journal.fail(combine_unit, "no combined files")
+
+                print(f"  Combined Files generated: {len(combined_files)}")
+                for cf in combined_files:
+                    print(f"    - {os.path.basename(cf)}")
+                if not combined_files:
+                    print("  No combined files were generated.")
+                return combined_files
+
+            async def _playoffs_stage(inputs):
+                selected, combined_files = inputs["top_reports"], inputs["combine"]
+                if not selected or not combined_files:
+                    return None
+                # Trigger "Playoffs" Evaluation
+                #
+                # SPEC: Post-combine pairwise is special. It must always be
+                # exactly:
+                #   - The two parent reports that were given to the combiner
+                #     (top_reports, limit=2), plus
+                #   - All combined reports (combined_files).
+                #
+                # Pre-combine uses pairwise_top_n (often 3) to select finalists,
+                # but that setting must NOT leak into playoffs. The playoffs
+                # tournament pool is therefore fixed to these combiner inputs and
+                # outputs only.
+
+                parent_reports: list[str] = list(selected["top_reports"])
+                tournament_pool = parent_reports + combined_files
+                print(f"\n=== TRIGGERING PLAYOFFS EVALUATION ===")
+                print(f"  Parent pool size: {len(parent_reports)}")
+                print(f"  Combined challengers: {len(combined_files)}")
+                print(f"  Total pool size: {len(tournament_pool)}")
+
+                # Calculate winners directory (sibling to output_folder root)
+                output_root = config.get('output_folder')
+                if output_root:
+                    output_root_parent = os.path.dirname(output_root)
+                    winners_root = os.path.join(output_root_parent, "winners")
+
+                    # output_folder here is the specific dir for the file; config['output_folder'] is the root
                     try:
-                        # Import Combiner here to avoid circular imports
-                        try:
-                            from api_cost_multiplier.combiner import ReportCombiner
-                        except ImportError:
-                            from combiner import ReportCombiner
+                        rel_dir = os.path.relpath(output_folder, output_root)
+                    except ValueError:
+                        rel_dir = "."
 
-                        combiner = ReportCombiner(config)
-                        
-                        # 2. Get Top 2 Reports
-                        top_reports = combiner.get_top_reports(db_path, output_folder, limit=2)
-                        print(f"  Top Reports selected: {len(top_reports)}")
-                        for tr in top_reports:
-                            print(f"    - {os.path.basename(tr)}")
-                        
-                        if len(top_reports) >= 2:
-                            # 3. Run Combination
-                            instructions_file = config.get('instructions_file')
-                            print(f"  Running Combiner...")
-                            
-                            # Determine base_name from the first top report
-                            # Assuming filename format: {base_name}.{type}.{idx}.{model}.{uid}.md
-                            # We'll take the first part as base_name
-                            first_report_name = os.path.basename(top_reports[0])
-                            base_name = first_report_name.split('.')[0]
-                            
-                            combined_files = await combiner.combine(
-                                top_reports, 
-                                instructions_file, 
-                                output_folder,
-                                base_name=base_name
-                            )
-                            
-                            print(f"  Combined Files generated: {len(combined_files)}")
-                            for cf in combined_files:
-                                print(f"    - {os.path.basename(cf)}")
-                            
-                            if combined_files:
-                                # 4. Trigger "Playoffs" Evaluation
-                                #
-                                # SPEC: Post-combine pairwise is special. It must always be
-                                # exactly:
-                                #   - The two parent reports that were given to the combiner
-                                #     (top_reports, limit=2), plus
-                                #   - All combined reports (combined_files).
-                                #
-                                # Pre-combine uses pairwise_top_n (often 3) to select finalists,
-                                # but that setting must NOT leak into playoffs. The playoffs
-                                # tournament pool is therefore fixed to these combiner inputs and
-                                # outputs only.
-
-                                parent_reports: list[str] = list(top_reports)
-                                tournament_pool = parent_reports + combined_files
-                                print(f"\n=== TRIGGERING PLAYOFFS EVALUATION ===")
-                                print(f"  Parent pool size: {len(parent_reports)}")
-                                print(f"  Combined challengers: {len(combined_files)}")
-                                print(f"  Total pool size: {len(tournament_pool)}")
-                                
-                                # Calculate winners directory (sibling to output_folder root)
-                                output_root = config.get('output_folder')
-                                if output_root:
-                                    output_root_parent = os.path.dirname(output_root)
-                                    winners_root = os.path.join(output_root_parent, "winners")
-                                    
-                                    # Calculate relative path of the current file's dir from output_root
-                                    # output_folder here is the specific dir for the file (passed to trigger_evaluation_for_all_files)
-                                    # Wait, trigger_evaluation_for_all_files receives 'output_folder' which is the specific dir
-                                    # But config['output_folder'] is the root output folder.
-                                    
-                                    try:
-                                        rel_dir = os.path.relpath(output_folder, output_root)
-                                    except ValueError:
-                                        rel_dir = "."
-                                        
-                                    winners_dir = os.path.join(winners_root, rel_dir)
-                                else:
-                                    # Fallback
-                                    winners_dir = os.path.join(output_folder, "winners")
-                                
-                                # Extract basenames (WITH extension) of combined files for optimization
-                                # Only the combined files are "new" - parents already have scores from pre-combine
-                                # doc_id in the DB is the full filename with extension
-                                combined_doc_ids = [
-                                    os.path.basename(f) for f in combined_files
-                                ]
-                                print(f"  [OPTIMIZATION] New docs for playoffs: {combined_doc_ids}")
-                                print(f"  [OPTIMIZATION] Source DB for cached scores: {db_path}")
-                                print(f"  [INFO] Running single evals for combined reports in playoffs phase (for analysis)")
-                                
-                                await trigger_evaluation_for_all_files(
-                                    output_folder,
-                                    config,
-                                    generated_files=tournament_pool,
-                                    timeout_seconds=timeout_seconds,
-                                    is_combined_run=True,  # Prevent infinite recursion
-                                    save_winner=True,
-                                    winners_dir=winners_dir,
-                                    new_docs_only=combined_doc_ids,  # Only evaluate combined reports, reuse parent scores
-                                    source_db=db_path,  # Pre-combine DB for copying cached scores
-                                    skip_single_eval=False  # Also run single evals for combined reports for richer HTML
-                                )
-                                
-                                # --- GENERATE UNIFIED HTML REPORT ---
-                                # After playoffs, generate combined HTML with both pre-combiner and playoffs data
+                    winners_dir = os.path.join(winners_root, rel_dir)
+                else:
+                    # Fallback
+                    winners_dir = os.path.join(output_folder, "winners")
+
+                # Extract basenames (WITH extension) of combined files for optimization
+                # Only the combined files are "new" - parents already have scores from pre-combine
+                # doc_id in the DB is the full filename with extension
+                combined_doc_ids = [
+                    os.path.basename(f) for f in combined_files
+                ]
+                print(f"  [OPTIMIZATION] New docs for playoffs: {combined_doc_ids}")
+                print(f"  [OPTIMIZATION] Source DB for cached scores: {selected['db_path']}")
+                print(f"  [INFO] Running single evals for combined reports in playoffs phase (for analysis)")
+
+                playoffs = await trigger_evaluation_for_all_files(
+                    output_folder,
+                    config,
+                    generated_files=tournament_pool,
+                    is_combined_run=True,  # Prevent infinite recursion
+                    save_winner=True,
+                    winners_dir=winners_dir,
+                    new_docs_only=combined_doc_ids,  # Only evaluate combined reports, reuse parent scores
+                    source_db=selected["db_path"],  # Pre-combine DB for copying cached scores
+                    skip_single_eval=False,  # Also run single evals for combined reports for richer HTML
+                    journal_file=journal_file,
+                )
+                return {"pool": tournament_pool, **(playoffs or {})}
+
+            def _unified_html_stage(inputs):
+                """After playoffs, generate combined HTML with both pre-combiner and playoffs data."""
+                selected, playoffs = inputs["top_reports"], inputs["playoffs"]
+                if not selected or not playoffs:
+                    return None
+                tournament_pool = playoffs["pool"]
+                db_path = selected["db_path"]
+                pre_eval_timeline_path = inputs["eval_timeline"]
+                pre_export = pre_export_dir
+                try:
+                    # Import from llm-doc-eval package and tools
+                    import sys as _sys
+                    llm_eval_path = os.path.join(os.path.dirname(__file__), "llm-doc-eval")
+                    if llm_eval_path not in _sys.path:
+                        _sys.path.insert(0, llm_eval_path)
+                    tools_path = os.path.join(os.path.dirname(__file__), "tools")
+                    if tools_path not in _sys.path:
+                        _sys.path.insert(0, tools_path)
+                    from reporting.html_exporter import generate_unified_html_report
+
+                    # The playoffs DB and export dir are the ones the playoffs evaluate.py reported;
+                    # other files' evaluations may be writing newer ones concurrently
+                    playoffs_db_path = playoffs.get("db_path")
+                    playoffs_export_dir = playoffs.get("export_dir")
+                    exports_base = os.path.join(os.path.dirname(__file__), "gptr-eval-process", "exports")
+
+                    # This file's generation timeline (exported before evaluation)
+                    gen_timeline_path = timeline_json_path if timeline_json_path and os.path.exists(timeline_json_path) else None
+
+                    # Generate playoffs eval timeline
+                    playoffs_eval_timeline_path = None
+                    if playoffs_db_path and os.path.exists(playoffs_db_path):
+                        from eval_timeline_from_db import generate_eval_timeline
+                        import json as _json
+
+                        acm_log = os.path.join(os.path.dirname(__file__), "logs", "acm_session.log")
+                        playoffs_timeline = generate_eval_timeline(
+                            db_path=playoffs_db_path,
+                            log_path=acm_log if os.path.exists(acm_log) else None,
+                            export_dir=playoffs_export_dir,
+                            eval_type_label="playoffs"
+                        )
+                        if playoffs_export_dir:
+                            playoffs_eval_timeline_path = os.path.join(playoffs_export_dir, "eval_timeline.json")
+                            with open(playoffs_eval_timeline_path, "w", encoding="utf-8") as f:
+                                _json.dump(playoffs_timeline, f, indent=2)
+                            print(f"  Generated playoffs eval timeline: {playoffs_eval_timeline_path}")
+
+                    # Build doc_paths for hyperlinks
+                    all_doc_paths = {}
+                    for f in valid_files:
+                        all_doc_paths[os.path.basename(f)] = f
+                    for f in tournament_pool:
+                        all_doc_paths[os.path.basename(f)] = f
+
+                    # Get FPF logs directory for cost parsing
+                    # Primary: FilePromptForge/logs (direct FPF output)
+                    # Fallback: logs/eval_fpf_logs (copied logs)
+                    eval_fpf_logs_dir = os.path.join(os.path.dirname(__file__), "FilePromptForge", "logs")
+                    if not os.path.isdir(eval_fpf_logs_dir):
+                        eval_fpf_logs_dir = os.path.join(os.path.dirname(__file__), "logs", "eval_fpf_logs")
+                    if not os.path.isdir(eval_fpf_logs_dir):
+                        eval_fpf_logs_dir = None
+
+                    # Generate unified HTML
+                    if db_path and playoffs_db_path:
+                        unified_output_dir = playoffs_export_dir or pre_export or os.path.join(exports_base, "unified")
+                        os.makedirs(unified_output_dir, exist_ok=True)
+
+                        # Load eval timeline chart data from both phases
+                        # These are generated by EvalTimelineAggregator in evaluate.py
+                        # with phase-specific filenames:
+                        #   - eval_timeline_chart_pre.json (precombine)
+                        #   - eval_timeline_chart_post.json (postcombine)
+                        pre_eval_timeline_chart_data = None
+                        playoffs_eval_timeline_chart_data = None
+
+                        # Debug: log pre_export_dir value
+                        print(f"  [DEBUG] pre_export_dir = {pre_export}")
+
+                        if pre_export:
+                            pre_chart_path = os.path.join(pre_export, "eval_timeline_chart_pre.json")
+                            print(f"  [DEBUG] Looking for pre-combine chart at: {pre_chart_path}")
+                            print(f"  [DEBUG] File exists: {os.path.isfile(pre_chart_path)}")
+                            if os.path.isfile(pre_chart_path):
                                 try:
-                                    # Import from llm-doc-eval package and tools
-                                    import sys as _sys
-                                    llm_eval_path = os.path.join(os.path.dirname(__file__), "llm-doc-eval")
-                                    if llm_eval_path not in _sys.path:
-                                        _sys.path.insert(0, llm_eval_path)
-                                    tools_path = os.path.join(os.path.dirname(__file__), "tools")
-                                    if tools_path not in _sys.path:
-                                        _sys.path.insert(0, tools_path)
-                                    from reporting.html_exporter import generate_unified_html_report
-                                    
-                                    # Find the playoffs DB path from exports
-                                    playoffs_db_path = None
-                                    playoffs_export_dir = None
-                                    
-                                    # Look for the most recent eval_run directory
-                                    exports_base = os.path.join(os.path.dirname(__file__), "gptr-eval-process", "exports")
-                                    if os.path.isdir(exports_base):
-                                        eval_dirs = sorted([d for d in os.listdir(exports_base) if d.startswith("eval_run_")], reverse=True)
-                                        if len(eval_dirs) >= 1:
-                                            # Most recent should be playoffs
-                                            playoffs_export_dir = os.path.join(exports_base, eval_dirs[0])
-                                            # Find the sqlite db
-                                            db_base = os.path.join(os.path.dirname(__file__), "llm-doc-eval", "llm_doc_eval")
-                                            if os.path.isdir(db_base):
-                                                db_files = sorted([f for f in os.listdir(db_base) if f.startswith("results_") and f.endswith(".sqlite")], reverse=True)
-                                                if db_files:
-                                                    playoffs_db_path = os.path.join(db_base, db_files[0])
-                                    
-                                    # Get generation timeline path
-                                    gen_timeline_path = os.path.join(os.path.dirname(__file__), "logs", "timeline_data.json")
-                                    if not os.path.exists(gen_timeline_path):
-                                        gen_timeline_path = None
-                                    
-                                    # Generate playoffs eval timeline
-                                    playoffs_eval_timeline_path = None
-                                    if playoffs_db_path and os.path.exists(playoffs_db_path):
-                                        # eval_timeline_from_db already imported above
-                                        from eval_timeline_from_db import generate_eval_timeline
-                                        import json as _json
-                                        
-                                        acm_log = os.path.join(os.path.dirname(__file__), "logs", "acm_session.log")
-                                        playoffs_timeline = generate_eval_timeline(
-                                            db_path=playoffs_db_path,
-                                            log_path=acm_log if os.path.exists(acm_log) else None,
-                                            export_dir=playoffs_export_dir,
-                                            eval_type_label="playoffs"
-                                        )
-                                        if playoffs_export_dir:
-                                            playoffs_eval_timeline_path = os.path.join(playoffs_export_dir, "eval_timeline.json")
-                                            with open(playoffs_eval_timeline_path, "w", encoding="utf-8") as f:
-                                                _json.dump(playoffs_timeline, f, indent=2)
-                                            print(f"  Generated playoffs eval timeline: {playoffs_eval_timeline_path}")
-                                    
-                                    # Build doc_paths for hyperlinks
-                                    all_doc_paths = {}
-                                    for f in valid_files:
-                                        all_doc_paths[os.path.basename(f)] = f
-                                    for f in tournament_pool:
-                                        all_doc_paths[os.path.basename(f)] = f
-                                    
-                                    # Get FPF logs directory for cost parsing
-                                    # Primary: FilePromptForge/logs (direct FPF output)
-                                    # Fallback: logs/eval_fpf_logs (copied logs)
-                                    eval_fpf_logs_dir = os.path.join(os.path.dirname(__file__), "FilePromptForge", "logs")
-                                    if not os.path.isdir(eval_fpf_logs_dir):
-                                        eval_fpf_logs_dir = os.path.join(os.path.dirname(__file__), "logs", "eval_fpf_logs")
-                                    if not os.path.isdir(eval_fpf_logs_dir):
-                                        eval_fpf_logs_dir = None
-                                    
-                                    # Generate unified HTML
-                                    if db_path and playoffs_db_path:
-                                        unified_output_dir = playoffs_export_dir or pre_export_dir or os.path.join(exports_base, "unified")
-                                        os.makedirs(unified_output_dir, exist_ok=True)
-                                        
-                                        # Load eval timeline chart data from both phases
-                                        # These are generated by EvalTimelineAggregator in evaluate.py
-                                        # with phase-specific filenames:
-                                        #   - eval_timeline_chart_pre.json (precombine)
-                                        #   - eval_timeline_chart_post.json (postcombine)
-                                        pre_eval_timeline_chart_data = None
-                                        playoffs_eval_timeline_chart_data = None
-                                        
-                                        # If pre_export_dir is not set, try to find it from the second-most-recent export dir
-                                        # (playoffs is most recent, pre-combine is second-most-recent)
-                                        if not pre_export_dir and len(eval_dirs) >= 2:
-                                            pre_export_dir = os.path.join(exports_base, eval_dirs[1])
-                                            print(f"  [DEBUG] pre_export_dir inferred from second-most-recent: {pre_export_dir}")
-                                        
-                                        # Debug: log pre_export_dir value
-                                        print(f"  [DEBUG] pre_export_dir = {pre_export_dir}")
-                                        
-                                        if pre_export_dir:
-                                            pre_chart_path = os.path.join(pre_export_dir, "eval_timeline_chart_pre.json")
-                                            print(f"  [DEBUG] Looking for pre-combine chart at: {pre_chart_path}")
-                                            print(f"  [DEBUG] File exists: {os.path.isfile(pre_chart_path)}")
-                                            if os.path.isfile(pre_chart_path):
-                                                try:
-                                                    with open(pre_chart_path, "r", encoding="utf-8") as f:
-                                                        pre_eval_timeline_chart_data = json.load(f)
-                                                    print(f"  Loaded pre-combine eval timeline chart: {pre_chart_path}")
-                                                    print(f"  [DEBUG] Chart data has {len(pre_eval_timeline_chart_data.get('rows', []))} rows")
-                                                except Exception as e:
-                                                    print(f"  Warning: Failed to load pre-combine chart: {e}")
-                                            else:
-                                                print(f"  [DEBUG] Pre-combine chart file NOT FOUND at: {pre_chart_path}")
-                                        else:
-                                            print(f"  [DEBUG] pre_export_dir is not set - cannot load pre-combine chart")
-                                        
-                                        if playoffs_export_dir:
-                                            playoffs_chart_path = os.path.join(playoffs_export_dir, "eval_timeline_chart_post.json")
-                                            if os.path.isfile(playoffs_chart_path):
-                                                try:
-                                                    with open(playoffs_chart_path, "r", encoding="utf-8") as f:
-                                                        playoffs_eval_timeline_chart_data = json.load(f)
-                                                    print(f"  Loaded playoffs eval timeline chart: {playoffs_chart_path}")
-                                                except Exception as e:
-                                                    print(f"  Warning: Failed to load playoffs chart: {e}")
-                                        
-                                        unified_html_path = generate_unified_html_report(
-                                            pre_db_path=db_path,
-                                            playoffs_db_path=playoffs_db_path,
-                                            output_dir=unified_output_dir,
-                                            gen_timeline_json_path=gen_timeline_path,
-                                            pre_eval_timeline_json_path=pre_eval_timeline_path,
-                                            playoffs_eval_timeline_json_path=playoffs_eval_timeline_path,
-                                            doc_paths=all_doc_paths,
-                                            fpf_log_dir=eval_fpf_logs_dir,
-                                            pre_eval_timeline_chart_data=pre_eval_timeline_chart_data,
-                                            playoffs_eval_timeline_chart_data=playoffs_eval_timeline_chart_data
-                                        )
-                                        if unified_html_path and master_html_path_holder is not None:
-                                            master_html_path_holder["path"] = unified_html_path
-                                        print(f"  Generated unified HTML report in: {unified_output_dir}")
+                                    with open(pre_chart_path, "r", encoding="utf-8") as f:
+                                        pre_eval_timeline_chart_data = json.load(f)
+                                    print(f"  Loaded pre-combine eval timeline chart: {pre_chart_path}")
+                                    print(f"  [DEBUG] Chart data has {len(pre_eval_timeline_chart_data.get('rows', []))} rows")
                                 except Exception as e:
-                                    print(f"  Warning: Failed to generate unified HTML report: {e}")
-                                    import traceback
-                                    traceback.print_exc()
+                                    print(f"  Warning: Failed to load pre-combine chart: {e}")
                             else:
-                                print("  No combined files were generated.")
+                                print(f"  [DEBUG] Pre-combine chart file NOT FOUND at: {pre_chart_path}")
                         else:
-                            print("  Not enough top reports found to combine (need 2).")
-                            
-                    except Exception as e:
-                        print(f"  âŒ ERROR during Combine & Revise process: {e}")
-                        import traceback
-                        print(traceback.format_exc())
-                else:
-                    print(f"  DB path invalid or not found: {db_path}")
+                            print(f"  [DEBUG] pre_export_dir is not set - cannot load pre-combine chart")
+
+                        if playoffs_export_dir:
+                            playoffs_chart_path = os.path.join(playoffs_export_dir, "eval_timeline_chart_post.json")
+                            if os.path.isfile(playoffs_chart_path):
+                                try:
+                                    with open(playoffs_chart_path, "r", encoding="utf-8") as f:
+                                        playoffs_eval_timeline_chart_data = json.load(f)
+                                    print(f"  Loaded playoffs eval timeline chart: {playoffs_chart_path}")
+                                except Exception as e:
+                                    print(f"  Warning: Failed to load playoffs chart: {e}")
+
+                        unified_html_path = generate_unified_html_report(
+                            pre_db_path=db_path,
+                            playoffs_db_path=playoffs_db_path,
+                            output_dir=unified_output_dir,
+                            gen_timeline_json_path=gen_timeline_path,
+                            pre_eval_timeline_json_path=pre_eval_timeline_path,
+                            playoffs_eval_timeline_json_path=playoffs_eval_timeline_path,
+                            doc_paths=all_doc_paths,
+                            fpf_log_dir=eval_fpf_logs_dir,
+                            pre_eval_timeline_chart_data=pre_eval_timeline_chart_data,
+                            playoffs_eval_timeline_chart_data=playoffs_eval_timeline_chart_data
+                        )
+                        if unified_html_path and master_html_path_holder is not None:
+                            master_html_path_holder["path"] = unified_html_path
+                        print(f"  Generated unified HTML report in: {unified_output_dir}")
+                        return unified_html_path
+                except Exception as e:
+                    print(f"  Warning: Failed to generate unified HTML report: {e}")
+                    import traceback
+                    traceback.print_exc()
+                return None
+
+            stages = Dag(name=f"eval:{'playoffs' if is_combined_run else 'precombine'}", limits={"export": 1})
+            stages.add("eval_timeline", _eval_timeline_stage, resource="export")
+            # --- COMBINE & REVISE LOGIC ---
+            # Only run if enabled, not already a combined run, and evaluation succeeded
+            combine_config = config.get('combine', {})
+            if not is_combined_run and combine_config.get('enabled', False):
+                print("\n=== COMBINE & REVISE TRIGGERED ===")
+                stages.add("top_reports", _top_reports_stage)
+                stages.add("combine", _combine_stage, deps=["top_reports"])
+                stages.add("playoffs", _playoffs_stage, deps=["top_reports", "combine"])
+                stages.add("unified_html", _unified_html_stage, deps=["top_reports", "playoffs", "eval_timeline"], resource="export")
+            stage_results = await stages.run()
+            for stage_name in ("top_reports", "combine", "playoffs"):
+                res = stage_results.get(stage_name)
+                if res is not None and res.status == "failed":
+                    print(f"  âŒ ERROR during Combine & Revise process ({stage_name}): {res.error}")
+            return {"db_path": pre_db_path, "export_dir": pre_export_dir}
 
-    except subprocess.TimeoutExpired as e:
-        print(f"\nâŒ ERROR: Evaluation timed out after {e.timeout} seconds")
-        if e.stdout:
-            print(f"Partial stdout:\n{e.stdout}")
-        if e.stderr:
-            print(f"Partial stderr:\n{e.stderr}")
-        if SUBPROC_LOGGER:
-            SUBPROC_LOGGER.error("[EVAL_ERROR] Evaluation timeout after %ds", timeout_seconds)
-        try:
-            proc.kill()
-        except Exception:
-            pass
     except Exception as e:
         print(f"\nâŒ ERROR: Subprocess execution failed: {e}")
         import traceback
@@ -1694,9 +1942,12 @@ async def trigger_evaluation_for_all_files(
         if SUBPROC_LOGGER:
             SUBPROC_LOGGER.error("[EVAL_ERROR] Evaluation exception: %s", e, exc_info=True)
 
-async def process_file_fpf_batch(md_file_path: str, config: dict, fpf_entries: list[dict], iterations: int, keep_temp: bool = False, on_event=None, timeout: float | None = None):
+@workspaces.scoped
+async def process_file_fpf_batch(md_file_path: str, config: dict, fpf_entries: list[dict], iterations: int, keep_temp: bool = False, on_event=None, timeout: float | None = None, run_indices: list[int] | None = None):
     """
     Aggregate all FPF runs for a single markdown file and execute them in one batch via stdin -> FPF.
+    run_indices (config runs[] position of each entry) enables the run journal: repetitions already
+    recorded as done are left out of the batch.
     """
     input_folder = os.path.abspath(config["input_folder"])
     output_folder = os.path.abspath(config["output_folder"])
@@ -1705,6 +1956,9 @@ async def process_file_fpf_batch(md_file_path: str, config: dict, fpf_entries: l
     # Build stdin JSON array for FPF
     batch_runs = []
     run_counter = 0
+    journal = RUN_JOURNAL if run_indices is not None else None
+    unit_by_run_id: dict[str, str] = {}
+    unit_by_name: dict[str, str] = {}
     for idx, entry in enumerate(fpf_entries):
         provider = (entry.get("provider") or "").strip()
         model = (entry.get("model") or "").strip()
@@ -1714,34 +1968,261 @@ async def process_file_fpf_batch(md_file_path: str, config: dict, fpf_entries: l
         for rep in range(1, int(iterations) + 1):
             run_counter += 1
             run_id = f"fpf-{idx+1}-{rep}"
+            unit = None
+            if journal is not None:
+                unit = gen_unit(md_file_path, run_indices[idx], rep)
+                if journal.is_done(unit):
+                    continue
             # Generate standardized filename with uid to avoid duplicates
             uid = pm_utils.uid3()
             model_label = pm_utils.sanitize_model_for_filename(model)
             base_name = Path(md_file_path).stem
+            out_path = os.path.join(output_folder, f"{base_name}.fpf.{rep}.{model_label}.{uid}.txt")
             batch_runs.append({
                 "id": run_id,
                 "provider": provider,
                 "model": model,
                 "file_a": instructions_file,
                 "file_b": md_file_path,
-                "out": os.path.join(output_folder, f"{base_name}.fpf.{rep}.{model_label}.{uid}.txt")
+                "out": out_path
             })
+            if unit:
+                unit_by_run_id[run_id] = unit
+                unit_by_name[os.path.basename(out_path)] = unit
 
     if not batch_runs:
-        print("  No valid FPF runs to execute in batch.")
+        if journal is not None and run_counter:
+            print(f"  [JOURNAL] all FPF runs already complete for {os.path.basename(md_file_path)}; skipping batch")
+        else:
+            print("  No valid FPF runs to execute in batch.")
         return
+    if deadlines.current().expired():
+        # File/batch budget already spent: do not launch (left failed for --resume)
+        print(f"  [DEADLINE] skipping FPF batch for {os.path.basename(md_file_path)}: {deadlines.current().reason()}")
+        for unit in unit_by_run_id.values():
+            journal.fail(unit, deadlines.current().reason())
+        return
+    if not cost_ledger.get_ledger().allow_launch():
+        print(f"  [BUDGET] skipping FPF batch for {os.path.basename(md_file_path)}: {cost_ledger.get_ledger().reason()}")
+        for unit in unit_by_run_id.values():
+            journal.fail(unit, cost_ledger.get_ledger().reason())
+        return
+    fpf_options = {
+        "json": False,
+        "run_timeout_seconds": deadlines.get_settings().for_run("fpf"),
+        "config_overrides": config.get("fpf_overrides"),
+    }
+
+    # FPF schedules runs inside its own process, so debit the shared provider buckets for the
+    # whole batch up front and mirror its run_start/run_complete events into the limiter's
+    # inflight counts so other run types see the FPF load against each provider's cap.
+    limiter = rate_limiter.get_rate_limiter()
+    per_run_tokens = 0
+    if limiter.enabled:
+        try:
+            prompt_chars = run_context.read_text(instructions_file) + run_context.read_text(md_file_path)
+        except Exception:
+            prompt_chars = ""
+        per_run_tokens = limiter.estimate_tokens(prompt_chars, "fpf")
+        groups: dict[tuple[str, str], int] = {}
+        for r in batch_runs:
+            groups[(r["provider"], r["model"])] = groups.get((r["provider"], r["model"]), 0) + 1
+        for (gp, gm), n in groups.items():
+            await limiter.reserve(gp, gm, requests=n, tokens=per_run_tokens * n)
+
+    started: dict[str, tuple[str, str]] = {}
+    started_at: dict[str, float] = {}
+    loop = asyncio.get_running_loop()
+
+    # Hedged re-launch of straggler runs (concurrency.hedging). FPF runs share one child
+    # process per batch, so a hedge is its own single-run batch ("<id>-hedge"). The first
+    # successful finisher wins; a losing hedge is killed, a losing primary's output is discarded.
+    hedge_policy = hedging.get_policy()
+    hedge_ledger = hedging.HedgeLedger()
+    hedge_tasks: dict[str, asyncio.Task] = {}
+    hedge_results: list = []
+    superseded: set[str] = set()
+    runs_by_id = {r["id"]: r for r in batch_runs}
+
+    def _on_event(event):
+        try:
+            data = (event or {}).get("data") or {}
+            etype = (event or {}).get("type")
+            rid = str(data.get("id"))
+            is_hedge = rid.endswith(hedging.HEDGE_SUFFIX)
+            primary_id = rid[: -len(hedging.HEDGE_SUFFIX)] if is_hedge else rid
+            if etype == "run_start":
+                started[rid] = (data.get("provider"), data.get("model"))
+                proc_sampler.note_run(rid)
+                started_at.setdefault(rid, time.monotonic())
+                limiter.note_start(data.get("provider"), data.get("model"))
+            elif etype == "run_complete":
+                if started.pop(rid, None) is not None:
+                    limiter.note_end(data.get("provider"), data.get("model"))
+                if primary_id in hedge_tasks and data.get("ok"):
+                    who = hedging.WINNER_HEDGE if is_hedge else hedging.WINNER_PRIMARY
+                    if hedge_ledger.claim(primary_id, who):
+                        if not is_hedge:
+                            loop.call_soon_threadsafe(hedge_tasks[primary_id].cancel)
+                    else:
+                        # Lost the race: drop the duplicate output so it is neither evaluated nor saved
+                        loser_path = data.get("path")
+                        if loser_path:
+                            superseded.add(os.path.abspath(loser_path))
+                            try:
+                                os.remove(loser_path)
+                            except Exception:
+                                pass
+                        event = {"type": "run_complete", "data": dict(data, ok=False, path=None, status="superseded", error="hedge_superseded")}
+        except Exception:
+            pass
+        if journal is not None:
+            try:
+                data = (event or {}).get("data") or {}
+                rid = str(data.get("id"))
+                unit = unit_by_run_id.get(rid[: -len(hedging.HEDGE_SUFFIX)] if rid.endswith(hedging.HEDGE_SUFFIX) else rid)
+                if unit and event.get("type") == "run_start":
+                    journal.start(unit, "gen", md_file_path)
+                elif unit and event.get("type") == "run_complete" and not data.get("ok"):
+                    journal.fail(unit, data.get("error") or data.get("status"))
+            except Exception:
+                pass
+        if on_event:
+            on_event(event)
+
+    async def _run_hedge(run: dict, delay: float):
+        hid = f"{run['id']}{hedging.HEDGE_SUFFIX}"
+        # Same naming scheme as the primary, with a fresh uid: <base>.fpf.<rep>.<model>.<uid>.txt
+        head, _uid, ext = run["out"].rsplit(".", 2)
+        hedge_run = dict(run, id=hid, out=f"{head}.{pm_utils.uid3()}.{ext}")
+        if run["id"] in unit_by_run_id:
+            unit_by_name[os.path.basename(hedge_run["out"])] = unit_by_run_id[run["id"]]
+        log = SUBPROC_LOGGER.info if SUBPROC_LOGGER else print
+        t_hedge = time.monotonic()
+        log(f"[HEDGE_START] id={run['id']} type=fpf model={run['model']} after={delay:.0f}s")
+        try:
+            if limiter.enabled:
+                await limiter.reserve(run["provider"], run["model"], requests=1, tokens=per_run_tokens)
+            res = await fpf_runner.run_filepromptforge_batch([hedge_run], options=fpf_options, on_event=_on_event, timeout=timeout)
+            if res and hedge_ledger.winner(run["id"]) == hedging.WINNER_HEDGE:
+                hedge_results.extend(res)
+        except asyncio.CancelledError:
+            if hid in started:
+                _on_event({"type": "run_complete", "data": {
+                    "id": hid, "kind": "rest", "provider": run["provider"], "model": run["model"],
+                    "ok": False, "status": "cancelled", "path": None, "error": "hedge_cancelled",
+                }})
+        except Exception as e:
+            print(f"  FPF hedge {hid} failed: {e}")
+        finally:
+            winner = hedge_ledger.winner(run["id"]) or hedging.WINNER_NONE
+            extra = time.monotonic() - t_hedge
+            hedge_policy.record(winner, extra)
+            log(f"[HEDGE_END] id={run['id']} winner={winner} extra_seconds={extra:.1f}")
 
-    try:
-        fpf_results = await fpf_runner.run_filepromptforge_batch(batch_runs, options={"json": False}, on_event=on_event, timeout=timeout)
-    except Exception as e:
-        print(f"  FPF batch failed: {e}")
-        fpf_results = []
+    async def _watch_stragglers():
+        while True:
+            await asyncio.sleep(5)
+            now = time.monotonic()
+            for rid, t_start in list(started_at.items()):
+                if rid in hedge_tasks or rid not in started or rid not in runs_by_id:
+                    continue
+                run = runs_by_id[rid]
+                delay = hedge_policy.delay_for("fpf", run["model"])
+                if delay is None or now - t_start < delay:
+                    continue
+                if not hedge_policy.try_reserve():
+                    return
+                hedge_tasks[rid] = asyncio.create_task(_run_hedge(run, delay))
+
+    def _close_unfinished(e: BaseException, provider: str | None = None) -> None:
+        # Process group already killed; close every run of that batch (all providers, or just
+        # `provider` for a per-provider batch) that started but never reported completion.
+        # Runs whose hedge is still in flight are left to the hedge; finally releases their slots.
+        label = f" (provider={provider})" if provider else ""
+        print(f"  [DEADLINE] FPF batch for {os.path.basename(md_file_path)}{label} stopped: {e}")
+        for rid, (gp, gm) in list(started.items()):
+            if provider is not None and (gp or "").strip().lower() != provider:
+                continue
+            primary_id = rid[: -len(hedging.HEDGE_SUFFIX)] if rid.endswith(hedging.HEDGE_SUFFIX) else rid
+            hedge = hedge_tasks.get(primary_id)
+            if hedge is not None and not hedge.done():
+                continue
+            kind = "deep" if (gp or "").strip().lower() == "openaidp" else "rest"
+            if SUBPROC_LOGGER:
+                SUBPROC_LOGGER.info(f"[FPF RUN_COMPLETE] id={rid} kind={kind} provider={gp} model={gm} ok=false elapsed=na status=deadline path=na error=deadline reason=deadline")
+            _on_event({"type": "run_complete", "data": {
+                "id": rid, "kind": kind, "provider": gp, "model": gm,
+                "ok": False, "status": "deadline", "path": None, "error": str(e) or "deadline exceeded",
+            }})
+
+    # FPF runs its batch with its own --max-concurrency, out of the provider limiter's reach. With
+    # adaptive concurrency on, each provider gets its own FPF child capped at the provider's current
+    # AIMD limit, so a 429 from FPF slows FPF's next batch for that provider too.
+    controller = adaptive_concurrency.get_controller()
+
+    async def _run_batches():
+        if not controller.enabled:
+            return await fpf_runner.run_filepromptforge_batch(batch_runs, options=fpf_options, on_event=_on_event, timeout=timeout)
+        by_provider: dict[str, list[dict]] = {}
+        for r in batch_runs:
+            by_provider.setdefault(r["provider"].strip().lower(), []).append(r)
+
+        async def _provider_batch(provider: str, runs_for_provider: list[dict]):
+            cap = controller.cap(provider)
+            print(f"  [ADAPTIVE] FPF batch provider={provider} runs={len(runs_for_provider)} max_concurrency={cap}")
+            return await fpf_runner.run_filepromptforge_batch(
+                runs_for_provider, options=dict(fpf_options, max_concurrency=cap), on_event=_on_event, timeout=timeout,
+            )
+
+        outcomes = await asyncio.gather(*(_provider_batch(p, rs) for p, rs in by_provider.items()), return_exceptions=True)
+        results = []
+        for provider, outcome in zip(by_provider, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                _close_unfinished(outcome, provider)
+            elif isinstance(outcome, BaseException):
+                print(f"  FPF batch failed (provider={provider}): {outcome}")
+            else:
+                results.extend(outcome or [])
+        return results
+
+    # One [PROC_STATS] line for the batch child (and any hedge children), listing the run ids it served
+    with proc_sampler.tag(f"fpf-batch-{pm_utils.uid3()}", "fpf"):
+        watcher = asyncio.create_task(_watch_stragglers()) if hedge_policy.applies("fpf") else None
+
+        try:
+            fpf_results = await _run_batches()
+        except asyncio.TimeoutError as e:
+            _close_unfinished(e)
+            fpf_results = []
+        except Exception as e:
+            print(f"  FPF batch failed: {e}")
+            fpf_results = []
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+                await asyncio.gather(watcher, return_exceptions=True)
+            # Hedges whose primary failed are still the only chance for that run
+            if hedge_tasks:
+                await asyncio.gather(*hedge_tasks.values(), return_exceptions=True)
+            # Runs that never reported completion (crash/timeout) must not keep holding provider capacity
+            for gp, gm in list(started.values()):
+                limiter.note_end(gp, gm)
+            started.clear()
+
+    if hedge_tasks:
+        fpf_results = [r for r in fpf_results if os.path.abspath(r[0]) not in superseded] + hedge_results
 
     # Save only FPF outputs for this file
     generated = {"ma": [], "gptr": [], "dr": [], "fpf": fpf_results}
     print("  Saving FPF batch reports to output folder (mirroring input structure)...")
     try:
         saved_files = save_generated_reports(md_file_path, input_folder, output_folder, generated)
+        if journal is not None:
+            for path in saved_files:
+                unit = unit_by_name.get(os.path.basename(path))
+                if unit:
+                    journal.finish(unit, outputs=[path])
         if saved_files:
             print(f"  Saved {len(saved_files)} FPF report(s) to {os.path.dirname(saved_files[0])}")
         else:
@@ -1761,7 +2242,289 @@ async def process_file_fpf_batch(md_file_path: str, config: dict, fpf_entries: l
     #     print(f"  Warning: failed to cleanup temp dir {TEMP_BASE}: {e}")
 
 
-async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_runs: int = 3, keep_temp: bool = False):
+# ---------------------------------------------------------------------------
+# Distributed mode (functions/job_queue.py): the coordinator queues generation
+# jobs and collects what workers post back; workers run them with the normal
+# process_file_run / process_file_fpf_batch code paths.
+# ---------------------------------------------------------------------------
+
+def _enqueue_file_jobs(queue, batch_id: str, md: str, config: dict, runs: list[dict], iterations: int, max_attempts: int = 3) -> int:
+    """Queue every generation job for one input file; units the run journal already has as done are left out."""
+    md = os.path.abspath(md)
+    input_folder = os.path.abspath(config["input_folder"])
+    with open(md, "rb") as fh:
+        input_key = queue.put_blob(fh.read())
+    with open(os.path.abspath(config["instructions_file"]), "rb") as fh:
+        instructions_key = queue.put_blob(fh.read())
+    common = {"rel": os.path.relpath(md, input_folder), "input_key": input_key, "instructions_key": instructions_key}
+
+    queued = 0
+    for idx, entry in enumerate(runs):
+        rtype = (entry.get("type") or "").strip().lower()
+        units = [gen_unit(md, idx, it) for it in range(1, int(iterations) + 1)]
+        if RUN_JOURNAL is not None:
+            for unit in units:
+                RUN_JOURNAL.plan(unit, "gen", md, detail=f"{entry.get('type')}:{entry.get('provider')}:{entry.get('model')}")
+            units = [u for u in units if not RUN_JOURNAL.is_done(u)]
+        if not units:
+            continue
+        if rtype == "fpf":
+            # FPF schedules iterations inside one child: one job per run entry
+            payload = dict(common, entry=entry, run_index=idx, iterations=len(units), units=units)
+            queued += queue.enqueue(batch_id, f"fpf|{md}|{idx}", job_queue.KIND_FPF, payload, file=md, max_attempts=max_attempts)
+        else:
+            for unit in units:
+                payload = dict(common, entry=entry, run_index=idx, iterations=1, units=[unit])
+                queued += queue.enqueue(batch_id, unit, job_queue.KIND_GEN, payload, file=md, max_attempts=max_attempts)
+    return queued
+
+
+def _artifact_unit(units: list[str], name: str) -> str | None:
+    """
+    Journal unit of one posted report. A generation job holds a single unit; an FPF job runs its
+    pending units as reps 1..n in payload order, and each output name carries its rep
+    ({base}.fpf.{rep}.{model}.{uid}.txt).
+    """
+    if len(units) == 1:
+        return units[0]
+    m = re.search(r"\.fpf\.(\d+)\.", name)
+    if m and 1 <= int(m.group(1)) <= len(units):
+        return units[int(m.group(1)) - 1]
+    return None
+
+
+def _store_job_results(queue, job, md: str, input_folder: str, output_folder: str) -> list[str]:
+    """Save a finished job's posted reports as if they had been generated here; journal its units."""
+    units = list(job.payload.get("units") or [])
+    saved: list[str] = []
+    saved_by_unit: dict[str | None, list[str]] = {}
+    if job.state == job_queue.STATE_DONE:
+        workspace = workspaces.create(f"job_{job.job_id}")
+        staging = workspace.path
+        try:
+            # Saved per unit so each unit is journaled with its own outputs, whatever subset or
+            # order of reports the worker posted
+            by_unit: dict[str | None, dict[str, list]] = {}
+            for art in queue.artifacts(job.job_id):
+                name = os.path.basename(art["name"])
+                path = os.path.join(staging, name)
+                with open(path, "wb") as fh:
+                    fh.write(art["data"])
+                generated = by_unit.setdefault(_artifact_unit(units, name), {"ma": [], "gptr": [], "dr": [], "fpf": []})
+                generated.setdefault(art["type"], []).append((path, art["model"]))
+            for unit, generated in by_unit.items():
+                unit_saved = save_generated_reports(md, input_folder, output_folder, generated)
+                saved_by_unit.setdefault(unit, []).extend(unit_saved)
+                saved.extend(unit_saved)
+        finally:
+            workspace.release()
+    if RUN_JOURNAL is not None and units:
+        try:
+            for unit in units:
+                if saved_by_unit.get(unit):
+                    RUN_JOURNAL.finish(unit, outputs=saved_by_unit[unit])
+                else:
+                    RUN_JOURNAL.fail(unit, job.error or "no output")
+        except Exception as e:
+            print(f"  Warning: run journal update failed: {e}")
+    queue.mark_collected(job.job_id)
+    print(f"  [QUEUE] job {job.job_id} {job.state} (worker={job.worker}, attempts={job.attempts}): {len(saved)} report(s) for {os.path.basename(md)}")
+    return saved
+
+
+async def _collect_file_jobs(queue, batch_id: str, md: str, config: dict, poll_seconds: float) -> dict:
+    """Wait until every job of one input file has finished, storing reports as they arrive."""
+    md = os.path.abspath(md)
+    input_folder = os.path.abspath(config["input_folder"])
+    output_folder = os.path.abspath(config["output_folder"])
+    started: set[int] = set()
+    while True:
+        jobs = await asyncio.to_thread(queue.jobs, batch_id, md)
+        for job in jobs:
+            if job.state == job_queue.STATE_LEASED and job.job_id not in started and RUN_JOURNAL is not None:
+                started.add(job.job_id)
+                for unit in job.payload.get("units") or []:
+                    RUN_JOURNAL.start(unit, "gen", md)
+            if job.finished and not job.collected:
+                await asyncio.to_thread(_store_job_results, queue, job, md, input_folder, output_folder)
+        if all(j.finished for j in jobs):
+            return {s: sum(1 for j in jobs if j.state == s) for s in (job_queue.STATE_DONE, job_queue.STATE_FAILED)}
+        if deadlines.current().expired():
+            # Leave the remaining jobs queued for a later --resume; evaluate what arrived
+            print(f"  [DEADLINE] stopped waiting for workers on {os.path.basename(md)}: {deadlines.current().reason()}")
+            return {s: sum(1 for j in jobs if j.state == s) for s in (job_queue.STATE_DONE, job_queue.STATE_FAILED)}
+        await asyncio.sleep(poll_seconds)
+
+
+async def _run_queue_job(queue, job, config: dict, settings, worker_id: str, keep_temp: bool = False) -> None:
+    """Run one leased job in a scratch folder and post its reports back to the queue."""
+    p = job.payload
+    workdir = os.path.join(settings.worker_dir, f"job_{job.job_id}_{pm_utils.uid3()}")
+    local_md = os.path.join(workdir, "inputs", p["rel"])
+    instructions = os.path.join(workdir, "instructions.txt")
+    os.makedirs(os.path.dirname(local_md), exist_ok=True)
+    for key, dest in ((p["input_key"], local_md), (p["instructions_key"], instructions)):
+        data = await asyncio.to_thread(queue.get_blob, key)
+        if data is None:
+            await asyncio.to_thread(queue.fail, job.job_id, worker_id, f"missing input blob {key}", False)
+            return
+        with open(dest, "wb") as fh:
+            fh.write(data)
+    job_config = dict(
+        config,
+        input_folder=os.path.join(workdir, "inputs"),
+        output_folder=os.path.join(workdir, "outputs"),
+        instructions_file=instructions,
+    )
+
+    entry = p["entry"]
+    print(f"\n[WORKER] job {job.job_id} ({job.kind}) {entry.get('type')}:{entry.get('provider')}:{entry.get('model')} file={p['rel']} attempt={job.attempts}")
+    runner_task = asyncio.current_task()
+
+    async def _keep_lease():
+        while True:
+            await asyncio.sleep(settings.lease_seconds / 3)
+            if not await asyncio.to_thread(queue.renew, job.job_id, worker_id, settings.lease_seconds):
+                print(f"  [WORKER] lost the lease on job {job.job_id}; stopping it")
+                runner_task.cancel()
+                return
+
+    keeper = asyncio.create_task(_keep_lease())
+    try:
+        if job.kind == job_queue.KIND_FPF:
+            await process_file_fpf_batch(local_md, job_config, [entry], int(p.get("iterations", 1)), keep_temp=keep_temp)
+        else:
+            await process_file_run(local_md, job_config, entry, int(p.get("iterations", 1)), keep_temp=keep_temp)
+        artifacts = []
+        for e in artifact_manifest.get_manifest().entries(input_file=local_md):
+            if os.path.isfile(e["path"]):
+                with open(e["path"], "rb") as fh:
+                    artifacts.append({"name": os.path.basename(e["path"]), "type": e["type"], "model": e["model"], "data": fh.read()})
+        if artifacts:
+            posted = await asyncio.to_thread(queue.complete, job.job_id, worker_id, artifacts)
+            print(f"  [WORKER] job {job.job_id} done: {len(artifacts)} report(s)" + ("" if posted else " (lease lost, discarded)"))
+        else:
+            await asyncio.to_thread(queue.fail, job.job_id, worker_id, "no output")
+            print(f"  [WORKER] job {job.job_id} produced no output")
+    except asyncio.CancelledError:
+        await asyncio.to_thread(queue.fail, job.job_id, worker_id, "worker stopped")
+        raise
+    except Exception as e:
+        print(f"  [WORKER] job {job.job_id} failed: {e}")
+        await asyncio.to_thread(queue.fail, job.job_id, worker_id, str(e))
+    finally:
+        keeper.cancel()
+        await asyncio.gather(keeper, return_exceptions=True)
+        if not keep_temp:
+            await asyncio.to_thread(shutil.rmtree, workdir, True)
+
+
+async def worker_main(config_path: str, queue_spec: str | None = None, worker_id: str | None = None, max_jobs: int | None = None, exit_when_idle: bool = False, batch_id: str | None = None, keep_temp: bool = False):
+    """Lease and run generation jobs from a coordinator's queue until stopped (or idle/max_jobs)."""
+    import socket
+
+    config_path = os.path.abspath(config_path)
+    config_dir = os.path.dirname(config_path)
+    config = config_parser.load_config(config_path)
+    if not config:
+        print("Failed to load configuration. Exiting.")
+        return
+
+    # Workers honour their own provider limits, hedging and deadlines
+    limiter = rate_limiter.configure(config)
+    adaptive_concurrency.configure(config, limiter)
+    hedging.configure(config)
+    deadlines.configure(config)
+    ws_manager = await workspaces.configure(config, keep=keep_temp).start()
+    # Workers are where launches pile up: gate them on free memory and learn footprints here too
+    sampler = await proc_sampler.configure(config).start()
+    admission = memory_admission.configure(config)
+    forks = await fork_server.configure(config).start()
+
+    settings = job_queue.resolve_queue_settings(config, config_dir)
+    queue = job_queue.open_queue(queue_spec or settings.queue, config_dir)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    artifact_manifest.configure(config, config_dir, f"worker_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}")
+    print(f"[WORKER] id={worker_id} queue={getattr(queue, 'path', queue_spec)} slots={settings.worker_slots}" + (f" batch={batch_id}" if batch_id else ""))
+
+    running: set[asyncio.Task] = set()
+    leased = 0
+    try:
+        while True:
+            while len(running) < settings.worker_slots and (max_jobs is None or leased < max_jobs):
+                job = await asyncio.to_thread(queue.lease, worker_id, settings.lease_seconds, batch_id)
+                if job is None:
+                    break
+                leased += 1
+                running.add(asyncio.create_task(_run_queue_job(queue, job, config, settings, worker_id, keep_temp=keep_temp)))
+            if not running:
+                if exit_when_idle or (max_jobs is not None and leased >= max_jobs):
+                    break
+                await asyncio.sleep(settings.poll_seconds)
+                continue
+            _done, running = await asyncio.wait(running, timeout=settings.poll_seconds, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+        queue.close()
+        await ws_manager.stop()
+        await sampler.stop()
+        await forks.stop()
+    if admission.enabled:
+        print(f"[MEM_ADMIT] {admission.summary()}")
+    if forks.servers:
+        print(f"[FORK_SERVER] {forks.summary()}")
+    print(f"[WORKER] id={worker_id} finished after {leased} job(s)")
+
+
+async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_runs: int = 3, keep_temp: bool = False, resume: bool | str = False, coordinator: bool = False, queue_spec: str | None = None):
+    """Run one batch. A hard budget (functions/cost_ledger) cancels it; that ends the batch cleanly, not with an error."""
+    previous = cost_ledger.get_ledger()
+    previous_sink = log_sink.get_sink()
+    previous_context = run_context.get_context()
+    previous_workspaces = workspaces.get_manager()
+    previous_sampler = proc_sampler.get_sampler()
+    previous_admission = memory_admission.get_admission()
+    previous_forks = fork_server.get_pool()
+    batch = asyncio.ensure_future(_main_batch(config_path, run_ma=run_ma, run_fpf=run_fpf, num_runs=num_runs, keep_temp=keep_temp, resume=resume, coordinator=coordinator, queue_spec=queue_spec))
+    try:
+        return await batch
+    except asyncio.CancelledError:
+        ledger = cost_ledger.get_ledger()
+        if not (batch.cancelled() and ledger.hard_exceeded):
+            raise
+        hint = " (unfinished units can be picked up with --resume)" if RUN_JOURNAL is not None else ""
+        print(f"[BUDGET] Batch cancelled: {ledger.reason()}{hint}")
+    finally:
+        ledger = cost_ledger.get_ledger()
+        if ledger is not previous:
+            await ledger.stop()
+            print(f"[COST] {ledger.summary()}")
+        sink = log_sink.get_sink()
+        if sink is not previous_sink:
+            sink.stop()
+            if sink.settings.enabled:
+                print(f"[LOG_SINK] {sink.summary()}")
+        run_context.set_context(previous_context)
+        ws_manager = workspaces.get_manager()
+        if ws_manager is not previous_workspaces:
+            await ws_manager.stop()
+            print(f"[WORKSPACES] {ws_manager.summary()}")
+        sampler = proc_sampler.get_sampler()
+        if sampler is not previous_sampler:
+            await sampler.stop()
+        admission = memory_admission.get_admission()
+        if admission is not previous_admission and admission.enabled:
+            print(f"[MEM_ADMIT] {admission.summary()}")
+        forks = fork_server.get_pool()
+        if forks is not previous_forks and forks.servers:
+            await forks.stop()
+            print(f"[FORK_SERVER] {forks.summary()}")
+
+
+async def _main_batch(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_runs: int = 3, keep_temp: bool = False, resume: bool | str = False, coordinator: bool = False, queue_spec: str | None = None):
     config_path = os.path.abspath(config_path)
     config_dir = os.path.dirname(config_path)
     config = config_parser.load_config(config_path)
@@ -1770,6 +2533,16 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
         print("Failed to load configuration. Exiting.")
         return
 
+    # One provider-aware scheduler shared by every run type (gptr/dr/ma/fpf/eval/combine)
+    limiter = rate_limiter.configure(config)
+    if limiter.enabled:
+        rl_cfg = config.get("rate_limits") or {}
+        print(f"[RATE LIMITS] enabled=True providers={sorted((rl_cfg.get('providers') or {}).keys())} models={sorted((rl_cfg.get('models') or {}).keys())}")
+    # AIMD concurrency per provider, enforced through the shared limiter
+    adaptive = adaptive_concurrency.configure(config, limiter)
+    if adaptive.enabled:
+        print(f"[ADAPTIVE CONCURRENCY] enabled=True ceiling={adaptive.ceiling()}")
+
     # Resolve log levels and build ACM logger (no basicConfig; named logger only)
     console_name, file_name, console_level, file_level = logging_levels.resolve_levels(config)
     acm_logger = logging_levels.build_logger("acm", console_level, file_level)
@@ -1820,6 +2593,15 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
         acm_logger.error(f"Failed to initialize subprocess logger: {e}")
         SUBPROC_LOGGER = None
 
+    # Forwarded child output is queued and written in batches off the reader path (functions/log_sink)
+    log_sink.configure(config).attach(acm_logger, SUBPROC_LOGGER, fpf_runner.logger)
+    # Per-child CPU/RSS/IO, logged as [PROC_STATS] for the timeline (functions/proc_sampler)
+    await proc_sampler.configure(config, logger=SUBPROC_LOGGER).start()
+    # Hold child launches while memory headroom is low; per-kind rlimits (functions/memory_admission)
+    memory_admission.configure(config)
+    # GPT-R/MA/FPF/eval children forked from pre-warmed interpreters (functions/fork_server)
+    await fork_server.configure(config).start()
+
     # Resolve forward_subprocess_output flag (env > config > default)
     def _coerce_bool(val, default=True):
         if val is None:
@@ -1856,6 +2638,17 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
     config['output_folder'] = output_folder
     config['instructions_file'] = instructions_file
 
+    # Snapshot config, paths and input texts once; nothing below re-reads config.yaml or the inputs
+    try:
+        ctx = run_context.build(config_path, config, file_manager.find_markdown_files(input_folder))
+    except ValueError as e:
+        print(f"Invalid configuration: {e}. Exiting.")
+        return
+    run_context.set_context(ctx)
+    config = ctx.config
+    # Per-run temp workspaces, deleted off the event loop as runs release them
+    await workspaces.configure(config, keep=keep_temp).start()
+
     # Heartbeat: batch + active runs with mm:ss every 30 seconds
     batch_start_ts = time.time()
     active_runs: dict[str, float] = {}
@@ -1876,15 +2669,23 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
         now = time.time()
         return [f"{rid}={_format_mmss(now - ts)}" for rid, ts in items]
 
+    # A cancelled batch (daemon cancel, hard budget) skips the normal stop below; end with the task
+    hb_owner = asyncio.current_task()
+
     def _hb():
-        while not hb_stop.is_set():
+        while not hb_stop.is_set() and not (hb_owner is not None and hb_owner.done()):
             now = time.time()
             batch_elapsed = _format_mmss(now - batch_start_ts)
             runs_list = _snapshot_runs()
-            msg = f"[HEARTBEAT ACM] batch={batch_elapsed} active={len(runs_list)} runs=[{', '.join(runs_list)}]"
+            lag = loop_lag.snapshot()
+            logq = log_sink.get_sink().stats()
+            msg = f"[HEARTBEAT ACM] batch={batch_elapsed} active={len(runs_list)} spent=${cost_ledger.get_ledger().spent():.4f} loop_lag_ms={lag['last_ms']} (max {lag['max_ms']}) log_q={logq['depth']} log_dropped={logq['dropped'] + logq['rate_limited']} runs=[{', '.join(runs_list)}]"
             print(msg, flush=True)
             hb_stop.wait(30.0)
 
+    # Event-loop lag (blocking work on the loop thread shows up here and in the heartbeat)
+    loop_lag = LoopLagMonitor().start()
+
     t_hb = threading.Thread(target=_hb, daemon=True)
     t_hb.start()
 
@@ -1896,43 +2697,37 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
         with active_lock:
             active_runs.pop(run_id, None)
 
-    # Shared variable to store timeline JSON path for evaluation
-    timeline_json_path_holder = {"path": None}
-    
     # Append end-of-run timeline generated from the unique subprocess log into ACM log
-    # Also exports timeline JSON for HTML report
-    def _append_timeline_to_acm_log(log_path_to_process: str, json_output_dir: str = None):
+    # Also exports timeline JSON for HTML report; returns the JSON path when one was written.
+    # Each input file passes its own json_path: pipelined evaluations run concurrently.
+    # Runs through process_runner so a slow timeline script never blocks the event loop.
+    async def _append_timeline_to_acm_log(log_path_to_process: str, json_path: str = None) -> str | None:
         if not log_path_to_process:
             acm_logger.warning("Timeline generation skipped: no subprocess log path provided.")
-            return
+            return None
         try:
             script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools", "timeline_from_logs.py")
             acm_log = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "acm_session.log")
             
             if not (os.path.isfile(script_path) and os.path.isfile(log_path_to_process) and os.path.isfile(acm_log)):
                 acm_logger.warning(f"Timeline script or log files not found. Script: {script_path}, SubprocLog: {log_path_to_process}, AcmLog: {acm_log}")
-                return
+                return None
 
             # Build command with optional JSON output
             cmd = [sys.executable, "-u", script_path, "--log-file", log_path_to_process, "--acm-log-file", acm_log]
             
-            # If json_output_dir provided, add JSON export
-            json_path = None
-            if json_output_dir:
-                os.makedirs(json_output_dir, exist_ok=True)
-                json_path = os.path.join(json_output_dir, "timeline_data.json")
+            # If json_path provided, add JSON export
+            if json_path:
+                os.makedirs(os.path.dirname(json_path), exist_ok=True)
                 cmd.extend(["--json-output", json_path])
             
-            proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
+            env = os.environ.copy()
+            env.setdefault("PYTHONIOENCODING", "utf-8")
+            proc = await process_runner.run_process(
+                cmd, env=env, deadline=deadlines.current().child(120, "timeline"), tail_lines=None,
             )
-            out, err = proc.communicate(timeout=120)
-            if proc.returncode == 0 and out:
+            out, err = proc.stdout_text, proc.stderr_text
+            if proc.ok and out:
                 try:
                     acm_logger.info("[TIMELINE]")
                 except Exception:
@@ -1946,13 +2741,13 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
                         acm_logger.info(lns)
                     except Exception:
                         pass
-                # Store JSON path if created
+                # Report JSON path if created
                 if json_path and os.path.isfile(json_path):
-                    timeline_json_path_holder["path"] = json_path
                     acm_logger.info(f"[TIMELINE_JSON] Exported to {json_path}")
+                    return json_path
             else:
                 try:
-                    acm_logger.warning("Timeline script exited rc=%s; stderr: %s", proc.returncode, (err or "").strip())
+                    acm_logger.warning("Timeline script exited rc=%s%s; stderr: %s", proc.returncode, f" ({proc.reason})" if proc.timed_out else "", (err or "").strip())
                 except Exception:
                     pass
         except Exception as e:
@@ -1962,7 +2757,7 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
                 pass
 
     # runs-only mode: per-type iterations are deprecated; we use iterations_default later
-    markdown_files = file_manager.find_markdown_files(input_folder)
+    markdown_files = list(ctx.input_files)
     print(f"Found {len(markdown_files)} markdown files in input folder.")
 
     if config.get('one_file_only', False) and markdown_files:
@@ -1990,6 +2785,100 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
             sanitized_runs.append(e)
         runs = sanitized_runs
 
+        # Start every provider at its adaptive initial cap (instead of unlimited until the first outcome)
+        if adaptive.enabled:
+            for e in runs:
+                adaptive.prime(e.get("provider") or ("openai" if (e.get("type") or "").strip().lower() == "ma" else ""))
+
+        # Launch ordering: 'config' (as listed) or 'longest_first' (predicted from earlier batches' logs)
+        run_history: RunHistory | None = None
+        longest_first = resolve_launch_order(config) == "longest_first"
+        hedging_cfg = ((config.get("concurrency") or {}).get("hedging")) or {}
+        history: RunHistory | None = None
+        if longest_first or hedging_cfg.get("enabled"):
+            try:
+                history = RunHistory.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs"))
+            except Exception as e:
+                print(f"  Warning: failed to load run history: {e}")
+                history = None
+        if longest_first and history is not None:
+            run_history = history
+            print(f"[LAUNCH ORDER] longest_first: {run_history.count()} historical run(s) loaded")
+            for e in runs:
+                rt = (e.get("type") or "").strip().lower()
+                print(f"  predicted {rt}:{e.get('model')} = {run_history.predict(rt, e.get('model')):.0f}s")
+        elif longest_first:
+            print("  Warning: no run history available, using config order")
+
+        # Hedged re-launch of stragglers (opt-in; needs history for the p90 trigger)
+        hedge_policy = hedging.configure(config, history)
+        if hedge_policy.enabled:
+            print(f"[HEDGING] enabled=True percentile={hedge_policy.percentile} max_hedges={hedge_policy.max_hedges} types={sorted(hedge_policy.types)}")
+
+        # Batch > file > run/eval deadlines; expiry kills the affected process groups
+        deadline_settings = deadlines.configure(config)
+        batch_deadline = deadlines.Deadline(deadline_settings.batch_seconds, label="batch")
+        file_deadlines: dict[str, deadlines.Deadline] = {}
+        print(
+            f"[DEADLINES] batch={deadline_settings.batch_seconds} file={deadline_settings.file_seconds} "
+            f"eval={deadline_settings.eval_seconds} run={deadline_settings.run_seconds}"
+        )
+
+        # Running spend per provider/phase; soft budget stops new launches, hard budget cancels the batch
+        ledger = cost_ledger.configure(config, os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs"))
+        if ledger.settings.enabled:
+            print(f"[BUDGET] soft={ledger.settings.total.soft_usd} hard={ledger.settings.total.hard_usd} scope={ledger.settings.scope} providers={ {p: (b.soft_usd, b.hard_usd) for p, b in ledger.settings.providers.items()} } carried=${ledger.spent():.4f}")
+            _batch_task = asyncio.current_task()
+            _batch_loop = asyncio.get_running_loop()
+            ledger.on_hard(lambda _reason: _batch_loop.call_soon_threadsafe(_batch_task.cancel))
+        ledger.start_watch(
+            [os.path.join(os.path.dirname(os.path.abspath(__file__)), "FilePromptForge", "logs"), os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "eval_fpf_logs")],
+            since=batch_start_ts,
+        )
+
+        def _file_deadline(md: str) -> deadlines.Deadline:
+            # One budget per input file, shared by its generation and its evaluation
+            if md not in file_deadlines:
+                file_deadlines[md] = batch_deadline.child(deadline_settings.file_seconds, "file")
+            return file_deadlines[md]
+
+        # Persistent index of outputs/winners/eval copies for the skip check
+        try:
+            artifact_index.configure(config, config_dir)
+        except Exception as e:
+            print(f"  Warning: artifact index unavailable, using a per-process index: {e}")
+
+        # Durable run journal: every planned unit and its state, for --resume after a crash
+        global RUN_JOURNAL
+        RUN_JOURNAL = None
+        journal_enabled, journal_path = resolve_journal_settings(config, config_dir)
+        if journal_enabled or resume:
+            try:
+                RUN_JOURNAL = RunJournal.open(journal_path, config_path, resume=resume)
+                if RUN_JOURNAL.resumed:
+                    print(f"[JOURNAL] Resuming batch {RUN_JOURNAL.batch_id}: {RUN_JOURNAL.counts()}")
+                else:
+                    if resume:
+                        print("[JOURNAL] No unfinished batch found for this config; starting a new batch")
+                    print(f"[JOURNAL] batch={RUN_JOURNAL.batch_id} db={journal_path}")
+            except Exception as e:
+                print(f"  Warning: run journal unavailable: {e}")
+                RUN_JOURNAL = None
+
+        # Manifest of every report written this batch; evaluation reads it instead of scanning output dirs.
+        # Keyed by the journal batch so --resume sees outputs from before the crash.
+        try:
+            manifest = artifact_manifest.configure(config, config_dir, RUN_JOURNAL.batch_id if RUN_JOURNAL is not None else None)
+            if len(manifest):
+                print(f"[MANIFEST] Loaded {len(manifest)} artifact(s) from {manifest.path}")
+        except Exception as e:
+            print(f"  Warning: artifact manifest unavailable: {e}")
+
+        def _by_predicted_duration(items: list, key) -> list:
+            if run_history is None:
+                return list(items)
+            return run_history.order_longest_first(items, key)
+
         # Initialize streaming eval manager if evaluation is enabled
         global STREAMING_EVAL_MANAGER
         eval_config_init = config.get('eval', {})
@@ -2014,7 +2903,8 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
                 STREAMING_EVAL_MANAGER = StreamingEvalManager(
                     db_path=streaming_db_path,
                     config_path=streaming_config_path,
-                    iterations=streaming_iterations
+                    iterations=streaming_iterations,
+                    judges=_eval_judge_pairs(config),
                 )
                 # Set the event loop reference for thread-safe spawning from FPF callbacks
                 try:
@@ -2030,9 +2920,26 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
         else:
             print(f"\n[STREAMING EVAL] Skipped init: auto_run={eval_config_init.get('auto_run')}, streaming_single_eval={eval_config_init.get('streaming_single_eval')}")
 
-        for md in markdown_files:
+        # Skip check: a file is skipped when eval results, a winner, or generated outputs already exist
+        def _should_process(md: str) -> bool:
+            if batch_deadline.expired():
+                print(f"[DEADLINE] Skipping {md}: {batch_deadline.reason()}")
+                return False
+            if not ledger.allow_launch():
+                print(f"[BUDGET] Skipping {md}: {ledger.reason()}")
+                return False
+            # Resumed batch: the journal knows exactly what is left for files it has seen
+            if RUN_JOURNAL is not None and RUN_JOURNAL.resumed and RUN_JOURNAL.has_file(md):
+                pending = RUN_JOURNAL.pending(md)
+                if pending:
+                    print(f"[JOURNAL] Resuming {md}: {len(pending)} incomplete unit(s)")
+                    return True
+                print(f"Skipping {md} (complete in journal batch {RUN_JOURNAL.batch_id})")
+                return False
+
             base_name = os.path.splitext(os.path.basename(md))[0]
             skip_file = False
+            index = artifact_index.get_index()
 
             # 1. Check Eval Output (if enabled)
             eval_config = config.get('eval', {})
@@ -2044,15 +2951,12 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
                     eval_out_abs = eval_out_rel
                 
                 if os.path.exists(eval_out_abs):
-                    # Search recursively for base_name.*
-                    # Optimization: Only check folders modified recently? No, check all.
-                    for root, dirs, files in os.walk(eval_out_abs):
-                        for f in files:
-                            if f.startswith(f"{base_name}."):
-                                print(f"Skipping {md} (found eval output: {os.path.join(root, f)})")
-                                skip_file = True
-                                break
-                        if skip_file: break
+                    # Any base_name.* anywhere in the tree (indexed once, not walked per input file)
+                    index.ensure(eval_out_abs, recursive=True)
+                    hit = index.find(eval_out_abs, base_name)
+                    if hit:
+                        print(f"Skipping {md} (found eval output: {hit})")
+                        skip_file = True
 
             # 2. Check Generation Output (if not already skipped)
             if not skip_file:
@@ -2068,37 +2972,44 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
                     winners_dir_for_file = os.path.join(winners_root, rel_dir)
                     
                     if os.path.exists(winners_dir_for_file):
-                        existing_winners = [
-                            f for f in os.listdir(winners_dir_for_file)
-                            if f.startswith(f"{base_name}.") and f.endswith((".md", ".txt"))
-                        ]
-                        if existing_winners:
-                            print(f"Skipping {md} (found existing winner: {os.path.join(winners_dir_for_file, existing_winners[0])})")
+                        index.ensure(winners_dir_for_file, exts=(".md", ".txt"))
+                        hit = index.find(winners_dir_for_file, base_name)
+                        if hit:
+                            print(f"Skipping {md} (found existing winner: {hit})")
                             skip_file = True
 
                     if not skip_file and os.path.exists(output_dir_for_file):
-                        # Look for any file starting with base_name. and having a relevant extension
+                        # Any file starting with base_name. and having a relevant extension
                         # This covers .gptr., .dr., .ma., .fpf. etc.
-                        existing = [
-                            f for f in os.listdir(output_dir_for_file)
-                            if f.startswith(f"{base_name}.") and f.endswith((".md", ".json", ".txt", ".docx", ".pdf"))
-                        ]
-                        if existing:
-                            print(f"Skipping {md} (found {len(existing)} existing outputs, e.g. {existing[0]})")
+                        index.ensure(output_dir_for_file, exts=(".md", ".json", ".txt", ".docx", ".pdf"))
+                        hit = index.find(output_dir_for_file, base_name)
+                        if hit:
+                            print(f"Skipping {md} (found {index.count(output_dir_for_file, base_name)} existing outputs, e.g. {os.path.basename(hit)})")
                             skip_file = True
                 except Exception as e:
                     print(f"Warning: Failed to check existing outputs for {md}: {e}")
 
-            if skip_file:
-                continue
+            return not skip_file
+
+        # Launch every configured run for one markdown file. MA and GPT‑R runs are awaited here;
+        # the FPF batch tasks are returned so the caller decides when to await them.
+        async def _generate_for_file(md: str) -> list[asyncio.Task]:
+            # Journal every (run entry x iteration) up front; re-planning on --resume keeps recorded states
+            if RUN_JOURNAL is not None:
+                try:
+                    for idx, entry in enumerate(runs):
+                        for it in range(1, int(iterations_all) + 1):
+                            RUN_JOURNAL.plan(gen_unit(md, idx, it), "gen", md, detail=f"{entry.get('type')}:{entry.get('provider')}:{entry.get('model')}")
+                except Exception as e:
+                    print(f"  Warning: run journal planning failed: {e}")
 
             # Split FPF vs non-FPF runs. Execute non-FPF individually as before; batch all FPF at once.
-            fpf_entries = []
+            fpf_entries: list[tuple[int, dict]] = []
             other_entries = []
             for idx, entry in enumerate(runs):
                 rtype = (entry.get("type") or "").strip().lower()
                 if rtype == "fpf":
-                    fpf_entries.append(entry)
+                    fpf_entries.append((idx, entry))
                 else:
                     other_entries.append((idx, entry))
 
@@ -2129,15 +3040,21 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
             open_task: asyncio.Task | None = None
             tracker: FpfInflightTracker | None = None
             if fpf_entries:
-                fpf_openaidp = [e for e in fpf_entries if (e.get("provider") or "").strip().lower() == "openaidp"]
-                fpf_rest = [e for e in fpf_entries if (e.get("provider") or "").strip().lower() != "openaidp"]
+                # Longest-first inside each FPF batch so short runs fill the tail
+                fpf_entries = _by_predicted_duration(fpf_entries, lambda it: ("fpf", it[1].get("model")))
+                fpf_openaidp = [it for it in fpf_entries if (it[1].get("provider") or "").strip().lower() == "openaidp"]
+                fpf_rest = [it for it in fpf_entries if (it[1].get("provider") or "").strip().lower() != "openaidp"]
 
                 # Initialize inflight tracker with totals for watermark gating
                 totals_rest = len(fpf_rest) * int(iterations_all)
                 totals_deep = len(fpf_openaidp) * int(iterations_all)
                 tracker = FpfInflightTracker({"rest": totals_rest, "deep": totals_deep})
+                for wm_name, wm_low in resolve_watermarks(config).items():
+                    tracker.set_watermark(wm_name, wm_low)
+                if not fpf_rest:
+                    tracker.close("rest")
 
-                async def _run_fpf_batch(run_id: str, entries: list[dict], on_event_cb, timeout: float | None = None):
+                async def _run_fpf_batch(run_id: str, entries: list[tuple[int, dict]], on_event_cb, timeout: float | None = None, group: str = "rest"):
                     _register_run(run_id)
                     try:
                         # Combine the tracker.update with our new event handler
@@ -2146,8 +3063,13 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
                                 on_event_cb(event)
                             _fpf_event_handler(event)
                         
-                        await process_file_fpf_batch(md, config, entries, iterations_all, keep_temp=keep_temp, on_event=combined_event_handler, timeout=timeout)
+                        await process_file_fpf_batch(
+                            md, config, [e for _, e in entries], iterations_all, keep_temp=keep_temp,
+                            on_event=combined_event_handler, timeout=timeout, run_indices=[i for i, _ in entries],
+                        )
                     finally:
+                        # No more completions for this group: release anything gated on it
+                        tracker.close(group)
                         _deregister_run(run_id)
 
                 # Launch openaidp sub-batch first (do not await here)
@@ -2155,7 +3077,7 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
                     print(f"\n--- Executing FPF openaidp-first batch ({len(fpf_openaidp)} run templates x {iterations_all} iteration(s)) ---")
                     run_id_open = f"fpf-openAidp-{Path(md).stem}"
                     # No timeout for openaidp (Deep Research)
-                    open_task = asyncio.create_task(_run_fpf_batch(run_id_open, fpf_openaidp, tracker.update, timeout=None))
+                    open_task = asyncio.create_task(_run_fpf_batch(run_id_open, fpf_openaidp, tracker.update, timeout=None, group="deep"))
                     fpf_tasks.append(open_task)
 
                 # Launch rest sub-batch (do not await here)
@@ -2170,8 +3092,12 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
             tasks_ma: list[asyncio.Task] = []
             
             if ma_entries:
+                ma_entries = _by_predicted_duration(ma_entries, lambda it: ("ma", it[1].get("model")))
                 # Resolve MA concurrency settings
                 ma_enabled, ma_max_conc, ma_launch_delay = _resolve_ma_concurrency(config)
+                if ma_enabled and adaptive.enabled:
+                    # The adaptive provider cap is the effective limit; the local semaphore only bounds it
+                    ma_max_conc = max(ma_max_conc, adaptive.ceiling())
                 
                 if not ma_enabled:
                     # Sequential MA execution
@@ -2181,7 +3107,7 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
                         run_id0 = f"ma-{idx0}"
                         _register_run(run_id0)
                         try:
-                            await process_file_run(md, config, e0, iterations_all, keep_temp=keep_temp, forward_subprocess_output=forward_subprocess_output)
+                            await process_file_run(md, config, e0, iterations_all, keep_temp=keep_temp, forward_subprocess_output=forward_subprocess_output, run_index=idx0)
                         finally:
                             _deregister_run(run_id0)
                     
@@ -2197,7 +3123,7 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
                             run_id0 = f"ma-{idx0}"
                             _register_run(run_id0)
                             try:
-                                await process_file_run(md, config, e0, iterations_all, keep_temp=keep_temp, forward_subprocess_output=forward_subprocess_output)
+                                await process_file_run(md, config, e0, iterations_all, keep_temp=keep_temp, forward_subprocess_output=forward_subprocess_output, run_index=idx0)
                             finally:
                                 _deregister_run(run_id0)
                     
@@ -2209,88 +3135,77 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
             tasks_gptr_std: list[asyncio.Task] = []
             sem_all: asyncio.Semaphore | None = None
             
-            # Start headroom gate as background task (non-blocking)
-            gate_task = None
-            if 'tracker' in locals() and tracker is not None:
-                async def _wait_for_headroom():
-                    try:
-                        while True:
-                            hr = tracker.headroom(low_watermark=1)
-                            if hr.get("ready", False):
-                                break
-                            await asyncio.sleep(0.5)
-                    except Exception:
-                        pass
-                gate_task = asyncio.create_task(_wait_for_headroom())
-            
+            # Optional FPF-rest watermark gate (concurrency.fpf_watermarks). Each GPT‑R task waits on its own,
+            # event-driven, before taking a slot: task creation never blocks and a launch happens the
+            # moment an FPF completion frees the watermark.
+            async def _gate_on_fpf(rtype0: str, run_id0: str) -> None:
+                if tracker is None or not tracker.has_watermark(rtype0):
+                    return
+                try:
+                    t_gate = time.monotonic()
+                    hr = await tracker.wait_for(rtype0)
+                    waited = time.monotonic() - t_gate
+                    if waited >= 0.05:
+                        print(f"  [WATERMARK] {run_id0} launched after {waited:.1f}s (FPF-rest inflight={hr['rest_inflight']}/{hr['eff_max']})")
+                except Exception as e:
+                    print(f"  Warning: FPF watermark gate failed for {run_id0}: {e}")
+
             enabled, max_conc, launch_delay = _resolve_gptr_concurrency(config)
+            if enabled and adaptive.enabled:
+                # The adaptive provider cap is the effective limit; the local semaphore only bounds it
+                max_conc = max(max_conc, adaptive.ceiling())
             if not enabled:
                 # Fall back to sequential behavior
                 for idx, entry in gptr_entries:
-                    print(f"\n--- Executing GPTâ€‘R (standard) run #{idx} (sequential): {entry} ---")
+                    print(f"\n--- Executing GPT‑R (standard) run #{idx} (sequential): {entry} ---")
                     run_id = f"gptr-std-{idx}"
+                    await _gate_on_fpf("gptr", run_id)
                     _register_run(run_id)
                     try:
-                        await process_file_run(md, config, entry, iterations_all, keep_temp=keep_temp, forward_subprocess_output=forward_subprocess_output)
+                        await process_file_run(md, config, entry, iterations_all, keep_temp=keep_temp, forward_subprocess_output=forward_subprocess_output, run_index=idx)
                     finally:
                         _deregister_run(run_id)
-            else:
-                print(f"\n[GPTâ€‘R Concurrency] (standard) enabled=True max_concurrent_reports={max_conc} launch_delay_seconds={launch_delay}")
-                sem_all = asyncio.Semaphore(max_conc)
-
-                async def _limited_std(idx0: int, e0: dict):
-                    async with sem_all:
-                        run_id0 = f"gptr-std-{idx0}"
-                        _register_run(run_id0)
-                        try:
-                            await process_file_run(md, config, e0, iterations_all, keep_temp=keep_temp, forward_subprocess_output=forward_subprocess_output)
-                        finally:
-                            _deregister_run(run_id0)
-
-                # Create all tasks immediately (don't wait for gate)
-                for j, (idx, entry) in enumerate(gptr_entries):
-                    tasks_gptr_std.append(asyncio.create_task(_limited_std(idx, entry)))
-                    if j < len(gptr_entries) - 1 and launch_delay > 0:
-                        await asyncio.sleep(launch_delay)
-                # Do not await here; deep group will be scheduled next and we'll await both together
 
-            # Then: Run GPTâ€‘R Deep Research with the same concurrency controls
-            # Note: Deep uses same gate_task and sem_all as standard to run concurrently
-            if not enabled:
+                # Then: Run GPT‑R Deep Research
                 for idx, entry in dr_entries:
-                    print(f"\n--- Executing GPTâ€‘R (deep) run #{idx} (sequential): {entry} ---")
+                    print(f"\n--- Executing GPT‑R (deep) run #{idx} (sequential): {entry} ---")
                     run_id = f"gptr-deep-{idx}"
+                    await _gate_on_fpf("dr", run_id)
                     _register_run(run_id)
                     try:
-                        await process_file_run(md, config, entry, iterations_all, keep_temp=keep_temp, forward_subprocess_output=forward_subprocess_output)
+                        await process_file_run(md, config, entry, iterations_all, keep_temp=keep_temp, forward_subprocess_output=forward_subprocess_output, run_index=idx)
                     finally:
                         _deregister_run(run_id)
             else:
-                print(f"\n[GPTâ€‘R Concurrency] (deep) enabled=True max_concurrent_reports={max_conc} launch_delay_seconds={launch_delay}")
-                # Use the same semaphore as standard to cap total GPTâ€‘R concurrency
-                if sem_all is None:
-                    sem_all = asyncio.Semaphore(max_conc)
-                tasks_gptr_dr: list[asyncio.Task] = []
+                print(f"\n[GPT‑R Concurrency] (standard+deep) enabled=True max_concurrent_reports={max_conc} launch_delay_seconds={launch_delay}")
+                # Standard and deep share one semaphore to cap total GPT‑R concurrency
+                sem_all = asyncio.Semaphore(max_conc)
 
-                async def _limited_dr(idx0: int, e0: dict):
+                async def _limited_gptr(rtype0: str, run_id0: str, idx0: int, e0: dict):
+                    await _gate_on_fpf(rtype0, run_id0)
                     async with sem_all:
-                        run_id0 = f"gptr-deep-{idx0}"
                         _register_run(run_id0)
                         try:
-                            await process_file_run(md, config, e0, iterations_all, keep_temp=keep_temp, forward_subprocess_output=forward_subprocess_output)
+                            await process_file_run(md, config, e0, iterations_all, keep_temp=keep_temp, forward_subprocess_output=forward_subprocess_output, run_index=idx0)
                         finally:
                             _deregister_run(run_id0)
 
-                for j, (idx, entry) in enumerate(dr_entries):
-                    tasks_gptr_dr.append(asyncio.create_task(_limited_dr(idx, entry)))
-                    if j < len(dr_entries) - 1 and launch_delay > 0:
+                # Config order launches standard before deep; longest_first interleaves both by
+                # predicted duration so a long deep-research run is not queued behind short ones.
+                launches = [("gptr", f"gptr-std-{idx}", idx, entry) for idx, entry in gptr_entries]
+                launches += [("dr", f"gptr-deep-{idx}", idx, entry) for idx, entry in dr_entries]
+                launches = _by_predicted_duration(launches, lambda it: (it[0], it[3].get("model")))
+
+                # Create all tasks immediately (don't wait for gate); semaphore admits in creation order
+                for j, (rt0, run_id0, idx0, entry) in enumerate(launches):
+                    tasks_gptr_std.append(asyncio.create_task(_limited_gptr(rt0, run_id0, idx0, entry)))
+                    if j < len(launches) - 1 and launch_delay > 0:
                         await asyncio.sleep(launch_delay)
 
                 # Await MA, standard and deep groups together
                 all_tasks: list[asyncio.Task] = []
                 all_tasks.extend(tasks_ma or [])
                 all_tasks.extend(tasks_gptr_std or [])
-                all_tasks.extend(tasks_gptr_dr)
                 if all_tasks:
                     await asyncio.gather(*all_tasks, return_exceptions=False)
 
@@ -2304,184 +3219,273 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
                 except Exception:
                     pass
 
-            # Check if we should stop after one file
-            if config.get('one_file_only', False):
-                print("Stopping after one file (one_file_only=True)")
-                break
 
-        # Await both FPF batches (rest and openaidp-deep) before evaluation
-        try:
-            if 'rest_task' in locals() and rest_task is not None:
-                await rest_task
-            if 'open_task' in locals() and open_task is not None:
-                await open_task
-        except Exception:
-            pass
+            return fpf_tasks
 
-        # Wait for all streaming single evals to complete before pairwise
-        streaming_eval_completed = False
-        if STREAMING_EVAL_MANAGER is not None and STREAMING_EVAL_MANAGER.tasks:
-            print(f"\n=== WAITING FOR STREAMING SINGLE EVALS ({len(STREAMING_EVAL_MANAGER.tasks)} pending) ===")
+        # Collect the files generated for one markdown file and run the full evaluation on them.
+        # Files come from the artifact manifest (everything this batch saved into the file's output dir).
+        # only_base: restrict to outputs of this input file (pipelined mode, where files share output dirs).
+        async def _evaluate_for_file(md: str, streaming_eval_completed: bool = False, streaming_db_path: str | None = None, only_base: bool = False):
             try:
-                await STREAMING_EVAL_MANAGER.wait_all()
-                completed = sum(1 for r in STREAMING_EVAL_MANAGER.results if r.get("returncode") == 0)
-                failed = len(STREAMING_EVAL_MANAGER.results) - completed
-                print(f"  Streaming evals complete: {completed} succeeded, {failed} failed")
-                streaming_eval_completed = completed > 0
-                if not streaming_eval_completed:
-                    print(f"  WARNING: All streaming evals failed, batch eval will NOT skip single eval phase")
-            except Exception as e:
-                print(f"  Warning: Streaming eval wait failed: {e}")
-
-        # CRITICAL: Trigger evaluation ONCE after ALL processing completes
-        # This ensures evaluation sees all generated files (FPF + MA + GPTR)
-
-        # and prevents expensive partial evaluations
-        try:
-            eval_config = config.get('eval', {})
-            if eval_config.get('auto_run', False):
-                print("\n=== TRIGGERING EVALUATION FOR ALL GENERATED FILES ===")
-                # Determine output directory for this markdown file
-                rel_path = os.path.relpath(md, input_folder)
-                output_dir_for_file = os.path.dirname(os.path.join(output_folder, rel_path))
+                eval_config = config.get('eval', {})
+                if eval_config.get('auto_run', False) and not ledger.allow_launch():
+                    print(f"[BUDGET] Skipping evaluation for {md}: {ledger.reason()}")
+                    return
+                if eval_config.get('auto_run', False):
+                    print("\n=== TRIGGERING EVALUATION FOR ALL GENERATED FILES ===")
+                    # Determine output directory for this markdown file
+                    rel_path = os.path.relpath(md, input_folder)
+                    output_dir_for_file = os.path.dirname(os.path.join(output_folder, rel_path))
                 
-                # Count expected files before triggering evaluation
-                expected_count = len([e for e in runs if e.get('type') in ('fpf', 'ma', 'gptr', 'dr')])
-                print(f"  Expected generated files: {expected_count}")
+                    if RUN_JOURNAL is not None:
+                        try:
+                            phases = ("precombine", "combine", "postcombine") if (config.get('combine') or {}).get('enabled', False) else ("precombine",)
+                            for phase in phases:
+                                RUN_JOURNAL.plan(eval_unit(md, phase), "eval", md)
+                        except Exception as e:
+                            print(f"  Warning: run journal planning failed: {e}")
+
+                    # Count expected files before triggering evaluation
+                    expected_count = len([e for e in runs if e.get('type') in ('fpf', 'ma', 'gptr', 'dr')])
+                    print(f"  Expected generated files: {expected_count}")
                 
-                # Collect ALL generated files from this run for evaluation
-                # Use recently modified files (within last 120 seconds) to ensure we only evaluate current run
-                all_generated_files = []
-                try:
-                    import datetime
-                    
-                    # EXTREME LOGGING: Start of file collection
-                    print(f"\n=== FILE COLLECTION DEBUG ===")
-                    print(f"  Output directory: {output_dir_for_file}")
-                    print(f"  Current time: {time.time()} ({datetime.datetime.now()})")
-                    
-                    # Add small buffer to ensure files have finished writing
-                    print(f"  Sleeping 2 seconds to ensure file writes complete...")
-                    await asyncio.sleep(2)
-                    
-                    # Use batch start time as threshold (files created THIS RUN only)
-                    # batch_start_ts is captured at beginning of main() function
-                    recent_threshold = batch_start_ts
-                    print(f"  Batch start time: {recent_threshold} ({datetime.datetime.fromtimestamp(recent_threshold)})")
-                    print(f"  Looking for files modified after: {datetime.datetime.fromtimestamp(recent_threshold)}")
-                    
-                    # List ALL files first for diagnostics
-                    all_files_in_dir = []
+                    # Collect the files this batch wrote for this output directory from the artifact manifest
+                    # (recorded by save_generated_reports as each report lands; no directory scan or mtime check)
+                    all_generated_files = []
                     try:
-                        all_files_in_dir = os.listdir(output_dir_for_file)
-                        print(f"  Total items in directory: {len(all_files_in_dir)}")
-                    except Exception as list_ex:
-                        print(f"  ERROR: Cannot list directory: {list_ex}")
-                        raise
-                    
-                    # Process each file with extreme logging
-                    for fname in all_files_in_dir:
-                        fpath = os.path.join(output_dir_for_file, fname)
-                        
-                        # Log every file encountered
-                        print(f"\n  Examining: {fname}")
-                        
-                        # Check if it's a file
-                        if not os.path.isfile(fpath):
-                            print(f"    âŒ SKIP: Not a file (is directory or other)")
-                            continue
-                        
-                        # Check extension
-                        if not fname.endswith(('.md', '.txt')):
-                            print(f"    âŒ SKIP: Wrong extension (not .md or .txt)")
-                            continue
-                        
-                        # Get file stats
-                        try:
-                            fsize = os.path.getsize(fpath)
-                            fmtime = os.path.getmtime(fpath)
-                            fmtime_dt = datetime.datetime.fromtimestamp(fmtime)
-                            age_seconds = time.time() - fmtime
-                            
-                            print(f"    ðŸ“Š Size: {fsize} bytes")
-                            print(f"    ðŸ“… Modified: {fmtime_dt} ({fmtime})")
-                            print(f"    â±ï¸  Age: {age_seconds:.1f} seconds")
-                            
-                            # Check recency threshold
-                            if fmtime >= recent_threshold:
-                                all_generated_files.append(fpath)
-                                print(f"    âœ… INCLUDED: File is recent enough")
-                            else:
-                                print(f"    âŒ EXCLUDED: File is too old (>120s)")
-                                
-                        except Exception as stat_ex:
-                            print(f"    âŒ ERROR getting file stats: {stat_ex}")
-                            continue
-                    
-                    print(f"\n=== FILE COLLECTION SUMMARY ===")
-                    print(f"  Expected files: {expected_count}")
-                    print(f"  Recent files found: {len(all_generated_files)}")
-                    print(f"  Total files examined: {len(all_files_in_dir)}")
+                        manifest = artifact_manifest.get_manifest()
+                        print(f"\n=== FILE COLLECTION ===")
+                        print(f"  Output directory: {output_dir_for_file}")
+                        print(f"  Manifest: {manifest.path or '(in-memory)'} ({len(manifest)} artifacts)")
+                        # Pipelined mode: other input files may share this output directory
+                        all_generated_files = manifest.files(output_dir_for_file, input_file=md if only_base else None)
+
+                        # Resumed batch: outputs journaled before the crash are older than this process
+                        if RUN_JOURNAL is not None and RUN_JOURNAL.resumed:
+                            for fpath in RUN_JOURNAL.file_outputs(md if only_base else None):
+                                if (
+                                    fpath not in all_generated_files
+                                    and os.path.isfile(fpath)
+                                    and os.path.dirname(os.path.abspath(fpath)) == os.path.abspath(output_dir_for_file)
+                                    and fpath.endswith(('.md', '.txt'))
+                                ):
+                                    all_generated_files.append(fpath)
+                                    print(f"  [JOURNAL] Included output from before resume: {os.path.basename(fpath)}")
+
+                        print(f"\n=== FILE COLLECTION SUMMARY ===")
+                        print(f"  Expected files: {expected_count}")
+                        print(f"  Files recorded: {len(all_generated_files)}")
                     
-                    # VALIDATION: Warn if mismatch
-                    if len(all_generated_files) != expected_count:
-                        print(f"  âš ï¸  WARNING: Found {len(all_generated_files)} files but expected {expected_count}")
-                        print(f"  This may indicate:")
-                        print(f"    - Files still being written (race condition)")
-                        print(f"    - Generation failures (some runs didn't produce output)")
-                        print(f"    - Stale files from previous runs (too old to include)")
+                        # VALIDATION: Warn if mismatch
+                        if len(all_generated_files) != expected_count:
+                            print(f"  âš ï¸  WARNING: Found {len(all_generated_files)} files but expected {expected_count}")
+                            print(f"  This may indicate generation failures (some runs didn't produce output)")
                     
-                    if len(all_generated_files) < 1:
-                        print(f"  âŒ ERROR: No recent files found in {output_dir_for_file}. Skipping evaluation.")
-                    else:
-                        print(f"\n=== FILES TO EVALUATE ===")
-                        for idx, f in enumerate(all_generated_files, 1):
-                            fsize = os.path.getsize(f)
-                            fmtime_dt = datetime.datetime.fromtimestamp(os.path.getmtime(f))
-                            print(f"  {idx}. {os.path.basename(f)} ({fsize} bytes, {fmtime_dt})")
-                        
-                        # Generate timeline JSON BEFORE evaluation so it can be included in HTML report
-                        try:
-                            if subproc_log_path and os.path.isfile(subproc_log_path):
-                                timeline_output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
-                                os.makedirs(timeline_output_dir, exist_ok=True)
-                                _append_timeline_to_acm_log(subproc_log_path, json_output_dir=timeline_output_dir)
-                                if timeline_json_path_holder.get("path"):
-                                    print(f"  Timeline JSON generated: {timeline_json_path_holder['path']}")
-                        except Exception as tl_err:
-                            print(f"  Warning: Timeline JSON generation failed: {tl_err}")
+                        if len(all_generated_files) < 1:
+                            print(f"  âŒ ERROR: No generated files recorded for {output_dir_for_file}. Skipping evaluation.")
+                        else:
+                            print(f"\n=== FILES TO EVALUATE ===")
+                            recorded = {e["path"]: e for e in manifest.entries(output_dir_for_file)}
+                            for idx, f in enumerate(all_generated_files, 1):
+                                e = recorded.get(f) or {}
+                                print(f"  {idx}. {os.path.basename(f)} ({e.get('size', '?')} bytes, type={e.get('type', '?')}, model={e.get('model') or '?'})")
                         
-                        # Determine if streaming eval was used
-                        use_streaming_eval = streaming_eval_completed and STREAMING_EVAL_MANAGER is not None
+                            # Generate timeline JSON BEFORE evaluation so it can be included in HTML report.
+                            # One file per input (logs/timeline_data_<input>.json): pipelined evaluations
+                            # of other files must not overwrite it while this one is still running.
+                            timeline_json_path = None
+                            try:
+                                if subproc_log_path and os.path.isfile(subproc_log_path):
+                                    timeline_stem = re.sub(r"[^A-Za-z0-9._-]+", "_", os.path.splitext(rel_path)[0])[:80] or "file"
+                                    timeline_json_path = await _append_timeline_to_acm_log(
+                                        subproc_log_path,
+                                        json_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", f"timeline_data_{timeline_stem}.json"),
+                                    )
+                                    if timeline_json_path:
+                                        print(f"  Timeline JSON generated: {timeline_json_path}")
+                            except Exception as tl_err:
+                                print(f"  Warning: Timeline JSON generation failed: {tl_err}")
                         
-                        await trigger_evaluation_for_all_files(
-                            output_dir_for_file,
-                            config,
-                            generated_files=all_generated_files,
-                            timeline_json_path=timeline_json_path_holder.get("path"),
-                            master_html_path_holder=master_html_path_holder,
-                            skip_single_eval=use_streaming_eval,
-                            existing_db_path=STREAMING_EVAL_MANAGER.db_path if use_streaming_eval else None
-                        )
-                except Exception as list_err:
-                    print(f"\nâŒ ERROR: File collection failed: {list_err}")
-                    import traceback
-                    print(f"Traceback:\n{traceback.format_exc()}")
-        except Exception as eval_err:
-            print(f"  ERROR: Evaluation trigger failed: {eval_err}")
+                            # Determine if streaming eval was used
+                            use_streaming_eval = streaming_eval_completed and STREAMING_EVAL_MANAGER is not None
+                            existing_db = (streaming_db_path or STREAMING_EVAL_MANAGER.db_path) if use_streaming_eval else None
+
+                            await trigger_evaluation_for_all_files(
+                                output_dir_for_file,
+                                config,
+                                generated_files=all_generated_files,
+                                timeline_json_path=timeline_json_path,
+                                master_html_path_holder=master_html_path_holder,
+                                skip_single_eval=use_streaming_eval,
+                                existing_db_path=existing_db,
+                                journal_file=md,
+                            )
+                    except Exception as list_err:
+                        print(f"\nâŒ ERROR: File collection failed: {list_err}")
+                        import traceback
+                        print(f"Traceback:\n{traceback.format_exc()}")
+            except Exception as eval_err:
+                print(f"  ERROR: Evaluation trigger failed: {eval_err}")
+
+        pipeline_enabled, pipeline_gen_depth, pipeline_eval_depth = resolve_pipeline_settings(config)
+        if coordinator:
+            # Coordinator mode: workers (runner.py --worker) generate; this process collects and evaluates
+            queue_settings = job_queue.resolve_queue_settings(config, config_dir)
+            queue = job_queue.open_queue(queue_spec or queue_settings.queue, config_dir)
+            queue_batch = RUN_JOURNAL.batch_id if RUN_JOURNAL is not None else time.strftime("%Y%m%d_%H%M%S")
+            print(f"\n[QUEUE] coordinator batch={queue_batch} queue={getattr(queue, 'path', queue_spec)}")
+            queued_files: list[str] = []
+            for md in markdown_files:
+                if not _should_process(md):
+                    continue
+                queued_files.append(md)
+                n = _enqueue_file_jobs(queue, queue_batch, md, config, runs, iterations_all, queue_settings.max_attempts)
+                print(f"  [QUEUE] {os.path.basename(md)}: {n} job(s) queued")
+                if config.get('one_file_only', False):
+                    break
+            print(f"  [QUEUE] {queue.counts(queue_batch)}; start workers with: python runner.py --worker --queue \"{getattr(queue, 'path', queue_spec)}\"")
 
-        # Cleanup temp dir after all tasks for this file are done
-        try:
-            if os.path.exists(TEMP_BASE) and not keep_temp:
-                shutil.rmtree(TEMP_BASE)
-        except Exception as e:
-            print(f"  Warning: failed to cleanup temp dir {TEMP_BASE}: {e}")
+            # Each file is evaluated as soon as its jobs are in; evaluations overlap the remaining generation
+            sem_eval = asyncio.Semaphore(pipeline_eval_depth)
+
+            async def _collect_and_evaluate(md: str):
+                streaming_db_path = None
+                if STREAMING_EVAL_MANAGER is not None:
+                    try:
+                        rel_path = os.path.relpath(md, input_folder)
+                        output_dir_for_file = os.path.dirname(os.path.join(output_folder, rel_path))
+                        streaming_db_path = STREAMING_EVAL_MANAGER.open_scope(md, output_dir_for_file, os.path.splitext(os.path.basename(md))[0])
+                    except Exception as e:
+                        print(f"  Warning: failed to open streaming eval scope for {md}: {e}")
+                with deadlines.scope(_file_deadline(md)):
+                    summary = await _collect_file_jobs(queue, queue_batch, md, config, queue_settings.poll_seconds)
+                    print(f"  [QUEUE] {os.path.basename(md)} generation finished: {summary}")
+                    streaming_eval_completed = False
+                    if streaming_db_path:
+                        try:
+                            results = await STREAMING_EVAL_MANAGER.wait_scope(md)
+                            streaming_eval_completed = any(r.get("returncode") == 0 for r in results)
+                        except Exception as e:
+                            print(f"  Warning: Streaming eval wait failed for {md}: {e}")
+                    async with sem_eval:
+                        await _evaluate_for_file(md, streaming_eval_completed=streaming_eval_completed, streaming_db_path=streaming_db_path, only_base=True)
+
+            try:
+                await asyncio.gather(*(_collect_and_evaluate(md) for md in queued_files))
+            finally:
+                queue.close()
+        elif not pipeline_enabled:
+            # Legacy sequential mode: generate every file, then evaluate once for the last file
+            md = None
+            fpf_tasks: list[asyncio.Task] = []
+            for md in markdown_files:
+                if not _should_process(md):
+                    continue
+
+                with deadlines.scope(_file_deadline(md)):
+                    fpf_tasks = await _generate_for_file(md) or fpf_tasks
+
+                # Check if we should stop after one file
+                if config.get('one_file_only', False):
+                    print("Stopping after one file (one_file_only=True)")
+                    break
+
+            # Await both FPF batches (rest and openaidp-deep) before evaluation
+            try:
+                for t in fpf_tasks:
+                    await t
+            except Exception:
+                pass
+
+            # Wait for all streaming single evals to complete before pairwise
+            streaming_eval_completed = False
+            if STREAMING_EVAL_MANAGER is not None and STREAMING_EVAL_MANAGER.tasks:
+                print(f"\n=== WAITING FOR STREAMING SINGLE EVALS ({len(STREAMING_EVAL_MANAGER.tasks)} pending) ===")
+                try:
+                    await STREAMING_EVAL_MANAGER.wait_all()
+                    completed = sum(1 for r in STREAMING_EVAL_MANAGER.results if r.get("returncode") == 0)
+                    failed = len(STREAMING_EVAL_MANAGER.results) - completed
+                    print(f"  Streaming evals complete: {completed} succeeded, {failed} failed")
+                    streaming_eval_completed = completed > 0
+                    if not streaming_eval_completed:
+                        print(f"  WARNING: All streaming evals failed, batch eval will NOT skip single eval phase")
+                except Exception as e:
+                    print(f"  Warning: Streaming eval wait failed: {e}")
+
+
+            # CRITICAL: Trigger evaluation ONCE after ALL processing completes
+            # This ensures evaluation sees all generated files (FPF + MA + GPTR)
+            # and prevents expensive partial evaluations
+            if md is not None:
+                with deadlines.scope(_file_deadline(md)):
+                    await _evaluate_for_file(md, streaming_eval_completed=streaming_eval_completed)
+        else:
+            # Pipelined mode: file N+1 generates while file N is in evaluation/combine/playoffs
+            print(f"\n[PIPELINE] enabled=True generate_depth={pipeline_gen_depth} evaluate_depth={pipeline_eval_depth}")
+
+            async def _pipeline_generate(md: str) -> dict:
+                streaming_db_path = None
+                if STREAMING_EVAL_MANAGER is not None:
+                    try:
+                        rel_path = os.path.relpath(md, input_folder)
+                        output_dir_for_file = os.path.dirname(os.path.join(output_folder, rel_path))
+                        streaming_db_path = STREAMING_EVAL_MANAGER.open_scope(md, output_dir_for_file, os.path.splitext(os.path.basename(md))[0])
+                    except Exception as e:
+                        print(f"  Warning: failed to open streaming eval scope for {md}: {e}")
+                with deadlines.scope(_file_deadline(md)):
+                    fpf_tasks = await _generate_for_file(md)
+                if fpf_tasks:
+                    await asyncio.gather(*fpf_tasks, return_exceptions=True)
+                return {"streaming_db_path": streaming_db_path}
+
+            async def _pipeline_evaluate(md: str, gen: dict):
+                streaming_eval_completed = False
+                if STREAMING_EVAL_MANAGER is not None and gen.get("streaming_db_path"):
+                    try:
+                        results = await STREAMING_EVAL_MANAGER.wait_scope(md)
+                        completed = sum(1 for r in results if r.get("returncode") == 0)
+                        print(f"  [PIPELINE] Streaming evals for {os.path.basename(md)}: {completed} succeeded, {len(results) - completed} failed")
+                        streaming_eval_completed = completed > 0
+                    except Exception as e:
+                        print(f"  Warning: Streaming eval wait failed for {md}: {e}")
+                with deadlines.scope(_file_deadline(md)):
+                    await _evaluate_for_file(
+                        md,
+                        streaming_eval_completed=streaming_eval_completed,
+                        streaming_db_path=gen.get("streaming_db_path"),
+                        only_base=True,
+                    )
+
+            pipeline = FilePipeline(
+                _pipeline_generate,
+                _pipeline_evaluate,
+                generate_depth=pipeline_gen_depth,
+                evaluate_depth=pipeline_eval_depth,
+                accept=_should_process,
+                max_items=1 if config.get('one_file_only', False) else None,
+            )
+            await pipeline.run(markdown_files)
+
+        # Temp workspaces are released by their runs and deleted by the reaper; main() drains the rest
 
         # Timeline already generated before evaluation; just stop heartbeat
         try:
             hb_stop.set()
         except Exception:
             pass
+        await loop_lag.stop()
+        print(loop_lag.summary_line())
+        if SUBPROC_LOGGER:
+            SUBPROC_LOGGER.info(loop_lag.summary_line())
+
+        if RUN_JOURNAL is not None:
+            try:
+                pending = RUN_JOURNAL.pending()
+                RUN_JOURNAL.close_batch("complete" if not pending else "incomplete")
+                print(f"[JOURNAL] batch={RUN_JOURNAL.batch_id} units={RUN_JOURNAL.counts()}" + (f" (resume with --resume to retry {len(pending)})" if pending else ""))
+                RUN_JOURNAL.close()
+            except Exception as e:
+                print(f"  Warning: failed to close run journal: {e}")
         
         # Print and open the master HTML report
         if master_html_path_holder.get("path"):
@@ -2504,7 +3508,7 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
     print("ERROR: config.yaml must define a 'runs' array (baselines/additional_models are no longer supported).")
     # Even if misconfigured, attempt to append any available timeline for diagnostics
     try:
-        _append_timeline_to_acm_log(subproc_log_path)
+        await _append_timeline_to_acm_log(subproc_log_path)
     except Exception:
         pass
     try:
@@ -2515,13 +3519,173 @@ async def main(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_
     return
 
 
-def run(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_runs: int = 3, keep_temp: bool = False):
-    asyncio.run(main(config_path, run_ma=run_ma, run_fpf=run_fpf, num_runs=num_runs, keep_temp=keep_temp))
+def plan_main(config_path: str, json_path: str | None = None):
+    """--plan: expand the config into its call graph and print projected tokens/USD/wall time (nothing is run)."""
+    config_path = os.path.abspath(config_path)
+    config_dir = os.path.dirname(config_path)
+    config = config_parser.load_config(config_path)
+    if not config:
+        print("Failed to load configuration. Exiting.")
+        return None
+
+    def resolve_path(p):
+        if not p:
+            return None
+        return p if os.path.isabs(p) else os.path.abspath(os.path.join(config_dir, p))
+
+    input_folder = resolve_path(config.get("input_folder"))
+    files = file_manager.find_markdown_files(input_folder) if input_folder and os.path.isdir(input_folder) else []
+    if not files:
+        print(f"[PLAN] No markdown files found in input folder {input_folder}")
+    # Generation prompts carry the instructions alongside each input file
+    instructions_file = resolve_path(config.get("instructions_file"))
+    try:
+        extra = os.path.getsize(instructions_file) if instructions_file else 0
+    except OSError:
+        extra = 0
+    sizes = {}
+    for f in files:
+        try:
+            sizes[f] = os.path.getsize(f) + extra
+        except OSError:
+            sizes[f] = extra
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    history = RunHistory.load(os.path.join(here, "logs"))
+    costs = planner.CostHistory.load([os.path.join(here, "FilePromptForge", "logs"), os.path.join(here, "logs", "eval_fpf_logs")])
+    plan = planner.build_plan(config, files, history=history, costs=costs, file_sizes=sizes)
+    print(plan.format())
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as fh:
+            json.dump(plan.to_dict(), fh, indent=2)
+        print(f"[PLAN] Wrote {json_path}")
+    return plan
+
+
+def sweep_main(config_path: str, presets_path: str, names: str | None = None, concurrency: int | None = None):
+    """--sweep: run presets from presets.yaml over this config's inputs concurrently and compare them."""
+    selected = [n.strip() for n in (names or "").split(",") if n.strip()] or None
+    try:
+        report = asyncio.run(preset_sweep.run_sweep(config_path, presets_path, names=selected, concurrency=concurrency))
+    except (KeyError, ValueError, RuntimeError, OSError) as e:
+        print(f"[SWEEP] {e}")
+        return None
+    print(report.format())
+    print(f"[SWEEP] Report: {os.path.join(report.sweep_dir, 'sweep_report.md')}")
+    return report
+
+
+async def daemon_main(config_path: str, host: str | None = None, port: int | None = None, socket_path: str | None = None):
+    """Serve batch jobs over the local daemon API until interrupted (see functions/daemon.py)."""
+    config_path = os.path.abspath(config_path)
+    config = config_parser.load_config(config_path) or {}
+    settings = daemon.resolve_daemon_settings(config)
+    if host:
+        settings.host = host
+    if port:
+        settings.port = port
+    if socket_path:
+        settings.socket = socket_path
+
+    async def _batch(spec: dict):
+        # Each job re-reads its own config; imports and the run history stay warm across jobs
+        await main(os.path.abspath(spec.get("config") or config_path), resume=spec.get("resume", False), coordinator=bool(spec.get("coordinator")), queue_spec=spec.get("queue"))
+
+    manager = daemon.JobManager({"batch": _batch}, max_events=settings.max_events)
+    runner_task = asyncio.create_task(manager.run())
+    await asyncio.sleep(0)
+    server = daemon.serve(manager, settings)
+    print(f"[DAEMON] pid={os.getpid()} listening on {settings.url} default_config={config_path}" + (" (token required)" if settings.token else ""))
+    try:
+        await runner_task
+    finally:
+        server.shutdown()
+        server.server_close()
+        if settings.socket:
+            try:
+                os.unlink(settings.socket)
+            except OSError:
+                pass
+
+
+def submit_to_daemon(config_path: str, url: str | None = None, resume: bool | str = False, coordinator: bool = False, queue_spec: str | None = None) -> bool:
+    """Submit a batch to a running daemon and stream its output; True if it finished successfully."""
+    config_path = os.path.abspath(config_path)
+    client = daemon.client_from_env()
+    if url or client is None:
+        settings = daemon.resolve_daemon_settings(config_parser.load_config(config_path) or {})
+        client = daemon.DaemonClient(url or settings.url, token=(client.token if client else None) or settings.token)
+    job = client.submit("batch", config=config_path, resume=resume, coordinator=coordinator, queue=queue_spec)
+    print(f"[DAEMON] submitted job {job['id']} to {client.url}")
+    try:
+        final = daemon.follow_job(client, job["id"])
+    except KeyboardInterrupt:
+        client.cancel(job["id"])
+        print(f"[DAEMON] cancelled job {job['id']}")
+        return False
+    print(f"[DAEMON] job {final['id']} {final['state']}" + (f": {final['error']}" if final.get("error") else ""))
+    return final.get("state") == daemon.STATE_DONE
+
+
+def run(config_path: str, run_ma: bool = True, run_fpf: bool = True, num_runs: int = 3, keep_temp: bool = False, resume: bool | str = False, coordinator: bool = False, queue_spec: str | None = None):
+    asyncio.run(main(config_path, run_ma=run_ma, run_fpf=run_fpf, num_runs=num_runs, keep_temp=keep_temp, resume=resume, coordinator=coordinator, queue_spec=queue_spec))
+
+
+def parse_cli_args(argv=None):
+    import argparse
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Run the ACM generation/evaluation batch.")
+    parser.add_argument("--config", default=os.path.join(current_dir, "config.yaml"), help="Path to config.yaml (default: local package config.yaml).")
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const=True,
+        default=False,
+        metavar="BATCH_ID",
+        help="Resume the latest unfinished batch for this config (or the given batch id) from the run journal. "
+             "Only batches that ran with journal.enabled can be resumed; --resume journals the batch it runs.",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--coordinator", action="store_true", help="Queue generation jobs for workers, then collect their reports and evaluate.")
+    mode.add_argument("--worker", action="store_true", help="Lease and run generation jobs from a coordinator's queue.")
+    parser.add_argument("--queue", default=None, help="Job queue (path or sqlite:///path); default: distributed.queue from config.")
+    parser.add_argument("--worker-id", default=None, help="Worker name shown in the queue (default: host-pid).")
+    parser.add_argument("--batch", default=None, help="Worker: only take jobs of this coordinator batch id.")
+    parser.add_argument("--max-jobs", type=int, default=None, help="Worker: exit after this many jobs.")
+    parser.add_argument("--exit-when-idle", action="store_true", help="Worker: exit when the queue has no more jobs.")
+    mode.add_argument(
+        "--plan",
+        nargs="?",
+        const=True,
+        default=False,
+        metavar="JSON_PATH",
+        help="Dry run: print projected calls, tokens, USD and wall time per phase (optionally also write them as JSON).",
+    )
+    mode.add_argument("--sweep", default=None, metavar="PRESETS_YAML", help="Run presets (from presets.yaml) over this config's inputs concurrently and write a comparison report.")
+    parser.add_argument("--presets", default=None, help="Sweep: comma-separated preset names (default: all).")
+    parser.add_argument("--sweep-concurrency", type=int, default=None, help="Sweep: presets run at once (default: sweep.concurrency or 2).")
+    mode.add_argument("--daemon", action="store_true", help="Stay resident and accept batch jobs over the local API (daemon: section in config).")
+    parser.add_argument("--submit", action="store_true", help="Send this batch to a running daemon and stream its output.")
+    parser.add_argument("--daemon-url", default=None, help="Daemon address (http://host:port or unix:///path); default: ACM_DAEMON_URL or daemon: in config.")
+    parser.add_argument("--listen", default=None, metavar="HOST:PORT", help="Daemon: TCP address to listen on (overrides config).")
+    parser.add_argument("--socket", default=None, help="Daemon: serve on this Unix socket instead of TCP.")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
     # Use local package config.yaml by default
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    cfg = os.path.join(current_dir, "config.yaml")
-    run(cfg)
+    args = parse_cli_args()
+    if args.plan:
+        plan_main(args.config, json_path=args.plan if isinstance(args.plan, str) else None)
+    elif args.sweep:
+        sys.exit(0 if sweep_main(args.config, args.sweep, names=args.presets, concurrency=args.sweep_concurrency) else 1)
+    elif args.submit:
+        sys.exit(0 if submit_to_daemon(args.config, url=args.daemon_url, resume=args.resume, coordinator=args.coordinator, queue_spec=args.queue) else 1)
+    elif args.worker:
+        asyncio.run(worker_main(args.config, queue_spec=args.queue, worker_id=args.worker_id, max_jobs=args.max_jobs, exit_when_idle=args.exit_when_idle, batch_id=args.batch))
+    elif args.daemon:
+        host, _, port = (args.listen or "").rpartition(":")
+        asyncio.run(daemon_main(args.config, host=host or None, port=int(port) if port else None, socket_path=args.socket))
+    else:
+        run(args.config, resume=args.resume, coordinator=args.coordinator, queue_spec=args.queue)
 
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/adaptive_concurrency.py (AIMD provider concurrency).
+"""
+
+import os
+import sys
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions.adaptive_concurrency import (
+    AimdLimit,
+    AdaptiveConcurrency,
+    classify_outcome,
+    configure,
+)
+from functions.rate_limiter import ProviderRateLimiter
+
+
+class TestClassifyOutcome(unittest.TestCase):
+    def test_status_codes(self):
+        self.assertEqual(classify_outcome(True, "200"), "ok")
+        self.assertEqual(classify_outcome(False, "429"), "rate_limit")
+        self.assertEqual(classify_outcome(False, "503"), "server_error")
+
+    def test_error_text(self):
+        self.assertEqual(classify_outcome(False, "na", "openai.RateLimitError: Rate limit reached"), "rate_limit")
+        self.assertEqual(classify_outcome(False, None, "Error code: 529 overloaded_error"), "server_error")
+        self.assertEqual(classify_outcome(False, None, "Request timed out"), "server_error")
+        self.assertEqual(classify_outcome(False, "400", "grounding validation failed"), "error")
+
+
+class TestAimdLimit(unittest.TestCase):
+    def test_additive_increase_per_window(self):
+        lim = AimdLimit(initial=4, max_limit=10, cooldown_seconds=0)
+        for _ in range(4):
+            lim.on_success()
+        self.assertEqual(lim.value, 4)  # 4 + 4*(1/4..) just under 5
+        for _ in range(4):
+            lim.on_success()
+        self.assertGreaterEqual(lim.value, 5)
+
+    def test_multiplicative_decrease_and_bounds(self):
+        lim = AimdLimit(initial=8, min_limit=2, max_limit=8, cooldown_seconds=0)
+        self.assertTrue(lim.on_congestion(now=1.0))
+        self.assertEqual(lim.value, 4)
+        lim.on_congestion(now=2.0)
+        lim.on_congestion(now=3.0)
+        self.assertEqual(lim.value, 2)
+        for _ in range(100):
+            lim.on_success()
+        self.assertEqual(lim.value, 8)
+
+    def test_cooldown_collapses_bursts(self):
+        lim = AimdLimit(initial=16, cooldown_seconds=10)
+        self.assertTrue(lim.on_congestion(now=100.0))
+        self.assertFalse(lim.on_congestion(now=101.0))
+        self.assertEqual(lim.value, 8)
+        self.assertTrue(lim.on_congestion(now=111.0))
+        self.assertEqual(lim.value, 4)
+
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+    def test_configure_enables_limiter_and_applies_caps(self):
+        limiter = ProviderRateLimiter({})
+        cfg = {"concurrency": {"adaptive": {"enabled": True, "initial": 6, "max": 12, "cooldown_seconds": 0,
+                                            "providers": {"google": {"max": 20}}}}}
+        ctl = configure(cfg, limiter)
+        self.assertTrue(limiter.enabled)
+        self.assertEqual(ctl.ceiling(), 20)
+
+        ctl.prime("openai")
+        self.assertEqual(limiter._state(("openai", "gpt-5.1")).max_concurrent, 6)
+
+        ctl.record_result("openai", "gpt-5.1", False, status="429")
+        self.assertEqual(limiter._state(("openai", "gpt-5.1")).max_concurrent, 3)
+        self.assertEqual(ctl.snapshot()["openai"]["outcomes"]["rate_limit"], 1)
+
+    def test_cap_follows_fpf_outcomes(self):
+        # FPF batches read cap() at launch for --max-concurrency
+        ctl = AdaptiveConcurrency({"enabled": True, "initial": 8, "cooldown_seconds": 0})
+        self.assertEqual(ctl.cap("Google"), 8)
+        ctl.record_result("google", "gemini-2.5-pro", False, status="429")
+        self.assertEqual(ctl.cap("google"), 4)
+        self.assertEqual(ctl.cap("openai"), 8)
+
+    def test_disabled_is_noop(self):
+        ctl = AdaptiveConcurrency({})
+        self.assertEqual(ctl.record_result("openai", "m", False, status="429"), "rate_limit")
+        self.assertIsNone(ctl.cap("openai"))
+        self.assertEqual(ctl.snapshot(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
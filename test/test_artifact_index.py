@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/artifact_index.py (indexed skip detection).
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions.artifact_index import ArtifactIndex, name_prefixes, configure, _norm
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("x")
+    return path
+
+
+class TestArtifactIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.out = os.path.join(self.tmp, "outputs")
+        os.makedirs(self.out)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_prefixes_match_startswith_semantics(self):
+        self.assertEqual(name_prefixes("doc.gptr.1.md"), ["doc", "doc.gptr", "doc.gptr.1"])
+        self.assertEqual(name_prefixes("README"), [])
+
+    def test_ensure_find_count(self):
+        _touch(os.path.join(self.out, "doc.gptr.1.m.abc.md"))
+        _touch(os.path.join(self.out, "doc.fpf.1.m.def.txt"))
+        _touch(os.path.join(self.out, "doc.log"))
+        _touch(os.path.join(self.out, "document.md"))
+        idx = ArtifactIndex()
+        idx.ensure(self.out, exts=(".md", ".txt"))
+        self.assertEqual(idx.count(self.out, "doc"), 2)
+        self.assertIsNotNone(idx.find(self.out, "doc"))
+        self.assertIsNone(idx.find(self.out, "other"))
+        idx.close()
+
+    def test_add_path_updates_indexed_roots_only(self):
+        idx = ArtifactIndex()
+        idx.ensure(self.out, exts=(".md",))
+        self.assertIsNone(idx.find(self.out, "doc"))
+        idx.add_path(_touch(os.path.join(self.out, "doc.dr.1.m.md")))
+        idx.add_path(_touch(os.path.join(self.out, "doc.dr.1.m.json")))  # filtered by exts
+        other = os.path.join(self.tmp, "elsewhere")
+        idx.add_path(_touch(os.path.join(other, "doc.md")))  # root never indexed
+        self.assertEqual(idx.count(self.out, "doc"), 1)
+        self.assertEqual(idx.count(other, "doc"), 0)
+        idx.close()
+
+    def test_deleted_file_is_not_a_hit(self):
+        path = _touch(os.path.join(self.out, "doc.gptr.1.md"))
+        idx = ArtifactIndex()
+        idx.ensure(self.out)
+        os.remove(path)
+        self.assertIsNone(idx.find(self.out, "doc"))
+        self.assertEqual(idx.count(self.out, "doc"), 0)
+        idx.close()
+
+    def test_recursive_root(self):
+        evals = os.path.join(self.tmp, "final_reports")
+        _touch(os.path.join(evals, "2025", "run1", "doc.best.md"))
+        idx = ArtifactIndex()
+        idx.ensure(evals, recursive=True)
+        self.assertTrue(idx.find(evals, "doc").endswith("doc.best.md"))
+        idx.add_path(_touch(os.path.join(evals, "2026", "new.best.md")))
+        self.assertIsNotNone(idx.find(evals, "new"))
+        idx.close()
+
+    def test_persists_between_processes(self):
+        db = os.path.join(self.tmp, "index.sqlite")
+        _touch(os.path.join(self.out, "doc.gptr.1.md"))
+        idx = ArtifactIndex(db, max_age_seconds=3600)
+        idx.ensure(self.out)
+        idx.close()
+        # An unchanged directory is not listed again while the stored listing is fresh
+        again = ArtifactIndex(db, max_age_seconds=3600)
+        built_at = again._roots[_norm(self.out)][2]
+        again.ensure(self.out)
+        self.assertEqual(again._roots[_norm(self.out)][2], built_at)
+        self.assertIsNotNone(again.find(self.out, "doc"))
+        again.close()
+
+    def test_directory_mtime_change_forces_rebuild(self):
+        db = os.path.join(self.tmp, "index.sqlite")
+        idx = ArtifactIndex(db, max_age_seconds=3600)
+        idx.ensure(self.out)
+        # Another process writes into the directory (mtime bumped explicitly for coarse clocks)
+        _touch(os.path.join(self.out, "late.gptr.1.md"))
+        st = os.stat(self.out)
+        os.utime(self.out, (st.st_atime, st.st_mtime + 5))
+        idx.ensure(self.out)
+        self.assertIsNotNone(idx.find(self.out, "late"))
+        idx.close()
+
+    def test_recursive_root_waits_for_max_age(self):
+        db = os.path.join(self.tmp, "index.sqlite")
+        _touch(os.path.join(self.out, "run1", "doc.json"))
+        idx = ArtifactIndex(db, max_age_seconds=3600)
+        idx.ensure(self.out, recursive=True)
+        _touch(os.path.join(self.out, "run1", "late.json"))
+        idx.ensure(self.out, recursive=True)
+        self.assertIsNone(idx.find(self.out, "late"))
+        idx.close()
+
+    def test_opens_index_without_dir_mtime_column(self):
+        db = os.path.join(self.tmp, "index.sqlite")
+        conn = sqlite3.connect(db)
+        conn.execute("CREATE TABLE roots (root TEXT PRIMARY KEY, recursive INTEGER NOT NULL, exts TEXT, built_at REAL NOT NULL)")
+        conn.execute("INSERT INTO roots VALUES (?, 0, NULL, ?)", (_norm(self.out), time.time()))
+        conn.commit()
+        conn.close()
+        _touch(os.path.join(self.out, "doc.gptr.1.md"))
+        idx = ArtifactIndex(db, max_age_seconds=3600)
+        # No stored mtime: the root is listed again
+        idx.ensure(self.out)
+        self.assertIsNotNone(idx.find(self.out, "doc"))
+        idx.close()
+
+    def test_configure_resolves_relative_path(self):
+        idx = configure({"skip_index": {"path": "idx.sqlite"}}, self.tmp)
+        self.assertEqual(idx.db_path, os.path.join(self.tmp, "idx.sqlite"))
+        idx.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/artifact_manifest.py (manifest-based eval file collection).
+"""
+
+import os
+import sys
+import hashlib
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions.artifact_manifest import ArtifactManifest, configure
+
+
+class TestArtifactManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.out = os.path.join(self.tmp, "outputs")
+        os.makedirs(self.out)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _write(self, name, text="report"):
+        path = os.path.join(self.out, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_record_captures_size_and_hash(self):
+        m = ArtifactManifest()
+        path = self._write("doc.gptr.1.m.abc.md", "hello")
+        entry = m.record(path, "gptr", "openai:gpt-4o", input_file="/in/doc.md")
+        self.assertEqual(entry["size"], 5)
+        self.assertEqual(entry["sha256"], hashlib.sha256(b"hello").hexdigest())
+        self.assertEqual(entry["type"], "gptr")
+        self.assertEqual(m.files(self.out), [os.path.abspath(path)])
+
+    def test_files_filters_dir_input_and_extension(self):
+        m = ArtifactManifest()
+        a = self._write("a.fpf.1.m.md")
+        b = self._write("b.fpf.1.m.txt")
+        j = self._write("a.ma.1.m.json")
+        m.record(a, "fpf", "m", input_file="/in/a.md")
+        m.record(b, "fpf", "m", input_file="/in/b.md")
+        m.record(j, "ma", "m", input_file="/in/a.md")
+        self.assertEqual(m.files(self.out), [os.path.abspath(a), os.path.abspath(b)])
+        self.assertEqual(m.files(self.out, input_file="/in/a.md"), [os.path.abspath(a)])
+        self.assertEqual(m.files(os.path.join(self.tmp, "other")), [])
+        # Files deleted after being recorded (e.g. a superseded hedge loser) are not evaluated
+        os.remove(b)
+        self.assertEqual(m.files(self.out), [os.path.abspath(a)])
+
+    def test_jsonl_is_reloaded_for_same_batch(self):
+        m = configure({"manifest": {"dir": "manifests"}}, self.tmp, batch_id="batch1")
+        a = self._write("doc.dr.1.m.md")
+        m.record(a, "dr", "m")
+        m.record(a, "dr", "m")  # re-recording replaces, not duplicates
+        self.assertEqual(len(m), 1)
+        again = configure({"manifest": {"dir": "manifests"}}, self.tmp, batch_id="batch1")
+        self.assertEqual(again.path, os.path.join(self.tmp, "manifests", "batch1.jsonl"))
+        self.assertEqual(again.files(self.out), [os.path.abspath(a)])
+        self.assertEqual(len(configure({"manifest": {"dir": "manifests"}}, self.tmp, batch_id="batch2")), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
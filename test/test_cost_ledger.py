@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/cost_ledger.py (live spend tracking and budgets).
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import tempfile
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import cost_ledger
+from functions.cost_ledger import CostLedger, STATE_HARD, STATE_OK, STATE_SOFT
+
+
+CONFIG = {
+    "runs": [{"type": "fpf", "provider": "openai", "model": "gpt-5.1"}],
+    "eval": {"judges": [{"provider": "google", "model": "gemini-2.5-flash"}]},
+    "budget": {"soft_usd": 1.0, "hard_usd": 2.0, "providers": {"google": {"soft_usd": 0.5}}},
+}
+
+
+def _write_log(folder, run_id, model, usd):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{run_id}.json")
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"run_group_id": os.path.basename(folder), "run_id": run_id, "model": model,
+                   "config": {"provider": "openai"}, "total_cost_usd": usd}, fh)
+    return path
+
+
+class TestBudgets(unittest.TestCase):
+    def setUp(self):
+        self.ledger = CostLedger(cost_ledger.resolve_budget_settings(CONFIG), cost_ledger.model_providers(CONFIG))
+
+    def test_soft_then_hard(self):
+        fired = []
+        self.ledger.on_hard(fired.append)
+        self.assertTrue(self.ledger.charge("openai", "gpt-5.1", 0.6))
+        self.assertTrue(self.ledger.allow_launch())
+        self.ledger.charge("openai", "gpt-5.1", 0.6, phase="eval")
+        self.assertEqual(self.ledger.state(), STATE_SOFT)
+        self.assertFalse(self.ledger.allow_launch())
+        self.assertEqual(fired, [])
+        self.ledger.charge(None, "gpt-5.1", 1.0)
+        self.assertEqual(self.ledger.state(), STATE_HARD)
+        self.assertEqual(len(fired), 1)
+        self.assertIn("budget exceeded", fired[0])
+        # Fires once only, and late subscribers are told immediately
+        self.ledger.charge("openai", "gpt-5.1", 1.0)
+        self.assertEqual(len(fired), 1)
+        late = []
+        self.ledger.on_hard(late.append)
+        self.assertEqual(len(late), 1)
+        snap = self.ledger.snapshot()
+        self.assertEqual(snap["by_phase"], {"eval": 0.6, "generate": 2.6})
+        self.assertEqual(snap["calls"], 4)
+
+    def test_provider_budget_only_blocks_that_provider(self):
+        self.ledger.charge("google", "gemini-2.5-flash", 0.5)
+        self.assertFalse(self.ledger.allow_launch("google"))
+        self.assertTrue(self.ledger.allow_launch("openai"))
+        self.assertTrue(self.ledger.allow_launch())
+        self.assertEqual(self.ledger.state(), STATE_SOFT)
+
+    def test_duplicates_and_zero_are_ignored(self):
+        self.assertTrue(self.ledger.charge("openai", "m", 0.1, key="k"))
+        self.assertFalse(self.ledger.charge("openai", "m", 0.1, key="k"))
+        self.assertFalse(self.ledger.charge("openai", "m", 0))
+        self.assertFalse(self.ledger.charge("openai", "m", None))
+        self.assertAlmostEqual(self.ledger.spent(), 0.1)
+
+    def test_unconfigured_never_blocks(self):
+        ledger = CostLedger()
+        ledger.charge("openai", "m", 1e6)
+        self.assertTrue(ledger.allow_launch("openai"))
+        self.assertEqual(ledger.state(), STATE_OK)
+
+
+class TestFpfLogs(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.ledger = CostLedger(cost_ledger.resolve_budget_settings(CONFIG), cost_ledger.model_providers(CONFIG))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_scan_charges_each_log_once_with_phase_and_provider(self):
+        _write_log(os.path.join(self.tmp, "grp1"), "r1", "gpt-5.1", 0.25)
+        _write_log(os.path.join(self.tmp, "single_20251130_x"), "r2", "gemini-2.5-flash", 0.1)
+        # A copy of the same eval log elsewhere (logs/eval_fpf_logs) is not charged twice
+        copies = os.path.join(self.tmp, "copies")
+        _write_log(os.path.join(copies, "single_20251130_x"), "r2", "gemini-2.5-flash", 0.1)
+        self.assertEqual(self.ledger.scan([self.tmp, copies]), 2)
+        self.assertEqual(self.ledger.scan([self.tmp, copies]), 0)
+        snap = self.ledger.snapshot()
+        self.assertEqual(snap["by_provider"], {"google": 0.1, "openai": 0.25})
+        self.assertEqual(snap["by_phase"], {"eval": 0.1, "generate": 0.25})
+
+    def test_scan_skips_old_logs(self):
+        path = _write_log(os.path.join(self.tmp, "grp1"), "old", "gpt-5.1", 5.0)
+        past = time.time() - 3600
+        os.utime(path, (past, past))
+        os.utime(os.path.dirname(path), (past, past))
+        self.assertEqual(self.ledger.scan([self.tmp], since=time.time() - 60), 0)
+
+    def test_watch_picks_up_new_logs(self):
+        self.ledger.settings.poll_seconds = 0.5
+
+        async def scenario():
+            self.ledger.start_watch([self.tmp], since=time.time() - 1)
+            await asyncio.sleep(0.1)
+            _write_log(os.path.join(self.tmp, "grp2"), "r9", "gpt-5.1", 0.4)
+            await self.ledger.stop()  # final scan on the way out
+
+        asyncio.run(scenario())
+        self.assertAlmostEqual(self.ledger.spent("openai"), 0.4)
+
+
+class TestDayScope(unittest.TestCase):
+    def test_journal_carries_spend_across_batches(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            config = dict(CONFIG, budget={"hard_usd": 1.0, "scope": "day"})
+            first = cost_ledger.configure(config, tmp)
+            first.charge("openai", "gpt-5.1", 0.7, key="fpf:g:r1")
+            second = cost_ledger.configure(config, tmp)
+            self.assertAlmostEqual(second.spent(), 0.7)
+            self.assertFalse(second.charge("openai", "gpt-5.1", 0.7, key="fpf:g:r1"))
+            second.charge("openai", "gpt-5.1", 0.4)
+            self.assertTrue(second.hard_exceeded)
+            # Batch scope ignores earlier spend
+            self.assertEqual(cost_ledger.configure(dict(config, budget={"hard_usd": 1.0}), tmp).spent(), 0.0)
+        finally:
+            cost_ledger._LEDGER = None
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
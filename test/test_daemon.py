@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/daemon.py (job manager, local HTTP API and client).
+"""
+
+import os
+import sys
+import time
+import asyncio
+import shutil
+import tempfile
+import threading
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import daemon
+
+
+class _DaemonFixture(unittest.TestCase):
+    """Runs a JobManager on a background loop with a 'batch' handler that prints its spec."""
+
+    settings_kwargs = {}
+
+    def setUp(self):
+        self.release = threading.Event()
+
+        async def batch(spec):
+            print(f"start {spec.get('config')}")
+            while not self.release.is_set():
+                await asyncio.sleep(0.01)
+            if spec.get("fail"):
+                raise RuntimeError("boom")
+            print("end", end="")
+
+        self.manager = daemon.JobManager({"batch": batch}, max_events=1000)
+        self.loop = asyncio.new_event_loop()
+        self.task = self.loop.create_task(self.manager.run())
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(asyncio.gather(self.task, return_exceptions=True),), daemon=True)
+        self.thread.start()
+        while self.manager._loop is None:
+            time.sleep(0.01)
+        self.settings = daemon.DaemonSettings(port=0, **self.settings_kwargs)
+        self.server = daemon.serve(self.manager, self.settings)
+        if not self.settings.socket:
+            self.settings.port = self.server.server_address[1]
+        self.client = daemon.DaemonClient(self.settings.url, token=self.settings.token, timeout=5)
+
+    def tearDown(self):
+        self.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join(timeout=5)
+        self.loop.close()
+
+    def _wait_state(self, job_id, state):
+        for _ in range(300):
+            if self.client.status(job_id)["state"] == state:
+                return
+            time.sleep(0.01)
+        self.fail(f"job {job_id} never reached {state}")
+
+
+class TestDaemonApi(_DaemonFixture):
+    def test_submit_follow_and_status(self):
+        self.assertTrue(self.client.available())
+        job = self.client.submit("batch", config="a.yaml")
+        # The 202 body is serialized after the job is enqueued, so an idle manager may already have started it
+        self.assertIn(job["state"], (daemon.STATE_QUEUED, daemon.STATE_RUNNING))
+        self._wait_state(job["id"], daemon.STATE_RUNNING)
+        self.release.set()
+        lines = []
+        final = daemon.follow_job(self.client, job["id"], echo=lines.append)
+        self.assertEqual(final["state"], daemon.STATE_DONE)
+        self.assertEqual(lines, ["start a.yaml", "end"])
+        # Replaying from a sequence number only returns later events
+        events = list(self.client.events(job["id"], after=0, follow=False))
+        later = list(self.client.events(job["id"], after=events[-2]["seq"], follow=False))
+        self.assertEqual(later, events[-1:])
+
+    def test_jobs_run_one_at_a_time_in_order(self):
+        first = self.client.submit("batch", config="1")
+        second = self.client.submit("batch", config="2")
+        self._wait_state(first["id"], daemon.STATE_RUNNING)
+        self.assertEqual(self.client.status(second["id"])["state"], daemon.STATE_QUEUED)
+        self.release.set()
+        self._wait_state(second["id"], daemon.STATE_DONE)
+        self.assertEqual(self.client.health()["jobs"], {daemon.STATE_DONE: 2})
+
+    def test_cancel_running_and_queued(self):
+        running = self.client.submit("batch", config="1")
+        queued = self.client.submit("batch", config="2")
+        self._wait_state(running["id"], daemon.STATE_RUNNING)
+        self.assertEqual(self.client.cancel(queued["id"])["state"], daemon.STATE_CANCELLED)
+        self.client.cancel(running["id"])
+        self._wait_state(running["id"], daemon.STATE_CANCELLED)
+        # The manager keeps serving after a cancellation
+        self.release.set()
+        after = self.client.submit("batch", config="3")
+        self._wait_state(after["id"], daemon.STATE_DONE)
+        self.assertEqual(self.client.status(queued["id"])["started_at"], None)
+
+    def test_failure_and_bad_requests(self):
+        self.release.set()
+        job = self.client.submit("batch", fail=True)
+        self._wait_state(job["id"], daemon.STATE_FAILED)
+        self.assertIn("boom", self.client.status(job["id"])["error"])
+        with self.assertRaises(RuntimeError):
+            self.client.submit("nope")
+        with self.assertRaises(RuntimeError):
+            self.client.status("missing")
+
+
+class TestDaemonToken(_DaemonFixture):
+    settings_kwargs = {"token": "s3cret"}
+
+    def test_token_required(self):
+        self.assertTrue(self.client.available())
+        anonymous = daemon.DaemonClient(self.settings.url, timeout=5)
+        self.assertFalse(anonymous.available())
+        with self.assertRaises(RuntimeError):
+            anonymous.submit("batch")
+
+
+@unittest.skipUnless(hasattr(__import__("socket"), "AF_UNIX"), "Unix sockets not available")
+class TestDaemonUnixSocket(_DaemonFixture):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.settings_kwargs = {"socket": os.path.join(self.tmp, "acm.sock")}
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_submit_over_socket(self):
+        self.assertTrue(self.settings.url.startswith("unix://"))
+        self.release.set()
+        job = self.client.submit("batch", config="sock.yaml")
+        final = daemon.follow_job(self.client, job["id"], echo=lambda line: None)
+        self.assertEqual(final["state"], daemon.STATE_DONE)
+
+
+class TestDaemonSettings(unittest.TestCase):
+    def test_settings(self):
+        s = daemon.resolve_daemon_settings({"daemon": {"port": 9000, "token": "t"}})
+        self.assertEqual((s.host, s.port, s.token, s.url), ("127.0.0.1", 9000, "t", "http://127.0.0.1:9000"))
+        self.assertEqual(daemon.resolve_daemon_settings(None).port, daemon.DEFAULT_PORT)
+
+
+if __name__ == "__main__":
+    unittest.main()
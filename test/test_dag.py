@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/dag.py (declarative stage DAG).
+"""
+
+import os
+import sys
+import asyncio
+import threading
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions.dag import Dag
+
+
+class TestDag(unittest.TestCase):
+    def test_inputs_flow_along_edges(self):
+        g = Dag(log=None)
+
+        async def a(_):
+            return 2
+
+        async def b(inputs):
+            return inputs["a"] * 10
+
+        def c(inputs):
+            # Plain functions run on a worker thread
+            return (inputs["a"], inputs["b"], threading.current_thread() is threading.main_thread())
+
+        g.add("c", c, deps=["a", "b"])
+        g.add("b", b, deps=["a"])
+        g.add("a", a)
+        res = asyncio.run(g.run())
+        self.assertEqual(res["c"].result, (2, 20, False))
+        self.assertTrue(all(r.ok for r in res.values()))
+
+    def test_independent_nodes_overlap(self):
+        g = Dag(log=None)
+        events = []
+
+        async def slow(_):
+            events.append("slow-start")
+            await asyncio.sleep(0.05)
+            events.append("slow-end")
+
+        async def fast(_):
+            events.append("fast-start")
+            await asyncio.sleep(0.01)
+            events.append("fast-end")
+
+        g.add("slow", slow)
+        g.add("fast", fast)
+        asyncio.run(g.run())
+        self.assertLess(events.index("fast-end"), events.index("slow-end"))
+
+    def test_failure_skips_dependents_only(self):
+        g = Dag(log=None)
+        ran = []
+
+        async def boom(_):
+            raise RuntimeError("nope")
+
+        async def after(_):
+            ran.append("after")
+
+        async def other(_):
+            ran.append("other")
+
+        g.add("boom", boom)
+        g.add("after", after, deps=["boom"])
+        g.add("after2", after, deps=["after"])
+        g.add("other", other)
+        res = asyncio.run(g.run())
+        self.assertEqual(res["boom"].status, "failed")
+        self.assertEqual(res["boom"].error, "nope")
+        self.assertEqual(res["after"].status, "skipped")
+        self.assertEqual(res["after2"].status, "skipped")
+        self.assertEqual(ran, ["other"])
+
+    def test_resource_limit(self):
+        g = Dag(limits={"combine": 1}, log=None)
+        active = {"now": 0, "peak": 0}
+
+        async def work(_):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+
+        for i in range(3):
+            g.add(f"m{i}", work, resource="combine")
+        asyncio.run(g.run())
+        self.assertEqual(active["peak"], 1)
+
+    def test_rejects_unknown_deps_and_cycles(self):
+        async def noop(_):
+            return None
+
+        g = Dag(log=None)
+        g.add("a", noop, deps=["missing"])
+        with self.assertRaises(ValueError):
+            asyncio.run(g.run())
+        g = Dag(log=None)
+        g.add("a", noop, deps=["b"])
+        g.add("b", noop, deps=["a"])
+        with self.assertRaises(ValueError):
+            asyncio.run(g.run())
+        with self.assertRaises(ValueError):
+            g.add("a", noop)
+
+
+if __name__ == "__main__":
+    unittest.main()
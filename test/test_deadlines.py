@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/deadlines.py (hierarchical deadlines and process-group kills).
+"""
+
+import os
+import sys
+import time
+import asyncio
+import signal
+import subprocess
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import deadlines
+
+
+class TestDeadline(unittest.TestCase):
+    def test_unbounded_by_default(self):
+        d = deadlines.Deadline()
+        self.assertIsNone(d.remaining())
+        self.assertFalse(d.expired())
+        self.assertEqual(d.timeout(30), 30)
+
+    def test_child_never_outlives_parent(self):
+        parent = deadlines.Deadline(1.0, label="file")
+        child = parent.child(600, "run:gptr")
+        self.assertLessEqual(child.remaining(), 1.0)
+        self.assertEqual(child.bound_by, "file")
+        self.assertEqual(child.reason(), "deadline exceeded (file)")
+
+        tight = parent.child(0.5, "run:gptr")
+        self.assertEqual(tight.bound_by, "run:gptr")
+
+    def test_expiry(self):
+        d = deadlines.Deadline(0.01, label="batch")
+        time.sleep(0.02)
+        self.assertTrue(d.expired())
+        self.assertEqual(d.remaining(), 0.0)
+        self.assertTrue(d.child(100, "file").expired())
+
+    def test_scope_is_inherited_by_tasks(self):
+        async def scenario():
+            async def probe():
+                return deadlines.current().bound_by
+
+            with deadlines.scope(deadlines.Deadline(60, label="file")):
+                task = asyncio.create_task(probe())
+            outside = deadlines.current().bounded
+            return await task, outside
+
+        inside, outside = asyncio.run(scenario())
+        self.assertEqual(inside, "file")
+        self.assertFalse(outside)
+
+    def test_env_export(self):
+        env = deadlines.Deadline(100, label="file").apply_env({}, run_seconds=30)
+        self.assertIn(deadlines.ENV_DEADLINE_AT, env)
+        self.assertEqual(env[deadlines.ENV_RUN_TIMEOUT], "30")
+        self.assertEqual(deadlines.Deadline().apply_env({}), {})
+
+    def test_settings(self):
+        s = deadlines.resolve_deadline_settings({"deadlines": {"file_seconds": 900, "run_seconds": {"fpf": 300, "gptr": 0}}})
+        self.assertEqual(s.file_seconds, 900)
+        self.assertIsNone(s.batch_seconds)
+        self.assertEqual(s.for_run("FPF"), 300)
+        self.assertIsNone(s.for_run("gptr"))
+        self.assertEqual(s.for_run("ma"), 600)
+
+
+def _running(pid):
+    """True while pid exists and is not a zombie waiting to be reaped."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    try:
+        with open(f"/proc/{pid}/stat") as fh:
+            return fh.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return True
+
+
+@unittest.skipIf(os.name == "nt", "process-group test uses POSIX sleep children")
+class TestWaitProcess(unittest.TestCase):
+    def test_exits_before_deadline(self):
+        async def scenario():
+            proc = subprocess.Popen([sys.executable, "-c", "pass"], **deadlines.popen_group_kwargs())
+            return await deadlines.wait_process(proc, deadlines.Deadline(10))
+
+        self.assertTrue(asyncio.run(scenario()))
+
+    def test_expiry_kills_whole_group(self):
+        # The child spawns a grandchild that would outlive a plain proc.kill()
+        script = (
+            "import subprocess, sys, time\n"
+            "g = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])\n"
+            "print(g.pid, flush=True)\n"
+            "time.sleep(30)\n"
+        )
+
+        async def scenario():
+            proc = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, text=True, **deadlines.popen_group_kwargs())
+            grandchild = int(proc.stdout.readline())
+            t0 = time.monotonic()
+            finished = await deadlines.wait_process(proc, deadlines.Deadline(0.3), grace=0.5)
+            return finished, time.monotonic() - t0, grandchild, proc
+
+        finished, elapsed, grandchild, proc = asyncio.run(scenario())
+        self.assertFalse(finished)
+        self.assertLess(elapsed, 5)
+        self.assertIsNotNone(proc.poll())
+        for _ in range(50):
+            if not _running(grandchild):
+                break
+            time.sleep(0.05)
+        else:
+            self.fail("grandchild survived the process-group kill")
+
+    def test_sweep_kills_grandchild_that_ignores_sigterm(self):
+        # The leader exits on SIGTERM; the grandchild ignores it and must get the SIGKILL sweep
+        grandchild_code = "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print('up', flush=True); time.sleep(30)"
+        script = (
+            "import subprocess, sys, time\n"
+            f"g = subprocess.Popen([sys.executable, '-c', {grandchild_code!r}], stdout=subprocess.PIPE, text=True)\n"
+            "g.stdout.readline()\n"
+            "print(g.pid, flush=True)\n"
+            "time.sleep(30)\n"
+        )
+
+        async def scenario():
+            proc = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, text=True, **deadlines.popen_group_kwargs())
+            grandchild = int(proc.stdout.readline())
+            await deadlines.terminate_process_group(proc, grace=3)
+            return grandchild, proc
+
+        grandchild, proc = asyncio.run(scenario())
+        self.assertIsNotNone(proc.poll())
+        for _ in range(50):
+            if not _running(grandchild):
+                break
+            time.sleep(0.05)
+        else:
+            os.kill(grandchild, signal.SIGKILL)
+            self.fail("grandchild ignoring SIGTERM survived the SIGKILL sweep")
+
+
+if __name__ == "__main__":
+    unittest.main()
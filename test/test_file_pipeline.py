@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/file_pipeline.py (cross-file pipelined scheduler).
+"""
+
+import os
+import sys
+import asyncio
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions.file_pipeline import FilePipeline, resolve_pipeline_settings
+
+
+class TestResolvePipelineSettings(unittest.TestCase):
+    def test_defaults_disabled(self):
+        self.assertEqual(resolve_pipeline_settings({}), (False, 1, 1))
+
+    def test_depth_and_overrides(self):
+        cfg = {"concurrency": {"pipeline": {"enabled": True, "depth": 3, "generate_depth": 1}}}
+        self.assertEqual(resolve_pipeline_settings(cfg), (True, 1, 3))
+
+    def test_invalid_depth_falls_back(self):
+        cfg = {"concurrency": {"pipeline": {"enabled": True, "depth": "x"}}}
+        self.assertEqual(resolve_pipeline_settings(cfg), (True, 1, 1))
+
+
+class TestFilePipeline(unittest.TestCase):
+    def test_generation_overlaps_evaluation(self):
+        events = []
+
+        async def generate(item):
+            events.append(("gen_start", item))
+            await asyncio.sleep(0.01)
+            events.append(("gen_end", item))
+            return item
+
+        async def evaluate(item, result):
+            events.append(("eval_start", item))
+            await asyncio.sleep(0.05)
+            events.append(("eval_end", item))
+            return result * 10
+
+        pipeline = FilePipeline(generate, evaluate, generate_depth=1, evaluate_depth=2)
+        records = asyncio.run(pipeline.run([1, 2, 3]))
+
+        self.assertEqual([r["evaluated"] for r in records], [10, 20, 30])
+        # File 2 starts generating before file 1 finishes evaluating
+        self.assertLess(events.index(("gen_start", 2)), events.index(("eval_end", 1)))
+        # Generation depth 1 keeps generation strictly ordered
+        self.assertLess(events.index(("gen_end", 1)), events.index(("gen_start", 2)))
+
+    def test_accept_and_max_items(self):
+        seen = []
+
+        async def generate(item):
+            seen.append(item)
+            return item
+
+        async def evaluate(item, result):
+            return result
+
+        pipeline = FilePipeline(generate, evaluate, accept=lambda i: i != "a", max_items=1)
+        records = asyncio.run(pipeline.run(["a", "b", "c"]))
+        self.assertEqual(seen, ["b"])
+        self.assertEqual(len(records), 1)
+
+    def test_none_result_skips_evaluation_and_errors_are_recorded(self):
+        async def generate(item):
+            if item == "boom":
+                raise RuntimeError("failed")
+            return None
+
+        async def evaluate(item, result):
+            raise AssertionError("should not evaluate")
+
+        records = asyncio.run(FilePipeline(generate, evaluate).run(["x", "boom"]))
+        self.assertIsNone(records[0]["error"])
+        self.assertIsNone(records[0]["evaluated"])
+        self.assertIn("generate", records[1]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
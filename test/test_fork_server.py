@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/fork_server.py (pre-warmed fork servers behind process_runner).
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import deadlines, fork_server, process_runner
+
+CHILD = """\
+import os, sys, random
+print("argv", sys.argv[1:])
+print("env", os.environ.get("SMART_LLM"))
+print("stdin", sys.stdin.read().strip())
+print("path0", sys.path[0])
+print("own_session", os.getsid(0) == os.getpid())
+print("warm", "email.mime.text" in sys.modules)
+sys.stderr.write("to stderr\\n")
+sys.exit(int(sys.argv[1]))
+"""
+
+SLEEPER = "import time\nprint('up', flush=True)\ntime.sleep(30)\n"
+
+
+@unittest.skipUnless(fork_server.SUPPORTED, "fork server needs fork() and Unix sockets")
+class TestForkServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.child = os.path.join(self.tmp.name, "warm_child.py")
+        self.sleeper = os.path.join(self.tmp.name, "warm_sleeper.py")
+        for path, text in ((self.child, CHILD), (self.sleeper, SLEEPER)):
+            with open(path, "w", encoding="utf-8") as fh:
+                fh.write(text)
+        previous = fork_server._POOL
+        self.addCleanup(setattr, fork_server, "_POOL", previous)
+
+    def run_with_pool(self, scenario):
+        pool = fork_server.configure({"fork_server": {"enabled": True, "profiles": {
+            "test": {"scripts": ["warm_child.py", "warm_sleeper.py"], "preload": ["email.mime.text", "no_such_module_xyz"]},
+        }}})
+
+        async def main():
+            await pool.start()
+            try:
+                return await scenario(pool)
+            finally:
+                await pool.stop()
+
+        return pool, asyncio.run(main())
+
+    def test_forked_children_keep_per_process_isolation(self):
+        async def scenario(pool):
+            server = pool.servers[0]
+            self.assertEqual(server.failed, ["no_such_module_xyz"])
+            runs = [
+                process_runner.run_process([sys.executable, "-u", self.child, str(i)],
+                                           env=dict(os.environ, SMART_LLM=f"openai:m{i}"), stdin_data=f"hi {i}")
+                for i in range(3)
+            ]
+            # Not served by any profile: a normal exec
+            runs.append(process_runner.run_process([sys.executable, self.child, "0"], stdin_data="plain"))
+            return await asyncio.gather(*runs)
+
+        pool, results = self.run_with_pool(scenario)
+        for i, res in enumerate(results[:3]):
+            self.assertEqual(res.returncode, i)
+            self.assertEqual(res.stdout, [
+                f"argv ['{i}']", f"env openai:m{i}", f"stdin hi {i}", f"path0 {self.tmp.name}",
+                "own_session True", "warm True",
+            ])
+            self.assertEqual(res.stderr, ["to stderr"])
+        self.assertIn("warm False", results[3].stdout)
+        self.assertEqual((pool.servers[0].spawned, pool.servers[0].fallbacks), (3, 0))
+
+    def test_deadline_kills_forked_child(self):
+        async def scenario(_pool):
+            return await process_runner.run_process(
+                [sys.executable, "-u", self.sleeper], deadline=deadlines.Deadline(1.0, label="test"), grace=0.5,
+            )
+
+        _pool, res = self.run_with_pool(scenario)
+        self.assertTrue(res.timed_out)
+        self.assertEqual(res.stdout, ["up"])
+        self.assertLess(res.returncode, 0)
+
+    def test_disabled_by_default(self):
+        pool = fork_server.configure({})
+        self.assertEqual(pool.servers, [])
+        self.assertIsNone(pool.server_for([sys.executable, "-u", "gptr_subprocess.py"]))
+        s = fork_server.resolve_fork_settings({"fork_server": {"profiles": {"x": {"scripts": ["a.py"], "paths": ["rel"]}}}})
+        self.assertEqual(list(s.profiles), ["x"])
+        self.assertTrue(os.path.isabs(s.profiles["x"]["paths"][0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/fpf_inflight.py (event-driven FPF headroom gating).
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions.fpf_inflight import FpfInflightTracker, resolve_watermarks
+from functions import watermark_orchestrator
+
+
+def _busy_tracker(n=2):
+    t = FpfInflightTracker({"rest": 4, "deep": 0})
+    t.update({"type": "concurrency", "max_concurrency": n})
+    for _ in range(n):
+        t.update({"type": "run_start", "kind": "rest"})
+    return t
+
+
+class TestHeadroomWaits(unittest.TestCase):
+    def test_ready_immediately_when_slot_free(self):
+        t = FpfInflightTracker({"rest": 3})
+
+        hr = asyncio.run(t.wait_for_headroom(low_watermark=1, timeout=1))
+        self.assertTrue(hr["ready"])
+
+    def test_completion_on_reader_thread_wakes_waiter(self):
+        t = _busy_tracker()
+
+        async def scenario():
+            def reader():
+                time.sleep(0.05)
+                t.update({"type": "run_complete", "kind": "rest"})
+
+            threading.Thread(target=reader).start()
+            start = time.monotonic()
+            hr = await t.wait_for_headroom(low_watermark=1, timeout=5)
+            return hr, time.monotonic() - start
+
+        hr, waited = asyncio.run(scenario())
+        self.assertTrue(hr["ready"])
+        self.assertEqual(hr["rest_inflight"], 1)
+        self.assertLess(waited, 1.0)
+
+    def test_named_watermarks_release_in_order(self):
+        t = _busy_tracker(3)
+        t.set_watermark("gptr", 1)
+        t.set_watermark("dr", 2)
+        order = []
+
+        async def waiter(name):
+            await t.wait_for(name, timeout=5)
+            order.append(name)
+
+        async def scenario():
+            tasks = [asyncio.create_task(waiter("dr")), asyncio.create_task(waiter("gptr"))]
+            await asyncio.sleep(0.01)
+            self.assertEqual(order, [])
+            t.update({"type": "run_complete", "kind": "rest"})
+            await asyncio.sleep(0.01)
+            self.assertEqual(order, ["gptr"])
+            t.update({"type": "run_complete", "kind": "rest"})
+            await asyncio.gather(*tasks)
+
+        asyncio.run(scenario())
+        self.assertEqual(order, ["gptr", "dr"])
+        self.assertEqual(t.snapshot()["watermarks"], {"gptr": 1, "dr": 2})
+
+    def test_close_releases_and_timeout_returns_not_ready(self):
+        t = _busy_tracker()
+        hr = asyncio.run(t.wait_for_headroom(low_watermark=1, timeout=0.02))
+        self.assertFalse(hr["ready"])
+
+        async def scenario():
+            task = asyncio.create_task(t.wait_for_headroom(low_watermark=1, timeout=5))
+            await asyncio.sleep(0.01)
+            t.close("rest")
+            return await task
+
+        self.assertFalse(asyncio.run(scenario())["ready"])
+
+    def test_resolve_watermarks(self):
+        cfg = {"concurrency": {"fpf_watermarks": {"GPTR": 1, "dr": "2", "bad": "x"}}}
+        self.assertEqual(resolve_watermarks(cfg), {"gptr": 1, "dr": 2})
+        self.assertEqual(resolve_watermarks({}), {})
+
+
+class TestOrchestrator(unittest.TestCase):
+    def test_gptr_launches_when_fpf_frees_a_slot(self):
+        events = []
+
+        async def run_fpf_batch(run_id, entries, on_event):
+            on_event({"type": "concurrency", "max_concurrency": 1})
+            on_event({"type": "run_start", "kind": "rest"})
+            await asyncio.sleep(0.05)
+            events.append("fpf-done")
+            on_event({"type": "run_complete", "kind": "rest"})
+
+        async def launch_gptr(idx, entry):
+            events.append("gptr-launch")
+            return asyncio.create_task(asyncio.sleep(0))
+
+        entries = [{"type": "fpf", "provider": "openai"}, {"type": "gptr"}]
+
+        async def scenario():
+            rest, _open = await watermark_orchestrator.run_for_file(
+                "doc.md", {}, entries, 1, False, False,
+                low_watermark=1, launch_gptr=launch_gptr, run_fpf_batch=run_fpf_batch,
+            )
+            await asyncio.gather(*rest)
+
+        asyncio.run(asyncio.wait_for(scenario(), 5))
+        self.assertEqual(events, ["fpf-done", "gptr-launch"])
+
+
+if __name__ == "__main__":
+    unittest.main()
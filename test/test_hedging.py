@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/hedging.py (hedged re-launch of straggler runs).
+"""
+
+import os
+import sys
+import asyncio
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions.hedging import HedgeLedger, HedgePolicy, configure
+from functions.run_history import RunHistory
+
+
+def _history(rtype="gptr", model="m1", samples=(10, 20, 30, 40, 50)):
+    hist = RunHistory()
+    for secs in samples:
+        hist.add(rtype, model, secs)
+    return hist
+
+
+class TestHedgePolicy(unittest.TestCase):
+    def test_delay_from_percentile(self):
+        pol = HedgePolicy({"enabled": True, "min_delay_seconds": 0}, history=_history())
+        self.assertAlmostEqual(pol.delay_for("gptr", "m1"), 46.0)
+        self.assertEqual(pol.delay_for("gptr", "m1"), pol.delay_for("gptr", "openai:m1"))
+
+    def test_no_hedge_without_history_or_when_disabled(self):
+        hist = _history(samples=(10, 20))
+        self.assertIsNone(HedgePolicy({"enabled": True}, history=hist).delay_for("gptr", "m1"))
+        self.assertIsNone(HedgePolicy({}, history=_history()).delay_for("gptr", "m1"))
+        self.assertIsNone(HedgePolicy({"enabled": True, "types": ["fpf"]}, history=_history()).delay_for("gptr", "m1"))
+
+    def test_min_delay_and_budget(self):
+        pol = HedgePolicy({"enabled": True, "min_delay_seconds": 120, "max_hedges": 2}, history=_history())
+        self.assertEqual(pol.delay_for("gptr", "m1"), 120.0)
+        self.assertTrue(pol.try_reserve())
+        self.assertTrue(pol.try_reserve())
+        self.assertFalse(pol.try_reserve())
+
+    def test_configure_reads_concurrency_section(self):
+        pol = configure({"concurrency": {"hedging": {"enabled": True, "percentile": 0.5}}}, _history())
+        self.assertTrue(pol.enabled)
+        self.assertEqual(pol.percentile, 0.5)
+
+
+class TestRace(unittest.TestCase):
+    def _policy(self, **kw):
+        return HedgePolicy(dict({"enabled": True}, **kw), history=_history())
+
+    def test_fast_primary_never_hedges(self):
+        pol = self._policy()
+        calls = []
+
+        async def primary():
+            return "p"
+
+        async def hedge():
+            calls.append("hedge")
+            return "h"
+
+        result, winner = asyncio.run(pol.race(primary, hedge, 0.5))
+        self.assertEqual((result, winner), ("p", "primary"))
+        self.assertEqual(calls, [])
+        self.assertEqual(pol.snapshot()["launched"], 0)
+
+    def test_hedge_wins_and_primary_is_cancelled(self):
+        pol = self._policy()
+        cancelled = []
+        lines = []
+
+        async def primary():
+            try:
+                await asyncio.sleep(5)
+                return "p"
+            except asyncio.CancelledError:
+                cancelled.append("primary")
+                raise
+
+        async def hedge():
+            await asyncio.sleep(0.01)
+            return "h"
+
+        result, winner = asyncio.run(pol.race(primary, hedge, 0.01, label="id=x", log=lines.append))
+        self.assertEqual((result, winner), ("h", "hedge"))
+        self.assertEqual(cancelled, ["primary"])
+        self.assertEqual(pol.snapshot()["won"], 1)
+        self.assertTrue(lines[0].startswith("[HEDGE_START] id=x"))
+        self.assertIn("winner=hedge", lines[-1])
+
+    def test_failed_attempt_does_not_win(self):
+        pol = self._policy()
+
+        async def primary():
+            await asyncio.sleep(0.05)
+            return "p"
+
+        async def hedge():
+            raise RuntimeError("boom")
+
+        result, winner = asyncio.run(pol.race(primary, hedge, 0.01))
+        self.assertEqual((result, winner), ("p", "primary"))
+
+    def test_both_fail(self):
+        pol = self._policy()
+
+        async def primary():
+            await asyncio.sleep(0.02)
+            return None
+
+        async def hedge():
+            return None
+
+        result, winner = asyncio.run(pol.race(primary, hedge, 0.01))
+        self.assertEqual((result, winner), (None, "none"))
+
+    def test_budget_exhausted_waits_for_primary(self):
+        pol = self._policy(max_hedges=0)
+
+        async def primary():
+            await asyncio.sleep(0.03)
+            return "p"
+
+        async def hedge():
+            return "h"
+
+        self.assertEqual(asyncio.run(pol.race(primary, hedge, 0.01)), ("p", "primary"))
+
+
+class TestHedgeLedger(unittest.TestCase):
+    def test_first_claim_wins(self):
+        ledger = HedgeLedger()
+        self.assertTrue(ledger.claim("fpf-1-1", "hedge"))
+        self.assertFalse(ledger.claim("fpf-1-1", "primary"))
+        self.assertTrue(ledger.claim("fpf-1-1", "hedge"))
+        self.assertEqual(ledger.winner("fpf-1-1"), "hedge")
+        self.assertIsNone(ledger.winner("fpf-2-1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
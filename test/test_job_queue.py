@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/job_queue.py (coordinator/worker job queue).
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import job_queue
+from functions.job_queue import SqliteJobQueue, STATE_DONE, STATE_FAILED, STATE_LEASED, STATE_QUEUED
+
+
+class TestSqliteJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "q", "jobs.sqlite")
+        self.q = SqliteJobQueue(self.path)
+
+    def tearDown(self):
+        self.q.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _enqueue(self, unit, **kw):
+        return self.q.enqueue("b1", unit, job_queue.KIND_GEN, {"unit": unit}, file="/in/a.md", **kw)
+
+    def test_lease_complete_and_artifacts(self):
+        self.assertTrue(self._enqueue("u1"))
+        job = self.q.lease("w1", lease_seconds=60)
+        self.assertEqual((job.unit, job.state, job.attempts, job.payload), ("u1", STATE_LEASED, 1, {"unit": "u1"}))
+        self.assertIsNone(self.q.lease("w2"))
+        self.assertTrue(self.q.complete(job.job_id, "w1", [{"name": "a.md", "type": "gptr", "model": "m", "data": b"report"}]))
+        (done,) = self.q.jobs("b1", "/in/a.md")
+        self.assertEqual(done.state, STATE_DONE)
+        self.assertEqual(self.q.artifacts(job.job_id)[0]["data"], b"report")
+        self.q.mark_collected(job.job_id)
+        self.assertTrue(self.q.jobs("b1")[0].collected)
+        self.assertEqual(self.q.artifacts(job.job_id), [])
+
+    def test_enqueue_is_idempotent_and_requeues_failed(self):
+        self.assertTrue(self._enqueue("u1", max_attempts=1))
+        self.assertFalse(self._enqueue("u1"))
+        job = self.q.lease("w1")
+        self.assertTrue(self.q.fail(job.job_id, "w1", "boom"))
+        self.assertEqual(self.q.jobs("b1")[0].state, STATE_FAILED)
+        # Coordinator restart: a failed unit is queued again with fresh attempts
+        self.assertTrue(self._enqueue("u1"))
+        again = self.q.jobs("b1")[0]
+        self.assertEqual((again.state, again.attempts), (STATE_QUEUED, 0))
+
+    def test_fail_retries_until_max_attempts(self):
+        self._enqueue("u1", max_attempts=2)
+        job = self.q.lease("w1")
+        self.q.fail(job.job_id, "w1", "transient")
+        self.assertEqual(self.q.jobs("b1")[0].state, STATE_QUEUED)
+        job = self.q.lease("w1")
+        self.q.fail(job.job_id, "w1", "transient")
+        self.assertEqual(self.q.jobs("b1")[0].state, STATE_FAILED)
+
+    def test_expired_lease_is_taken_over(self):
+        self._enqueue("u1")
+        job = self.q.lease("w1", lease_seconds=60)
+        self.q._write(lambda c: c.execute("UPDATE jobs SET lease_until = ? WHERE job_id = ?", (time.time() - 1, job.job_id)))
+        other = self.q.lease("w2", lease_seconds=60)
+        self.assertEqual((other.job_id, other.worker, other.attempts), (job.job_id, "w2", 2))
+        # The first worker lost its lease: it can neither renew nor post results
+        self.assertFalse(self.q.renew(job.job_id, "w1"))
+        self.assertFalse(self.q.complete(job.job_id, "w1", []))
+        self.assertTrue(self.q.renew(job.job_id, "w2"))
+
+    def test_concurrent_workers_never_share_a_job(self):
+        for i in range(20):
+            self._enqueue(f"u{i}")
+        got = []
+        lock = threading.Lock()
+
+        def worker(name):
+            q = SqliteJobQueue(self.path)
+            try:
+                while True:
+                    job = q.lease(name)
+                    if job is None:
+                        return
+                    with lock:
+                        got.append(job.unit)
+            finally:
+                q.close()
+
+        threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(got), sorted(f"u{i}" for i in range(20)))
+
+    def test_blobs_are_deduplicated(self):
+        k1 = self.q.put_blob(b"input")
+        k2 = self.q.put_blob(b"input")
+        self.assertEqual(k1, k2)
+        self.assertEqual(self.q.get_blob(k1), b"input")
+        self.assertIsNone(self.q.get_blob("missing"))
+
+
+class TestOpenQueue(unittest.TestCase):
+    def test_specs(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            q = job_queue.open_queue("q.sqlite", tmp)
+            self.assertEqual(q.path, os.path.join(tmp, "q.sqlite"))
+            q.close()
+            q = job_queue.open_queue(f"sqlite://{os.path.join(tmp, 'q2.sqlite')}")
+            self.assertTrue(os.path.isfile(os.path.join(tmp, "q2.sqlite")))
+            q.close()
+            with self.assertRaises(ValueError):
+                job_queue.open_queue("redis://localhost/0")
+            job_queue.register_broker("memtest", lambda rest: ("memtest", rest))
+            self.assertEqual(job_queue.open_queue("memtest://x"), ("memtest", "x"))
+        finally:
+            job_queue._BROKERS.pop("memtest", None)
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def test_settings(self):
+        s = job_queue.resolve_queue_settings({"distributed": {"queue": "shared/q.sqlite", "worker_slots": 3, "worker_dir": "wd"}}, "/cfg")
+        self.assertEqual(s.queue, "shared/q.sqlite")
+        self.assertEqual(s.worker_slots, 3)
+        self.assertEqual(s.worker_dir, os.path.abspath("/cfg/wd"))
+
+
+if __name__ == "__main__":
+    unittest.main()
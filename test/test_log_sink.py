@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/log_sink.py (queued, batched log writes with sampling/rate limits).
+"""
+
+import contextlib
+import io
+import os
+import sys
+import logging
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import log_sink
+from functions.log_sink import LogSink
+
+
+class _SinkCase(unittest.TestCase):
+    def make(self, **sink_cfg):
+        self.stream = io.StringIO()
+        self.logger = logging.getLogger(f"test.log_sink.{self.id()}")
+        self.logger.handlers.clear()
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+        self.handler = logging.StreamHandler(self.stream)
+        self.handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        self.logger.addHandler(self.handler)
+        self.sink = LogSink(log_sink.resolve_log_sink_settings({"log_sink": sink_cfg}))
+        self.sink.attach(self.logger)
+
+    def tearDown(self):
+        self.sink.stop()
+
+
+class TestBatchedWrites(_SinkCase):
+    def test_lines_are_written_in_order_and_handlers_restored(self):
+        self.make(batch_size=50)
+        for i in range(120):
+            self.logger.info("line %d", i)
+        self.sink.stop()
+        lines = self.stream.getvalue().splitlines()
+        self.assertEqual(lines, [f"INFO line {i}" for i in range(120)])
+        stats = self.sink.stats()
+        self.assertEqual((stats["queued"], stats["written"], stats["dropped"]), (120, 120, 0))
+        self.assertGreaterEqual(stats["batches"], 3)
+        # Handlers are back in place and write synchronously again
+        self.assertEqual(self.logger.handlers, [self.handler])
+        self.logger.info("after")
+        self.assertTrue(self.stream.getvalue().endswith("INFO after\n"))
+
+    def test_disabled_sink_leaves_logger_alone(self):
+        self.make(enabled=False)
+        self.assertEqual(self.logger.handlers, [self.handler])
+
+
+class TestShedding(_SinkCase):
+    def test_sampling_per_source_keeps_warnings(self):
+        self.make(sample={"fpf:": 3})
+        for i in range(9):
+            self.logger.info("out %d", i, extra={"acm_source": "fpf:batch"})
+        self.logger.warning("problem", extra={"acm_source": "fpf:batch"})
+        self.logger.info("other")
+        self.sink.stop()
+        lines = self.stream.getvalue().splitlines()
+        self.assertEqual(lines, ["INFO out 0", "INFO out 3", "INFO out 6", "WARNING problem", "INFO other"])
+        self.assertEqual(self.sink.stats()["sampled"], 6)
+
+    def test_rate_limit_and_full_queue_drop_info_only(self):
+        self.make(rate_per_source=0.001, burst=2, max_queue=1000)
+        for i in range(5):
+            self.logger.info("chatty %d", i, extra={"acm_source": "gptr:1"})
+        self.sink.stop()
+        self.assertEqual(self.sink.stats()["rate_limited"], 3)
+
+        self.make(max_queue=1)
+        # Stall the listener by holding the handler lock, then overflow the queue
+        self.handler.acquire()
+        try:
+            for i in range(50):
+                self.logger.info("burst %d", i)
+        finally:
+            self.handler.release()
+        self.sink.stop()
+        stats = self.sink.stats()
+        self.assertGreater(stats["dropped"], 0)
+        self.assertEqual(stats["queued"] + stats["dropped"], 50)
+
+
+class TestStdoutHandler(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger(f"test.log_sink.{self.id()}")
+        self.logger.handlers.clear()
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.handler = log_sink.StdoutHandler()
+        self.handler.setFormatter(logging.Formatter("%(message)s"))
+        self.logger.addHandler(self.handler)
+
+    def test_follows_redirected_stdout(self):
+        first, second = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(first):
+            self.logger.info("one")
+        with contextlib.redirect_stdout(second):
+            self.logger.info("two")
+        self.assertEqual((first.getvalue(), second.getvalue()), ("one\n", "two\n"))
+
+    def test_batched_through_sink_into_redirected_stdout(self):
+        sink = LogSink(log_sink.resolve_log_sink_settings({"log_sink": {}}))
+        captured = io.StringIO()
+        with contextlib.redirect_stdout(captured):
+            sink.attach(self.logger)
+            for i in range(5):
+                self.logger.info("line %d", i)
+            sink.stop()
+        self.assertEqual(captured.getvalue().splitlines(), [f"line {i}" for i in range(5)])
+        self.assertEqual(self.logger.handlers, [self.handler])
+
+
+class TestSettings(unittest.TestCase):
+    def test_defaults_and_prefix_matching(self):
+        s = log_sink.resolve_log_sink_settings({"log_sink": {"sample": {"fpf:": 4, "fpf:FPF batch": 2}, "rate_per_source": 0}})
+        self.assertTrue(s.enabled)
+        self.assertIsNone(s.rate_per_source)
+        self.assertEqual(s.sample_every("fpf:FPF batch"), 2)
+        self.assertEqual(s.sample_every("fpf:FPF run 1"), 4)
+        self.assertEqual(s.sample_every("gptr:1"), 1)
+        self.assertFalse(LogSink().settings.enabled)
+
+
+if __name__ == "__main__":
+    unittest.main()
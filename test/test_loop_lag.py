@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/loop_lag.py (event-loop lag metric).
+"""
+
+import os
+import sys
+import time
+import asyncio
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions.loop_lag import LoopLagMonitor
+
+
+class TestLoopLagMonitor(unittest.TestCase):
+    def _measure(self, body):
+        async def scenario():
+            mon = LoopLagMonitor(interval=0.01).start()
+            await asyncio.sleep(0.03)
+            await body()
+            await asyncio.sleep(0.03)
+            await mon.stop()
+            return mon.snapshot()
+
+        return asyncio.run(scenario())
+
+    def test_blocking_call_shows_up_as_lag(self):
+        async def block():
+            time.sleep(0.2)  # blocks the loop thread
+
+        snap = self._measure(block)
+        self.assertGreaterEqual(snap["max_ms"], 150.0)
+        self.assertGreater(snap["samples"], 0)
+
+    def test_async_subprocess_keeps_loop_responsive(self):
+        async def child():
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, "-c", "import time; print('x', flush=True); time.sleep(0.3)",
+                stdout=asyncio.subprocess.PIPE,
+            )
+            await proc.stdout.readline()
+            await proc.wait()
+
+        snap = self._measure(child)
+        self.assertLess(snap["max_ms"], 150.0)
+
+    def test_summary_line(self):
+        mon = LoopLagMonitor()
+        mon._record(0.002)
+        mon._record(1.5)
+        line = mon.summary_line()
+        self.assertTrue(line.startswith("[LOOP_LAG] samples=2"))
+        self.assertIn("over_1s=1", line)
+        self.assertIn("max_ms=1500.0", line)
+
+
+if __name__ == "__main__":
+    unittest.main()
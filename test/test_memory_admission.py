@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/memory_admission.py (memory-aware launch gating and per-kind rlimits).
+"""
+
+import os
+import sys
+import asyncio
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import memory_admission, process_runner
+from functions.memory_admission import AdmissionSettings, MemoryAdmission
+
+
+class _Mem:
+    """Fake MemAvailable reading."""
+
+    def __init__(self, mb):
+        self.mb = mb
+
+    def __call__(self):
+        return self.mb
+
+
+class TestAdmission(unittest.TestCase):
+    def gate(self, mem, **kw):
+        kw.setdefault("reserve_mb", 1000)
+        kw.setdefault("poll_seconds", 0.02)
+        return MemoryAdmission(AdmissionSettings(enabled=True, **kw), meminfo=mem)
+
+    def test_launch_waits_for_headroom(self):
+        mem = _Mem(2500)
+        gate = self.gate(mem, footprints_mb={"gptr": 800})
+
+        async def scenario():
+            first = await gate.admit("gptr")      # nothing of ours running: always admitted
+            waiting = asyncio.ensure_future(gate.admit("gptr"))
+            await asyncio.sleep(0.1)
+            self.assertFalse(waiting.done())        # 2500 - 1000 reserve - 800 ramping < 800
+            mem.mb = 3200                           # e.g. another process exited
+            second = await asyncio.wait_for(waiting, 1.0)
+            mem.mb = 2500
+            third = asyncio.ensure_future(gate.admit("gptr"))
+            await asyncio.sleep(0.1)
+            self.assertFalse(third.done())
+            first.release()                         # wakes the waiter
+            second.release()
+            (await asyncio.wait_for(third, 1.0)).release()
+
+        asyncio.run(scenario())
+        s = gate.stats()
+        self.assertEqual((s["admitted"], s["delayed"], s["forced"], s["inflight"]), (3, 2, 0, 0))
+
+    def test_ramped_children_count_through_memavailable_only(self):
+        gate = self.gate(_Mem(1800), ramp_seconds=0.0, footprints_mb={"fpf": 500})
+
+        async def scenario():
+            held = [await gate.admit("fpf") for _ in range(3)]
+            for t in held:
+                t.release()
+
+        asyncio.run(scenario())
+        self.assertEqual(gate.stats()["delayed"], 0)
+
+    def test_forced_after_max_wait(self):
+        gate = self.gate(_Mem(100), max_wait_seconds=0.1)
+
+        async def scenario():
+            first = await gate.admit("ma")
+            second = await asyncio.wait_for(gate.admit("ma"), 2.0)
+            first.release()
+            second.release()
+
+        asyncio.run(scenario())
+        self.assertEqual(gate.stats()["forced"], 1)
+
+    def test_learned_footprint(self):
+        gate = self.gate(_Mem(8000), footprints_mb={"gptr": 700})
+        self.assertEqual(gate.footprint("gptr"), 700)
+        self.assertEqual(gate.footprint("unknown"), memory_admission.DEFAULT_FOOTPRINT_MB["proc"])
+        gate.observe("gptr", 1200.0)
+        self.assertEqual(gate.footprint("gptr"), 1200.0)
+        gate.observe("gptr", 200.0)
+        self.assertAlmostEqual(gate.footprint("gptr"), 900.0)
+        gate.observe("gptr", None)
+        self.assertAlmostEqual(gate.footprint("gptr"), 900.0)
+
+    def test_disabled_is_pass_through(self):
+        gate = MemoryAdmission(AdmissionSettings(enabled=True), meminfo=lambda: None)
+        self.assertFalse(gate.enabled)
+        ticket = asyncio.run(gate.admit("gptr"))
+        ticket.release()
+        self.assertEqual(gate.stats()["admitted"], 0)
+
+
+class TestSettingsAndLimits(unittest.TestCase):
+    def test_settings(self):
+        s = memory_admission.resolve_admission_settings({"memory_admission": {
+            "enabled": True, "reserve_mb": 2048, "footprints_mb": {"dr": 1500},
+            "rlimits": {"gptr": {"data_mb": 4096, "bogus": 1}},
+        }})
+        self.assertTrue(s.enabled)
+        self.assertEqual(s.reserve_mb, 2048.0)
+        self.assertEqual((s.footprints_mb["dr"], s.footprints_mb["gptr"]), (1500.0, 700.0))
+        self.assertEqual(s.rlimits, {"gptr": {"data_mb": 4096}})
+
+    @unittest.skipIf(memory_admission.resource is None, "resource module is POSIX only")
+    def test_rlimits_reach_the_child(self):
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        want = 64 if hard == resource.RLIM_INFINITY else min(64, hard)
+        previous = memory_admission._ADMISSION
+        self.addCleanup(setattr, memory_admission, "_ADMISSION", previous)
+        memory_admission.configure({"memory_admission": {"rlimits": {"default": {"nofile": want}}}})
+        code = "import resource; print(resource.getrlimit(resource.RLIMIT_NOFILE))"
+        res = asyncio.run(process_runner.run_process([sys.executable, "-c", code], stats_tag="eval-{pid}", stats_kind="eval"))
+        self.assertTrue(res.ok, res.stderr)
+        self.assertEqual(res.stdout, [str((want, want))])
+        self.assertEqual(resource.getrlimit(resource.RLIMIT_NOFILE), (soft, hard))  # parent untouched
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/planner.py (dry-run call graph and cost/time projection).
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import planner
+from functions.run_history import RunHistory
+
+
+CONFIG = {
+    "iterations_default": 2,
+    "runs": [
+        {"type": "fpf", "provider": "openai", "model": "gpt-5.1"},
+        {"type": "dr", "provider": "openai", "model": "gpt-5.1"},
+    ],
+    "concurrency": {"gpt_researcher": {"enabled": True, "max_concurrent_reports": 1}},
+    "eval": {
+        "auto_run": True,
+        "iterations": 1,
+        "pairwise_top_n": 3,
+        "mode": "both",
+        "judges": [{"provider": "google", "model": "gemini-2.5-flash"}, {"provider": "openai", "model": "gpt-5"}],
+    },
+    "combine": {"enabled": True, "models": [{"provider": "openai", "model": "gpt-5.1"}]},
+}
+
+
+def _fpf_log(folder, name, model, seconds, prompt, completion, usd, max_concurrency=4):
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, name), "w", encoding="utf-8") as fh:
+        json.dump({
+            "model": model,
+            "started_at": "2025-11-30T13:00:00",
+            "finished_at": f"2025-11-30T13:00:{seconds:02d}",
+            "usage": {"prompt_tokens": prompt, "completion_tokens": completion},
+            "cost": {"input_price_per_million_usd": 1.0, "output_price_per_million_usd": 10.0, "total_cost_usd": usd},
+            "config": {"concurrency": {"max_concurrency": max_concurrency}},
+        }, fh)
+
+
+class TestExpectedCounts(unittest.TestCase):
+    def test_matches_gui_formulas(self):
+        c = planner.expected_call_counts(reports=4, eval_iterations=1, judges=3, top_n=3, mode="both", combiners=1)
+        self.assertEqual(c, {"single_eval": 12, "pairwise_eval": 9, "combine": 1, "post_pairwise_eval": 6})
+
+    def test_modes_and_disabled_eval(self):
+        self.assertEqual(planner.expected_call_counts(4, 2, 1, 3, mode="single")["pairwise_eval"], 0)
+        self.assertEqual(planner.expected_call_counts(4, 2, 1, 3, mode="pairwise")["single_eval"], 0)
+        off = planner.expected_call_counts(4, 1, 3, 3, eval_enabled=False, combiners=2)
+        self.assertEqual(off, {"single_eval": 0, "pairwise_eval": 0, "combine": 2, "post_pairwise_eval": 0})
+
+
+class TestMakespan(unittest.TestCase):
+    def test_packing(self):
+        self.assertEqual(planner.makespan([10, 10, 10], 1), 30)
+        self.assertEqual(planner.makespan([10, 10, 10], 3), 10)
+        self.assertEqual(planner.makespan([6, 5, 4, 3], 2), 9)
+        self.assertEqual(planner.makespan([], 4), 0)
+
+
+class TestBuildPlan(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        _fpf_log(os.path.join(self.tmp, "single_1"), "a.json", "gemini-2.5-flash", 20, 1000, 100, 0.01)
+        _fpf_log(os.path.join(self.tmp, "pairwise_1"), "b.json", "gemini-2.5-flash", 30, 2000, 100, 0.02)
+        _fpf_log(self.tmp, "c.json", "gpt-5", 40, 1000, 1000, 0.05)
+        _fpf_log(self.tmp, "failure-d.json", "gpt-5", 40, 1000, 1000, 99.0)
+        self.costs = planner.CostHistory.load([self.tmp])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_cost_history(self):
+        self.assertEqual(self.costs.fpf_max_concurrency, 4)
+        self.assertEqual(self.costs.estimate("single", "google:gemini-2.5-flash")["usd"], 0.01)
+        self.assertEqual(self.costs.estimate("pairwise", "gemini-2.5-flash")["seconds"], 30)
+        self.assertEqual(self.costs.count("fpf", "gpt-5"), 1)  # failure-* logs are ignored
+        self.assertEqual(self.costs.price("gpt-5"), (1.0, 10.0))
+
+    def test_plan_counts_costs_and_wall(self):
+        history = RunHistory()
+        history.add("fpf", "gpt-5.1", 100)
+        history.add("dr", "gpt-5.1", 600)
+        plan = planner.build_plan(CONFIG, ["a.md"], history=history, costs=self.costs, file_sizes={"a.md": 4000})
+        counts = {name: len(p.calls) for name, p in plan.phases.items()}
+        self.assertEqual(counts, {"generate": 4, "single_eval": 8, "pairwise_eval": 6, "combine": 1, "post_pairwise_eval": 4})
+
+        single = plan.phases["single_eval"]
+        flash = [c for c in single.calls if c.model == "gemini-2.5-flash"]
+        self.assertTrue(all(c.source == "history" and c.usd == 0.01 for c in flash))
+        # gpt-5 has no single-eval samples: tokens are estimated and priced from its FPF log prices
+        gpt5 = [c for c in single.calls if c.model == "gpt-5"][0]
+        self.assertEqual(gpt5.source, "estimate")
+        self.assertAlmostEqual(gpt5.usd, (gpt5.prompt_tokens * 1.0 + gpt5.completion_tokens * 10.0) / 1e6)
+        # gpt-5.1 generation runs have no price anywhere
+        self.assertEqual(plan.phases["generate"].unpriced, 4)
+
+        # Two DR runs share one GPT-R slot (1200 s); FPF runs in parallel beside them
+        self.assertEqual(plan.phases["generate"].wall_seconds, 1200)
+        self.assertEqual(plan.wall_seconds, sum(p.wall_seconds for p in plan.phases.values()))
+        self.assertEqual(plan.to_dict()["totals"]["calls"], 23)
+        self.assertIn("post_pairwise_eval", plan.format())
+
+    def test_provider_cap_and_one_file_only(self):
+        history = RunHistory()
+        history.add("fpf", "gpt-5.1", 100)
+        config = dict(CONFIG, runs=CONFIG["runs"][:1], eval={}, combine={},
+                      rate_limits={"enabled": True, "providers": {"openai": {"max_concurrent": 1}}})
+        plan = planner.build_plan(config, ["a.md", "b.md"], history=history, costs=self.costs, file_sizes={"a.md": 1, "b.md": 1})
+        # Four FPF slots, but the provider allows one call at a time
+        self.assertEqual(plan.phases["generate"].wall_seconds, 400)
+        self.assertEqual(plan.wall_seconds, 400)
+
+        one = planner.build_plan(dict(config, one_file_only=True), ["a.md", "b.md"], history=history, costs=self.costs, file_sizes={"a.md": 1})
+        self.assertEqual(one.files, ["a.md"])
+
+    def test_pipeline_overlaps_files(self):
+        self.assertEqual(planner._pipeline_wall([(10, 5), (10, 5)], 1, 1), 25)
+        self.assertEqual(planner._pipeline_wall([(10, 20), (10, 20)], 1, 2), 40)
+
+
+if __name__ == "__main__":
+    unittest.main()
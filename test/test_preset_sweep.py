@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/preset_sweep.py (concurrent preset sweeps over presets.yaml).
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import preset_sweep
+from functions.preset_sweep import PresetResult, SweepReport
+
+
+BASE = {
+    "input_folder": "test/mdinputs",
+    "output_folder": "test/mdoutputs",
+    "instructions_file": "test/instructions.txt",
+    "iterations_default": 1,
+    "runs": [
+        {"type": "fpf", "provider": "openai", "model": "gpt-5-mini"},
+        {"type": "gptr", "provider": "openai", "model": "gpt-5-mini"},
+        {"type": "ma", "provider": "openai", "model": "gpt-5-mini"},
+    ],
+    "eval": {"auto_run": False, "mode": "both"},
+    "rate_limits": {
+        "default": {"rpm": 60, "max_concurrent": 5},
+        "providers": {"openai": {"rpm": 500, "tpm": 200000, "max_concurrent": 3}},
+    },
+}
+
+PRESET = {
+    "iterations_default": 3,
+    "input_folder": "C:/somewhere/else",
+    "follow_guidelines": True,
+    "SMART_TOKEN_LIMIT": 4000,
+    "TEMPERATURE": 0.2,
+    "fpf": {"grounding.max_results": 5, "reasoning.effort": "high"},
+    "ma": {"max_sections": 4},
+    "enable": {"fpf": True, "gptr": True, "ma": False, "evaluation": True, "pairwise": False},
+}
+
+
+class TestPresetConfig(unittest.TestCase):
+    def test_preset_overlay_keeps_shared_inputs(self):
+        cfg, not_applied = preset_sweep.preset_config(BASE, PRESET, "8", "/sweeps/s1", "/repo", share=2)
+        self.assertEqual(cfg["input_folder"], os.path.abspath("/repo/test/mdinputs"))
+        self.assertEqual(cfg["instructions_file"], os.path.abspath("/repo/test/instructions.txt"))
+        self.assertEqual(cfg["output_folder"], os.path.join("/sweeps/s1", "8", "outputs"))
+        self.assertEqual(cfg["iterations_default"], 3)
+        self.assertEqual([r["type"] for r in cfg["runs"]], ["fpf", "gptr"])
+        self.assertEqual(cfg["eval"], {"auto_run": True, "mode": "single"})
+        self.assertEqual(cfg["gptr_env"], {"SMART_TOKEN_LIMIT": "4000", "TEMPERATURE": "0.2"})
+        self.assertEqual(cfg["fpf_overrides"], {"grounding.max_results": 5, "reasoning.effort": "high"})
+        self.assertIn("ma.max_sections", not_applied)
+        self.assertIn("follow_guidelines", not_applied)
+        self.assertTrue(any(n.startswith("input_folder") for n in not_applied))
+        # The base config is not modified
+        self.assertEqual(len(BASE["runs"]), 3)
+
+    def test_rate_limits_are_split_between_concurrent_presets(self):
+        out = preset_sweep.split_rate_limits(BASE["rate_limits"], 2)
+        self.assertEqual(out["default"], {"rpm": 30.0, "max_concurrent": 2})
+        self.assertEqual(out["providers"]["openai"], {"rpm": 250.0, "tpm": 100000.0, "max_concurrent": 1})
+        self.assertEqual(BASE["rate_limits"]["providers"]["openai"]["rpm"], 500)
+        self.assertEqual(preset_sweep.split_rate_limits(BASE["rate_limits"], 1), BASE["rate_limits"])
+
+
+class TestReport(unittest.TestCase):
+    def _db(self, path, rows):
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE single_doc_results (doc_id TEXT, model TEXT, trial INTEGER, criterion TEXT, score INTEGER, reason TEXT, timestamp TEXT)")
+        conn.executemany("INSERT INTO single_doc_results VALUES (?, 'm', 1, 'c', ?, '', '')", rows)
+        conn.commit()
+        conn.close()
+
+    def test_scores_and_table(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db1, db2 = os.path.join(tmp, "a.sqlite"), os.path.join(tmp, "b.sqlite")
+            self._db(db1, [("doc1", 4), ("doc1", 2)])
+            self._db(db2, [("doc2", 5)])
+            scores = preset_sweep.eval_scores([db1, db2, os.path.join(tmp, "missing.sqlite")])
+        self.assertEqual(scores, {"mean_score": 3.667, "best_doc_score": 5.0, "best_doc": "doc2", "scored_docs": 2})
+        self.assertIsNone(preset_sweep.eval_scores([])["mean_score"])
+
+        report = SweepReport(sweep_dir="/s", concurrency=2, wall_seconds=120)
+        report.results.append(PresetResult("8", "/s/8/config.yaml", returncode=0, wall_seconds=60, cost_usd=1.5, scores=scores))
+        report.results.append(PresetResult("low", "/s/low/config.yaml", returncode=1, wall_seconds=30, not_applied=["ma.max_sections"], error="boom"))
+        text = report.format()
+        self.assertIn("| 8 | 0 | 1.0 | 1.5000 | 0.4091 | 3.667 | 5.000 |", text)
+        self.assertIn("| low | 1 | 0.5 | - | - | - | - |", text)
+        self.assertIn("- low: not applied: ma.max_sections", text)
+        self.assertEqual(report.to_dict()["presets"][0]["mean_score"], 3.667)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/proc_sampler.py (per-subprocess CPU/RSS/IO sampling) and its
+[PROC_STATS] attachment in tools/timeline_from_logs.py.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import logging
+import tempfile
+import unittest
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import proc_sampler, process_runner
+from functions.proc_sampler import ProcStats
+
+from tools import timeline_from_logs
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(record.getMessage())
+
+
+@unittest.skipUnless(proc_sampler.proc_available(), "needs /proc")
+class TestSampling(unittest.TestCase):
+    def setUp(self):
+        self.handler = _ListHandler()
+        self.logger = logging.getLogger("test_proc_sampler")
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.addCleanup(self.logger.removeHandler, self.handler)
+        previous = proc_sampler._SAMPLER
+        self.addCleanup(setattr, proc_sampler, "_SAMPLER", previous)
+
+    def test_child_and_grandchild_are_sampled(self):
+        sampler = proc_sampler.configure({"proc_stats": {"interval_seconds": 0.1}}, logger=self.logger)
+        # The grandchild allocates ~40 MB and burns CPU; it must be counted against the child's tag
+        inner = "x = bytearray(40 * 1024 * 1024)\nimport time\nt = time.time()\nwhile time.time() - t < 0.8: pass"
+        code = f"import subprocess, sys\nsubprocess.run([sys.executable, '-c', {inner!r}])"
+
+        async def scenario():
+            await sampler.start()
+            try:
+                return await process_runner.run_process(
+                    [sys.executable, "-c", code], stats_tag="gptr-{pid}", stats_kind="gptr",
+                )
+            finally:
+                await sampler.stop()
+
+        res = asyncio.run(scenario())
+        self.assertTrue(res.ok)
+        stats = res.proc_stats
+        self.assertEqual((stats.run_id, stats.kind), (f"gptr-{res.pid}", "gptr"))
+        self.assertGreaterEqual(stats.procs, 2)
+        self.assertGreater(stats.peak_rss_mb, 40)
+        self.assertGreater(stats.cpu_seconds, 0.3)
+        self.assertEqual(self.handler.lines, [stats.format()])
+
+    def test_tag_collects_children_and_run_ids(self):
+        sampler = proc_sampler.configure({"proc_stats": {"interval_seconds": 0.1}}, logger=self.logger)
+
+        async def scenario():
+            await sampler.start()
+            try:
+                with proc_sampler.tag("fpf-batch-abc", "fpf") as t:
+                    proc_sampler.note_run("r1")
+                    await asyncio.gather(*(
+                        process_runner.run_process([sys.executable, "-c", "import time; time.sleep(0.4)"])
+                        for _ in range(2)
+                    ))
+                    proc_sampler.note_run("r2")
+                return t
+            finally:
+                await sampler.stop()
+
+        t = asyncio.run(scenario())
+        self.assertTrue(t.closed)
+        self.assertEqual(len(self.handler.lines), 1)
+        line = self.handler.lines[0]
+        self.assertTrue(line.startswith("[PROC_STATS] run=fpf-batch-abc kind=fpf "), line)
+        self.assertTrue(line.endswith(" runs=r1,r2"), line)
+        self.assertGreaterEqual(t.stats().procs, 2)
+
+    def test_disabled_and_untagged_log_nothing(self):
+        sampler = proc_sampler.configure({"proc_stats": {"enabled": False}}, logger=self.logger)
+        self.assertFalse(sampler.enabled)
+        res = asyncio.run(process_runner.run_process([sys.executable, "-c", "pass"], stats_tag="eval-{pid}"))
+        self.assertIsNone(res.proc_stats)
+        proc_sampler.configure({}, logger=self.logger)
+        self.assertFalse(proc_sampler.get_sampler().track(os.getpid()))  # no tag -> not tracked
+        self.assertEqual(self.handler.lines, [])
+
+
+class TestTimelineAttachment(unittest.TestCase):
+    def test_stats_attach_to_records_and_summary(self):
+        lines = [
+            "2025-01-01 10:00:00,000 - INFO - [GPTR_START] pid=111 type=research_report model=openai:gpt-4o",
+            "2025-01-01 10:00:01,000 - INFO - [FPF RUN_START] id=r1 kind=rest provider=openai model=gpt-4o",
+            "2025-01-01 10:00:01,000 - INFO - [FPF RUN_START] id=r2 kind=rest provider=openai model=gpt-4o",
+            "2025-01-01 10:01:00,000 - INFO - [FPF RUN_COMPLETE] id=r1 kind=rest provider=openai model=gpt-4o ok=true elapsed=59 status=ok path=na error=na",
+            "2025-01-01 10:01:00,000 - INFO - [FPF RUN_COMPLETE] id=r2 kind=rest provider=openai model=gpt-4o ok=true elapsed=59 status=ok path=na error=na",
+            "2025-01-01 10:01:01,000 - INFO - " + ProcStats("fpf-batch-x", "fpf", 120.0, 3.5, 0.0, 1.0, 1, 30, 60.0, ["r1", "r2"]).format(),
+            "2025-01-01 10:02:00,000 - INFO - [GPTR_END] pid=111 result=success",
+            "2025-01-01 10:02:00,000 - INFO - " + ProcStats("gptr-111", "gptr", 512.3, 45.2, 1.2, 0.4, 7, 60, 120.0).format(),
+            "2025-01-01 10:03:00,000 - INFO - " + ProcStats("eval-222", "eval", 300.0, 10.0, 0.0, 0.1, 1, 5, 10.0).format(),
+        ]
+        with tempfile.TemporaryDirectory() as d:
+            log_path = os.path.join(d, "acm_subprocess.log")
+            with open(log_path, "w", encoding="utf-8") as fh:
+                fh.write("\n".join(lines) + "\n")
+            records = timeline_from_logs.produce_timeline(log_path)
+            out = os.path.join(d, "timeline_data.json")
+            stats = timeline_from_logs.parse_proc_stats(log_path)
+            self.assertTrue(timeline_from_logs.export_timeline_json(records, datetime(2025, 1, 1, 10), out, proc_stats=stats))
+            with open(out, encoding="utf-8") as fh:
+                data = json.load(fh)
+        by_id = {r["run_id"]: r for r in data["records"]}
+        self.assertEqual(by_id["gptr-111"]["proc"]["peak_rss_mb"], 512.3)
+        self.assertEqual((by_id["r1"]["proc"]["cpu_s"], by_id["r1"]["proc"]["shared_by"]), (3.5, 2))
+        self.assertEqual(len(data["process_stats"]), 3)
+        self.assertEqual(data["process_summary"]["eval"]["count"], 1)
+        self.assertEqual(data["process_summary"]["gptr"]["cpu_s"], 45.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
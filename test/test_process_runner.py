@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/process_runner.py (shared asyncio subprocess layer).
+"""
+
+import os
+import sys
+import time
+import asyncio
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import deadlines, process_runner
+
+
+def _py(code):
+    return [sys.executable, "-c", code]
+
+
+class TestRunProcess(unittest.TestCase):
+    def test_lines_streams_and_exit_code(self):
+        seen = []
+        code = "import sys\nprint('a')\nprint('b\\r')\nsys.stderr.write('oops\\n')\nsys.stdout.write('tail')\nsys.exit(3)"
+        res = asyncio.run(process_runner.run_process(_py(code), on_line=lambda s, l: seen.append((s, l))))
+        self.assertEqual(res.returncode, 3)
+        self.assertFalse(res.ok)
+        self.assertEqual(res.stdout, ["a", "b", "tail"])
+        self.assertEqual(res.stderr, ["oops"])
+        self.assertIn((process_runner.STDERR, "oops"), seen)
+        self.assertEqual(len(seen), 4)
+
+    def test_stdin_and_callback_errors_do_not_stop_reading(self):
+        def bad(_stream, _line):
+            raise RuntimeError("callback failure")
+
+        res = asyncio.run(process_runner.run_process(
+            _py("import sys\nfor ln in sys.stdin: print(ln.strip().upper())"), stdin_data="x\ny\n", on_line=bad
+        ))
+        self.assertTrue(res.ok)
+        self.assertEqual(res.stdout_text, "X\nY")
+
+    def test_long_lines_are_split_not_lost(self):
+        limit = process_runner.LINE_LIMIT
+        process_runner.LINE_LIMIT = 1024
+        try:
+            res = asyncio.run(process_runner.run_process(_py("print('x' * 5000)")))
+        finally:
+            process_runner.LINE_LIMIT = limit
+        self.assertEqual(sum(len(l) for l in res.stdout), 5000)
+
+    def test_capture_is_bounded_with_kept_lines(self):
+        code = "for i in range(5000): print(f'line {i}')\nprint('[EVAL_SUMMARY] db=x')\nprint('{\"path\": \"p\"}')"
+        keep = lambda s, l: process_runner.json_line(s, l) or process_runner.marker_lines("[EVAL_SUMMARY]")(s, l)
+        res = asyncio.run(process_runner.run_process(_py(code), tail_lines=3, keep=keep))
+        self.assertEqual(res.stdout, ["line 4999", "[EVAL_SUMMARY] db=x", '{"path": "p"}'])
+        self.assertEqual(res.kept, ["[EVAL_SUMMARY] db=x", '{"path": "p"}'])
+        self.assertEqual(res.stdout_count, 5002)
+        self.assertTrue(res.truncated)
+        self.assertFalse(process_runner.json_line(process_runner.STDERR, "{}"))
+
+    def test_deadline_kills_process(self):
+        start = time.monotonic()
+        res = asyncio.run(process_runner.run_process(
+            _py("import time\nprint('up', flush=True)\ntime.sleep(30)"),
+            deadline=deadlines.Deadline(0.5, label="run:test"), grace=0.2,
+        ))
+        self.assertTrue(res.timed_out)
+        self.assertIn("run:test", res.reason)
+        self.assertEqual(res.stdout, ["up"])
+        self.assertLess(time.monotonic() - start, 10)
+
+    def test_cancel_kills_process(self):
+        pids = []
+
+        async def scenario():
+            task = asyncio.ensure_future(process_runner.run_process(
+                _py("import time\ntime.sleep(30)"), on_start=lambda p: pids.append(p)
+            ))
+            await asyncio.sleep(0.5)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            await asyncio.wait_for(pids[0].wait(), 5)
+
+        asyncio.run(scenario())
+        self.assertIsNotNone(pids[0].returncode)
+
+
+if __name__ == "__main__":
+    unittest.main()
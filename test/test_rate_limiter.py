@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/rate_limiter.py (provider-aware token-bucket scheduler).
+"""
+
+import os
+import sys
+import asyncio
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions.rate_limiter import ProviderRateLimiter, TokenBucket, estimate_tokens
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_unlimited(self):
+        b = TokenBucket(0)
+        self.assertTrue(b.unlimited)
+        self.assertEqual(b.wait_time(1000), 0.0)
+
+    def test_wait_time_after_drain(self):
+        b = TokenBucket(60)  # 1 token / second
+        self.assertEqual(b.wait_time(60), 0.0)
+        b.take(60)
+        self.assertAlmostEqual(b.wait_time(1), 1.0, delta=0.05)
+
+    def test_oversized_request_fits_full_bucket(self):
+        b = TokenBucket(10)
+        self.assertEqual(b.wait_time(50), 0.0)
+
+
+class TestProviderRateLimiter(unittest.TestCase):
+    def _limiter(self, **extra):
+        settings = {
+            "enabled": True,
+            "default": {"max_concurrent": 0},
+            "providers": {"openai": {"max_concurrent": 2, "rpm": 600}},
+            "models": {"openai:gpt-5.1": {"max_concurrent": 1}},
+        }
+        settings.update(extra)
+        return ProviderRateLimiter(settings)
+
+    def test_limits_lookup_order(self):
+        lim = self._limiter()
+        self.assertEqual(lim.limits_for("openai", "gpt-5.1")["max_concurrent"], 1)
+        self.assertEqual(lim.limits_for("OpenAI", "gpt-4o")["max_concurrent"], 2)
+        self.assertEqual(lim.limits_for("openai", "gpt-4o")["rpm"], 600)
+        self.assertEqual(lim.limits_for("google", "gemini")["max_concurrent"], 0)
+        # provider:model given as model only
+        self.assertEqual(lim.limits_for("", "openai:gpt-5.1")["max_concurrent"], 1)
+
+    def test_disabled_is_passthrough(self):
+        lim = ProviderRateLimiter({})
+
+        async def go():
+            lease = await lim.acquire("openai", "x")
+            lease.release()
+            lease.release()
+
+        asyncio.run(go())
+        self.assertEqual(lim.snapshot(), {})
+
+    def test_concurrency_cap_serialises_holders(self):
+        lim = self._limiter()
+        active = {"now": 0, "peak": 0}
+
+        async def worker():
+            async with lim.limit("openai", "gpt-5.1"):
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+                await asyncio.sleep(0.01)
+                active["now"] -= 1
+
+        async def go():
+            await asyncio.gather(*(worker() for _ in range(4)))
+
+        asyncio.run(go())
+        self.assertEqual(active["peak"], 1)
+        self.assertEqual(lim.snapshot()["openai:gpt-5.1"]["acquired"], 4)
+
+    def test_external_inflight_counts_against_cap(self):
+        lim = self._limiter()
+
+        async def go():
+            lim.note_start("openai", "gpt-5.1")
+            task = asyncio.create_task(lim.acquire("openai", "gpt-5.1"))
+            await asyncio.sleep(0.02)
+            self.assertFalse(task.done())
+            lim.note_end("openai", "gpt-5.1")
+            lease = await asyncio.wait_for(task, timeout=1)
+            lease.release()
+
+        asyncio.run(go())
+
+    def test_limit_many_dedupes_keys(self):
+        lim = self._limiter()
+
+        async def go():
+            async with lim.limit_many([("openai", "gpt-5.1"), ("OPENAI", "gpt-5.1")]) as leases:
+                self.assertEqual(len(leases), 1)
+
+        asyncio.run(go())
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens("a" * 400, "eval", {"eval": 10}), 110)
+        self.assertEqual(estimate_tokens(None, "unknown"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
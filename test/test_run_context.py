@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/run_context.py (immutable per-batch config/input snapshot).
+"""
+
+import os
+import sys
+import dataclasses
+import tempfile
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import run_context
+
+
+class TestRunContext(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        d = self.tmp.name
+        os.makedirs(os.path.join(d, "in"))
+        self.md = os.path.join(d, "in", "doc.md")
+        self._write(self.md, "# doc")
+        self._write(os.path.join(d, "instructions.txt"), "Write a report.")
+        self._write(os.path.join(d, "guidelines.txt"), "be brief\n\n cite sources \n")
+        self.config_path = os.path.join(d, "config.yaml")
+        self.config = {
+            "input_folder": os.path.join(d, "in"),
+            "output_folder": os.path.join(d, "out"),
+            "instructions_file": "instructions.txt",
+            "guidelines_file": "guidelines.txt",
+            "one_file_only": True,
+            "runs": [{"type": "fpf", "model": "m"}],
+        }
+        self.addCleanup(run_context.set_context, run_context.get_context())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, path, text):
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+
+    def test_snapshot_is_read_once_and_frozen(self):
+        ctx = run_context.build(self.config_path, self.config, [self.md])
+        self.assertEqual(ctx.instructions_file, os.path.join(self.tmp.name, "instructions.txt"))
+        self.assertEqual(ctx.guidelines, ("be brief", "cite sources"))
+        self.assertTrue(ctx.follow_guidelines and ctx.one_file_only)
+        self.assertEqual(ctx.input_files, (self.md,))
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            ctx.one_file_only = False
+        # Later edits to the files or the caller's dict do not leak into the batch
+        self.config["runs"].append({"type": "gptr"})
+        self._write(self.md, "# edited")
+        self.assertEqual(len(ctx.config["runs"]), 1)
+        run_context.set_context(ctx)
+        self.assertEqual(run_context.read_text(self.md), "# doc")
+        self.assertEqual(run_context.read_text(ctx.instructions_file), "Write a report.")
+        # Files outside the snapshot come from disk
+        other = os.path.join(self.tmp.name, "other.md")
+        self._write(other, "other")
+        self.assertEqual(run_context.read_text(other), "other")
+
+    def test_validation(self):
+        del self.config["output_folder"]
+        with self.assertRaisesRegex(ValueError, "output_folder"):
+            run_context.build(self.config_path, self.config)
+        self.config["output_folder"] = "out"
+        self.config["instructions_file"] = "missing.txt"
+        with self.assertRaisesRegex(ValueError, "instructions"):
+            run_context.build(self.config_path, self.config)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/run_history.py (historical durations for launch ordering).
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions.run_history import RunHistory, resolve_launch_order, DEFAULT_SECONDS
+
+
+SUBPROC_LOG = """\
+2025-01-01 10:00:00,000 - acm.subproc - INFO - [FPF RUN_START] id=fpf-1-1 kind=rest provider=google model=gemini-2.5-flash
+2025-01-01 10:00:01,000 - acm.subproc - INFO - [GPTR_START] pid=111 type=deep model=openai:gpt-5.1
+2025-01-01 10:00:02,000 - acm.subproc - INFO - [MA_START] id=abc model=gpt-4o
+2025-01-01 10:01:00,000 - acm.subproc - INFO - [FPF RUN_COMPLETE] id=fpf-1-1 kind=rest provider=google model=gemini-2.5-flash ok=true path=x.txt
+2025-01-01 10:05:02,000 - acm.subproc - INFO - [MA_END] id=abc model=gpt-4o result=success
+2025-01-01 10:20:01,000 - acm.subproc - INFO - [GPTR_END] pid=111 result=success
+2025-01-01 10:20:05,000 - acm.subproc - INFO - [GPTR_START] pid=222 type=research_report model=openai:gpt-5.1
+2025-01-01 10:20:15,000 - acm.subproc - INFO - [GPTR_END] pid=222 result=failure
+"""
+
+
+class TestRunHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_load_from_subprocess_log(self):
+        with open(os.path.join(self.tmp, "acm_subprocess_20250101_100000.log"), "w", encoding="utf-8") as f:
+            f.write(SUBPROC_LOG)
+        hist = RunHistory.load(self.tmp)
+        self.assertEqual(hist.predict("fpf", "gemini-2.5-flash"), 60.0)
+        self.assertEqual(hist.predict("dr", "openai:gpt-5.1"), 1200.0)
+        self.assertEqual(hist.predict("ma", "gpt-4o"), 300.0)
+        # Failed runs are not learned
+        self.assertEqual(hist.count("gptr", "gpt-5.1"), 0)
+
+    def test_timeline_json_dedupes_with_log(self):
+        with open(os.path.join(self.tmp, "acm_subprocess_20250101_100000.log"), "w", encoding="utf-8") as f:
+            f.write(SUBPROC_LOG)
+        data = {"records": [
+            {"report_type": "FPF rest", "model": "gemini-2.5-flash", "result": "success",
+             "start_ts": "2025-01-01T10:00:00", "duration_seconds": 60},
+            {"report_type": "GPT-R standard", "model": "openai:gpt-5.1", "result": "success",
+             "start_ts": "2025-01-02T10:00:00", "duration_seconds": 200},
+        ]}
+        with open(os.path.join(self.tmp, "timeline_data.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        hist = RunHistory.load(self.tmp)
+        self.assertEqual(hist.count("fpf", "gemini-2.5-flash"), 1)
+        self.assertEqual(hist.predict("gptr", "gpt-5.1"), 200.0)
+
+    def test_fallbacks_and_percentile(self):
+        hist = RunHistory()
+        self.assertEqual(hist.predict("dr", "unknown"), DEFAULT_SECONDS["dr"])
+        for secs in (10, 20, 30, 40, 50):
+            hist.add("gptr", "m1", secs)
+        self.assertEqual(hist.predict("gptr", "m1"), 30)
+        self.assertEqual(hist.predict("gptr", "other-model"), 30)  # type-wide median
+        self.assertAlmostEqual(hist.percentile("gptr", "m1", 0.9), 46.0)
+        self.assertIsNone(hist.percentile("gptr", "other-model", 0.9))
+
+    def test_order_longest_first(self):
+        hist = RunHistory()
+        hist.add("gptr", "a", 100)
+        hist.add("dr", "b", 900)
+        hist.add("fpf", "c", 30)
+        items = [("gptr", "a"), ("fpf", "c"), ("dr", "b")]
+        self.assertEqual(hist.order_longest_first(items, key=lambda it: it), [("dr", "b"), ("gptr", "a"), ("fpf", "c")])
+
+    def test_resolve_launch_order(self):
+        self.assertEqual(resolve_launch_order({}), "config")
+        self.assertEqual(resolve_launch_order({"concurrency": {"launch_order": "longest_first"}}), "longest_first")
+
+
+if __name__ == "__main__":
+    unittest.main()
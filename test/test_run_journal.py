@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/run_journal.py (durable run journal / crash-resume).
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions.run_journal import RunJournal, gen_unit, eval_unit, resolve_journal_settings
+
+
+class TestRunJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db = os.path.join(self.tmp, "journal.sqlite")
+        self.cfg = os.path.join(self.tmp, "config.yaml")
+        with open(self.cfg, "w", encoding="utf-8") as f:
+            f.write("runs: []\n")
+        self.md = os.path.join(self.tmp, "doc.md")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_state_transitions(self):
+        j = RunJournal.open(self.db, self.cfg)
+        u = gen_unit(self.md, 0, 1)
+        j.plan(u, "gen", self.md)
+        self.assertEqual(j.state(u), "planned")
+        j.start(u)
+        self.assertEqual(j.state(u), "running")
+        j.fail(u, "429 rate limit")
+        self.assertEqual(j.state(u), "failed")
+        j.start(u)
+        j.finish(u, outputs=["/out/doc.gptr.1.m.abc.md"])
+        self.assertTrue(j.is_done(u))
+        # A late failure (e.g. superseded duplicate) does not undo a finished unit
+        j.fail(u, "late")
+        self.assertTrue(j.is_done(u))
+        self.assertEqual(j.outputs(u), ["/out/doc.gptr.1.m.abc.md"])
+        j.close()
+
+    def test_resume_reopens_unfinished_batch_only(self):
+        j = RunJournal.open(self.db, self.cfg)
+        done, left = gen_unit(self.md, 0, 1), gen_unit(self.md, 0, 2)
+        ev = eval_unit(self.md, "precombine")
+        for u in (done, left, ev):
+            j.plan(u, u.split("|", 1)[0], self.md)
+        j.start(done)
+        j.finish(done, outputs=["a.md"])
+        j.start(left)  # crash while running
+        batch = j.batch_id
+        j.close()
+
+        r = RunJournal.open(self.db, self.cfg, resume=True)
+        self.assertTrue(r.resumed)
+        self.assertEqual(r.batch_id, batch)
+        self.assertTrue(r.has_file(self.md))
+        self.assertEqual(sorted(r.pending(self.md)), sorted([left, ev]))
+        self.assertEqual(r.file_outputs(), ["a.md"])
+        # Re-planning keeps the recorded state
+        r.plan(done, "gen", self.md)
+        self.assertTrue(r.is_done(done))
+        r.close_batch("complete")
+        r.close()
+
+        fresh = RunJournal.open(self.db, self.cfg, resume=True)
+        self.assertFalse(fresh.resumed)
+        self.assertNotEqual(fresh.batch_id, batch)
+        fresh.close()
+
+    def test_settings(self):
+        enabled, path = resolve_journal_settings({"journal": {"path": "j.sqlite"}}, self.tmp)
+        self.assertFalse(enabled)  # opt-in
+        self.assertEqual(path, os.path.join(self.tmp, "j.sqlite"))
+        self.assertTrue(resolve_journal_settings({"journal": {"enabled": True}}, self.tmp)[0])
+        self.assertFalse(resolve_journal_settings({}, self.tmp)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Unit tests for functions/workspaces.py (per-run temp workspaces and the background reaper).
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import workspaces
+from functions.workspaces import WorkspaceManager, WorkspaceSettings
+
+
+class _ManagerCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "ws")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def manager(self, **kw):
+        kw.setdefault("reap_interval", 0.05)
+        kw.setdefault("orphan_scan_seconds", 3600)
+        return WorkspaceManager(WorkspaceSettings(**kw), root=self.root)
+
+
+class TestLifetimes(_ManagerCase):
+    def test_scope_releases_and_reaper_deletes_off_loop(self):
+        mgr = self.manager()
+
+        async def scenario():
+            await mgr.start()
+
+            @workspaces.scoped
+            async def run():
+                # Tasks started inside the scope create workspaces owned by it
+                ws = await asyncio.create_task(asyncio.to_thread(mgr.create, "fpf_run"))
+                held = ws.acquire()
+                return ws, held
+
+            ws, held = await run()
+            self.assertTrue(os.path.isdir(ws.path))
+            self.assertEqual(ws.refs, 1)
+            await asyncio.sleep(0.2)
+            self.assertTrue(os.path.isdir(ws.path), "still referenced after the scope closed")
+            held.release()
+            for _ in range(50):
+                if not os.path.exists(ws.path):
+                    break
+                await asyncio.sleep(0.05)
+            self.assertFalse(os.path.exists(ws.path))
+            batch_ws = mgr.create("unscoped")
+            await mgr.stop()
+            return batch_ws
+
+        batch_ws = asyncio.run(scenario())
+        self.assertFalse(os.path.exists(batch_ws.path))
+        stats = mgr.stats()
+        self.assertEqual((stats["created"], stats["reaped"], stats["live"]), (2, 2, 0))
+        with self.assertRaises(RuntimeError):
+            batch_ws.acquire()
+
+    def test_keep_leaves_everything(self):
+        mgr = self.manager(keep=True)
+        ws = mgr.create("ma_run")
+        ws.release()
+        mgr.reap()
+        mgr.scan()
+        self.assertTrue(os.path.isdir(ws.path))
+
+
+class TestQuotas(_ManagerCase):
+    def _orphan(self, name, pid=None, age=0.0, size=0):
+        path = os.path.join(self.root, name)
+        os.makedirs(path)
+        if pid is not None:
+            with open(os.path.join(path, workspaces.OWNER_FILE), "w") as fh:
+                json.dump({"pid": pid}, fh)
+        if size:
+            with open(os.path.join(path, "blob"), "wb") as fh:
+                fh.write(b"x" * size)
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+        return path
+
+    @unittest.skipUnless(os.name == "posix", "owner liveness is only probed on POSIX")
+    def test_age_and_size_quotas_skip_live_owners(self):
+        mgr = self.manager(max_age_seconds=3600, max_total_bytes=1500)
+        live = mgr.create("gptr_prompt")
+        with open(os.path.join(live.path, "big"), "wb") as fh:
+            fh.write(b"x" * 1000)
+        dead_pid = 2 ** 22 + 12345
+        old = self._orphan("old_run", pid=dead_pid, age=7200)
+        busy = self._orphan("other_process", pid=os.getppid(), age=7200, size=10)
+        oldest = self._orphan("crashed_a", pid=dead_pid, age=600, size=1000)
+        newer = self._orphan("crashed_b", age=60, size=10)
+        mgr.scan()
+        self.assertFalse(os.path.exists(old))          # past max_age
+        self.assertFalse(os.path.exists(oldest))       # oldest dead orphan goes first under quota
+        self.assertTrue(os.path.exists(newer))         # quota met after one removal
+        self.assertTrue(os.path.exists(busy))          # owner still alive
+        self.assertTrue(os.path.isdir(live.path))      # live workspace untouched
+        self.assertEqual((mgr.stats()["orphans_reaped"], mgr.stats()["quota_reaped"]), (1, 1))
+
+    def test_settings(self):
+        s = workspaces.resolve_workspace_settings({"workspaces": {"max_age_hours": 1, "max_total_mb": 0}}, keep=True)
+        self.assertTrue(s.keep)
+        self.assertEqual((s.max_age_seconds, s.max_total_bytes), (3600.0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
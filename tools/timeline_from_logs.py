@@ -24,6 +24,10 @@ Optional input:
 - --file-filter can be provided to restrict lines by substring (not commonly used)
 - --no-t0-filter disables baseline (t0) filtering if needed (default: use safer t0 with fallback)
 
+[PROC_STATS] lines (functions/proc_sampler.py: peak RSS, CPU seconds and storage IO per child
+process tree) are not printed; --json-output attaches them to the matching records ("proc")
+and adds "process_stats" / "process_summary".
+
 Usage examples (run from repo root):
   python ..\\silky\\api_cost_multiplier\\tools\\timeline_from_logs.py --log-file ..\\silky\\api_cost_multiplier\\logs\\acm_subprocess_YYYYMMDD_HHMMSS.log
 """
@@ -61,6 +65,19 @@ GPTR_END = re.compile(
     re.IGNORECASE,
 )
 
+# Hedged duplicates of straggler runs (see functions/hedging.py)
+GPTR_HEDGE_FLAG = re.compile(r"\bhedge=1\b")
+HEDGE_ID_SUFFIX = "-hedge"
+
+# Runs killed by a batch/file/run deadline (see functions/deadlines.py)
+DEADLINE_FLAG = re.compile(r"\breason=deadline\b")
+
+# Per-child resource usage (see functions/proc_sampler.py); FPF batches list the run ids they served
+PROC_STATS = re.compile(
+    r"\[PROC_STATS\]\s+run=(\S+)\s+kind=(\S+)\s+peak_rss_mb=([\d.]+)\s+cpu_s=([\d.]+)\s+read_mb=([\d.]+)"
+    r"\s+write_mb=([\d.]+)\s+procs=(\d+)\s+samples=(\d+)\s+wall_s=([\d.]+)(?:\s+runs=(\S+))?"
+)
+
 # MA signals
 MA_START = re.compile(r"\[MA run (\d+)\] Starting research for query:")
 MA_END = re.compile(r"\[MA run (\d+)\] Multi-agent report \(Markdown\) written to")
@@ -96,6 +113,9 @@ class RunRecord:
     result: Optional[str] = None  # "success" | "failure"
     output_file: Optional[str] = None
     file_size: Optional[int] = None
+    hedge: bool = False  # duplicate launched for a straggler run (extra cost, see hedge_summary)
+    deadline: bool = False  # killed because a batch/file/run deadline expired
+    proc: Optional[dict] = None  # [PROC_STATS] for the child process tree that ran it
 
 
 def parse_ts(line: str) -> Optional[datetime]:
@@ -225,7 +245,9 @@ def produce_timeline(
                 if m and ts:
                     run_id, kind, provider, model = m.group(1), m.group(2), m.group(3), m.group(4)
                     rtype = fpf_kind_to_report_type(kind, provider)
-                    _upsert_single(run_id, report_type=rtype, model=model, start_ts=ts)
+                    rec = _upsert_single(run_id, report_type=rtype, model=model, start_ts=ts)
+                    if run_id.endswith(HEDGE_ID_SUFFIX):
+                        rec.hedge = True
                     continue
 
                 # FPF RUN_COMPLETE
@@ -233,13 +255,15 @@ def produce_timeline(
                 if m and ts:
                     run_id, kind, provider, model, ok = m.group(1), m.group(2), m.group(3), m.group(4), m.group(5)
                     rtype = fpf_kind_to_report_type(kind, provider)
-                    _upsert_single(
+                    rec = _upsert_single(
                         run_id,
                         report_type=rtype,
                         model=model,
                         end_ts=ts,
                         result="success" if str(ok).lower() == "true" else "failure",
                     )
+                    if DEADLINE_FLAG.search(line):
+                        rec.deadline = True
                     continue
 
                 # GPTR_START
@@ -248,7 +272,9 @@ def produce_timeline(
                     pid, gptr_type, model = m.group(1), m.group(2), m.group(3)
                     run_id = f"gptr-{pid}"
                     rtype = gptr_type_to_report_type(gptr_type)
-                    _upsert_single(run_id, report_type=rtype, model=model, start_ts=ts)
+                    rec = _upsert_single(run_id, report_type=rtype, model=model, start_ts=ts)
+                    if GPTR_HEDGE_FLAG.search(line):
+                        rec.hedge = True
                     continue
 
                 # GPTR_END
@@ -256,7 +282,9 @@ def produce_timeline(
                 if m and ts:
                     pid, result = m.group(1), m.group(2)
                     run_id = f"gptr-{pid}"
-                    _upsert_single(run_id, end_ts=ts, result=result.lower())
+                    rec = _upsert_single(run_id, end_ts=ts, result=result.lower())
+                    if DEADLINE_FLAG.search(line):
+                        rec.deadline = True
                     continue
 
                 # Standardized MA_START
@@ -318,6 +346,8 @@ def produce_timeline(
                         approx_start = ts - timedelta(seconds=1)
                         new_rec = RunRecord(run_id=run_id, report_type="MA", model=model or "unknown", start_ts=approx_start, end_ts=ts, result=result.lower())
                         lst.append(new_rec)
+                    if DEADLINE_FLAG.search(line):
+                        lst[-1].deadline = True
                     continue
 
                 # MA_END
@@ -470,17 +500,73 @@ def produce_timeline(
     return filtered
 
 
+def parse_proc_stats(subprocess_log_path: str) -> List[dict]:
+    """Return every [PROC_STATS] line in the subprocess log as a dict, in log order."""
+    stats: List[dict] = []
+    with open(subprocess_log_path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            m = PROC_STATS.search(line)
+            if not m:
+                continue
+            ts = parse_ts(line)
+            stats.append({
+                "run": m.group(1),
+                "kind": m.group(2),
+                "peak_rss_mb": float(m.group(3)),
+                "cpu_s": float(m.group(4)),
+                "read_mb": float(m.group(5)),
+                "write_mb": float(m.group(6)),
+                "procs": int(m.group(7)),
+                "samples": int(m.group(8)),
+                "wall_s": float(m.group(9)),
+                "runs": m.group(10).split(",") if m.group(10) else [],
+                "ts": ts.isoformat() if ts else None,
+            })
+    return stats
+
+
+def attach_proc_stats(records: List[RunRecord], proc_stats: List[dict]) -> None:
+    """
+    Set RunRecord.proc from [PROC_STATS]: by run id for GPT-R/MA, and for FPF from the batch line
+    that lists the run (the batch's usage is shared by its runs, see "shared_by").
+    """
+    by_id: Dict[str, dict] = {}
+    for st in proc_stats:
+        by_id[st["run"]] = st
+        for rid in st["runs"]:
+            by_id.setdefault(rid, dict(st, shared_by=len(st["runs"])))
+    for r in records:
+        st = by_id.get(r.run_id)
+        if st is not None:
+            r.proc = {k: v for k, v in st.items() if k not in ("runs", "ts")}
+
+
+def _process_summary(proc_stats: List[dict]) -> Dict[str, dict]:
+    summary: Dict[str, dict] = {}
+    for st in proc_stats:
+        s = summary.setdefault(st["kind"], {"count": 0, "peak_rss_mb": 0.0, "cpu_s": 0.0, "read_mb": 0.0, "write_mb": 0.0})
+        s["count"] += 1
+        s["peak_rss_mb"] = max(s["peak_rss_mb"], st["peak_rss_mb"])
+        for key in ("cpu_s", "read_mb", "write_mb"):
+            s[key] = round(s[key] + st[key], 2)
+    return summary
+
+
 def export_timeline_json(
     records: List[RunRecord],
     t0: datetime,
     output_path: str,
     run_start_iso: Optional[str] = None,
+    proc_stats: Optional[List[dict]] = None,
 ) -> bool:
     """
     Export timeline records to a JSON file for use by html_exporter.
+    proc_stats (parse_proc_stats) is attached to the records and summarised per process kind.
     Returns True on success.
     """
     try:
+        if proc_stats:
+            attach_proc_stats(records, proc_stats)
         data = {
             "run_start": run_start_iso or (t0.isoformat() if t0 else None),
             "t0_iso": t0.isoformat() if t0 else None,
@@ -496,6 +582,9 @@ def export_timeline_json(
                 "result": r.result,
                 "output_file": r.output_file,
                 "file_size": r.file_size,
+                "hedge": r.hedge,
+                "deadline": r.deadline,
+                "proc": r.proc,
             }
             # Calculate relative times for display
             if r.start_ts and t0:
@@ -509,7 +598,21 @@ def export_timeline_json(
                 rec_dict["duration_mmss"] = to_mmss(dur)
                 rec_dict["duration_seconds"] = int(dur.total_seconds())
             data["records"].append(rec_dict)
-        
+
+        # Hedge cost is reported separately from the planned runs
+        hedges = [r for r in records if r.hedge]
+        data["hedge_summary"] = {
+            "count": len(hedges),
+            "succeeded": sum(1 for r in hedges if r.result == "success"),
+            "extra_seconds": int(sum((r.end_ts - r.start_ts).total_seconds() for r in hedges if r.start_ts and r.end_ts)),
+        }
+
+        data["deadline_summary"] = {"killed": sum(1 for r in records if r.deadline)}
+
+        # Includes children with no timeline record of their own (evaluate.py, streaming evals)
+        data["process_stats"] = list(proc_stats or [])
+        data["process_summary"] = _process_summary(proc_stats or [])
+
         with open(output_path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2)
         return True
@@ -542,7 +645,7 @@ def main():
         if args.json_output and records:
             # Determine t0 from records
             t0 = min(r.start_ts for r in records if r.start_ts) if records else None
-            export_timeline_json(records, t0, args.json_output)
+            export_timeline_json(records, t0, args.json_output, proc_stats=parse_proc_stats(args.log_file))
             print(f"Timeline JSON exported to: {args.json_output}", file=sys.stderr)
     except Exception as e:
         print(f"ERROR: timeline generation failed: {e}", file=sys.stderr)